@@ -7,15 +7,47 @@ import numpy as np
 from PIL import Image
 import threading  # 用于在独立线程中运行脚本
 import ctypes
-from pynput import keyboard, mouse  # 用于监听键盘和鼠标事件，支持热键和鼠标侧键操作
+import importlib
 
-# 初始化键盘和鼠标控制器
-keyboard_controller = keyboard.Controller()
-mouse_controller = mouse.Controller()
+
+# pynput 延迟导入：导入 pynput 时就会连接桌面（Linux 上需要 X 服务器），
+# 放到首次使用按键、控制器或监听器时再导入，模拟器、回放和基准测试等命令行工具在无桌面的机器上也能导入本模块
+class _LazyPynputModule:
+    """首次访问属性时才导入的 pynput.keyboard / pynput.mouse"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = _import_pynput(self._name)
+        return getattr(self._module, attr)
+
+
+def _import_pynput(name):
+    try:
+        return importlib.import_module("pynput." + name)
+    except ImportError as e:
+        # 没有可用桌面（例如 CI 上没有 DISPLAY）：改用 pynput 的 dummy 后端，
+        # 按键对象可以创建和比较，但不会真正发送或监听输入
+        print(f"⚠️  [警告] pynput 无法加载当前平台的后端（{str(e).splitlines()[0]}），改用 dummy 后端")
+        os.environ["PYNPUT_BACKEND"] = "dummy"
+        return importlib.import_module("pynput." + name)
+
+
+keyboard = _LazyPynputModule("keyboard")  # 用于监听键盘和鼠标事件，支持热键和鼠标侧键操作
+mouse = _LazyPynputModule("mouse")
 import datetime
 import re
 import queue  # 用于线程安全通信
 import random  # 添加随机模块用于时间抖动
+import base64
+import collections
+import contextlib
+import concurrent.futures
+import hashlib
+import weakref
 
 try:
     import winsound
@@ -371,10 +403,94 @@ debug_history_lock = threading.Lock()  # 保护调试历史记录的线程锁
 debug_window = None  # 调试窗口引用
 debug_auto_refresh = True  # 是否自动刷新调试信息
 
+# =========================
+# 时钟（钓鱼流程的计时和等待都通过 clock，模拟器可以替换为加速时钟）
+# =========================
+class Clock:
+    """实时时钟：直接使用系统时间"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class AcceleratedClock(Clock):
+    """加速时钟：虚拟时间按 speed 倍速流逝，sleep 实际只等待 1/speed 的时间
+
+    用于模拟器在 Linux 上以高于实时的速度跑完整的钓鱼流程
+    """
+
+    def __init__(self, speed=10.0, start=None):
+        self.speed = speed
+        self._real_origin = time.time()
+        self._origin = self._real_origin if start is None else start
+
+    def time(self):
+        return self._origin + (time.time() - self._real_origin) * self.speed
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+
+class SimulatedClock(Clock):
+    """模拟时钟：sleep 不真正等待，直接把虚拟时间往后推
+
+    只适合单线程的离线回放（例如用几秒钟跑完8小时的钓鱼循环和鱼桶满检测），
+    多个线程同时 sleep 时各自推进同一个时间，不能代表真实的并发顺序
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+        self._timers = []  # [触发时间, 间隔(None表示只触发一次), 回调]
+        self._in_timer = False
+
+    def time(self):
+        return self._now
+
+    def call_at(self, when, callback, interval=None):
+        """注册定时回调：sleep 把虚拟时间推过 when 时调用 callback()，interval 不为None时按间隔重复
+
+        用来在单线程里代替后台线程的定时工作（例如每0.5秒一次的鱼桶满检测）。
+        回调里的 sleep 只推进时间，不会再触发其他定时回调
+        """
+        self._timers.append([when, interval, callback])
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        target = self._now + seconds
+        while self._timers and not self._in_timer:
+            timer = min(self._timers, key=lambda item: item[0])
+            if timer[0] > target:
+                break
+            with self._lock:
+                self._now = max(self._now, timer[0])
+            if timer[1] is None:
+                self._timers.remove(timer)
+            else:
+                timer[0] += timer[1]
+            self._in_timer = True
+            try:
+                timer[2]()
+            finally:
+                self._in_timer = False
+        with self._lock:
+            self._now = max(self._now, target)
+
+
+clock = Clock()  # 当前使用的时钟
+
 # =========================
 # 时间抖动配置
 # =========================
 JITTER_RANGE = 0  # 时间抖动范围 ±0%
+jitter_random = random.Random()  # 时间抖动使用的随机数生成器（回放/模拟时换成固定种子的实例）
+timing_listeners = []  # 每次打印时间抖动信息时调用 listener(操作类型, 基础时间, 实际时间)
 # 保存上次操作的时间戳
 last_operation_time = None
 last_operation_type = None
@@ -393,7 +509,7 @@ def add_jitter(base_time):
         return base_time
 
     # 计算抖动范围（±JITTER_RANGE%）
-    jitter_factor = random.uniform(1 - JITTER_RANGE / 100, 1 + JITTER_RANGE / 100)
+    jitter_factor = jitter_random.uniform(1 - JITTER_RANGE / 100, 1 + JITTER_RANGE / 100)
     jittered_time = base_time * jitter_factor
 
     # 确保时间不为负数且保持精度
@@ -411,7 +527,7 @@ def print_timing_info(operation_type, base_time, actual_time, previous_interval=
     """
     global last_operation_time, last_operation_type
 
-    current_time = time.time()
+    current_time = clock.time()
 
     # 计算与基础时间的偏差百分比
     deviation = ((actual_time - base_time) / base_time) * 100 if base_time > 0 else 0
@@ -439,6 +555,9 @@ def print_timing_info(operation_type, base_time, actual_time, previous_interval=
     last_operation_time = current_time
     last_operation_type = operation_type
 
+    for listener in timing_listeners:
+        listener(operation_type, base_time, actual_time)
+
     # 打印信息
     print(
         f"⏱️  [时间] {operation_type}: 基础={base_time:.3f}s, 实际={actual_time:.3f}s ({deviation_display}){interval_info}"
@@ -828,6 +947,11 @@ def save_parameters():
         "fish_bucket_sound_enabled": fish_bucket_sound_enabled,
         "bucket_detection_mode": bucket_detection_mode,  # 新增保存鱼桶检测模式
         "bait_recognition_algorithm": bait_recognition_algorithm,  # 新增保存鱼饵识别算法
+        # 会话画面录制设置
+        "frame_recorder_enabled": frame_recorder_enabled,
+        "frame_recorder_seconds": frame_recorder_seconds,
+        "frame_recorder_budget_mb": frame_recorder_budget_mb,
+        "frame_recorder_hotkey": frame_recorder_hotkey_name,
         # 放生功能设置
         "release_fish_enabled": release_fish_enabled,
         "release_standard_enabled": release_standard_enabled,
@@ -857,6 +981,8 @@ def load_parameters():
     global JITTER_RANGE
     global bait_recognition_algorithm  # 新增加载鱼饵识别算法
     global uno_hotkey_name, uno_hotkey_modifiers, uno_hotkey_main_key  # 添加UNO热键全局变量
+    global frame_recorder_enabled, frame_recorder_seconds, frame_recorder_budget_mb
+    global frame_recorder_hotkey_name, frame_recorder_hotkey_main_key
     global release_fish_enabled, release_standard_enabled, release_uncommon_enabled, release_rare_enabled, release_epic_enabled, release_legendary_enabled, release_phantom_rare_enabled  # 添加放生功能全局变量
     try:
         with open(PARAMETER_FILE, "r", encoding="utf-8") as f:
@@ -911,6 +1037,20 @@ def load_parameters():
         release_epic_enabled = params.get("release_epic_enabled", False)
         release_legendary_enabled = params.get("release_legendary_enabled", False)
         release_phantom_rare_enabled = params.get("release_phantom_rare_enabled", False)
+        # 加载会话画面录制设置
+        frame_recorder_enabled = params.get("frame_recorder_enabled", False)
+        frame_recorder_seconds = params.get("frame_recorder_seconds", 10)
+        frame_recorder_budget_mb = params.get("frame_recorder_budget_mb", 64)
+        frame_recorder.reset(frame_recorder_seconds, frame_recorder_budget_mb)
+        saved_recorder_hotkey = params.get("frame_recorder_hotkey", "F9")
+        try:
+            _, recorder_main_key, _ = parse_hotkey_string(saved_recorder_hotkey)
+            if recorder_main_key is not None:
+                frame_recorder_hotkey_name = saved_recorder_hotkey
+                frame_recorder_hotkey_main_key = recorder_main_key
+        except Exception:
+            frame_recorder_hotkey_name = "F9"
+            frame_recorder_hotkey_main_key = None  # load_parameters() 中解析，默认 F9
 
         # 加载热键设置（新格式支持组合键）
         saved_hotkey = params.get("hotkey", "F2")
@@ -960,6 +1100,15 @@ def load_parameters():
     except Exception as e:
         print(f"❌ [错误] 加载参数失败: {e}")
 
+    # 没有参数文件时使用默认热键（按键对象到这里才创建，导入模块时不加载 pynput）
+    load_key_tables()
+    if hotkey_main_key is None:
+        hotkey_main_key = keyboard.Key.f2
+    if uno_hotkey_main_key is None:
+        uno_hotkey_main_key = keyboard.Key.f3
+    if frame_recorder_hotkey_main_key is None:
+        frame_recorder_hotkey_main_key = keyboard.Key.f9
+
     # 重新计算缩放比例
     SCALE_X = TARGET_WIDTH / BASE_WIDTH
     SCALE_Y = TARGET_HEIGHT / BASE_HEIGHT
@@ -1321,36 +1470,37 @@ def show_debug_window():
         """手动触发OCR识别，用于测试调试功能"""
         temp_scr = None
         try:
-            # 临时初始化scr对象
             debug_info = {
                 "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
                     :-3
                 ],
                 "action": "manual_ocr_start",
-                "message": "开始手动触发OCR识别，正在初始化截图对象...",
+                "message": "开始手动触发OCR识别，正在获取截图帧...",
             }
             add_debug_info(debug_info)
             update_debug_info()
 
-            # 初始化mss截图对象
-            temp_scr = mss.mss()
+            # 从共享帧总线获取包含鱼信息区域的帧
+            temp_scr = frame_bus.fetch(["fish_info"])
 
-            # 添加调试信息，记录截图对象初始化成功
+            # 添加调试信息，记录截图帧获取结果
             debug_info = {
                 "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
                     :-3
                 ],
                 "action": "manual_ocr_scr_init",
-                "message": "截图对象初始化成功，正在执行OCR识别...",
+                "message": "截图帧获取完成，正在执行OCR识别...",
                 "scr_type": type(temp_scr).__name__,
             }
             add_debug_info(debug_info)
             update_debug_info()
 
-            # 调用OCR识别相关函数，传入临时初始化的scr对象
+            # 调用OCR识别相关函数，传入获取到的截图帧
             img = capture_fish_info_region(temp_scr)
             if img is not None:
-                fish_name, fish_quality, fish_weight = recognize_fish_info_ocr(img)
+                fish_name, fish_quality, fish_weight, is_first_capture = recognize_fish_info_ocr(
+                    img
+                )
                 # 添加调试信息，记录OCR识别结果
                 debug_info = {
                     "timestamp": datetime.datetime.now().strftime(
@@ -1361,6 +1511,7 @@ def show_debug_window():
                         "鱼名": fish_name if fish_name else "未识别",
                         "品质": fish_quality if fish_quality else "未识别",
                         "重量": fish_weight if fish_weight else "未识别",
+                        "首次捕获": "是" if is_first_capture else "否",
                     },
                     "message": "手动触发OCR识别完成",
                     "image_shape": img.shape,
@@ -1394,36 +1545,6 @@ def show_debug_window():
             add_debug_info(debug_info)
             # 立即更新调试信息显示
             update_debug_info()
-        finally:
-            # 确保scr对象正确关闭
-            if temp_scr is not None:
-                try:
-                    temp_scr.close()
-                    # 添加调试信息，记录截图对象关闭
-                    debug_info = {
-                        "timestamp": datetime.datetime.now().strftime(
-                            "%Y-%m-%d %H:%M:%S.%f"
-                        )[:-3],
-                        "action": "manual_ocr_scr_close",
-                        "message": "截图对象已关闭",
-                        "scr_type": (
-                            type(temp_scr).__name__ if temp_scr is not None else "未知"
-                        ),
-                    }
-                    add_debug_info(debug_info)
-                    update_debug_info()
-                except Exception as close_error:
-                    # 添加错误调试信息
-                    debug_info = {
-                        "timestamp": datetime.datetime.now().strftime(
-                            "%Y-%m-%d %H:%M:%S.%f"
-                        )[:-3],
-                        "action": "manual_ocr_scr_close_error",
-                        "error": f"关闭截图对象失败: {str(close_error)}",
-                        "exception_type": type(close_error).__name__,
-                    }
-                    add_debug_info(debug_info)
-                    update_debug_info()
 
     manual_ocr_btn = ttkb.Button(
         control_frame,
@@ -4597,6 +4718,18 @@ def scale_point_center_anchored(x, y):
     return scale_position(x, y, anchor="center", coordinate_type="point")
 
 
+def tong_score(scr):
+    """鱼桶图标（tong_gray.png）的匹配度，模板文件不存在或帧中没有该区域时返回None"""
+    if not os.path.exists(os.path.join(template_folder_path, "tong_gray.png")):
+        return None
+    region_gray = capture_region(*get_tong_region_coords(), scr)
+    if region_gray is None:
+        return None
+    # 模板仓库缓存缩放后的版本
+    max_val, _ = ncc_match_max(region_gray, template_store.get("tong_gray.png"))
+    return 0.0 if max_val is None else float(max_val)
+
+
 def release_fish():
     """
     执行放生操作流程
@@ -4611,75 +4744,58 @@ def release_fish():
     global release_fish_enabled, release_standard_enabled, release_uncommon_enabled, release_rare_enabled, release_epic_enabled, release_legendary_enabled
     global is_casting, is_releasing, operation_lock
 
-    scr = None
+    state_before_release = fishing_fsm.transition("RELEASING", "开始放生")
     try:
         # 检查是否正在抛杆，如果是则等待
         with operation_lock:
             while is_casting:
                 print("⏳ [提示] 正在抛杆，等待抛杆完成后再放生")
-                time.sleep(0.5)
+                clock.sleep(0.5)
             # 设置放生状态
             is_releasing = True
         
-        # 创建新的截图对象，确保每次都是新鲜的
-        scr = mss.mss()
-        
         # 1. 将鼠标移动到屏幕中心，确保窗口焦点（不点击）
         screen_width, screen_height = get_current_screen_resolution()
         center_x = screen_width // 2
         center_y = screen_height // 2
-        mouse_controller.position = (center_x, center_y)
-        time.sleep(0.3)
+        input_backend.move(center_x, center_y)
+        clock.sleep(0.3)
         
         # 2. 按住C键 - 提高可靠性
         c_key = keyboard.KeyCode.from_char("c")
-        keyboard_controller.press(c_key)
-        time.sleep(0.1)  # 短暂延迟确保按键被按下
+        input_backend.key_down(c_key)
+        clock.sleep(0.1)  # 短暂延迟确保按键被按下
         
         # 再次按下确保按键状态正确
-        keyboard_controller.press(c_key)
-        time.sleep(1)
+        input_backend.key_down(c_key)
+        clock.sleep(1)
 
         # 2. 识别 tong_gray.png 在区域 (1042,675,89,79)
-        # 缩放识别区域
-        scaled_x, scaled_y, scaled_w, scaled_h = scale_position(
-            1042, 675, 89, 79, anchor="center", coordinate_type="region"
-        )
         # 添加标志变量，跟踪是否识别到桶
         tong_detected = False
         
-        # 截取指定区域
-        region_gray = capture_region(scaled_x, scaled_y, scaled_w, scaled_h, scr)
-        if region_gray is not None:
-            # 加载 tong_gray.png 模板
-            tong_template_path = os.path.join(template_folder_path, "tong_gray.png")
-            if os.path.exists(tong_template_path):
-                img = Image.open(tong_template_path)
-                tong_template = np.array(img)
-                scale = SCALE_UNIFORM  # 使用统一缩放比例
-                tong_template = scale_template(tong_template, scale, scale)
-                # 进行模板匹配
-                res = cv2.matchTemplate(region_gray, tong_template, cv2.TM_CCOEFF_NORMED)
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-                if max_val > 0.8:  # 匹配度大于0.8认为匹配成功
-                    tong_detected = True
-                    # 4. 点击1090,720（左键）
-                    scaled_click_x, scaled_click_y = scale_position(
-                        1090, 720, anchor="center", coordinate_type="point"
-                    )
-                    mouse_controller.position = (scaled_click_x, scaled_click_y)
-                    time.sleep(0.3)
-                    mouse_controller.click(mouse.Button.left, 1)
-                    time.sleep(0.3)
-        time.sleep(0.5)
+        # 从共享帧总线取一帧按下C键之后的画面
+        scr = frame_bus.fetch(["tong"], newer_than=clock.time())
+        max_val = tong_score(scr)
+        if max_val is not None and max_val > match_threshold("tong"):  # 匹配度大于阈值认为匹配成功
+            tong_detected = True
+            # 4. 点击1090,720（左键）
+            scaled_click_x, scaled_click_y = scale_position(
+                1090, 720, anchor="center", coordinate_type="point"
+            )
+            input_backend.move(scaled_click_x, scaled_click_y)
+            clock.sleep(0.3)
+            input_backend.click("left")
+            clock.sleep(0.3)
+        clock.sleep(0.5)
 
         # 3. 松开C键 - 提高可靠性
-        keyboard_controller.release(c_key)
-        time.sleep(0.1)  # 短暂延迟确保按键被释放
+        input_backend.key_up(c_key)
+        clock.sleep(0.1)  # 短暂延迟确保按键被释放
         
         # 再次释放确保按键状态正确
-        keyboard_controller.release(c_key)
-        time.sleep(0.5)
+        input_backend.key_up(c_key)
+        clock.sleep(0.5)
 
 
         # 只有识别到桶时才执行后续操作
@@ -4688,23 +4804,23 @@ def release_fish():
             scaled_x2, scaled_y2 = scale_position(
                 1930, 590, anchor="bottom_right", coordinate_type="point"
             )
-            mouse_controller.position = (scaled_x2, scaled_y2)
-            time.sleep(0.3)
-            mouse_controller.click(mouse.Button.right, 1)
-            time.sleep(0.3)
+            input_backend.move(scaled_x2, scaled_y2)
+            clock.sleep(0.3)
+            input_backend.click("right")
+            clock.sleep(0.3)
 
             # 5. 点击2030,764（左键） - 使用右下角锚定，更适合屏幕右侧元素
             scaled_x3, scaled_y3 = scale_position(
                 2030, 764, anchor="bottom_right", coordinate_type="point"
             )
-            mouse_controller.position = (scaled_x3, scaled_y3)
-            time.sleep(0.3)
-            mouse_controller.click(mouse.Button.left, 1)
-            time.sleep(0.3)
+            input_backend.move(scaled_x3, scaled_y3)
+            clock.sleep(0.3)
+            input_backend.click("left")
+            clock.sleep(0.3)
 
             # 6. 按下ESC键退出
-            keyboard_controller.tap(keyboard.Key.esc)  # 使用tap方法，自动处理按下和释放
-            time.sleep(0.5)  # 按下后等待
+            input_backend.tap(keyboard.Key.esc)  # 使用tap方法，自动处理按下和释放
+            clock.sleep(0.5)  # 按下后等待
         else:
             print("❌ [识别] 未识别到桶，跳过后续操作")
 
@@ -4717,19 +4833,13 @@ def release_fish():
     except Exception as e:
         print(f"❌ [放生] 放生操作执行失败: {e}")
         # 确保C键被释放
-        keyboard_controller.release(keyboard.KeyCode.from_char("c"))
+        input_backend.key_up(keyboard.KeyCode.from_char("c"))
         return False
     finally:
         # 无论是否异常，都要重置放生状态
         with operation_lock:
             is_releasing = False
-        
-        # 确保scr对象被正确关闭
-        if scr is not None:
-            try:
-                scr.close()
-            except:
-                pass
+        fishing_fsm.transition(state_before_release, "放生结束")
 
 
 def should_release_fish(quality, fish_name=""):
@@ -4757,11 +4867,8 @@ def should_release_fish(quality, fish_name=""):
     if quality in ["史诗", "传奇"]:
         return False
 
-    # 幻神稀有鱼列表
-    phantom_rare_fishes = ["地包天鱼", "黄鸭叫", "辐射鲈", "鬼刀鱼", "鬼虎鱼", "鬼牙鱼", "芭蕃蓬蓬鱼", "幻光鱼", "甲方满意鱼", "蓝眼泪", "飞机头", "鳅鳅鱼", "拟岩鱼", "粗红线", "水法老", "大罐子鱼", "粉丝虾", "狼蛛蟹", "金蛙", "拳击虾", "大师龟"]
-    
-    # 检查是否是幻神稀有鱼
-    if fish_name in phantom_rare_fishes and release_phantom_rare_enabled:
+    # 检查是否是幻神稀有鱼（鱼名词典中标注的幻神稀有鱼）
+    if release_phantom_rare_enabled and get_fish_name_resolver().is_phantom_rare(fish_name):
         return True
     elif quality == "标准" and release_standard_enabled:
         return True
@@ -4883,6 +4990,14 @@ def get_jiashi_region_by_resolution():
         )
 
 
+def apply_target_resolution(width, height):
+    """切换目标分辨率，并更新缩放比例、区域坐标和模板"""
+    global TARGET_WIDTH, TARGET_HEIGHT
+    TARGET_WIDTH, TARGET_HEIGHT = width, height
+    calculate_scale_factors()
+    update_region_coords()
+
+
 def update_region_coords():
     """
     根据当前缩放比例更新所有区域坐标
@@ -4931,104 +5046,220 @@ bait_recognition_algorithms = {
 # =========================
 # 鱼饵识别器类
 # =========================
+def bait_digit_regions(gray_img):
+    """按统一缩放比例从鱼饵数量区域截取三个数字区域
+
+    Returns:
+        tuple: (区域1 第一个数字, 区域2 第二个数字, 区域3 单个数字居中)，
+        区域2超出图像时为 None
+    """
+    # 根据统一缩放比例动态计算裁切尺寸
+    scale = SCALE_UNIFORM
+    crop_h = max(1, int(BAIT_CROP_HEIGHT_BASE * scale))
+    crop_w = max(1, int(BAIT_CROP_WIDTH1_BASE * scale))
+
+    # 确保不超出图像边界
+    img_h, img_w = gray_img.shape[:2]
+    crop_h = min(crop_h, img_h)
+    crop_w = min(crop_w, img_w // 2)  # 确保单个数字宽度不超过一半
+
+    region1 = gray_img[0:crop_h, 0:crop_w]
+    region2 = gray_img[0:crop_h, crop_w : crop_w * 2] if crop_w * 2 <= img_w else None
+    # 单个数字居中区域 - 动态计算起始位置，适应各种分辨率
+    mid_start = max(0, (img_w - crop_w) // 2)
+    mid_end = min(mid_start + crop_w, img_w)
+    region3 = gray_img[0:crop_h, mid_start:mid_end]
+    return region1, region2, region3
+
+
+def bait_digit_priors(previous):
+    """根据上次的鱼饵数量给出三个数字区域的候选数字顺序
+
+    鱼饵数量通常不变或比上次少1，依次取这两个数的十位、个位（两位数）或本身（一位数）。
+
+    Returns:
+        tuple: (区域1候选, 区域2候选, 区域3候选)，没有上次结果时为 None
+    """
+    if previous is None or previous < 0:
+        return None
+    tens, ones, single = [], [], []
+    for value in (previous, previous - 1):
+        if value >= 10:
+            tens.append(value // 10 % 10)
+            ones.append(value % 10)
+        elif value >= 0:
+            single.append(value)
+    return tens, ones, single
+
+
+def combine_bait_digits(match1, match2, match3):
+    """把三个区域的识别结果 (数字, 置信度) 拼成鱼饵数量
+
+    两位数取两个数字中较低的置信度，返回 (鱼饵数量, 置信度)，识别失败返回 (None, 0.0)
+    """
+    if match1 and match2:
+        # 拼接两个匹配的数字，转换为整数
+        return int(f"{match1[0]}{match2[0]}"), min(match1[1], match2[1])
+    if match3:
+        return int(match3[0]), match3[1]
+    return None, 0.0
+
+
 class BaitRecognizer:
     """
-    鱼饵识别器类，支持多种识别算法
+    鱼饵识别器：识别算法注册表
+
+    每个算法是一个函数 func(gray_img, bgra) -> (鱼饵数量, 置信度)，识别失败时数量为 None。
+    recognize 按名称分派，并记录每个算法的调用次数、耗时和平均置信度
     """
 
     def __init__(self):
-        """初始化鱼饵识别器"""
-        # 初始化模板（如果使用模板匹配算法）
+        """初始化鱼饵识别器并注册内置算法"""
+        self.backends = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+        # 轮廓/像素统计算法使用的数字特征，模板重新加载后重建
         self.templates = []
-        self._load_templates()
-
-    def _load_templates(self):
-        """加载数字模板"""
-        # 这里可以根据实际情况加载模板
-        # 由于模板匹配算法需要实际的模板文件，这里简化处理
-        pass
-
-    def recognize(self, image, algorithm="template"):
+        self._template_features = None
+        # 按先验顺序匹配时的读数次数和实际匹配的候选数字总数
+        self.prior_reads = 0
+        self.prior_candidates = 0
+        self.register("template", self._recognize_template)
+        self.register("ocr", self._recognize_ocr)
+        self.register("contour", self._recognize_contour)
+        self.register("pixel", self._recognize_pixel)
+
+    def register(self, name, func, label=None):
+        """注册识别算法，label 为界面上显示的名称"""
+        self.backends[name] = func
+        self.stats[name] = {"calls": 0, "time": 0.0, "recognized": 0, "confidence": 0.0}
+        if label is not None:
+            bait_recognition_algorithms[name] = label
+
+    def recognize(self, gray_img, algorithm="template", bgra=None, previous=None):
         """
         使用指定算法识别鱼饵数量
 
         Args:
-            image: 截取的鱼饵区域图像（RGBA格式的NumPy数组）
-            algorithm: 使用的识别算法，可选值："template", "ocr", "contour", "pixel"
+            gray_img: 鱼饵区域的灰度图像
+            algorithm: 识别算法名称，未注册的名称使用模板匹配算法
+            bgra: 鱼饵区域的原始BGRA图像（OCR算法使用，可选）
+            previous: 上次识别的鱼饵数量（模板匹配算法据此决定数字的匹配顺序，可选）
 
         Returns:
-            int: 识别出的鱼饵数量，如果识别失败则返回None
+            dict: {"value": 鱼饵数量或None, "confidence": 置信度, "latency_ms": 耗时, "algorithm": 算法}
         """
-        if image is None:
-            return None
+        if algorithm not in self.backends:
+            algorithm = "template"
+        if gray_img is None:
+            return {"value": None, "confidence": 0.0, "latency_ms": 0.0, "algorithm": algorithm}
 
-        # 转换为灰度图像
-        gray_img = cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
-
-        # 根据选择的算法进行识别
-        if algorithm == "template":
-            return self._recognize_template(gray_img)
-        elif algorithm == "ocr":
-            return self._recognize_ocr(image)
-        elif algorithm == "contour":
-            return self._recognize_contour(gray_img)
-        elif algorithm == "pixel":
-            return self._recognize_pixel(gray_img)
-        else:
-            # 默认使用模板匹配算法
-            return self._recognize_template(gray_img)
+        start = time.perf_counter()
+        try:
+            if algorithm == "template":
+                value, confidence = self._recognize_template(gray_img, bgra, previous)
+            else:
+                value, confidence = self.backends[algorithm](gray_img, bgra)
+        except Exception as e:
+            if debug_mode:
+                print(f"⚠️  [鱼饵识别] {algorithm} 识别失败: {e}")
+            value, confidence = None, 0.0
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            stats = self.stats[algorithm]
+            stats["calls"] += 1
+            stats["time"] += elapsed
+            if value is not None:
+                stats["recognized"] += 1
+                stats["confidence"] += confidence
+        return {
+            "value": value,
+            "confidence": confidence,
+            "latency_ms": elapsed * 1000,
+            "algorithm": algorithm,
+        }
+
+    def get_stats(self):
+        """每个算法的调用次数、识别成功次数、平均耗时和平均置信度"""
+        with self._lock:
+            return {
+                name: {
+                    "calls": stats["calls"],
+                    "recognized": stats["recognized"],
+                    "avg_ms": stats["time"] / stats["calls"] * 1000 if stats["calls"] else 0.0,
+                    "avg_confidence": (
+                        stats["confidence"] / stats["recognized"] if stats["recognized"] else 0.0
+                    ),
+                }
+                for name, stats in self.stats.items()
+            }
+
+    def get_prior_stats(self):
+        """按先验顺序匹配的读数次数和平均每次读数匹配的候选数字个数"""
+        with self._lock:
+            reads = self.prior_reads
+            return {
+                "reads": reads,
+                "candidates": self.prior_candidates,
+                "avg_candidates": self.prior_candidates / reads if reads else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            for stats in self.stats.values():
+                stats.update(calls=0, time=0.0, recognized=0, confidence=0.0)
+            self.prior_reads = 0
+            self.prior_candidates = 0
+
+    def _load_templates(self):
+        """加载数字模板，并生成轮廓/像素统计算法使用的特征"""
+        classifier = get_digit_classifier()
+        if classifier is None:
+            return None
+        if self._template_features is None or self.templates is not classifier.source:
+            self.templates = classifier.source
+            self._template_features = {
+                "glyph": [self._glyph_feature(self._binarize(t)) for t in self.templates],
+                "zones": np.stack([self._zone_feature(self._binarize(t)) for t in self.templates]),
+            }
+        return self._template_features
 
-    def _recognize_template(self, gray_img):
+    def _recognize_template(self, gray_img, bgra=None, previous=None):
         """
-        使用模板匹配算法识别鱼饵数量
+        模板匹配算法：三个数字区域一次批量匹配全部数字模板（DigitClassifier）
 
-        Args:
-            gray_img: 灰度图像
+        给出上次的鱼饵数量时按先验顺序匹配（DigitClassifier.classify_prior）：
+        先匹配区域1，区域1识别成功才匹配区域2，两位数都识别成功时不再匹配区域3；
+        上次是一位数时先匹配区域3
 
         Returns:
-            int: 识别出的鱼饵数量，如果识别失败则返回None
+            tuple: (鱼饵数量, 置信度)
         """
-        # 根据统一缩放比例动态计算裁切尺寸
-        scale = SCALE_UNIFORM
-        crop_h = max(1, int(BAIT_CROP_HEIGHT_BASE * scale))
-        crop_w = max(1, int(BAIT_CROP_WIDTH1_BASE * scale))
-
-        # 确保不超出图像边界
-        img_h, img_w = gray_img.shape[:2]
-        crop_h = min(crop_h, img_h)
-        crop_w = min(crop_w, img_w // 2)  # 确保单个数字宽度不超过一半
-
-        # 初始化匹配结果
-        best_match1 = None
-        best_match2 = None
-        best_match3 = None
-
-        # 截取并处理区域1（第一个数字）
-        if crop_w <= img_w:
-            region1 = gray_img[0:crop_h, 0:crop_w]
-            best_match1 = match_digit_template(region1)
-
-        # 截取并处理区域2（第二个数字）
-        if crop_w * 2 <= img_w:
-            region2 = gray_img[0:crop_h, crop_w : crop_w * 2]
-            best_match2 = match_digit_template(region2)
-
-        # 单个数字居中区域 - 动态计算起始位置，适应各种分辨率
-        mid_start = max(0, (img_w - crop_w) // 2)
-        mid_end = min(mid_start + crop_w, img_w)
-        region3 = gray_img[0:crop_h, mid_start:mid_end]
-        best_match3 = match_digit_template(region3)
-
-        if best_match1 and best_match2:
-            # 从best_match中提取数字索引（i），并拼接成整数
-            best_match1_val = best_match1[0]  # 提取区域1的数字索引
-            best_match2_val = best_match2[0]  # 提取区域2的数字索引
-            # 拼接两个匹配的数字，转换为整数
-            return int(f"{best_match1_val}{best_match2_val}")
-        elif best_match3:
-            return int(f"{best_match3[0]}")
-        else:
-            return None
+        regions = bait_digit_regions(gray_img)
+        priors = bait_digit_priors(previous)
+        classifier = get_digit_classifier()
+        if priors is None or classifier is None:
+            return combine_bait_digits(*classify_digits(list(regions)))
+
+        scored = 0
+        match1 = match2 = match3 = None
+        if not priors[0]:
+            # 上次是一位数：先匹配居中的区域3，高置信度命中时区域1、2必然是空白，不再匹配
+            match3, scored = classifier.classify_prior(regions[2], priors[2])
+        if not (match3 and match3[1] > DIGIT_EARLY_EXIT_CONFIDENCE):
+            match1, count = classifier.classify_prior(regions[0], priors[0])
+            scored += count
+            if match1:
+                match2, count = classifier.classify_prior(regions[1], priors[1])
+                scored += count
+            if not (match1 and match2) and match3 is None and priors[0]:
+                match3, count = classifier.classify_prior(regions[2], priors[2])
+                scored += count
+        with self._lock:
+            self.prior_reads += 1
+            self.prior_candidates += scored
+        return combine_bait_digits(match1, match2, match3)
 
     def _match_digit_template(self, image):
         """匹配数字模板
@@ -5039,136 +5270,157 @@ class BaitRecognizer:
         Returns:
             tuple: (匹配的数字索引, 匹配位置)，如果匹配失败则返回None
         """
-        best_match = None  # 最佳匹配信息
-        best_val = 0  # 存储最佳匹配度
-
-        # 这里应该使用实际的模板，目前简化处理
-        # 实际实现中应该加载预定义的数字模板
-        for i in range(10):
-            # 简化处理，假设模板匹配成功
-            # 实际实现中应该使用cv2.matchTemplate进行匹配
-            pass
-
-        # 这里返回None表示需要使用实际模板才能进行匹配
-        # 实际实现中应该返回最佳匹配结果
-        return None
+        return match_digit_template(image)
 
-    def _recognize_ocr(self, image):
+    def _recognize_ocr(self, gray_img, bgra=None):
         """
         使用OCR算法识别鱼饵数量
 
-        Args:
-            image: 原始图像
-
         Returns:
-            int: 识别出的鱼饵数量，如果识别失败则返回None
+            tuple: (鱼饵数量, OCR置信度)
         """
         if not OCR_AVAILABLE or ocr_engine is None:
+            return None, 0.0
+
+        if bgra is not None:
+            img_rgb = cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB)
+        else:
+            img_rgb = cv2.cvtColor(gray_img, cv2.COLOR_GRAY2RGB)
+        # 使用OCR识别文本
+        result, _ = ocr_engine(img_rgb)
+        for line in result or []:
+            text = line[1]
+            # 提取数字
+            digits = re.findall(r"\d+", text)
+            if digits:
+                confidence = float(line[2]) if len(line) > 2 else 1.0
+                return int(digits[0]), confidence
+        return None, 0.0
+
+    # 轮廓/像素统计算法的特征尺寸
+    GLYPH_FEATURE_SIZE = (8, 12)  # 单个字符缩放到的 宽, 高
+    ZONE_GRID = (3, 5)  # 像素统计的分区 列, 行
+    GLYPH_MIN_CONFIDENCE = 0.75
+    ZONE_MIN_CONFIDENCE = 0.8
+    ZONE_MIN_INK = 0.08  # 区域内深色像素占比低于该值视为没有数字
+
+    @staticmethod
+    def _binarize(gray_img):
+        """Otsu二值化，数字笔画（深色）为1"""
+        _, binary = cv2.threshold(gray_img, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        return binary
+
+    @classmethod
+    def _glyph_feature(cls, binary):
+        """取最大的深色连通域作为字符，返回 (缩放后的字符点阵, 宽高比)"""
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
             return None
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        return cls._glyph_bitmap(binary[y : y + h, x : x + w])
+
+    @classmethod
+    def _glyph_bitmap(cls, glyph):
+        h, w = glyph.shape[:2]
+        bitmap = cv2.resize(
+            glyph.astype(np.float32), cls.GLYPH_FEATURE_SIZE, interpolation=cv2.INTER_AREA
+        )
+        return bitmap, w / h
 
-        try:
-            # 将RGBA图像转换为RGB
-            img_rgb = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
-            # 使用OCR识别文本
-            result = ocr_engine(img_rgb)
-
-            if result and len(result) > 0:
-                for line in result:
-                    text = line[1][0]
-                    # 提取数字
-                    digits = re.findall(r"\d+", text)
-                    if digits:
-                        return int(digits[0])
-        except Exception as e:
-            if debug_mode:
-                print(f"⚠️  [OCR] 识别失败: {e}")
-        return None
+    @classmethod
+    def _zone_feature(cls, binary):
+        """各分区深色像素占比"""
+        return cv2.resize(
+            binary.astype(np.float32), cls.ZONE_GRID, interpolation=cv2.INTER_AREA
+        ).ravel()
 
-    def _recognize_contour(self, gray_img):
+    def _recognize_contour(self, gray_img, bgra=None):
         """
-        使用轮廓特征算法识别鱼饵数量
-
-        Args:
-            gray_img: 灰度图像
+        轮廓特征算法：整块区域二值化后按轮廓切分出每个字符，
+        与数字模板的字符点阵和宽高比比较，不依赖固定的裁切位置
 
         Returns:
-            int: 识别出的鱼饵数量，如果识别失败则返回None
+            tuple: (鱼饵数量, 置信度)
         """
-        try:
-            # 二值化处理
-            _, thresh = cv2.threshold(
-                gray_img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
-            )
-            # 查找轮廓
-            contours, _ = cv2.findContours(
-                thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-            )
-
-            # 过滤小轮廓
-            valid_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > 10]
-
-            # 根据轮廓数量和特征识别数字
-            # 这里简化处理，实际实现中应该根据轮廓特征进行更复杂的判断
-            if len(valid_contours) == 1:
-                # 可能是单个数字
-                return 1
-            elif len(valid_contours) == 2:
-                # 可能是两个数字
-                return 2
-        except Exception as e:
-            if debug_mode:
-                print(f"⚠️  [轮廓识别] 识别失败: {e}")
-        return None
-
-    def _recognize_pixel(self, gray_img):
+        features = self._load_templates()
+        if features is None:
+            return None, 0.0
+        binary = self._binarize(gray_img)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # 过滤噪点：字符高度至少为区域高度的40%
+        min_h = gray_img.shape[0] * 0.4
+        boxes = sorted(
+            box for box in map(cv2.boundingRect, contours) if box[3] >= min_h
+        )
+        if not boxes or len(boxes) > 2:
+            return None, 0.0
+
+        digits = []
+        confidences = []
+        for x, y, w, h in boxes:
+            bitmap, aspect = self._glyph_bitmap(binary[y : y + h, x : x + w])
+            best_digit, best_conf = None, 0.0
+            for digit, template_feature in enumerate(features["glyph"]):
+                if template_feature is None:
+                    continue
+                t_bitmap, t_aspect = template_feature
+                conf = 1.0 - float(np.abs(bitmap - t_bitmap).mean()) - abs(aspect - t_aspect) * 0.5
+                if conf > best_conf:
+                    best_digit, best_conf = digit, conf
+            if best_digit is None or best_conf <= self.GLYPH_MIN_CONFIDENCE:
+                return None, 0.0
+            digits.append(best_digit)
+            confidences.append(best_conf)
+        return int("".join(map(str, digits))), min(confidences)
+
+    def _recognize_pixel(self, gray_img, bgra=None):
         """
-        使用像素统计算法识别鱼饵数量
-
-        Args:
-            gray_img: 灰度图像
+        像素统计算法：在与模板匹配相同的三个数字区域内统计各分区的深色像素占比，
+        与数字模板的分区占比比较（最近邻）
 
         Returns:
-            int: 识别出的鱼饵数量，如果识别失败则返回None
+            tuple: (鱼饵数量, 置信度)
         """
-        try:
-            # 计算非零像素数量
-            non_zero_count = cv2.countNonZero(gray_img)
-            # 计算总像素数量
-            total_count = gray_img.shape[0] * gray_img.shape[1]
-            # 计算非零像素比例
-            ratio = non_zero_count / total_count
-
-            # 根据比例识别数字
-            # 这里简化处理，实际实现中应该根据实际情况调整阈值
-            if ratio < 0.1:
-                return 0
-            elif ratio < 0.2:
-                return 1
-            elif ratio < 0.3:
-                return 2
-            elif ratio < 0.4:
-                return 3
-            elif ratio < 0.5:
-                return 4
-            elif ratio < 0.6:
-                return 5
-            elif ratio < 0.7:
-                return 6
-            elif ratio < 0.8:
-                return 7
-            elif ratio < 0.9:
-                return 8
-            else:
-                return 9
-        except Exception as e:
-            if debug_mode:
-                print(f"⚠️  [像素统计] 识别失败: {e}")
-        return None
+        features = self._load_templates()
+        if features is None:
+            return None, 0.0
+        # 整块区域统一阈值，避免没有数字的区域被Otsu强行分出前景
+        threshold, _ = cv2.threshold(gray_img, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        binary = (gray_img <= threshold).astype(np.uint8)
+
+        matches = []
+        for region in bait_digit_regions(binary):
+            if region is None or region.size == 0 or region.mean() < self.ZONE_MIN_INK:
+                matches.append(None)
+                continue
+            distances = np.abs(features["zones"] - self._zone_feature(region)).mean(axis=1)
+            digit = int(np.argmin(distances))
+            confidence = 1.0 - float(distances[digit])
+            matches.append((digit, confidence) if confidence > self.ZONE_MIN_CONFIDENCE else None)
+        return combine_bait_digits(*matches)
 
 
 # 创建全局鱼饵识别器实例
 bait_recognizer = BaitRecognizer()
 
+
+def print_bait_recognizer_stats():
+    """打印各鱼饵识别算法的调用次数、平均耗时和平均置信度"""
+    for name, stats in bait_recognizer.get_stats().items():
+        if stats["calls"]:
+            print(
+                f"📊 [统计] 鱼饵识别({bait_recognition_algorithms.get(name, name)}): "
+                f"{stats['calls']} 次，识别成功 {stats['recognized']} 次，"
+                f"平均 {stats['avg_ms']:.3f}ms，平均置信度 {stats['avg_confidence']:.2f}"
+            )
+    prior = bait_recognizer.get_prior_stats()
+    if prior["reads"]:
+        print(
+            f"📊 [统计] 鱼饵数字按先验顺序匹配: {prior['reads']} 次读数，"
+            f"平均每次匹配 {prior['avg_candidates']:.2f} 个候选数字（全部匹配为30个）"
+        )
+
 # =========================
 # 钓鱼记录系统
 # =========================
@@ -5329,17 +5581,12 @@ def capture_fish_info_region(scr_param=None):
         return None
 
     # 根据分辨率缩放坐标
-    x1, y1, x2, y2 = FISH_INFO_REGION_BASE
-    region = (
-        int(x1 * SCALE_X),
-        int(y1 * SCALE_Y),
-        int(x2 * SCALE_X),
-        int(y2 * SCALE_Y),
-    )
+    left, top, width, height = get_fish_info_region_coords()
+    region = (left, top, left + width, top + height)
 
     try:
-        frame = current_scr.grab(region)
-        if frame is None:
+        img = capture_region_bgra(left, top, width, height, current_scr)
+        if img is None:
             # 调试信息：记录错误
             if debug_mode:
                 debug_info = {
@@ -5360,7 +5607,6 @@ def capture_fish_info_region(scr_param=None):
                 }
                 add_debug_info(debug_info)
             return None
-        img = np.array(frame)
         # 转换为RGB格式（OCR需要）
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGRA2RGB)
 
@@ -5409,223 +5655,791 @@ def capture_fish_info_region(scr_param=None):
         return None
 
 
-def recognize_fish_info_ocr(img):
-    """使用OCR识别鱼的信息"""
-    if not OCR_AVAILABLE or ocr_engine is None:
-        # 调试信息：记录错误
-        if debug_mode:
-            debug_info = {
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-                    :-3
-                ],
-                "action": "ocr_error",
-                "error": "OCR引擎不可用",
-            }
-            add_debug_info(debug_info)
-        return None, None, None
+# =========================
+# OCR结果缓存（鱼信息横幅的感知签名 -> 识别结果）
+# =========================
+# 同一种鱼、同样品质和重量的横幅在不同截图中像素不会完全一样（背景、压缩、亚像素偏移），
+# 缓存按各文字行（鱼名、品质、重量，行框见 FISH_INFO_LINE_BOXES_BASE）分别计算 dHash，
+# 每行的汉明距离都不超过 OCR_CACHE_MAX_HAMMING 时视为候选。
+# dHash 网格较粗，重量只差一位数字的横幅也可能落在阈值以内，候选还要逐块核对各行的缩略图：
+# 缩略图按行高缩放并归一化亮度，按 OCR_CACHE_VERIFY_BLOCK 列分块比较，任何一块的平均差超过
+# OCR_CACHE_VERIFY_MAX_DIFF 就不是同一条横幅。横幅固定画在屏幕同一位置，不同截图之间像素对齐，
+# 只有噪声和半透明背景的差异：合成横幅上同一横幅各块的平均差不超过3，重量差一位数字时至少13
+OCR_CACHE_ENABLED = True
+OCR_CACHE_FILE = "./ocr_cache.json"
+OCR_CACHE_VERSION = 3
+OCR_CACHE_SIZE = 512  # 最多缓存的横幅数，超过时淘汰最久未使用的
+OCR_CACHE_HASH_SIZE = (64, 8)  # 每行 dHash 的网格（列, 行），64×8 = 512 位
+OCR_CACHE_HASH_MARGIN = 0.5  # 相邻格子亮度差超过该值（整行标准差的倍数）才计为1
+OCR_CACHE_MAX_HAMMING = 8  # 每行 dHash 允许的最大汉明距离
+OCR_CACHE_THUMB_HEIGHT = 16  # 核对用缩略图的高度（像素）
+OCR_CACHE_VERIFY_BLOCK = 4  # 核对时分块的宽度（缩略图像素，约为一个数字笔画的宽度）
+OCR_CACHE_VERIFY_MAX_DIFF = 8.0  # 缩略图任一块的最大平均差（归一化后的灰度）
+OCR_CACHE_MAX_VERIFY = 16  # 每次查找最多核对的候选数（按 dHash 距离从近到远）
+OCR_CACHE_SAVE_INTERVAL = 60.0  # 新结果最多攒多少秒写一次缓存文件，暂停和退出时也会写入
+
+
+def _line_dhash(gray):
+    """一行文字的 dHash，返回整数
+
+    左右相邻格子的亮度差（按整行标准差归一化）超过 OCR_CACHE_HASH_MARGIN 时该位为1：
+    普通 dHash 在没有文字的平坦背景上由噪声决定，每次截图都不一样
+    """
+    cols, rows = OCR_CACHE_HASH_SIZE
+    small = cv2.resize(gray, (cols + 1, rows), interpolation=cv2.INTER_AREA).astype(np.float32)
+    small /= max(float(small.std()), 1.0)
+    bits = (small[:, 1:] - small[:, :-1] > OCR_CACHE_HASH_MARGIN).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _line_thumbnail(gray):
+    """一行文字的核对缩略图：缩放到固定行高，按均值和标准差归一化后量化为 uint8"""
+    h, w = gray.shape[:2]
+    height = OCR_CACHE_THUMB_HEIGHT
+    width = max(height, int(round(w * height / h)))
+    small = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA).astype(np.float32)
+    normalized = (small - small.mean()) / max(float(small.std()), 1.0)
+    return np.clip(normalized * 32 + 128, 0, 255).astype(np.uint8)
+
+
+def fish_info_signature(img):
+    """鱼信息横幅的感知签名：(各行 dHash 元组, 各行缩略图元组)，裁不出文字行时返回None"""
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) if img.ndim == 3 else img
+    hashes, thumbs = [], []
+    for _, (x0, y0, x1, y1) in fish_info_line_boxes(gray):
+        line = gray[y0:y1, x0:x1]
+        if line.shape[0] < 2 or line.shape[1] < 2:
+            return None
+        hashes.append(_line_dhash(line))
+        thumbs.append(_line_thumbnail(line))
+    if not hashes:
+        return None
+    return tuple(hashes), tuple(thumbs)
 
-    if img is None:
-        # 调试信息：记录错误
-        if debug_mode:
-            debug_info = {
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-                    :-3
-                ],
-                "action": "ocr_error",
-                "error": "输入图像为空",
-            }
-            add_debug_info(debug_info)
-        return None, None, None
 
-    try:
-        # 执行OCR识别
-        result, elapse = ocr_engine(img)
+def thumbnails_match(thumbs, others):
+    """两组缩略图逐行分块比较，所有块的平均差都不超过 OCR_CACHE_VERIFY_MAX_DIFF 时为True"""
+    if len(thumbs) != len(others):
+        return False
+    block = OCR_CACHE_VERIFY_BLOCK
+    for thumb, other in zip(thumbs, others):
+        if thumb.shape != other.shape:
+            return False
+        diff = np.abs(thumb.astype(np.int16) - other.astype(np.int16)).mean(axis=0)
+        width = len(diff) // block * block
+        blocks = diff[:width].reshape(-1, block).mean(axis=1) if width else diff[None, :].mean(axis=1)
+        if width < len(diff):
+            blocks = np.append(blocks, diff[width:].mean())
+        if blocks.max() > OCR_CACHE_VERIFY_MAX_DIFF:
+            return False
+    return True
 
-        # 确保result是列表类型
-        if result is None:
-            result = []
 
-        # 合并所有识别到的文本
-        full_text = ""
-        for line in result:
-            if isinstance(line, list) and len(line) >= 2:
-                full_text += line[1] + " "
+class OcrResultCache:
+    """按横幅感知签名缓存OCR解析结果 (鱼名, 品质, 重量, 是否首次捕获)
 
-        full_text = full_text.strip()
+    查找时在同一识别模式的记录中找各行 dHash 都足够接近、缩略图核对一致的横幅。
+    LRU淘汰，新结果攒到 OCR_CACHE_SAVE_INTERVAL 秒或调用 flush 时写入 OCR_CACHE_FILE，下次启动时读回；
+    每条记录保存当时OCR的耗时，命中时累计为节省的时间
+    """
 
-        # 解析鱼的信息
-        fish_name = None
-        fish_quality = None
-        fish_weight = None
-        is_first_capture = False
+    def __init__(self, path=OCR_CACHE_FILE, max_entries=OCR_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        # (识别模式, 各行 dHash) -> (各行缩略图, 结果, OCR耗时ms)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = None
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0  # dHash 接近但缩略图核对不一致的次数
+        self.saved_ms = 0.0
+
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != OCR_CACHE_VERSION:
+                return
+            for mode, hashes, thumbs, result, elapsed_ms in data.get("entries", [])[-self.max_entries :]:
+                thumbs = tuple(
+                    cv2.imdecode(np.frombuffer(base64.b64decode(png), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+                    for png in thumbs
+                )
+                key = (mode, tuple(int(h, 16) for h in hashes))
+                self._entries[key] = (thumbs, tuple(result), float(elapsed_ms))
+        except Exception as e:
+            print(f"⚠️  [警告] OCR缓存读取失败，重新开始缓存: {e}")
+            self._entries.clear()
+
+    def _save(self):
+        entries = [
+            [
+                mode,
+                [f"{h:x}" for h in hashes],
+                [base64.b64encode(cv2.imencode(".png", thumb)[1].tobytes()).decode("ascii") for thumb in thumbs],
+                list(result),
+                elapsed_ms,
+            ]
+            for (mode, hashes), (thumbs, result, elapsed_ms) in self._entries.items()
+        ]
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": OCR_CACHE_VERSION, "entries": entries}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            print(f"⚠️  [警告] OCR缓存保存失败: {e}")
+        self._last_save = clock.time()
+
+    def _find(self, mode, signature):
+        """按 dHash 总距离从近到远核对候选（最多 OCR_CACHE_MAX_VERIFY 个），返回第一个核对一致的记录键"""
+        hashes, thumbs = signature
+        candidates = []
+        for key in self._entries:
+            if key[0] != mode or len(key[1]) != len(hashes):
+                continue
+            distances = [bin(a ^ b).count("1") for a, b in zip(hashes, key[1])]
+            if max(distances) <= OCR_CACHE_MAX_HAMMING:
+                candidates.append((sum(distances), key))
+        candidates.sort(key=lambda item: item[0])
+        for _, key in candidates[:OCR_CACHE_MAX_VERIFY]:
+            if thumbnails_match(thumbs, self._entries[key][0]):
+                return key
+            self.rejected += 1
+        return None
 
-        if len(result) > 0 and full_text:
-            # 识别品质
-            for quality in QUALITY_LEVELS:
-                if quality in full_text:
-                    fish_quality = quality
-                    break
+    def lookup(self, mode, signature):
+        """返回同一识别模式下同一条横幅的缓存结果，没有时返回None"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            key = self._find(mode, signature)
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            _, result, elapsed_ms = self._entries[key]
+            self.hits += 1
+            self.saved_ms += elapsed_ms
+            return result
+
+    def store(self, mode, signature, result, elapsed_ms):
+        """保存一次OCR的识别结果，距上次写文件超过 OCR_CACHE_SAVE_INTERVAL 秒时写入缓存文件"""
+        hashes, thumbs = signature
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            key = self._find(mode, signature) or (mode, hashes)
+            self._entries[key] = (thumbs, tuple(result), elapsed_ms)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            if self._last_save is None:
+                self._last_save = clock.time()
+            elif clock.time() - self._last_save >= OCR_CACHE_SAVE_INTERVAL:
+                self._save()
 
-            # 识别重量（匹配数字+kg或g的模式，支持简繁体）
-            weight_pattern = r"(\d+\.?\d*)\s*(kg|g|千克|克|公斤|KG|G)?"
-            weight_matches = re.findall(weight_pattern, full_text, re.IGNORECASE)
-            if weight_matches:
-                # 取最后一个匹配的数字作为重量
-                for match in weight_matches:
-                    if match[0]:
-                        fish_weight = match[0]
-                        unit = match[1].lower() if match[1] else "kg"
-                        if unit in ["g", "克", "g"]:
-                            fish_weight = str(float(fish_weight) / 1000)
-                        fish_weight = f"{float(fish_weight):.2f}kg"
+    def flush(self):
+        """把尚未写入的结果写入缓存文件（暂停和退出时调用）"""
+        with self._lock:
+            if self._dirty:
+                self._save()
 
-            # 识别鱼名 - 优先匹配"你钓到了XXX"或"首次捕获XXX"格式（支持简繁体）
-            # 优化正则表达式，处理OCR可能将"钓"识别为"约"的情况
-            fish_name_patterns = [
-                r"(?:你?[钓釣約]到了|首次?捕[获獲])\s*[「【\[]?\s*(.+?)\s*[」】\]]?\s*(?:[标標][准準]|非凡|稀有|史[诗詩]|传奇|傳奇|[傳傅]奇)?$"
-            ]
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_ms": self.saved_ms,
+                "entries": len(self._entries),
+            }
 
-            for pattern in fish_name_patterns:
-                match = re.search(pattern, full_text)
-                if match:
-                    # 检查是否是首次捕获
-                    if "首次" in match.group(0) or "首次" in full_text:
-                        is_first_capture = True
-                    
-                    extracted_name = match.group(1).strip()
-                    # 清理鱼名中的数字、单位和特殊字符
-                    extracted_name = re.sub(
-                        r"\d+\.?\d*\s*(kg|g|千克|克|公斤|KG|G)?",
-                        "",
-                        extracted_name,
-                        flags=re.IGNORECASE,
-                    )
-                    # 清理鱼名中可能包含的品质词
-                    for quality in QUALITY_LEVELS:
-                        if quality in extracted_name:
-                            extracted_name = extracted_name.replace(quality, " ")
-                    # 清理鱼名中的多余字符，保留中文和英文
-                    extracted_name = re.sub(
-                        r"[^\u4e00-\u9fff\uf900-\ufaffa-zA-Z\s]",
-                        "",
-                        extracted_name,
-                    )
-                    # 移除多余空格，只保留必要的空格
-                    extracted_name = re.sub(r"\s+", " ", extracted_name).strip()
-                    # 移除单个字符（可能是OCR误识别）
-                    if extracted_name:
-                        words = extracted_name.split()
-                        filtered_words = [word for word in words if len(word) > 1 or word in ["a", "A"]]
-                        extracted_name = " ".join(filtered_words).strip()
-                    if extracted_name and len(extracted_name) >= 2:
-                        fish_name = extracted_name
-                        # 特别处理美髯公，确保能被正确识别
-                        cleaned_fish_name = fish_name.replace(" ", "")
-                if "美髯公" in cleaned_fish_name or (
-                    ("美" in cleaned_fish_name)
-                    and ("公" in cleaned_fish_name)
-                    and len(cleaned_fish_name) <= 3
-                ):
-                    fish_name = "美髯公"
-                break
 
-            # 如果上述模式都没匹配到，尝试备用方案
-            if not fish_name:
-                name_text = full_text
-                # 移除常见前缀（支持简繁体）
-                prefixes_to_remove = [r"你?[钓釣約](?:到了|到)|(?:首次)?捕[获獲]"]
-                for prefix in prefixes_to_remove:
-                    name_text = name_text.replace(prefix, " ")
-                # 移除所有品质词
-                for quality in QUALITY_LEVELS:
-                    name_text = name_text.replace(quality, " ")
-                # 移除数字和单位
-                name_text = re.sub(
-                    r"\d+\.?\d*\s*(kg|g|千克|克|公斤|KG|G)?",
-                    "",
-                    name_text,
-                    flags=re.IGNORECASE,
-                )
-                # 清理特殊字符，保留中文和英文（包括繁体）
-                name_text = re.sub(
-                    r"[^\u4e00-\u9fff\uf900-\ufaffa-zA-Z\s]",
-                    " ",
-                    name_text,
-                )
-                # 移除多余空格
-                name_text = re.sub(r"\s+", " ", name_text).strip()
-                # 移除单个字符（可能是OCR误识别）
-                if name_text:
-                    words = name_text.split()
-                    filtered_words = [word for word in words if len(word) > 1 or word in ["a", "A"]]
-                    name_text = " ".join(filtered_words).strip()
-
-                # 改进的鱼名提取逻辑
-                # 1. 尝试直接使用清理后的文本作为鱼名
-                if name_text and len(name_text) >= 2:
-                    fish_name = name_text
-                    # 特别处理美髯公，确保能被正确识别
-                    cleaned_fish_name = fish_name.replace(" ", "")
-                    if "美髯公" in cleaned_fish_name or (
-                        ("美" in cleaned_fish_name)
-                        and ("公" in cleaned_fish_name)
-                        and len(cleaned_fish_name) <= 3
-                    ):
-                        fish_name = "美髯公"
-
-                # 2. 如果直接使用不行，尝试提取连续的中文词
-                if not fish_name:
-                    # 取最长的连续中文词作为鱼名（支持繁体）
-                    chinese_words = re.findall(r"[\u4e00-\u9fff]{2,}", name_text)
-                    if chinese_words:
-                        # 选择最长的词作为鱼名
-                        fish_name = max(chinese_words, key=len)
-                        # 特别处理美髯公，确保能被正确识别
-                        cleaned_fish_name = fish_name.replace(" ", "")
-                        if "美髯公" in cleaned_fish_name or (
-                            ("美" in cleaned_fish_name)
-                            and ("公" in cleaned_fish_name)
-                            and len(cleaned_fish_name) <= 3
-                        ):
-                            fish_name = "美髯公"
-
-            # 如果还是没匹配到，尝试直接从完整文本中提取鱼名
-            if not fish_name:
-                # 移除品质词和重量
-                clean_text = full_text
-                for quality in QUALITY_LEVELS:
-                    clean_text = clean_text.replace(quality, " ")
-                # 移除数字和单位
-                weight_pattern = r"\d+\.?\d*\s*(kg|g|千克|克|公斤|KG|G)?"
-                clean_text = re.sub(weight_pattern, "", clean_text, flags=re.IGNORECASE)
-                # 移除前缀
-                for prefix in prefixes_to_remove:
-                    clean_text = clean_text.replace(prefix, " ")
-                # 清理特殊字符
-                clean_text = re.sub(
-                    r"[^\u4e00-\u9fff\uf900-\ufaffa-zA-Z\s]",
-                    " ",
-                    clean_text,
-                )
-                # 移除多余空格
-                clean_text = re.sub(r"\s+", " ", clean_text).strip()
-                # 移除单个字符（可能是OCR误识别）
-                if clean_text:
-                    words = clean_text.split()
-                    filtered_words = [word for word in words if len(word) > 1 or word in ["a", "A"]]
-                    clean_text = " ".join(filtered_words).strip()
-                # 直接使用清理后的文本作为鱼名（如果长度合适）
-                if clean_text and len(clean_text) >= 2:
-                    fish_name = clean_text
-                    # 特别处理美髯公，确保能被正确识别
-                    cleaned_fish_name = fish_name.replace(" ", "")
-                    # 特别处理各种鱼名，确保能被正确识别
-                    if "美髯公" in cleaned_fish_name or (
-                        ("美" in cleaned_fish_name)
-                        and ("公" in cleaned_fish_name)
-                        and len(cleaned_fish_name) <= 3
-                    ):
-                        fish_name = "美髯公"
+ocr_result_cache = OcrResultCache()
+
+
+def print_ocr_cache_stats():
+    """打印OCR结果缓存的命中率和节省的识别时间"""
+    stats = ocr_result_cache.get_stats()
+    if not stats["hits"] and not stats["misses"]:
+        return
+    print(
+        f"📊 [统计] OCR结果缓存: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次"
+        f"（命中率 {stats['hit_rate'] * 100:.1f}%），节省 {stats['saved_ms']:.0f}ms，"
+        f"核对不一致 {stats['rejected']} 次，缓存 {stats['entries']} 条"
+    )
+
+
+# =========================
+# 固定版面OCR（只识别已知的文字行，不做文字检测和方向分类）
+# =========================
+# 鱼信息横幅的版面固定：鱼名一行、品质标签、重量。"layout" 模式按下面的行框（2K基准下
+# 相对于 FISH_INFO_REGION_BASE 区域左上角的 x, y, w, h）裁出各行，按 SCALE_X/SCALE_Y 缩放，
+# 只交给识别模型；"full" 模式对整块横幅运行检测+分类+识别的完整流程。
+# 各行框互不重叠（裁出的行不含相邻行的笔画），默认值是把横幅按三行划分的初始值，
+# --benchmark-ocr 会从录制的横幅测量实际的文字行位置（measure_fish_info_line_boxes）并给出建议值；
+# 两种模式的识别率和耗时也用 --benchmark-ocr 在录制的横幅上对比
+FISH_INFO_OCR_MODE = "full"
+FISH_INFO_LINE_BOXES_BASE = {
+    "name": (0, 0, 725, 56),
+    "quality": (0, 56, 725, 40),
+    "weight": (0, 96, 725, 54),
+}
+FISH_INFO_LINE_ENERGY_RATIO = 0.2  # 测量行框时，水平梯度能量超过最大值该比例的像素行/列视为文字
+FISH_INFO_LINE_PADDING = 4  # 测量出的行框向外扩展的像素（2K基准，不超过与相邻行间隙的一半）
+
+
+def fish_info_line_boxes(img):
+    """按当前缩放比例计算各文字行在鱼信息图像中的位置 [(行名称, (x0, y0, x1, y1)), ...]"""
+    h, w = img.shape[:2]
+    boxes = []
+    for name, (x, y, box_w, box_h) in FISH_INFO_LINE_BOXES_BASE.items():
+        x0, y0 = int(x * SCALE_X), int(y * SCALE_Y)
+        x1, y1 = min(w, int((x + box_w) * SCALE_X)), min(h, int((y + box_h) * SCALE_Y))
+        if x1 > x0 and y1 > y0:
+            boxes.append((name, (x0, y0, x1, y1)))
+    return boxes
+
+
+def measure_fish_info_line_boxes(images):
+    """从录制的鱼信息横幅测量各文字行的位置
+
+    累加每张横幅的水平梯度能量，能量超过阈值的连续像素行为一行文字，行内再按列能量确定左右范围。
+    行数与 FISH_INFO_LINE_BOXES_BASE 不同时返回None
+
+    Returns:
+        dict: {行名称: (x, y, w, h)}（2K基准坐标），按从上到下的顺序对应 FISH_INFO_LINE_BOXES_BASE 的各行
+    """
+    energy = None
+    for img in images:
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) if img.ndim == 3 else img
+        sobel = np.abs(cv2.Sobel(gray, cv2.CV_32F, 1, 0))
+        if energy is None:
+            energy = sobel
+        elif sobel.shape == energy.shape:
+            energy += sobel
+    if energy is None:
+        return None
+    rows = energy.mean(axis=1)
+    is_text = rows > rows.max() * FISH_INFO_LINE_ENERGY_RATIO
+    runs = []
+    for y, text in enumerate(is_text):
+        if not text:
+            continue
+        # 相隔不超过2个像素行的文字行合并为同一行（字符内部的空行）
+        if runs and y - runs[-1][1] <= 3:
+            runs[-1][1] = y + 1
+        else:
+            runs.append([y, y + 1])
+    if len(runs) != len(FISH_INFO_LINE_BOXES_BASE):
+        return None
+    h, w = energy.shape
+    boxes = {}
+    for index, (name, (y0, y1)) in enumerate(zip(FISH_INFO_LINE_BOXES_BASE, runs)):
+        cols = energy[y0:y1].mean(axis=0)
+        xs = np.flatnonzero(cols > cols.max() * FISH_INFO_LINE_ENERGY_RATIO)
+        x0, x1 = int(xs[0]), int(xs[-1]) + 1
+        # 上下扩展不超过与相邻行间隙的一半，行框互不重叠
+        above = (y0 - runs[index - 1][1]) // 2 if index > 0 else y0
+        below = (runs[index + 1][0] - y1) // 2 if index + 1 < len(runs) else h - y1
+        pad_y = int(FISH_INFO_LINE_PADDING * SCALE_Y)
+        pad_x = int(FISH_INFO_LINE_PADDING * SCALE_X)
+        y0, y1 = y0 - min(pad_y, above), y1 + min(pad_y, below)
+        x0, x1 = max(0, x0 - pad_x), min(w, x1 + pad_x)
+        boxes[name] = (
+            int(round(x0 / SCALE_X)),
+            int(round(y0 / SCALE_Y)),
+            int(round((x1 - x0) / SCALE_X)),
+            int(round((y1 - y0) / SCALE_Y)),
+        )
+    return boxes
+
+
+def recognize_fish_info_lines(img):
+    """固定版面OCR：只把各文字行交给识别模型（关闭文字检测和方向分类）
+
+    Returns:
+        tuple: (与完整流程格式相同的结果 [[行框四点, 文本, 置信度], ...], 耗时秒)
+    """
+    boxes = fish_info_line_boxes(img)
+    crops = [np.ascontiguousarray(img[y0:y1, x0:x1]) for _, (x0, y0, x1, y1) in boxes]
+    start = time.perf_counter()
+    text_rec = getattr(ocr_engine, "text_rec", None)
+    if text_rec is not None:
+        # 识别模型一次批量处理所有文字行
+        recognized, _ = text_rec(crops)
+    else:
+        recognized = []
+        for crop in crops:
+            lines, _ = ocr_engine(crop, use_det=False, use_cls=False, use_rec=True)
+            recognized.append(tuple(lines[0][:2]) if lines else ("", 0.0))
+    result = []
+    for (_, (x0, y0, x1, y1)), (text, score) in zip(boxes, recognized):
+        if text:
+            result.append([[[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, float(score)])
+    return result, time.perf_counter() - start
+
+
+# =========================
+# 横幅颜色判断品质（不经过OCR）
+# =========================
+# 游戏按品质给鱼信息横幅的品质标签着色（与 QUALITY_COLORS 的显示颜色一致：标准白/灰、
+# 非凡绿、稀有蓝、史诗紫、传奇金）。在品质标签所在的行框（FISH_INFO_LINE_BOXES_BASE["quality"]）
+# 隔像素取样，统计高饱和度像素的色相，与各品质的色相比较，几十微秒即可判断品质。
+# 色相使用 OpenCV 的 0~180 范围，可以用 --benchmark-quality-color 在录制的横幅上重新拟合
+QUALITY_COLOR_HUES = {"非凡": 60.0, "稀有": 105.0, "史诗": 140.0, "传奇": 22.0}
+QUALITY_COLOR_MIN_SATURATION = 90  # 饱和度和亮度都不低于该值的像素视为着色像素
+QUALITY_COLOR_MIN_COLORED_RATIO = 0.04  # 着色像素比例低于该值时判为标准（白/灰）
+QUALITY_COLOR_HUE_TOLERANCE = 12.0  # 着色像素色相与品质色相相差不超过该值计为该品质
+QUALITY_COLOR_MIN_CONFIDENCE = 0.8  # 置信度达到该值、且该品质不放生时不等待OCR
+QUALITY_COLOR_SAMPLE_STEP = 3  # 取样间隔（像素）
+
+
+class BannerQualityClassifier:
+    """按横幅品质标签颜色判断品质，返回 (品质, 置信度)
+
+    着色像素很少时判为标准，置信度随着色比例降低而升高；否则着色像素按色相归入最近的品质，
+    置信度为归入该品质的像素占全部着色像素的比例（颜色越纯越可信）
+    """
+
+    def __init__(self, hues=None):
+        self.hues = dict(hues or QUALITY_COLOR_HUES)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "confident": 0, "time": 0.0}
+
+    def _sample(self, img):
+        """品质标签区域隔像素取样，返回 HSV 像素 (N, 3)"""
+        boxes = dict(fish_info_line_boxes(img))
+        x0, y0, x1, y1 = boxes.get("quality", (0, 0, img.shape[1], img.shape[0]))
+        step = QUALITY_COLOR_SAMPLE_STEP
+        sample = np.ascontiguousarray(img[y0:y1:step, x0:x1:step, :3])
+        return cv2.cvtColor(sample, cv2.COLOR_RGB2HSV).reshape(-1, 3)
+
+    def _colored_hues(self, img):
+        hsv = self._sample(img)
+        colored = (hsv[:, 1] >= QUALITY_COLOR_MIN_SATURATION) & (
+            hsv[:, 2] >= QUALITY_COLOR_MIN_SATURATION
+        )
+        return hsv[colored, 0].astype(np.float32), len(hsv)
+
+    def classify(self, img):
+        """判断横幅（RGB图像）的品质，图像为空时返回 (None, 0.0)"""
+        if img is None or img.ndim != 3 or img.size == 0:
+            return None, 0.0
+        start = time.perf_counter()
+        hues, total = self._colored_hues(img)
+        ratio = len(hues) / total if total else 0.0
+        if ratio < QUALITY_COLOR_MIN_COLORED_RATIO:
+            quality, confidence = "标准", 1.0 - ratio / QUALITY_COLOR_MIN_COLORED_RATIO * 0.5
+        else:
+            names = list(self.hues)
+            centers = np.array([self.hues[name] for name in names], dtype=np.float32)
+            # 色相是环形的（0与180相邻）
+            distance = np.abs(hues[:, None] - centers[None, :])
+            distance = np.minimum(distance, 180.0 - distance)
+            nearest = np.argmin(distance, axis=1)
+            within = distance[np.arange(len(hues)), nearest] <= QUALITY_COLOR_HUE_TOLERANCE
+            votes = np.bincount(nearest[within], minlength=len(names))
+            best = int(np.argmax(votes))
+            quality, confidence = names[best], float(votes[best]) / len(hues)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["confident"] += confidence >= QUALITY_COLOR_MIN_CONFIDENCE
+            self.stats["time"] += elapsed
+        return quality, confidence
+
+    def fit(self, samples):
+        """用标注了品质的横幅 [(RGB图像, 品质), ...] 重新估计各品质的色相（着色像素色相的环形均值）"""
+        for quality in list(self.hues):
+            hues = []
+            for img, label in samples:
+                if label == quality:
+                    hues.append(self._colored_hues(img)[0])
+            hues = np.concatenate(hues) if hues else np.empty(0, dtype=np.float32)
+            if len(hues):
+                angle = hues.astype(np.float64) * (np.pi / 90.0)
+                mean = np.arctan2(np.sin(angle).mean(), np.cos(angle).mean())
+                self.hues[quality] = float(mean * 90.0 / np.pi) % 180.0
+        return self.hues
+
+    def get_stats(self):
+        with self._lock:
+            calls = self.stats["calls"]
+            return {
+                "calls": calls,
+                "confident": self.stats["confident"],
+                "avg_us": self.stats["time"] / calls * 1e6 if calls else 0.0,
+            }
+
+
+banner_quality_classifier = BannerQualityClassifier()
+
+
+def print_banner_quality_stats():
+    """打印横幅颜色判断品质的次数、高置信度次数和平均耗时"""
+    stats = banner_quality_classifier.get_stats()
+    if not stats["calls"]:
+        return
+    print(
+        f"📊 [统计] 横幅颜色判断品质: {stats['calls']} 次，高置信度 {stats['confident']} 次，"
+        f"平均 {stats['avg_us']:.0f}µs"
+    )
+
+
+def color_rules_out_release(quality, confidence):
+    """横幅颜色能确定这条鱼不需要放生时返回True（不用等待OCR）
+
+    颜色只用来跳过等待，不用来放生：放生不可撤销，必须等OCR确认品质和鱼名。
+    开启幻神稀有鱼放生时，除史诗、传奇外都需要鱼名才能确定不放生
+    """
+    if quality is None or confidence < QUALITY_COLOR_MIN_CONFIDENCE:
+        return False
+    if should_release_fish(quality):
+        return False
+    return not release_phantom_rare_enabled or quality in ["史诗", "传奇"]
+
+
+# =========================
+# 鱼名词典（OCR文本 -> 标准鱼名）
+# =========================
+# 词典文件在 resources 目录下：
+#   {"version": 1, "complete": false, "species": [{"name": "鱼名", "aliases": [...], "phantom_rare": true}, ...]}
+# 识别时先把繁体字转成简体，再用字符 n-gram 倒排索引取出候选鱼名，对候选计算与OCR鱼名文本的编辑距离，
+# 得分 = 1 - 编辑距离 / 鱼名长度。允许的编辑距离随鱼名长度增加（见 fish_name_max_distance），三个字以内的鱼名必须完全一致。
+# 有错字的文本得分不低于 FISH_NAME_MIN_SCORE 时替换为词典中的鱼名，否则按清理后的原文记录；
+# 幻神稀有鱼只认完全一致的鱼名或别名，避免把其他鱼改成幻神稀有鱼后误放生。
+# complete 表示词典是否已收录全部鱼种（只作记录）。
+# 词典可以用 --build-species-dict 从钓鱼记录中补充，识别准确率和耗时用 --benchmark-fish-names 测试
+FISH_SPECIES_FILE = "fish_species.json"
+FISH_SPECIES_VERSION = 1
+FISH_NAME_NGRAM_SIZES = (1, 2)
+FISH_NAME_MAX_CANDIDATES = 16
+FISH_NAME_CHARS_PER_EDIT = 3  # 鱼名每多3个字允许多1处错字
+FISH_NAME_MIN_SCORE = 0.75  # 有错字的文本替换为词典鱼名的最低得分
+FISH_SPECIES_MIN_RECORDS = 2  # 钓鱼记录中至少出现该次数的鱼名才加入词典
+
+# 词典文件不存在时使用的幻神稀有鱼
+PHANTOM_RARE_FISHES = [
+    "地包天鱼", "黄鸭叫", "辐射鲈", "鬼刀鱼", "鬼虎鱼", "鬼牙鱼", "芭蕃蓬蓬鱼", "幻光鱼", "甲方满意鱼", "蓝眼泪", "飞机头",
+    "鳅鳅鱼", "拟岩鱼", "粗红线", "水法老", "大罐子鱼", "粉丝虾", "狼蛛蟹", "金蛙", "拳击虾", "大师龟",
+]
+
+# 鱼信息横幅中会出现的繁体字 -> 简体字（繁体客户端和OCR把简体识别成繁体时使用）
+_TRADITIONAL_SIMPLIFIED_PAIRS = (
+    "釣钓獲获約约標标準准詩诗傳传魚鱼黃黄鴨鸭輻辐鱸鲈藍蓝淚泪飛飞機机頭头鰍鳅擬拟紅红線线師师龜龟滿满"
+    "絲丝蝦虾擊击鬚须須须鯉鲤鯽鲫鱒鳟鯊鲨鱈鳕鰻鳗鱔鳝鮭鲑鯰鲶鱘鲟鰱鲢鱖鳜鯨鲸龍龙鳳凤貝贝鰈鲽鱷鳄鯛鲷燈灯"
+    "劍剑帶带鋸锯鐵铁銀银碼码馬马鬥斗壯壮蓮莲葉叶雙双電电蘭兰鳥鸟鮪鲔鰭鳍國国長长寶宝蟲虫鐘钟網网兒儿"
+    "條条無无獅狮鵝鹅團团麗丽"
+)
+TRADITIONAL_TO_SIMPLIFIED = str.maketrans(
+    _TRADITIONAL_SIMPLIFIED_PAIRS[0::2], _TRADITIONAL_SIMPLIFIED_PAIRS[1::2]
+)
+
+# 鱼名以外的文字：前缀（"你钓到了"、"首次捕获"，OCR可能把"钓"识别为"约"）、品质、重量
+_FISH_NAME_NOISE_PATTERNS = [
+    r"你?[钓约]到了?|首次?捕获",
+    "|".join(sorted({q.translate(TRADITIONAL_TO_SIMPLIFIED) for q in QUALITY_LEVELS}, key=len, reverse=True)),
+    r"\d+\.?\d*\s*(?:kg|g|千克|克|公斤)?",
+    r"[^\u4e00-\u9fff\uf900-\ufaffa-zA-Z]",
+]
+
+
+def normalize_fish_name_text(text):
+    """繁体转简体并去掉前缀、品质、重量和符号，返回剩下的词列表（OCR可能把鱼名拆成几个词）"""
+    text = text.translate(TRADITIONAL_TO_SIMPLIFIED)
+    for pattern in _FISH_NAME_NOISE_PATTERNS:
+        text = re.sub(pattern, " ", text, flags=re.IGNORECASE)
+    return text.split()
+
+
+def fish_name_max_distance(name):
+    """鱼名允许的编辑距离：1~3个字为0，4~6个字为1，以此类推"""
+    return (len(name) - 1) // FISH_NAME_CHARS_PER_EDIT
+
+
+def edit_distance(pattern, text):
+    """两个字符串之间的编辑距离"""
+    previous = list(range(len(text) + 1))
+    for i, char in enumerate(pattern, 1):
+        current = [i]
+        for j, other in enumerate(text, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            )
+        previous = current
+    return previous[-1]
+
+
+class FishNameResolver:
+    """鱼名词典：字符 n-gram 倒排索引 + 编辑距离，把OCR文本映射为标准鱼名"""
+
+    def __init__(self, species, complete=False):
+        self.species = list(species)
+        self.complete = complete  # 词典是否收录了全部鱼种
+        self.keys = []  # [(简体化的名称/别名, 标准鱼名)]
+        self.exact = {}  # 简体化的名称/别名 -> 标准鱼名
+        self.index = {}  # n-gram -> {keys 下标}
+        self.phantom_rare = set()
+        for entry in self.species:
+            name = entry["name"]
+            if entry.get("phantom_rare"):
+                self.phantom_rare.add(name)
+            for key in {name, *entry.get("aliases", [])}:
+                key = key.translate(TRADITIONAL_TO_SIMPLIFIED)
+                self.keys.append((key, name))
+                self.exact[key] = name
+                for gram in self._ngrams(key):
+                    self.index.setdefault(gram, set()).add(len(self.keys) - 1)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @staticmethod
+    def _ngrams(text):
+        return {text[i : i + n] for n in FISH_NAME_NGRAM_SIZES for i in range(len(text) - n + 1)}
+
+    @classmethod
+    def load(cls, path=None):
+        """读取词典文件，文件不存在或格式不对时只使用内置的幻神稀有鱼"""
+        path = path or os.path.join(template_folder_path, FISH_SPECIES_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == FISH_SPECIES_VERSION:
+                return cls(data["species"], data.get("complete", False))
+            print(f"⚠️  [警告] 鱼名词典版本不匹配，使用内置词典: {path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️  [警告] 读取鱼名词典失败，使用内置词典: {e}")
+        return cls({"name": name, "phantom_rare": True} for name in PHANTOM_RARE_FISHES)
+
+    def save(self, path=None):
+        """写入词典文件（先写临时文件再替换）"""
+        path = path or os.path.join(template_folder_path, FISH_SPECIES_FILE)
+        data = {"version": FISH_SPECIES_VERSION, "complete": self.complete, "species": self.species}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def resolve(self, text):
+        """把OCR文本映射为词典中最相近的鱼名（编辑距离不超过该鱼名允许的范围）
+
+        Returns:
+            tuple: (标准鱼名, 得分 0~1)，没有足够相近的鱼名时为 (None, 0.0)；得分为1表示与鱼名或别名完全一致
+        """
+        start = time.perf_counter()
+        query = "".join(normalize_fish_name_text(text))
+        hits = {}
+        for gram in self._ngrams(query):
+            for key_id in self.index.get(gram, ()):
+                hits[key_id] = hits.get(key_id, 0) + 1
+        candidates = sorted(hits, key=hits.get, reverse=True)[:FISH_NAME_MAX_CANDIDATES]
+        best_name, best_score, best_length = None, 0.0, 0
+        for key_id in candidates:
+            key, name = self.keys[key_id]
+            distance = edit_distance(key, query)
+            if distance > fish_name_max_distance(key):
+                continue
+            score = 1.0 - distance / len(key)
+            # 得分相同时取较长的鱼名
+            if (score, len(key)) > (best_score, best_length):
+                best_name, best_score, best_length = name, score, len(key)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["candidates"] += len(candidates)
+            self.stats["resolved"] += best_name is not None
+            self.stats["time"] += elapsed
+        return best_name, best_score
+
+    def is_phantom_rare(self, name):
+        """鱼名（繁体也可以）与某种幻神稀有鱼的鱼名或别名完全一致时返回True"""
+        if not name:
+            return False
+        return self.exact.get(name.replace(" ", "").translate(TRADITIONAL_TO_SIMPLIFIED)) in self.phantom_rare
+
+    def add_species(self, names):
+        """把新鱼名加入词典（已有的鱼名不重复加入），返回加入的数量"""
+        known = {entry["name"] for entry in self.species}
+        added = [{"name": name} for name in names if name not in known]
+        self.__init__(self.species + added, self.complete)
+        return len(added)
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"calls": 0, "candidates": 0, "resolved": 0, "time": 0.0}
+
+    def get_stats(self):
+        with self._lock:
+            calls = self.stats["calls"]
+            return {
+                "calls": calls,
+                "resolved": self.stats["resolved"],
+                "avg_candidates": self.stats["candidates"] / calls if calls else 0.0,
+                "avg_us": self.stats["time"] / calls * 1e6 if calls else 0.0,
+            }
+
+
+_fish_name_resolver = None
+
+
+def get_fish_name_resolver():
+    """返回鱼名词典（首次使用时读取词典文件）"""
+    global _fish_name_resolver
+    if _fish_name_resolver is None:
+        _fish_name_resolver = FishNameResolver.load()
+    return _fish_name_resolver
+
+
+def resolve_fish_name(text):
+    """从OCR文本中识别鱼名
+
+    与词典完全一致时返回词典中的鱼名；有错字时得分不低于 FISH_NAME_MIN_SCORE、且相近的不是幻神稀有鱼时
+    才替换为词典中的鱼名
+
+    Returns:
+        tuple: (鱼名, 得分)。不替换时返回清理后文本中的词（用空格连接），没有可用文字时鱼名为None
+    """
+    resolver = get_fish_name_resolver()
+    name, score = resolver.resolve(text)
+    if name is not None and (
+        score == 1.0 or (score >= FISH_NAME_MIN_SCORE and name not in resolver.phantom_rare)
+    ):
+        return name, score
+    # 单个字的词视为OCR误识别
+    words = [word for word in normalize_fish_name_text(text) if len(word) > 1 or word in ["a", "A"]]
+    fallback = " ".join(words)
+    return (fallback if len(fallback) >= 2 else None), score
+
+
+def print_fish_name_resolver_stats():
+    """打印鱼名词典的识别次数、命中率、平均候选数和耗时"""
+    if _fish_name_resolver is None:
+        return
+    stats = _fish_name_resolver.get_stats()
+    if not stats["calls"]:
+        return
+    print(
+        f"📊 [统计] 鱼名词典: 识别 {stats['calls']} 次，命中 {stats['resolved']} 次，"
+        f"平均候选 {stats['avg_candidates']:.1f} 个，平均 {stats['avg_us']:.0f}µs"
+    )
+
+
+def recognize_fish_info_ocr(img):
+    """使用OCR识别鱼的信息，同样的横幅直接使用OCR结果缓存
+
+    Returns:
+        tuple: (鱼名, 品质, 重量, 是否首次捕获)，识别失败的项为None
+    """
+    if not OCR_AVAILABLE or ocr_engine is None:
+        # 调试信息：记录错误
+        if debug_mode:
+            debug_info = {
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+                    :-3
+                ],
+                "action": "ocr_error",
+                "error": "OCR引擎不可用",
+            }
+            add_debug_info(debug_info)
+        return None, None, None, False
+
+    if img is None:
+        # 调试信息：记录错误
+        if debug_mode:
+            debug_info = {
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+                    :-3
+                ],
+                "action": "ocr_error",
+                "error": "输入图像为空",
+            }
+            add_debug_info(debug_info)
+        return None, None, None, False
+
+    # 同样的横幅（同一帧的重复识别、同种鱼同样品质和重量）直接使用缓存的识别结果
+    cache_mode = cache_signature = None
+    if OCR_CACHE_ENABLED:
+        # 两种识别模式的结果分开缓存；签名按行框裁出文字行，行框不同的记录也分开
+        cache_mode = f"{FISH_INFO_OCR_MODE}:{sorted(FISH_INFO_LINE_BOXES_BASE.items())}"
+        cache_signature = fish_info_signature(img)
+    if cache_signature is not None:
+        cached = ocr_result_cache.lookup(cache_mode, cache_signature)
+        if cached is not None:
+            if debug_mode:
+                debug_info = {
+                    "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                    "action": "ocr_cache_hit",
+                    "message": "OCR结果缓存命中，跳过OCR",
+                    "parsed_info": {"鱼名": cached[0], "品质": cached[1], "重量": cached[2]},
+                }
+                add_debug_info(debug_info)
+            return cached
+
+    try:
+        # 执行OCR识别
+        ocr_start = time.perf_counter()
+        if FISH_INFO_OCR_MODE == "layout":
+            result, elapse = recognize_fish_info_lines(img)
+        else:
+            result, elapse = ocr_engine(img)
+        ocr_elapsed_ms = (time.perf_counter() - ocr_start) * 1000
+
+        # 确保result是列表类型
+        if result is None:
+            result = []
+
+        # 合并所有识别到的文本
+        full_text = ""
+        for line in result:
+            if isinstance(line, list) and len(line) >= 2:
+                full_text += line[1] + " "
+
+        full_text = full_text.strip()
+
+        # 解析鱼的信息
+        fish_name = None
+        fish_quality = None
+        fish_weight = None
+        fish_name_score = 0.0
+        is_first_capture = False
+
+        if len(result) > 0 and full_text:
+            # 识别品质
+            for quality in QUALITY_LEVELS:
+                if quality in full_text:
+                    fish_quality = quality
+                    break
+
+            # 识别重量（匹配数字+kg或g的模式，支持简繁体）
+            weight_pattern = r"(\d+\.?\d*)\s*(kg|g|千克|克|公斤|KG|G)?"
+            weight_matches = re.findall(weight_pattern, full_text, re.IGNORECASE)
+            if weight_matches:
+                # 取最后一个匹配的数字作为重量
+                for match in weight_matches:
+                    if match[0]:
+                        fish_weight = match[0]
+                        unit = match[1].lower() if match[1] else "kg"
+                        if unit in ["g", "克", "g"]:
+                            fish_weight = str(float(fish_weight) / 1000)
+                        fish_weight = f"{float(fish_weight):.2f}kg"
+
+            # 识别鱼名（鱼名词典查找，支持简繁体和OCR错字）
+            is_first_capture = "首次" in full_text
+            fish_name, fish_name_score = resolve_fish_name(full_text)
 
         # 调试信息：记录OCR识别结果和详细的鱼信息识别
         if debug_mode:
@@ -5654,6 +6468,7 @@ def recognize_fish_info_ocr(img):
                 "message": "鱼信息识别完整流程完成",
                 "parsed_info": {
                     "鱼名": fish_name if fish_name else "未识别",
+                    "鱼名得分": round(fish_name_score, 3),
                     "品质": fish_quality if fish_quality else "未识别",
                     "重量": fish_weight if fish_weight else "未识别",
                 },
@@ -5664,6 +6479,14 @@ def recognize_fish_info_ocr(img):
         if len(result) == 0 or not full_text:
             return None, None, None, False
 
+        # 只缓存识别出内容的结果，识别失败的横幅下次仍然重新识别
+        if cache_signature is not None and (fish_name or fish_quality or fish_weight):
+            ocr_result_cache.store(
+                cache_mode,
+                cache_signature,
+                (fish_name, fish_quality, fish_weight, is_first_capture),
+                ocr_elapsed_ms,
+            )
         return fish_name, fish_quality, fish_weight, is_first_capture
 
     except Exception as e:
@@ -5679,77 +6502,107 @@ def recognize_fish_info_ocr(img):
                 "exception_type": type(e).__name__,
             }
             add_debug_info(debug_info)
-        return None, None, None
+        return None, None, None, False
 
 
-def record_caught_fish():
-    """识别并记录钓到的鱼"""
-    global current_session_fish, all_fish_records
-    global record_fish_enabled
+def grab_main_monitor():
+    """截取主显示器全屏
 
-    # 调试信息：记录函数开始执行
-    if debug_mode:
-        debug_info = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            "action": "fish_record_start",
-            "message": "开始记录钓到的鱼",
-            "ocr_available": OCR_AVAILABLE,
-            "record_fish_enabled": record_fish_enabled,
-        }
-        add_debug_info(debug_info)
+    主显示器通常具有最小的left和top值（0,0坐标），找不到时使用默认的index 1
 
-    if not OCR_AVAILABLE or not record_fish_enabled:
-        # 调试信息：记录钓鱼记录开关状态
+    Returns:
+        tuple: (mss截图对象, 显示器信息)
+    """
+    with mss.mss() as sct:
+        main_monitor = None
+        for monitor in sct.monitors[1:]:  # 跳过index 0（所有显示器组合）
+            if monitor["left"] == 0 and monitor["top"] == 0:
+                main_monitor = monitor
+                break
+        if main_monitor is None:
+            main_monitor = sct.monitors[1]
+            print(f"📌 [调试] 未找到坐标0,0的显示器，使用默认显示器1: {main_monitor}")
+        # 强制使用确定的主显示器进行截屏
+        return sct.grab(main_monitor), main_monitor
+
+
+def save_fish_screenshot(screenshot, fish, folder, suffix, label, action):
+    """把上鱼时截取的主显示器画面保存为PNG
+
+    Args:
+        screenshot: grab_main_monitor 的返回值 (截图, 显示器信息)
+        fish: 钓鱼记录
+        folder: 截图目录下的子目录名
+        suffix: 文件名后缀
+        label: 日志中的截图类型（传奇鱼/首次捕获）
+        action: 调试日志的 action 前缀
+    """
+    shot, monitor = screenshot
+    try:
+        # 调试信息：记录开始截屏
         if debug_mode:
             debug_info = {
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-                    :-3
-                ],
-                "action": "fish_record_check",
-                "message": "钓鱼记录未执行",
-                "reason": "OCR不可用" if not OCR_AVAILABLE else "钓鱼记录开关已关闭",
-                "ocr_available": OCR_AVAILABLE,
-                "record_fish_enabled": record_fish_enabled,
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "action": f"{action}_start",
+                "message": f"开始{label}自动截屏",
             }
             add_debug_info(debug_info)
-        return None
 
-    # 等待鱼信息显示
-    time.sleep(0.3)
+        # 创建截图保存目录
+        screenshot_dir = os.path.join(".", "截图", folder)
+        os.makedirs(screenshot_dir, exist_ok=True)
 
-    # 调试信息：记录准备截取鱼信息区域
-    if debug_mode:
-        debug_info = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            "action": "fish_record_capture_start",
-            "message": "准备截取鱼信息区域",
-        }
-        add_debug_info(debug_info)
+        # 生成截图文件名（包含时间戳、鱼名和品质）
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        fish_name_clean = re.sub(r"[^\w\s]", "", fish.name)
+        screenshot_path = os.path.join(
+            screenshot_dir, f"{timestamp}_{fish_name_clean}_{fish.quality}{suffix}.png"
+        )
 
-    # 截取鱼信息区域
-    img = capture_fish_info_region()
-    if img is None:
-        # 调试信息：记录鱼信息区域截取失败
+        # 保存截图
+        mss.tools.to_png(shot.rgb, shot.size, output=screenshot_path)
+        print(f"📸 [截屏] {label}已自动保存到主显示器截图: {screenshot_path}")
+
+        # 调试信息：记录截屏成功
         if debug_mode:
             debug_info = {
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-                    :-3
-                ],
-                "action": "fish_record_capture_failed",
-                "message": "鱼信息区域截取失败",
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "action": f"{action}_success",
+                "message": f"{label}自动截屏成功",
+                "screenshot_path": screenshot_path,
+                "monitor_info": monitor,
+            }
+            add_debug_info(debug_info)
+    except Exception as e:
+        print(f"❌ [错误] {label}截图失败: {e}")
+        # 调试信息：记录截屏失败
+        if debug_mode:
+            debug_info = {
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "action": f"{action}_failed",
+                "message": f"{label}自动截屏失败",
+                "error": str(e),
+                "exception_type": type(e).__name__,
             }
             add_debug_info(debug_info)
-        return None
 
-    # 调试信息：记录鱼信息区域截取成功
-    if debug_mode:
-        debug_info = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            "action": "fish_record_capture_success",
-            "message": "鱼信息区域截取成功",
-            "image_shape": img.shape if img is not None else "无图像",
-        }
-        add_debug_info(debug_info)
+
+def process_fish_info(img, screenshot=None):
+    """识别鱼信息并保存记录（在OCR工作线程中执行，不阻塞主循环）
+
+    OCR识别、保存钓鱼记录、传奇鱼/首次捕获截图和GUI更新都在这里完成
+
+    Args:
+        img: 鱼信息区域的RGB图像
+        screenshot: 上鱼时截取的主显示器画面（grab_main_monitor 的返回值），没有开启截图时为None
+
+    Returns:
+        FishRecord: 钓鱼记录，识别失败时返回None
+    """
+    global current_session_fish, all_fish_records
+
+    # 调试信息：记录开始OCR识别
+    if debug_mode:
         debug_info = {
             "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
             "action": "fish_record_ocr_start",
@@ -5759,6 +6612,11 @@ def record_caught_fish():
 
     # OCR识别
     fish_name, fish_quality, fish_weight, is_first_capture = recognize_fish_info_ocr(img)
+    if fish_quality is None and fish_name is not None:
+        # OCR没有识别出品质标签时使用横幅颜色判断的品质
+        color_quality, color_confidence = banner_quality_classifier.classify(img)
+        if color_confidence >= QUALITY_COLOR_MIN_CONFIDENCE:
+            fish_quality = color_quality
 
     # 调试信息：记录OCR识别结果
     if debug_mode:
@@ -5786,6 +6644,7 @@ def record_caught_fish():
                 "message": "OCR识别未获取到有效鱼信息",
             }
             add_debug_info(debug_info)
+        frame_recorder.dump("ocr_failed")
         return None
 
     # 调试信息：记录开始保存记录
@@ -5838,196 +6697,19 @@ def record_caught_fish():
         )
 
         # 传奇鱼自动截屏
-        if legendary_screenshot_enabled and fish.quality in ["传奇", "傳奇"]:
-            try:
-                # 调试信息：记录开始传奇鱼截屏
-                if debug_mode:
-                    debug_info = {
-                        "timestamp": datetime.datetime.now().strftime(
-                            "%Y-%m-%d %H:%M:%S.%f"
-                        )[:-3],
-                        "action": "fish_record_screenshot_start",
-                        "message": "开始传奇鱼自动截屏",
-                    }
-                    add_debug_info(debug_info)
-
-                # 使用mss截取主显示器全屏
-                with mss.mss() as sct:
-                    # 选择主显示器 - 通常index 1是主显示器，但有些系统可能不同
-                    # 主显示器通常具有最小的left和top值（0,0坐标）
-                    main_monitor = None
-                    for i, monitor in enumerate(
-                        sct.monitors[1:]
-                    ):  # 跳过index 0（所有显示器组合）
-                        if monitor["left"] == 0 and monitor["top"] == 0:
-                            main_monitor = monitor
-                            break
-
-                    # 如果找不到坐标0,0的显示器，使用默认的index 1
-                    if main_monitor is None:
-                        main_monitor = sct.monitors[1]
-                        print(
-                            f"📌 [调试] 未找到坐标0,0的显示器，使用默认显示器1: {main_monitor}"
-                        )
-
-                    # 强制使用确定的主显示器进行截屏
-                    screenshot = sct.grab(main_monitor)
-
-                    # 创建截图保存目录
-                    screenshot_dir = os.path.join(".", "截图", "传奇")
-                    os.makedirs(screenshot_dir, exist_ok=True)
-
-                    # 生成截图文件名（包含时间戳和鱼名）
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                    fish_name_clean = re.sub(r"[^\w\s]", "", fish.name)
-                    screenshot_path = os.path.join(
-                        screenshot_dir,
-                        f"{timestamp}_{fish_name_clean}_{fish.quality}.png",
-                    )
-
-                    # 保存截图
-                    mss.tools.to_png(
-                        screenshot.rgb, screenshot.size, output=screenshot_path
-                    )
-                    print(
-                        f"📸 [截屏] 传奇鱼已自动保存到主显示器截图: {screenshot_path}"
-                    )
-
-                    # 调试信息：记录传奇鱼截屏成功
-                    if debug_mode:
-                        debug_info = {
-                            "timestamp": datetime.datetime.now().strftime(
-                                "%Y-%m-%d %H:%M:%S.%f"
-                            )[:-3],
-                            "action": "fish_record_screenshot_success",
-                            "message": "传奇鱼自动截屏成功",
-                            "screenshot_path": screenshot_path,
-                            "monitor_info": monitor,
-                        }
-                        add_debug_info(debug_info)
-            except Exception as e:
-                print(f"❌ [错误] 截图失败: {e}")
-                # 调试信息：记录传奇鱼截屏失败
-                if debug_mode:
-                    debug_info = {
-                        "timestamp": datetime.datetime.now().strftime(
-                            "%Y-%m-%d %H:%M:%S.%f"
-                        )[:-3],
-                        "action": "fish_record_screenshot_failed",
-                        "message": "传奇鱼自动截屏失败",
-                        "error": str(e),
-                        "exception_type": type(e).__name__,
-                    }
-                    add_debug_info(debug_info)
+        if (
+            screenshot is not None
+            and legendary_screenshot_enabled
+            and fish.quality in ["传奇", "傳奇"]
+        ):
+            save_fish_screenshot(screenshot, fish, "传奇", "", "传奇鱼", "fish_record_screenshot")
 
         # 首次捕获截图
-        if first_capture_screenshot_enabled and is_first_capture:
-            try:
-                # 调试信息：记录开始首次捕获截屏
-                if debug_mode:
-                    debug_info = {
-                        "timestamp": datetime.datetime.now().strftime(
-                            "%Y-%m-%d %H:%M:%S.%f"
-                        )[:-3],
-                        "action": "first_capture_screenshot_start",
-                        "message": "开始首次捕获自动截屏",
-                    }
-                    add_debug_info(debug_info)
-
-                # 使用mss截取主显示器全屏
-                with mss.mss() as sct:
-                    # 选择主显示器
-                    main_monitor = None
-                    for i, monitor in enumerate(
-                        sct.monitors[1:]
-                    ):
-                        if monitor["left"] == 0 and monitor["top"] == 0:
-                            main_monitor = monitor
-                            break
-                    if main_monitor is None:
-                        main_monitor = sct.monitors[1]
-
-                    # 强制使用确定的主显示器进行截屏
-                    screenshot = sct.grab(main_monitor)
-
-                    # 创建截图保存目录
-                    screenshot_dir = os.path.join(".", "截图", "首次")
-                    os.makedirs(screenshot_dir, exist_ok=True)
-
-                    # 生成截图文件名（包含时间戳、鱼名和品质）
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                    fish_name_clean = re.sub(r"[^\w\s]", "", fish.name)
-                    screenshot_path = os.path.join(
-                        screenshot_dir,
-                        f"{timestamp}_{fish_name_clean}_{fish.quality}_首次捕获.png",
-                    )
-
-                    # 保存截图
-                    mss.tools.to_png(
-                        screenshot.rgb, screenshot.size, output=screenshot_path
-                    )
-                    print(
-                        f"📸 [截屏] 首次捕获已自动保存到主显示器截图: {screenshot_path}"
-                    )
-
-                    # 调试信息：记录首次捕获截屏成功
-                    if debug_mode:
-                        debug_info = {
-                            "timestamp": datetime.datetime.now().strftime(
-                                "%Y-%m-%d %H:%M:%S.%f"
-                            )[:-3],
-                            "action": "first_capture_screenshot_success",
-                            "message": "首次捕获自动截屏成功",
-                            "screenshot_path": screenshot_path,
-                            "monitor_info": monitor,
-                        }
-                        add_debug_info(debug_info)
-            except Exception as e:
-                print(f"❌ [错误] 首次捕获截图失败: {e}")
-                # 调试信息：记录首次捕获截屏失败
-                if debug_mode:
-                    debug_info = {
-                        "timestamp": datetime.datetime.now().strftime(
-                            "%Y-%m-%d %H:%M:%S.%f"
-                        )[:-3],
-                        "action": "first_capture_screenshot_failed",
-                        "message": "首次捕获自动截屏失败",
-                        "error": str(e),
-                        "exception_type": type(e).__name__,
-                    }
-                    add_debug_info(debug_info)
-        
-        # 鼠标左键收起 - 截图完成后再收起
-        print("🐠 [操作] 执行鼠标左键收起")
-        
-        try:
-            # 直接在屏幕中心执行收起操作
-            screen_width, screen_height = get_current_screen_resolution()
-            center_x = screen_width // 2
-            center_y = screen_height // 2
-            
-            # 执行点击
-            mouse_controller.position = (center_x, center_y)
-            time.sleep(0.3)
-            mouse_controller.click(mouse.Button.left, 1)
-            time.sleep(0.5)  # 增加延迟，确保左键点击完成
-            print("🐠 [操作] 在屏幕中心执行收起操作")
-        except Exception as e:
-            print(f"🐠 [操作] 执行收起操作失败: {str(e)}")
-            
+        if screenshot is not None and first_capture_screenshot_enabled and is_first_capture:
+            save_fish_screenshot(
+                screenshot, fish, "首次", "_首次捕获", "首次捕获", "first_capture_screenshot"
+            )
 
-        # 放生判断和执行
-        if release_fish_enabled:  # 先检查全局开关是否开启
-            if should_release_fish(fish.quality, fish.name):  # 再检查鱼的稀有度
-                print(f"🐠 [放生] 开始放生 {fish.quality}品质的 {fish.name}")
-                # 执行放生操作
-                success = release_fish()
-                if success:
-                    print(f"🐠 [放生] {fish.quality}品质的 {fish.name} 放生成功")
-                else:
-                    print(f"🐠 [放生] {fish.quality}品质的 {fish.name} 放生失败")
-        else:
-            print(f"⏹️ [放生] 放生功能已禁用，跳过放生判断")
         # 通知GUI更新
         if gui_fish_update_callback:
             try:
@@ -6076,6 +6758,261 @@ def record_caught_fish():
         return None
 
 
+# =========================
+# 异步OCR（鱼信息识别不阻塞下一次抛竿）
+# =========================
+OCR_QUEUE_SIZE = 4  # 等待识别的鱼信息上限，积压时丢弃新的任务
+OCR_RESULT_TIMEOUT = 5.0  # 放生判断等待识别结果的最长时间（秒）
+
+
+class OcrWorker:
+    """鱼信息OCR工作线程
+
+    主循环只截取鱼信息区域并提交（submit 返回 Future），OCR识别、保存记录、截图和GUI更新
+    都在工作线程中完成；需要识别结果的放生判断通过 wait 取回结果。
+    队列有上限，积压时丢弃新任务（Future 结果为None），不阻塞主循环
+    """
+
+    def __init__(self, handler, maxsize=OCR_QUEUE_SIZE):
+        self.handler = handler
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.reset_stats()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="OcrWorker", daemon=True)
+                self._thread.start()
+
+    def submit(self, *args):
+        """提交一个识别任务，返回 concurrent.futures.Future"""
+        future = concurrent.futures.Future()
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((future, time.perf_counter(), args))
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            print("⚠️  [警告] OCR队列已满，跳过本条鱼信息")
+            future.set_result(None)
+            return future
+        with self._lock:
+            self.stats["submitted"] += 1
+        return future
+
+    def _run(self):
+        while True:
+            future, queued_at, args = self._queue.get()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                start = time.perf_counter()
+                try:
+                    result = self.handler(*args)
+                except Exception as e:
+                    print(f"⚠️  [警告] 记录鱼信息失败: {e}")
+                    future.set_exception(e)
+                    result = None
+                else:
+                    future.set_result(result)
+                with self._lock:
+                    self.stats["completed"] += 1
+                    self.stats["recognized"] += result is not None
+                    self.stats["time"] += time.perf_counter() - start
+                    self.stats["queue_time"] += start - queued_at
+            finally:
+                self._queue.task_done()
+
+    def wait(self, future, timeout=OCR_RESULT_TIMEOUT):
+        """等待识别结果，超时或识别出错时返回None，并统计主循环因此等待的时间"""
+        start = time.perf_counter()
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            print(f"⚠️  [警告] 等待OCR结果超时（{timeout:.1f}s）")
+            return None
+        except Exception:
+            return None
+        finally:
+            with self._lock:
+                self.stats["waits"] += 1
+                self.stats["wait_time"] += time.perf_counter() - start
+
+    def join(self):
+        """等待队列中的任务全部完成"""
+        self._queue.join()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.update(
+                submitted=0,
+                dropped=0,
+                completed=0,
+                recognized=0,
+                time=0.0,
+                queue_time=0.0,
+                waits=0,
+                wait_time=0.0,
+            )
+
+    def get_stats(self):
+        """任务数、平均识别耗时（不再占用主循环的时间）、平均排队时间和放生判断的平均等待时间"""
+        with self._lock:
+            stats = dict(self.stats)
+        completed = stats["completed"]
+        stats["avg_ms"] = stats["time"] / completed * 1000 if completed else 0.0
+        stats["avg_queue_ms"] = stats["queue_time"] / completed * 1000 if completed else 0.0
+        stats["avg_wait_ms"] = stats["wait_time"] / stats["waits"] * 1000 if stats["waits"] else 0.0
+        return stats
+
+
+ocr_worker = OcrWorker(process_fish_info)
+
+
+def print_ocr_worker_stats():
+    """打印OCR工作线程的任务数、平均识别耗时和主循环的等待时间"""
+    stats = ocr_worker.get_stats()
+    if not stats["submitted"] and not stats["dropped"]:
+        return
+    summary = (
+        f"提交 {stats['submitted']} 条，完成 {stats['completed']} 条（识别成功 {stats['recognized']}），"
+        f"丢弃 {stats['dropped']} 条，平均识别 {stats['avg_ms']:.0f}ms，排队 {stats['avg_queue_ms']:.0f}ms"
+    )
+    if stats["waits"]:
+        summary += f"，放生判断等待 {stats['waits']} 次（平均 {stats['avg_wait_ms']:.0f}ms）"
+    print(f"📊 [统计] 后台OCR: {summary}")
+
+
+def record_caught_fish():
+    """截取鱼信息交给OCR工作线程识别并记录，收起鱼信息后按需等待识别结果决定是否放生
+
+    只有截图、收起和放生留在主循环中：没有开启放生时不等待识别结果，直接进入下一轮
+
+    Returns:
+        Future: 结果为钓鱼记录（识别失败时为None）；没有执行记录时返回None
+    """
+    global record_fish_enabled
+
+    # 调试信息：记录函数开始执行
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "action": "fish_record_start",
+            "message": "开始记录钓到的鱼",
+            "ocr_available": OCR_AVAILABLE,
+            "record_fish_enabled": record_fish_enabled,
+        }
+        add_debug_info(debug_info)
+
+    if not OCR_AVAILABLE or not record_fish_enabled:
+        # 调试信息：记录钓鱼记录开关状态
+        if debug_mode:
+            debug_info = {
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+                    :-3
+                ],
+                "action": "fish_record_check",
+                "message": "钓鱼记录未执行",
+                "reason": "OCR不可用" if not OCR_AVAILABLE else "钓鱼记录开关已关闭",
+                "ocr_available": OCR_AVAILABLE,
+                "record_fish_enabled": record_fish_enabled,
+            }
+            add_debug_info(debug_info)
+        return None
+
+    # 等待鱼信息显示
+    clock.sleep(0.3)
+
+    # 调试信息：记录准备截取鱼信息区域
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "action": "fish_record_capture_start",
+            "message": "准备截取鱼信息区域",
+        }
+        add_debug_info(debug_info)
+
+    # 截取鱼信息区域（等待之后的新画面）
+    img = capture_fish_info_region(
+        frame_bus.fetch(["fish_info"], newer_than=clock.time())
+    )
+    if img is None:
+        # 调试信息：记录鱼信息区域截取失败
+        if debug_mode:
+            debug_info = {
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+                    :-3
+                ],
+                "action": "fish_record_capture_failed",
+                "message": "鱼信息区域截取失败",
+            }
+            add_debug_info(debug_info)
+        frame_recorder.dump("ocr_failed")
+        return None
+
+    # 调试信息：记录鱼信息区域截取成功
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "action": "fish_record_capture_success",
+            "message": "鱼信息区域截取成功",
+            "image_shape": img.shape if img is not None else "无图像",
+        }
+        add_debug_info(debug_info)
+
+    # 上鱼横幅收起前截取主显示器（传奇鱼/首次捕获截图在识别完成后才知道是否需要保存）
+    screenshot = None
+    if legendary_screenshot_enabled or first_capture_screenshot_enabled:
+        try:
+            screenshot = grab_main_monitor()
+        except Exception as e:
+            print(f"❌ [错误] 截图失败: {e}")
+
+    # 横幅颜色判断品质只需几十微秒，能确定不放生时不用等待OCR
+    color_quality, color_confidence = banner_quality_classifier.classify(img)
+    future = ocr_worker.submit(img, screenshot)
+
+    # 鼠标左键收起 - 截图完成后再收起
+    print("🐠 [操作] 执行鼠标左键收起")
+
+    try:
+        # 直接在屏幕中心执行收起操作
+        screen_width, screen_height = get_current_screen_resolution()
+        center_x = screen_width // 2
+        center_y = screen_height // 2
+
+        # 执行点击
+        input_backend.move(center_x, center_y)
+        clock.sleep(0.3)
+        input_backend.click("left")
+        clock.sleep(0.5)  # 增加延迟，确保左键点击完成
+        print("🐠 [操作] 在屏幕中心执行收起操作")
+    except Exception as e:
+        print(f"🐠 [操作] 执行收起操作失败: {str(e)}")
+
+    # 放生判断和执行（需要识别结果，收起期间OCR已在后台进行）
+    if release_fish_enabled:  # 先检查全局开关是否开启
+        if color_rules_out_release(color_quality, color_confidence):
+            # 颜色判断为不放生的品质，不等待OCR
+            print(f"⏹️ [放生] 横幅颜色判断为{color_quality}品质，不需要放生")
+        else:
+            fish = ocr_worker.wait(future)
+            if fish is not None and should_release_fish(fish.quality, fish.name):  # 再检查鱼的稀有度
+                print(f"🐠 [放生] 开始放生 {fish.quality}品质的 {fish.name}")
+                # 执行放生操作
+                success = release_fish()
+                if success:
+                    print(f"🐠 [放生] {fish.quality}品质的 {fish.name} 放生成功")
+                else:
+                    print(f"🐠 [放生] {fish.quality}品质的 {fish.name} 放生失败")
+    else:
+        print(f"⏹️ [放生] 放生功能已禁用，跳过放生判断")
+    return future
+
+
 def play_fish_bucket_warning_sound():
     """播放鱼桶满/没鱼饵警告!音效"""
     if not fish_bucket_sound_enabled:
@@ -6258,6 +7195,8 @@ def handle_fish_bucket_full():
 
     # 在运行日志中提示
     print(f"🪣  [警告] 检测到: {FISH_BUCKET_FULL_TEXT}")
+    fishing_fsm.transition("BUCKET_FULL", FISH_BUCKET_FULL_TEXT)
+    frame_recorder.dump("bucket_full")
 
     # 根据不同模式执行不同操作
     if bucket_detection_mode == "mode1":
@@ -6277,9 +7216,9 @@ def handle_fish_bucket_full():
 
         try:
             # 按下一次F键
-            keyboard_controller.press(keyboard.KeyCode.from_char("f"))
-            time.sleep(0.1)
-            keyboard_controller.release(keyboard.KeyCode.from_char("f"))
+            input_backend.key_down(keyboard.KeyCode.from_char("f"))
+            clock.sleep(0.1)
+            input_backend.key_up(keyboard.KeyCode.from_char("f"))
             print("⌨️  [操作] 已按下F键")
 
             # 键盘活动标志
@@ -6309,16 +7248,17 @@ def handle_fish_bucket_full():
                 click_x = screen_width // 2
                 click_y = screen_height // 2
 
-                # 执行鼠标点击
-                mouse_controller.position = (click_x, click_y)
-                mouse_controller.click(mouse.Button.left, 1)
+                # 执行鼠标点击（移动和点击合并为一次发送）
+                with input_backend.batched():
+                    input_backend.move(click_x, click_y)
+                    input_backend.click("left")
                 print(f"🖱️  [操作] 已点击屏幕中心: ({click_x}, {click_y})")
 
                 # 等待一段时间，同时检查键盘活动
                 for _ in range(50):  # 5秒 = 50 * 0.1秒
                     if keyboard_activity[0]:
                         break
-                    time.sleep(0.1)  # 每0.1秒检查一次键盘活动
+                    clock.sleep(0.1)  # 每0.1秒检查一次键盘活动
 
                 if keyboard_activity[0]:
                     break
@@ -6346,9 +7286,9 @@ def handle_fish_bucket_full():
 
         try:
             # 按下一次F键
-            keyboard_controller.press(keyboard.KeyCode.from_char("f"))
-            time.sleep(0.1)
-            keyboard_controller.release(keyboard.KeyCode.from_char("f"))
+            input_backend.key_down(keyboard.KeyCode.from_char("f"))
+            clock.sleep(0.1)
+            input_backend.key_up(keyboard.KeyCode.from_char("f"))
             print("⌨️  [操作] 已按下F键")
         except Exception as e:
             print(f"❌ [错误] 执行仅F键模式时出错: {e}")
@@ -6365,119 +7305,161 @@ def reset_fish_bucket_full_detection():
         casting_timestamps.clear()  # 清空时间戳
 
 
-def bucket_full_detection_thread():
-    """鱼桶满独立检测线程 - 修复版
-    检测完整钓鱼循环的时长，而不是抛竿间隔
+class BucketFullIntervalDetector:
+    """根据抛竿时间戳判断鱼桶满/没鱼饵（检测完整钓鱼循环的时长，而不是抛竿间隔）
+
+    每次 check 看最近一次循环的时长，连续多次检查到短循环时判定为鱼桶满。
+    从检测线程中拆出来，便于用模拟时钟离线回放
     """
-    global fish_bucket_full_detected, bucket_full_by_interval, paogantime
 
-    short_cycle_count = 0  # 短循环计数器
-    last_reset_time = time.time()  # 上次重置计数器的时间
+    REQUIRED_SHORT_CYCLES = 3  # 连续3次短循环才判定为鱼桶满
 
-    while True:
-        if not run_event.is_set():
-            # 脚本未运行时，重置检测状态
-            short_cycle_count = 0
-            with casting_interval_lock:
-                casting_timestamps.clear()
-            time.sleep(0.5)
-            continue
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.short_cycle_count = 0  # 短循环计数器
+        self.last_reset_time = clock.time()  # 上次重置计数器的时间
 
-        try:
-            # 定期重置计数器（防止累积误判）
-            current_time = time.time()
-            if current_time - last_reset_time > 30:  # 每30秒重置一次
-                if short_cycle_count > 0:
-                    print(f"🔄 [检测] 定期重置短循环计数器: {short_cycle_count}次")
-                    short_cycle_count = 0
-                last_reset_time = current_time
+    def reset(self):
+        self.short_cycle_count = 0
 
-            with casting_interval_lock:
-                # 复制时间戳列表，避免在计算过程中被修改
-                timestamps = casting_timestamps.copy()
+    def check(self, timestamps, now, blocked=False):
+        """检查一次，返回是否判定为鱼桶满
 
-            # 需要至少2个时间戳来计算1个间隔
-            if len(timestamps) < 2:
-                time.sleep(0.5)
-                continue
+        Args:
+            timestamps: 抛竿时间戳列表（副本）
+            now: 当前时间
+            blocked: 已经处于鱼桶满状态时为True，不重复判定
+        """
+        # 定期重置计数器（防止累积误判）
+        if now - self.last_reset_time > 30:  # 每30秒重置一次
+            if self.short_cycle_count > 0:
+                if self.verbose:
+                    print(f"🔄 [检测] 定期重置短循环计数器: {self.short_cycle_count}次")
+                self.short_cycle_count = 0
+            self.last_reset_time = now
+
+        # 需要至少2个时间戳来计算1个间隔
+        if len(timestamps) < 2:
+            return False
 
-            # 计算最近一次完整钓鱼循环的时长
-            last_interval = timestamps[-1] - timestamps[-2]
-
-            # 【核心判断逻辑】
-            # 正常钓鱼循环应该至少包含：
-            # - 抛竿动画（0.5秒）
-            # - 等待上钩（随机，通常3-10秒）
-            # - 收放线（3-10秒）
-            # - 识别鱼信息（0.5秒）
-            # 总计：正常至少7-20秒
-
-            # 鱼桶满/没鱼饵时的特征：循环异常短
-            # 动态阈值计算：基于当前抛竿时间，确保正常循环不会被误判
-            # - 基于当前抛竿时间的1.0倍
-            # 基数+当前抛竿时间的动态阈值
-            base_value = 0.8  # 基数
-            dynamic_threshold = base_value + paogantime
-            if last_interval < dynamic_threshold:
-                short_cycle_count += 1
+        # 计算最近一次完整钓鱼循环的时长
+        last_interval = timestamps[-1] - timestamps[-2]
+
+        # 【核心判断逻辑】
+        # 正常钓鱼循环应该至少包含：
+        # - 抛竿动画（0.5秒）
+        # - 等待上钩（随机，通常3-10秒）
+        # - 收放线（3-10秒）
+        # - 识别鱼信息（0.5秒）
+        # 总计：正常至少7-20秒
+
+        # 鱼桶满/没鱼饵时的特征：循环异常短
+        # 动态阈值计算：基于当前抛竿时间，确保正常循环不会被误判
+        # - 基于当前抛竿时间的1.0倍
+        # 基数+当前抛竿时间的动态阈值
+        base_value = 0.8  # 基数
+        dynamic_threshold = base_value + paogantime
+        if last_interval < dynamic_threshold:
+            self.short_cycle_count += 1
+            if self.verbose:
                 print(
-                    f"⚠️  [检测] 检测到短循环 #{short_cycle_count}: {last_interval:.2f}秒 (<{dynamic_threshold:.2f}秒)"
+                    f"⚠️  [检测] 检测到短循环 #{self.short_cycle_count}: {last_interval:.2f}秒 (<{dynamic_threshold:.2f}秒)"
                 )
 
-                # 连续3次短循环才判定为鱼桶满
-                REQUIRED_SHORT_CYCLES = 3
-                if (
-                    short_cycle_count >= REQUIRED_SHORT_CYCLES
-                    and not fish_bucket_full_detected
-                    and not bucket_full_by_interval
-                ):
-                    # 额外验证：检查最近的REQUIRED_SHORT_CYCLES个循环是否都异常短
-                    recent_short_cycles = 0
-                    check_count = min(REQUIRED_SHORT_CYCLES, len(timestamps) - 1)
+            if self.short_cycle_count >= self.REQUIRED_SHORT_CYCLES and not blocked:
+                # 额外验证：检查最近的REQUIRED_SHORT_CYCLES个循环是否都异常短
+                recent_short_cycles = 0
+                check_count = min(self.REQUIRED_SHORT_CYCLES, len(timestamps) - 1)
 
-                    for i in range(len(timestamps) - check_count, len(timestamps)):
-                        interval = timestamps[i] - timestamps[i - 1]
-                        if interval < dynamic_threshold:
-                            recent_short_cycles += 1
+                for i in range(len(timestamps) - check_count, len(timestamps)):
+                    interval = timestamps[i] - timestamps[i - 1]
+                    if interval < dynamic_threshold:
+                        recent_short_cycles += 1
 
-                    # 如果最近的check_count个循环都是短循环，或者记录很少，就判定
-                    if recent_short_cycles >= check_count or len(timestamps) <= 5:
+                # 如果最近的check_count个循环都是短循环，或者记录很少，就判定
+                if recent_short_cycles >= check_count or len(timestamps) <= 5:
+                    if self.verbose:
                         print(
-                            f"🪣  [警告] 连续{short_cycle_count}次短循环，判定为鱼桶满/没鱼饵！"
+                            f"🪣  [警告] 连续{self.short_cycle_count}次短循环，判定为鱼桶满/没鱼饵！"
                         )
                         print(
                             f"   最近{len(timestamps)}次循环时长: {[round(timestamps[i]-timestamps[i-1], 2) for i in range(1, len(timestamps))]}"
                         )
-
-                        bucket_full_by_interval = True
-                        fish_bucket_full_detected = True
-                        handle_fish_bucket_full()
-            else:
-                # 正常循环，重置计数器
-                if short_cycle_count > 0:
-                    # 当检测到符合动态阈值的正常循环时重置计数器
+                    return True
+        else:
+            # 正常循环，重置计数器
+            if self.short_cycle_count > 0:
+                # 当检测到符合动态阈值的正常循环时重置计数器
+                if self.verbose:
                     print(
                         f"✅ [检测] 恢复正常循环: {last_interval:.2f}秒，重置短循环计数器"
                     )
-                    short_cycle_count = 0
+                self.short_cycle_count = 0
+        return False
 
-            time.sleep(0.5)  # 每0.5秒检查一次
 
-        except Exception as e:
-            print(f"⚠️  [警告] 鱼桶满检测线程出错: {e}")
-            time.sleep(1)
+def check_bucket_full_interval(detector):
+    """鱼桶满检测的一次检查：按抛竿时间戳判定，再用当前画面确认，返回是否判定为鱼桶满"""
+    with casting_interval_lock:
+        # 复制时间戳列表，避免在计算过程中被修改
+        timestamps = casting_timestamps.copy()
 
+    if not detector.check(
+        timestamps,
+        clock.time(),
+        blocked=fish_bucket_full_detected or bucket_full_by_interval,
+    ):
+        return False
+    # 用当前画面确认：画面上有加时界面、上鱼星星或上鱼提示，说明钓鱼流程在正常进行
+    frame = frame_bus.fetch(["jiashi", "star", "bite"], timeout=0.5, newer_than=clock.time())
+    state = game_state_classifier.classify(frame, ["jiashi", "star", "bite"])["state"]
+    if state is not None:
+        print(f"🪣  [检测] 画面显示 {state}，钓鱼流程正常，暂不判定为鱼桶满")
+        detector.reset()
+        return False
+    return True
 
-def get_session_fish_list():
-    """获取当前会话的钓鱼记录"""
-    with fish_record_lock:
-        return list(current_session_fish)
 
+def bucket_full_detection_thread():
+    """鱼桶满独立检测线程 - 修复版
+    检测完整钓鱼循环的时长，而不是抛竿间隔
+    """
+    global fish_bucket_full_detected, bucket_full_by_interval
 
-def get_all_fish_list():
-    """获取所有钓鱼记录"""
-    with fish_record_lock:
-        return list(all_fish_records)
+    detector = BucketFullIntervalDetector()
+
+    while True:
+        if not run_event.is_set():
+            # 脚本未运行时，重置检测状态
+            detector.reset()
+            with casting_interval_lock:
+                casting_timestamps.clear()
+            clock.sleep(0.5)
+            continue
+
+        try:
+            if check_bucket_full_interval(detector):
+                bucket_full_by_interval = True
+                fish_bucket_full_detected = True
+                handle_fish_bucket_full()
+
+            clock.sleep(0.5)  # 每0.5秒检查一次
+
+        except Exception as e:
+            print(f"⚠️  [警告] 鱼桶满检测线程出错: {e}")
+            clock.sleep(1)
+
+
+def get_session_fish_list():
+    """获取当前会话的钓鱼记录"""
+    with fish_record_lock:
+        return list(current_session_fish)
+
+
+def get_all_fish_list():
+    """获取所有钓鱼记录"""
+    with fish_record_lock:
+        return list(all_fish_records)
 
 
 def search_fish_records(keyword="", quality_filter="全部", use_session=True):
@@ -6546,16 +7528,23 @@ _cached_scale_x = None
 _cached_scale_y = None
 run_event = threading.Event()
 begin_event = threading.Event()
-user32 = ctypes.WinDLL("user32")
+try:
+    user32 = ctypes.WinDLL("user32")
+except (AttributeError, OSError):
+    # 非Windows平台（如在Linux上回放测试）没有user32
+    user32 = None
 listener = None  # 监听
 hotkey_name = "F2"  # 默认热键显示名称
 hotkey_modifiers = set()  # 修饰键集合 (ctrl, alt, shift)
-hotkey_main_key = keyboard.Key.f2  # 主按键对象
+hotkey_main_key = None  # 主按键对象（load_parameters() 中解析，默认 F2）
 
 # UNO功能热键
 uno_hotkey_name = "F3"  # 默认UNO热键显示名称
 uno_hotkey_modifiers = set()  # UNO热键修饰键集合
-uno_hotkey_main_key = keyboard.Key.f3  # UNO热键主按键对象
+uno_hotkey_main_key = None  # UNO热键主按键对象（load_parameters() 中解析，默认 F3）
+
+# 会话画面录制热键（启用录制后按下即保存最近画面）
+frame_recorder_hotkey_main_key = None  # load_parameters() 中解析，默认 F9
 # UNO卡计数变量
 global uno_input1_var, uno_input2_var  # 当前牌数和抽取牌数变量
 uno_input1_var = None
@@ -6576,6 +7565,9 @@ def get_current_screen_resolution():
     获取当前系统的屏幕分辨率
     返回: (width, height) 元组
     """
+    if user32 is None:
+        # 非Windows平台（回放测试）以目标分辨率为准
+        return TARGET_WIDTH, TARGET_HEIGHT
     try:
         # 尝试使用EnumDisplaySettings获取实际物理分辨率（不受DPI缩放影响）
         # 定义DEVMODE结构体
@@ -6647,58 +7639,73 @@ CURRENT_SCREEN_HEIGHT = TARGET_HEIGHT
 # 当前按下的修饰键状态
 current_modifiers = set()
 
-# 修饰键映射
-MODIFIER_KEYS = {
-    keyboard.Key.ctrl_l: "ctrl",
-    keyboard.Key.ctrl_r: "ctrl",
-    keyboard.Key.alt_l: "alt",
-    keyboard.Key.alt_r: "alt",
-    keyboard.Key.alt_gr: "alt",
-    keyboard.Key.shift_l: "shift",
-    keyboard.Key.shift_r: "shift",
+# 修饰键映射：pynput 按键名 -> 修饰键
+_MODIFIER_KEY_ATTRS = {
+    "ctrl_l": "ctrl",
+    "ctrl_r": "ctrl",
+    "alt_l": "alt",
+    "alt_r": "alt",
+    "alt_gr": "alt",
+    "shift_l": "shift",
+    "shift_r": "shift",
 }
 
-# 特殊键名称映射（用于显示和解析）
-SPECIAL_KEY_NAMES = {
-    keyboard.Key.f1: "F1",
-    keyboard.Key.f2: "F2",
-    keyboard.Key.f3: "F3",
-    keyboard.Key.f4: "F4",
-    keyboard.Key.f5: "F5",
-    keyboard.Key.f6: "F6",
-    keyboard.Key.f7: "F7",
-    keyboard.Key.f8: "F8",
-    keyboard.Key.f9: "F9",
-    keyboard.Key.f10: "F10",
-    keyboard.Key.f11: "F11",
-    keyboard.Key.f12: "F12",
-    keyboard.Key.space: "Space",
-    keyboard.Key.enter: "Enter",
-    keyboard.Key.tab: "Tab",
-    keyboard.Key.backspace: "Backspace",
-    keyboard.Key.delete: "Delete",
-    keyboard.Key.insert: "Insert",
-    keyboard.Key.home: "Home",
-    keyboard.Key.end: "End",
-    keyboard.Key.page_up: "PageUp",
-    keyboard.Key.page_down: "PageDown",
-    keyboard.Key.up: "↑",
-    keyboard.Key.down: "↓",
-    keyboard.Key.left: "←",
-    keyboard.Key.right: "→",
-    keyboard.Key.esc: "Esc",
-    keyboard.Key.pause: "Pause",
-    keyboard.Key.print_screen: "PrintScreen",
-    keyboard.Key.scroll_lock: "ScrollLock",
-    keyboard.Key.caps_lock: "CapsLock",
-    keyboard.Key.num_lock: "NumLock",
-    # 鼠标侧键支持
-    mouse.Button.x1: "Mouse4",  # 鼠标前进键
-    mouse.Button.x2: "Mouse5",  # 鼠标后退键
+# 特殊键名称映射（用于显示和解析）：pynput 按键名 -> 显示名称
+_SPECIAL_KEY_ATTRS = {
+    "f1": "F1",
+    "f2": "F2",
+    "f3": "F3",
+    "f4": "F4",
+    "f5": "F5",
+    "f6": "F6",
+    "f7": "F7",
+    "f8": "F8",
+    "f9": "F9",
+    "f10": "F10",
+    "f11": "F11",
+    "f12": "F12",
+    "space": "Space",
+    "enter": "Enter",
+    "tab": "Tab",
+    "backspace": "Backspace",
+    "delete": "Delete",
+    "insert": "Insert",
+    "home": "Home",
+    "end": "End",
+    "page_up": "PageUp",
+    "page_down": "PageDown",
+    "up": "↑",
+    "down": "↓",
+    "left": "←",
+    "right": "→",
+    "esc": "Esc",
+    "pause": "Pause",
+    "print_screen": "PrintScreen",
+    "scroll_lock": "ScrollLock",
+    "caps_lock": "CapsLock",
+    "num_lock": "NumLock",
 }
 
+# 按键对象 -> 名称的映射表，由 load_key_tables() 在首次使用热键时填充（此时才导入 pynput）
+MODIFIER_KEYS = {}
+SPECIAL_KEY_NAMES = {}
 # 反向映射：名称 -> 按键对象
-NAME_TO_KEY = {v: k for k, v in SPECIAL_KEY_NAMES.items()}
+NAME_TO_KEY = {}
+
+
+def load_key_tables():
+    """创建修饰键、特殊键的映射表（只创建一次）"""
+    if NAME_TO_KEY:
+        return
+    modifier_keys = {getattr(keyboard.Key, attr): name for attr, name in _MODIFIER_KEY_ATTRS.items()}
+    special_key_names = {getattr(keyboard.Key, attr): name for attr, name in _SPECIAL_KEY_ATTRS.items()}
+    # 鼠标侧键支持（只有Windows后端提供侧键，其他平台回放测试时跳过）
+    if hasattr(mouse.Button, "x1"):
+        special_key_names[mouse.Button.x1] = "Mouse4"  # 鼠标前进键
+        special_key_names[mouse.Button.x2] = "Mouse5"  # 鼠标后退键
+    MODIFIER_KEYS.update(modifier_keys)
+    SPECIAL_KEY_NAMES.update(special_key_names)
+    NAME_TO_KEY.update({v: k for k, v in special_key_names.items()})
 
 
 def parse_hotkey_string(hotkey_str):
@@ -6707,6 +7714,7 @@ def parse_hotkey_string(hotkey_str):
     例如: "Ctrl+Shift+A" -> ({'ctrl', 'shift'}, KeyCode(char='a'), 'A')
     支持鼠标侧键: "Mouse4" -> (set(), mouse.Button.x1, "Mouse4")
     """
+    load_key_tables()
     parts = [p.strip() for p in hotkey_str.split("+")]
     modifiers = set()
     main_key = None
@@ -6783,6 +7791,7 @@ def format_hotkey_display(modifiers, main_key_name):
 
 def key_to_name(key):
     """将按键对象转换为显示名称"""
+    load_key_tables()
     # 检查是否为鼠标按键
     if key in SPECIAL_KEY_NAMES:
         return SPECIAL_KEY_NAMES[key]
@@ -6829,9 +7838,682 @@ def scale_template(template, scale_x, scale_y):
     return cv2.resize(template, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
 
 
+# =========================
+# 模板仓库
+# =========================
+# 预编译模板包：所有灰度模板按常用分辨率预先缩放，连同均值和去均值后的范数保存在一个
+# 不压缩的 .npz 中，启动时直接内存映射，不再用PIL解码PNG。
+# 打包前用 `PartyFish.py --build-template-pack` 生成；包里没有的缩放比例（自定义分辨率）仍从PNG生成。
+# 包里记录生成时每个PNG的哈希，PNG修改过（与包里的哈希不同）的模板不使用包里的版本，改为从PNG生成
+TEMPLATE_PACK_FILE = "templates_pack.npz"
+TEMPLATE_PACK_VERSION = 2
+TEMPLATE_PACK_RESOLUTIONS = {
+    "1080P": (1920, 1080),
+    "2K": (2560, 1440),
+    "1440P带鱼屏": (3440, 1440),
+    "4K": (3840, 2160),
+}
+# 按统一缩放比例（SCALE_UNIFORM）缩放的模板；加时模板按屏幕宽度缩放，单独处理
+TEMPLATE_PACK_FILES = [f"{i}_grayscale.png" for i in range(10)] + [
+    "star_grayscale.png",
+    "F1_grayscale.png",
+    "F2_grayscale.png",
+    "shangyu_grayscale.png",
+    "tiao.png",
+    "tong_gray.png",
+]
+JIASHI_TEMPLATE_FILE = "chang_grayscale.png"
+
+
+def template_pack_keys(width, height):
+    """该分辨率下各检测器使用的模板缓存键 (文件名, 缩放比例, 插值方式)
+
+    与 load_* 函数的缩放方式一致：统一缩放比例为 高度/基准高度，加时模板横屏时按 宽度/基准宽度
+    """
+    scale = height / BASE_HEIGHT
+    jiashi_scale = width / BASE_WIDTH if width > height else height / BASE_HEIGHT
+    keys = [(filename, scale, cv2.INTER_LINEAR) for filename in TEMPLATE_PACK_FILES]
+    keys.append((JIASHI_TEMPLATE_FILE, jiashi_scale, cv2.INTER_AREA))
+    return keys
+
+
+def template_file_digest(path):
+    """模板PNG文件内容的哈希，文件不存在时返回None"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def template_moments(template):
+    """模板的均值和去均值后的L2范数（归一化相关匹配使用）"""
+    values = template.astype(np.float32)
+    mean = float(values.mean())
+    return mean, float(np.linalg.norm(values - mean))
+
+
+def _mmap_npz_member(path, name):
+    """内存映射不压缩 .npz 中的一个数组，压缩或格式不支持时返回None"""
+    import zipfile
+
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(path, "rb") as f:
+        # ZIP本地文件头固定30字节，之后是文件名和扩展字段
+        f.seek(info.header_offset + 26)
+        name_len = int.from_bytes(f.read(2), "little")
+        extra_len = int.from_bytes(f.read(2), "little")
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if fortran_order or dtype.hasobject:
+        return None
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+class TemplatePack:
+    """内存映射的预编译模板包，按 (文件名, 缩放比例, 插值方式) 查找模板和均值/范数
+
+    提供 folder 时检查每个PNG的哈希，PNG修改过的模板不放进索引（stale 中记录这些文件名）
+    """
+
+    def __init__(self, path, folder=None):
+        with np.load(path, allow_pickle=False) as pack:
+            if int(pack["version"]) != TEMPLATE_PACK_VERSION:
+                raise ValueError(f"模板包版本不匹配: {int(pack['version'])}")
+            names = [str(name) for name in pack["names"]]
+            scales = pack["scales"].tolist()
+            interps = pack["interps"].tolist()
+            offsets = pack["offsets"].tolist()
+            shapes = [tuple(shape) for shape in pack["shapes"].tolist()]
+            means = pack["means"].tolist()
+            norms = pack["norms"].tolist()
+            digests = dict(zip(pack["sources"].tolist(), pack["digests"].tolist()))
+            data = _mmap_npz_member(path, "data")
+            if data is None:
+                data = pack["data"]
+        self.path = path
+        self.stale = set()
+        if folder is not None:
+            for name, digest in digests.items():
+                current = template_file_digest(os.path.join(folder, name))
+                # PNG不存在时只能使用包里的版本
+                if current is not None and current != digest:
+                    self.stale.add(name)
+        self.index = {}
+        self.moments_by_id = {}  # id(模板) -> (均值, 范数)，模板由 index 持有，id 不会被复用
+        for name, scale, interp, offset, shape, mean, norm in zip(
+            names, scales, interps, offsets, shapes, means, norms
+        ):
+            if name in self.stale:
+                continue
+            size = shape[0] * shape[1]
+            template = data[offset : offset + size].reshape(shape)
+            self.index[(name, round(scale, 6), interp)] = (template, (mean, norm))
+            self.moments_by_id[id(template)] = (mean, norm)
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key):
+        """返回 (模板, (均值, 范数))，包里没有时返回None"""
+        return self.index.get(key)
+
+
+def build_template_pack(path=None, resolutions=None):
+    """生成预编译模板包，返回写入的模板数量
+
+    包含每个模板的原始尺寸（2K基准）和 TEMPLATE_PACK_RESOLUTIONS 中各分辨率使用的缩放版本
+    """
+    path = path or os.path.join(template_folder_path, TEMPLATE_PACK_FILE)
+    resolutions = resolutions or TEMPLATE_PACK_RESOLUTIONS
+    # 只从PNG生成，不读取旧的模板包
+    store = TemplateStore(template_folder_path, use_pack=False)
+    keys = [(f, 1.0, cv2.INTER_LINEAR) for f in TEMPLATE_PACK_FILES + [JIASHI_TEMPLATE_FILE]]
+    for width, height in resolutions.values():
+        keys.extend(template_pack_keys(width, height))
+
+    entries = {}
+    for filename, scale, interp in keys:
+        key = (filename, round(scale, 6), interp)
+        if key not in entries:
+            entries[key] = np.ascontiguousarray(store.get(filename, scale, interp), dtype=np.uint8)
+
+    offsets, shapes, means, norms = [], [], [], []
+    offset = 0
+    for template in entries.values():
+        offsets.append(offset)
+        shapes.append(template.shape[:2])
+        mean, norm = template_moments(template)
+        means.append(mean)
+        norms.append(norm)
+        offset += template.size
+    data = np.concatenate([template.ravel() for template in entries.values()])
+    sources = sorted({key[0] for key in entries})
+    digests = [template_file_digest(os.path.join(template_folder_path, name)) for name in sources]
+
+    tmp_path = path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        version=np.int32(TEMPLATE_PACK_VERSION),
+        names=np.array([key[0] for key in entries]),
+        scales=np.array([key[1] for key in entries], dtype=np.float64),
+        interps=np.array([key[2] for key in entries], dtype=np.int32),
+        offsets=np.array(offsets, dtype=np.int64),
+        shapes=np.array(shapes, dtype=np.int32),
+        means=np.array(means, dtype=np.float32),
+        norms=np.array(norms, dtype=np.float32),
+        sources=np.array(sources),
+        digests=np.array(digests),
+        data=data,
+    )
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class TemplateStore:
+    """模板仓库：每个模板文件只解码一次，缩放后的版本按 (文件名, 缩放比例, 插值方式)
+    保存在LRU缓存中，所有检测器共用。切换回用过的分辨率时不再读盘和缩放
+
+    有预编译模板包时优先从包里取（内存映射，不解码PNG），包里没有的缩放比例才从PNG生成
+    """
+
+    def __init__(self, folder, max_scaled=96, use_pack=True):
+        self.folder = folder
+        self.max_scaled = max_scaled
+        self.use_pack = use_pack
+        self._pack = None
+        self._pack_loaded = False
+        self._originals = {}
+        self._scaled = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+        self.pack_loads = 0
+        self.evictions = 0
+
+    @property
+    def pack(self):
+        """预编译模板包，第一次访问时加载，没有或损坏时为None"""
+        if not self._pack_loaded:
+            self._pack_loaded = True
+            path = os.path.join(self.folder, TEMPLATE_PACK_FILE)
+            if self.use_pack and os.path.exists(path):
+                try:
+                    self._pack = TemplatePack(path, self.folder)
+                except Exception as e:
+                    print(f"⚠️  [模板] 模板包加载失败，使用PNG模板: {e}")
+                if self._pack is not None and self._pack.stale:
+                    print(
+                        f"⚠️  [模板] 模板包生成后这些PNG已修改，改用PNG: {', '.join(sorted(self._pack.stale))}"
+                        "（重新运行 --build-template-pack 更新模板包）"
+                    )
+        return self._pack
+
+    def _from_pack(self, key):
+        entry = self.pack.get(key) if self.pack is not None else None
+        if entry is None:
+            return None
+        template, _ = entry
+        with self._lock:
+            self.pack_loads += 1
+        return template
+
+    def original(self, filename):
+        """未缩放的原始灰度模板（2560×1440基准尺寸）"""
+        with self._lock:
+            template = self._originals.get(filename)
+        if template is None:
+            template = self._from_pack((filename, 1.0, cv2.INTER_LINEAR))
+        if template is None:
+            img = Image.open(os.path.join(self.folder, filename))
+            # 无论原图是什么格式，都转换为灰度图像
+            if img.mode != "L":
+                img = img.convert("L")
+            template = np.array(img)
+            with self._lock:
+                self.decodes += 1
+        with self._lock:
+            template = self._originals.setdefault(filename, template)
+        return template
+
+    def get(self, filename, scale=None, interpolation=cv2.INTER_LINEAR):
+        """按缩放比例取模板，scale 为 None 时使用 SCALE_UNIFORM"""
+        if scale is None:
+            scale = SCALE_UNIFORM
+        key = (filename, round(scale, 6), interpolation)
+        with self._lock:
+            template = self._scaled.get(key)
+            if template is not None:
+                self._scaled.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+        template = self._from_pack(key)
+        if template is None:
+            template = self.original(filename)
+            if scale != 1.0:
+                h, w = template.shape[:2]
+                size = (max(1, int(w * scale)), max(1, int(h * scale)))
+                template = cv2.resize(template, size, interpolation=interpolation)
+        with self._lock:
+            self._scaled[key] = template
+            self._scaled.move_to_end(key)
+            while len(self._scaled) > self.max_scaled:
+                self._scaled.popitem(last=False)
+                self.evictions += 1
+        return template
+
+    def moments_of(self, template):
+        """模板包中预先计算的 (均值, 去均值后的L2范数)，模板不是从包里取出的时返回None"""
+        pack = self._pack
+        return None if pack is None else pack.moments_by_id.get(id(template))
+
+    def clear(self):
+        with self._lock:
+            self._originals.clear()
+            self._scaled.clear()
+            self._pack = None
+            self._pack_loaded = False
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "decodes": self.decodes,
+                "pack_loads": self.pack_loads,
+                "evictions": self.evictions,
+                "cached": len(self._scaled),
+            }
+
+
+def print_template_store_stats():
+    """打印模板仓库的命中率和读盘次数"""
+    stats = template_store.get_stats()
+    if stats["hits"] or stats["misses"]:
+        print(
+            f"📊 [统计] 模板缓存: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次"
+            f"（命中率 {stats['hit_rate'] * 100:.1f}%），模板包 {stats['pack_loads']} 个，"
+            f"解码PNG {stats['decodes']} 次，"
+            f"缓存 {stats['cached']} 个缩放版本"
+        )
+
+
+template_store = TemplateStore(template_folder_path)
+
+
+# =========================
+# 小区域归一化相关匹配引擎
+# =========================
+# 指示器区域很小（2K下F1/F2区域10×19、上鱼提示17×21，与模板同尺寸），cv2.matchTemplate
+# 每次调用都要重新计算模板的均值和范数并走一遍通用流程，调用开销远大于实际计算量。
+# 模板去均值、归一化后预先堆成矩阵（每个模板、每种缩放只算一次），区域中每个位置的
+# 像素和与平方和由积分图得到，多个同尺寸模板一次矩阵乘法得到所有位置的匹配度。
+# 可放置位置较多的大区域（加时、UNO条）仍使用 cv2 的DFT实现。
+# 位置数少也不一定更快（1080P下上鱼提示区域25×25、模板25×23，引擎只有 cv2 的0.8倍），
+# 所以每种区域/模板尺寸第一次匹配时两种实现各实测几轮，引擎明显更快才使用
+NCC_ENGINE_ENABLED = True
+NCC_ENGINE_MAX_POSITIONS = 16  # 区域内模板可放置的位置数不超过该值时才考虑匹配引擎
+NCC_ENGINE_MIN_SPEEDUP = 1.1  # 实测匹配引擎比 cv2.matchTemplate 快这么多倍才使用
+NCC_ENGINE_CALIBRATION_ROUNDS = 5  # 实测轮数，每种实现取最快一轮
+NCC_ENGINE_CALIBRATION_CALLS = 10  # 每轮调用次数
+NCC_MATCHER_CACHE_SIZE = 64  # 缓存的模板矩阵个数
+
+
+class NccMatcher:
+    """一组同尺寸模板的归一化相关匹配，结果与 cv2.TM_CCOEFF_NORMED 相同"""
+
+    def __init__(self, templates):
+        shapes = {template.shape[:2] for template in templates}
+        if len(shapes) != 1:
+            raise ValueError(f"模板尺寸不一致: {sorted(shapes)}")
+        self.templates = tuple(templates)
+        self.template_shape = shapes.pop()
+        columns = []
+        for template in templates:
+            # 模板包里的模板直接使用预先计算的均值和范数
+            mean, norm = template_store.moments_of(template) or template_moments(template)
+            values = template.astype(np.float32).ravel() - mean
+            columns.append(values / norm if norm > 0 else values)
+        # 形状 (模板像素数, 模板个数)
+        self.matrix = np.ascontiguousarray(np.stack(columns, axis=1))
+
+    def scores(self, region):
+        """区域中每个位置对每个模板的匹配度，形状 (位置数, 模板个数)；纯色位置记为0"""
+        t_h, t_w = self.template_shape
+        h, w = region.shape[:2]
+        count = t_h * t_w
+        if h == t_h and w == t_w:
+            # 区域与模板同尺寸：只有一个位置，不需要积分图
+            values = region.astype(np.float32).ravel()
+            total = values.sum()
+            variance = values.dot(values) - total * total / count
+            if variance < 1e-6:
+                return np.zeros((1, self.matrix.shape[1]), dtype=np.float32)
+            return (values @ self.matrix)[None, :] / np.sqrt(variance)
+        sums, squares = cv2.integral2(region, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        total = sums[t_h:, t_w:] - sums[:-t_h, t_w:] - sums[t_h:, :-t_w] + sums[:-t_h, :-t_w]
+        square = (
+            squares[t_h:, t_w:] - squares[:-t_h, t_w:] - squares[t_h:, :-t_w] + squares[:-t_h, :-t_w]
+        )
+        variance = (square - total * total / count).ravel()
+        variance[variance < 1e-6] = np.inf
+        # as_strided 比 sliding_window_view 的调用开销小得多
+        windows = np.lib.stride_tricks.as_strided(
+            region, (h - t_h + 1, w - t_w + 1, t_h, t_w), region.strides * 2, writeable=False
+        )
+        values = windows.reshape(-1, count).astype(np.float32)
+        return (values @ self.matrix) / np.sqrt(variance).astype(np.float32)[:, None]
+
+    def match(self, region):
+        """每个模板的 (最大匹配度, 位置 (x, y))"""
+        scores = self.scores(region)
+        if len(scores) == 1:
+            return [(float(score), (0, 0)) for score in scores[0]]
+        out_w = region.shape[1] - self.template_shape[1] + 1
+        best = np.argmax(scores, axis=0)
+        return [
+            (float(scores[index, column]), tuple(reversed(divmod(int(index), out_w))))
+            for column, index in enumerate(best)
+        ]
+
+
+_ncc_matchers = {}
+_ncc_matchers_lock = threading.Lock()
+
+
+def get_ncc_matcher(*templates):
+    """返回模板对应的匹配引擎（按模板对象缓存，模板重新加载后自动重建）"""
+    key = tuple(map(id, templates))
+    with _ncc_matchers_lock:
+        matcher = _ncc_matchers.get(key)
+    if matcher is None or any(a is not b for a, b in zip(matcher.templates, templates)):
+        matcher = NccMatcher(templates)
+        with _ncc_matchers_lock:
+            if len(_ncc_matchers) >= NCC_MATCHER_CACHE_SIZE:
+                _ncc_matchers.clear()
+            _ncc_matchers[key] = matcher
+    return matcher
+
+
+def _opencv_match_max(region_gray, template):
+    _, max_val, _, max_loc = cv2.minMaxLoc(
+        cv2.matchTemplate(region_gray, template, cv2.TM_CCOEFF_NORMED)
+    )
+    return max_val, max_loc
+
+
+def _engine_match_max(region_gray, template):
+    return get_ncc_matcher(template).match(region_gray)[0]
+
+
+# (区域尺寸, 模板尺寸) -> 实测的匹配引擎加速比（cv2 耗时 / 引擎耗时）
+_ncc_engine_speedups = {}
+
+
+def measure_ncc_engine_speedup(region_gray, template):
+    """用这块区域实测匹配引擎相对 cv2.matchTemplate 的加速比，每轮取平均、多轮取最快"""
+    timings = []
+    for func in (_opencv_match_max, _engine_match_max):
+        func(region_gray, template)
+        best = float("inf")
+        for _ in range(NCC_ENGINE_CALIBRATION_ROUNDS):
+            start = time.perf_counter()
+            for _ in range(NCC_ENGINE_CALIBRATION_CALLS):
+                func(region_gray, template)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    return timings[0] / timings[1] if timings[1] > 0 else float("inf")
+
+
+def ncc_engine_speedup(region_gray, template):
+    """该区域/模板尺寸下匹配引擎的加速比；位置数超过 NCC_ENGINE_MAX_POSITIONS 时不实测，返回 None"""
+    h, w = region_gray.shape[:2]
+    t_h, t_w = template.shape[:2]
+    if (h - t_h + 1) * (w - t_w + 1) > NCC_ENGINE_MAX_POSITIONS:
+        return None
+    key = ((h, w), (t_h, t_w))
+    speedup = _ncc_engine_speedups.get(key)
+    if speedup is None:
+        speedup = _ncc_engine_speedups[key] = measure_ncc_engine_speedup(region_gray, template)
+    return speedup
+
+
+def ncc_match_max(region_gray, template):
+    """区域与模板的 (最大匹配度, 位置)，区域比模板小时返回 (None, None)
+
+    该尺寸下实测匹配引擎比 cv2.matchTemplate 快 NCC_ENGINE_MIN_SPEEDUP 倍以上时使用匹配引擎，
+    否则使用 cv2.matchTemplate
+    """
+    h, w = region_gray.shape[:2]
+    t_h, t_w = template.shape[:2]
+    if h < t_h or w < t_w:
+        return None, None
+    if NCC_ENGINE_ENABLED:
+        speedup = ncc_engine_speedup(region_gray, template)
+        if speedup is not None and speedup >= NCC_ENGINE_MIN_SPEEDUP:
+            return _engine_match_max(region_gray, template)
+    return _opencv_match_max(region_gray, template)
+
+
+# =========================
+# 基准分辨率匹配（缩小区域而不是放大模板）
+# =========================
+# 缩放比例大于1（高于2K）时，把截取的区域用 INTER_AREA 缩小到 2560×1440 基准尺寸，
+# 再与未缩放的原始模板匹配，每次匹配的计算量与分辨率无关。
+# 缩放比例不大于1、未提供原始模板或缩小后区域放不下模板时，仍使用原区域与缩放后的模板匹配。
+# 只对可放置位置很多的大区域划算：小区域（星星、F1/F2、上鱼提示、加时）缩小区域的开销
+# 比匹配本身还大（--benchmark-match，4K下加时 19µs → 38µs），只有UNO条（4K下 3.1ms → 1.5ms）开启
+MATCH_AT_BASE_RESOLUTION = True
+MATCH_AT_BASE_RESOLUTION_INDICATORS = frozenset({"uno_recognize_tiao"})
+BASE_MATCH_SIZE_TOLERANCE = 1  # 缩小后的区域比模板小不超过该像素数时，直接缩放到模板大小
+
+def load_base_template(filename):
+    """未缩放的原始灰度模板（2560×1440基准尺寸），由模板仓库缓存"""
+    return template_store.original(filename)
+
+
+def downscale_to_base(region_gray, base_template):
+    """把区域缩小到基准尺寸，缩小后放不下原始模板时返回None"""
+    scale = SCALE_UNIFORM
+    h, w = region_gray.shape[:2]
+    t_h, t_w = base_template.shape[:2]
+    size_w, size_h = round(w / scale), round(h / scale)
+    if size_w < t_w - BASE_MATCH_SIZE_TOLERANCE or size_h < t_h - BASE_MATCH_SIZE_TOLERANCE:
+        return None
+    size = (max(size_w, t_w), max(size_h, t_h))
+    return cv2.resize(region_gray, size, interpolation=cv2.INTER_AREA)
+
+
+def match_template_max(
+    region_gray, template, base_template=None, at_base=None, track=None, threshold=None
+):
+    """区域与模板的最大匹配度（TM_CCOEFF_NORMED），区域比模板小时返回None
+
+    Args:
+        region_gray: 截取的灰度区域（当前分辨率）
+        template: 按 SCALE_UNIFORM 缩放后的模板
+        base_template: 未缩放的原始模板，提供时可以在基准分辨率下匹配
+        at_base: 是否在基准分辨率下匹配，None 表示按指示器决定（track 在 MATCH_AT_BASE_RESOLUTION_INDICATORS 中）
+        track: 指示器名称，提供时先在上次匹配位置附近的小窗口里匹配（见 RoiTracker）
+        threshold: 调用方的判断阈值，位置跟踪的结果低于该值时搜索整个区域
+    """
+    if at_base is None:
+        at_base = MATCH_AT_BASE_RESOLUTION and track in MATCH_AT_BASE_RESOLUTION_INDICATORS
+    if at_base and base_template is not None and SCALE_UNIFORM > 1.0:
+        small = downscale_to_base(region_gray, base_template)
+        if small is not None:
+            region_gray, template = small, base_template
+    h, w = region_gray.shape[:2]
+    t_h, t_w = template.shape[:2]
+    if h < t_h or w < t_w:
+        return None
+    if (
+        track is not None
+        and ROI_TRACKING_ENABLED
+        and (h - t_h + 1) * (w - t_w + 1) >= ROI_TRACKING_MIN_POSITIONS
+    ):
+        return roi_tracker.match(track, region_gray, template, threshold)
+    return ncc_match_max(region_gray, template)[0]
+
+
+# =========================
+# 区域内匹配位置跟踪
+# =========================
+# 指示器每次出现的位置基本不变：记住每个模板上次匹配成功的位置，
+# 1. 先只在上次的位置直接计算一次归一化相关系数（一次点积），匹配度太低说明指示器不在附近，直接跳到第3步；
+# 2. 从该位置出发，逐个计算上下左右相邻位置的匹配度并向更高处移动（不超出 ROI_TRACKING_PADDING 像素），
+#    得到的局部最大值超过阈值时返回该值并更新位置。位置没变时只多算四次点积；
+# 3. 仍不超过阈值时再搜索整个区域，搜索不到时忘掉上次位置，指示器不在画面上时下一帧直接搜索整个区域。
+# 只对可放置位置多、整区域搜索要走 cv2.matchTemplate 的大区域（UNO条）跟踪：星星、F1/F2、上鱼提示、加时
+# 的区域和模板几乎一样大，匹配引擎一次就能算完所有位置，先算上次位置只会多出开销
+ROI_TRACKING_ENABLED = True
+ROI_TRACKING_MIN_POSITIONS = NCC_ENGINE_MAX_POSITIONS + 1  # 可放置位置少于该值的区域不跟踪
+ROI_TRACKING_PADDING = 2
+ROI_TRACKING_THRESHOLD = 0.8
+ROI_TRACKING_WINDOW_MIN_SCORE = 0.4  # 上次位置的匹配度低于该值视为指示器不在画面上，不搜索小窗口
+
+
+class RoiTracker:
+    """按 (指示器, 区域尺寸, 模板尺寸) 记录上次匹配位置，统计命中率"""
+
+    def __init__(
+        self,
+        padding=ROI_TRACKING_PADDING,
+        threshold=ROI_TRACKING_THRESHOLD,
+        window_min_score=ROI_TRACKING_WINDOW_MIN_SCORE,
+    ):
+        self.padding = padding
+        self.threshold = threshold
+        self.window_min_score = window_min_score
+        self._lock = threading.Lock()
+        self._last_loc = {}
+        self.stats = {}
+
+    def _stats_for(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = {"exact_hits": 0, "window_hits": 0, "misses": 0, "full": 0}
+            self.stats[name] = stats
+        return stats
+
+    def _count(self, name, field):
+        with self._lock:
+            self._stats_for(name)[field] += 1
+
+    def _score_at(self, region_gray, template, loc):
+        """模板放在 loc 处的归一化相关系数（匹配引擎的单位置计算，不经过 matchTemplate）"""
+        t_h, t_w = template.shape[:2]
+        x, y = loc
+        patch = region_gray[y : y + t_h, x : x + t_w]
+        return float(get_ncc_matcher(template).scores(patch)[0, 0])
+
+    def _refine(self, region_gray, template, loc, score):
+        """从 loc 出发向上下左右匹配度更高的位置移动，直到四周都不更高（不超出 padding 范围）
+
+        Returns:
+            tuple: (局部最大匹配度, 位置)
+        """
+        h, w = region_gray.shape[:2]
+        t_h, t_w = template.shape[:2]
+        p = self.padding
+        x_min, y_min = max(0, loc[0] - p), max(0, loc[1] - p)
+        x_max, y_max = min(w - t_w, loc[0] + p), min(h - t_h, loc[1] + p)
+        scores = {loc: score}
+        current = loc
+        while True:
+            best = current
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                x, y = current[0] + dx, current[1] + dy
+                if not (x_min <= x <= x_max and y_min <= y <= y_max):
+                    continue
+                if (x, y) not in scores:
+                    scores[(x, y)] = self._score_at(region_gray, template, (x, y))
+                if scores[(x, y)] > scores[best]:
+                    best = (x, y)
+            if best == current:
+                return scores[current], current
+            current = best
+
+    def match(self, name, region_gray, template, threshold=None):
+        """返回匹配度；上次位置附近的局部最大匹配度超过阈值时直接返回，不搜索整个区域
+
+        上次位置只用来判断指示器是否还在附近，返回的是从上次位置出发找到的局部最大值，并记住它的位置
+        （指示器偏移1像素时上次位置的匹配度会明显低于实际最大值）。
+        threshold 为调用方判断指示器是否出现的阈值（校准后的阈值），None 时使用 ROI_TRACKING_THRESHOLD：
+        局部最大值低于调用方阈值时继续搜索整个区域，不会因为跟踪到旧位置而漏判
+        """
+        threshold = self.threshold if threshold is None else threshold
+        h, w = region_gray.shape[:2]
+        t_h, t_w = template.shape[:2]
+        key = (name, (h, w), (t_h, t_w))
+        with self._lock:
+            loc = self._last_loc.get(key)
+        if loc is not None:
+            score = self._score_at(region_gray, template, loc)
+            if score >= self.window_min_score:
+                max_val, max_loc = self._refine(region_gray, template, loc, score)
+                if max_val > threshold:
+                    self._count(name, "exact_hits" if max_loc == loc else "window_hits")
+                    with self._lock:
+                        self._last_loc[key] = max_loc
+                    return max_val
+            self._count(name, "misses")
+        max_val, max_loc = ncc_match_max(region_gray, template)
+        self._count(name, "full")
+        with self._lock:
+            if max_val > threshold:
+                self._last_loc[key] = max_loc
+            else:
+                # 指示器不在画面上：下一帧不再先算旧位置
+                self._last_loc.pop(key, None)
+        return max_val
+
+    def reset(self):
+        with self._lock:
+            self._last_loc.clear()
+            self.stats.clear()
+
+    def get_stats(self):
+        """每个指示器在上次位置/附近窗口命中的次数、命中率和整区域搜索次数"""
+        with self._lock:
+            result = {}
+            for name, stats in self.stats.items():
+                hits = stats["exact_hits"] + stats["window_hits"]
+                tried = hits + stats["misses"]
+                result[name] = dict(stats, hits=hits, tried=tried, hit_rate=hits / tried if tried else 0.0)
+            return result
+
+
+roi_tracker = RoiTracker()
+
+
+def print_roi_tracker_stats():
+    """打印各指示器匹配位置跟踪的命中率"""
+    stats = roi_tracker.get_stats()
+    if not stats:
+        return
+    summary = "，".join(
+        f"{name} 命中 {s['hits']}/{s['tried']}（{s['hit_rate'] * 100:.0f}%），整区域 {s['full']} 次"
+        for name, s in stats.items()
+    )
+    print(f"📊 [统计] 匹配位置跟踪: {summary}")
+
+
 def reload_templates_if_scale_changed():
     """如果缩放比例变化，重新加载所有模板"""
-    global templates, star_template, f1, f2, shangyule, jiashi
+    global templates, star_template, f1, f2, shangyule, jiashi, tiao_template
     global _cached_scale_x, _cached_scale_y
 
     # 只有当缓存的缩放比例存在且发生变化时，才重新加载模板
@@ -6845,59 +8527,22 @@ def reload_templates_if_scale_changed():
             f"🔄 [模板] 分辨率变化，重新加载模板 (缩放: X={SCALE_X:.2f}, Y={SCALE_Y:.2f})"
         )
 
-        # 重新加载所有模板（强制重新加载）
+        # 重新加载所有模板（缩放后的模板由模板仓库缓存，用过的分辨率不再读盘和缩放）
         try:
-            # 使用统一缩放比例避免模板变形
-            scale = SCALE_UNIFORM
-
-            # 数字模板
-            templates = []
-            for i in range(10):
-                template_path = os.path.join(template_folder_path, f"{i}_grayscale.png")
-                img = Image.open(template_path)
-                template = np.array(img)
-                template = scale_template(template, scale, scale)
-                templates.append(template)
-
-            # 星星模板
-            star_template_path = os.path.join(
-                template_folder_path, "star_grayscale.png"
-            )
-            img = Image.open(star_template_path)
-            star_template = scale_template(np.array(img), scale, scale)
-
-            # F1模板
-            f1_path = os.path.join(template_folder_path, "F1_grayscale.png")
-            img = Image.open(f1_path)
-            f1 = scale_template(np.array(img), scale, scale)
-
-            # F2模板
-            f2_path = os.path.join(template_folder_path, "F2_grayscale.png")
-            img = Image.open(f2_path)
-            f2 = scale_template(np.array(img), scale, scale)
-
-            # 上鱼模板
-            shangyule_path = os.path.join(template_folder_path, "shangyu_grayscale.png")
-            img = Image.open(shangyule_path)
-            shangyule = scale_template(np.array(img), scale, scale)
-
-            # 加时模板
-            jiashi_path = os.path.join(template_folder_path, "chang_grayscale.png")
-            img = Image.open(jiashi_path)
-            jiashi = scale_template(np.array(img), scale, scale)
-
-            # UNO条模板
-            try:
-                tiao_path = os.path.join(template_folder_path, "tiao_gray.png")
-                img = Image.open(tiao_path)
-                tiao_template = scale_template(np.array(img), scale, scale)
-            except Exception as e:
-                print(f"⚠️ [模板] 加载UNO条模板失败: {e}")
-                tiao_template = None
+            templates = None
+            star_template = f1 = f2 = shangyule = jiashi = tiao_template = None
+            load_templates()
+            load_star_template()
+            load_f1()
+            load_f2()
+            load_shangyule()
+            load_jiashi()
+            load_tiao_template()
 
             print(
-                f"✅ [模板] 所有模板重新加载完成，共 {len(templates)} 个数字模板 (统一缩放: {scale:.2f})"
+                f"✅ [模板] 所有模板重新加载完成，共 {len(templates)} 个数字模板 (统一缩放: {SCALE_UNIFORM:.2f})"
             )
+            print_template_store_stats()
         except Exception as e:
             print(f"❌ [错误] 重新加载模板失败: {e}")
     elif _cached_scale_x is None and _cached_scale_y is None:
@@ -6908,100 +8553,381 @@ def reload_templates_if_scale_changed():
 
 # 加载模板（0.png到9.png）
 def load_templates():
-    global templates, template_folder_path
+    global templates
     if templates is None:
-        templates = []
-        scale = SCALE_UNIFORM  # 使用统一缩放比例
-        for i in range(10):
-            template_path = os.path.join(template_folder_path, f"{i}_grayscale.png")
-            img = Image.open(template_path)
-            template = np.array(img)
-            # 根据当前缩放比例缩放模板
-            template = scale_template(template, scale, scale)
-            templates.append(template)
+        # 根据当前缩放比例缩放模板（使用统一缩放比例）
+        templates = [template_store.get(f"{i}_grayscale.png") for i in range(10)]
     return templates
 
 
 # 加载模板
 def load_star_template():
-    global star_template, template_folder_path
+    global star_template
     if star_template is None:
-        star_template_path = os.path.join(template_folder_path, "star_grayscale.png")
-        img = Image.open(star_template_path)
-        template = np.array(img)
-        scale = SCALE_UNIFORM  # 使用统一缩放比例
-        star_template = scale_template(template, scale, scale)
+        star_template = template_store.get("star_grayscale.png")
     return star_template
 
 
 def load_f1():
     global f1
     if f1 is None:
-        f1_path = os.path.join(template_folder_path, "F1_grayscale.png")
-        img = Image.open(f1_path)
-        template = np.array(img)
-        scale = SCALE_UNIFORM
-        f1 = scale_template(template, scale, scale)
+        f1 = template_store.get("F1_grayscale.png")
     return f1
 
 
 def load_f2():
     global f2
     if f2 is None:
-        f2_path = os.path.join(template_folder_path, "F2_grayscale.png")
-        img = Image.open(f2_path)
-        template = np.array(img)
-        scale = SCALE_UNIFORM
-        f2 = scale_template(template, scale, scale)
+        f2 = template_store.get("F2_grayscale.png")
     return f2
 
 
 def load_shangyule():
     global shangyule
-    shangyule_path = os.path.join(template_folder_path, "shangyu_grayscale.png")
-    img = Image.open(shangyule_path)
-    template = np.array(img)
-    scale = SCALE_UNIFORM
-    shangyule = scale_template(template, scale, scale)
+    shangyule = template_store.get("shangyu_grayscale.png")
     return shangyule
 
 
-def load_jiashi():
-    global jiashi
-    jiashi_path = os.path.join(template_folder_path, "chang_grayscale.png")
-    
-
-    
-    img = Image.open(jiashi_path)
-    template = np.array(img)
-    
-    # 改进模板缩放方法，确保模板正确缩放
-    # 根据当前分辨率获取正确的缩放比例
+def get_jiashi_template_scale():
+    """加时模板的缩放比例：与加时识别区域一样按屏幕分辨率计算（横屏按宽度）"""
     screen_width, screen_height = get_current_screen_resolution()
     if screen_width > screen_height:
-        scale = screen_width / BASE_WIDTH
-    else:
-        scale = screen_height / BASE_HEIGHT
-    
-    # 使用更精确的缩放方法
-    scaled_w = int(template.shape[1] * scale)
-    scaled_h = int(template.shape[0] * scale)
-    jiashi = cv2.resize(template, (scaled_w, scaled_h), interpolation=cv2.INTER_AREA)
-    
+        return screen_width / BASE_WIDTH
+    return screen_height / BASE_HEIGHT
+
+
+def load_jiashi():
+    global jiashi
+    # 加时模板使用 INTER_AREA 缩放
+    jiashi = template_store.get(
+        "chang_grayscale.png", get_jiashi_template_scale(), cv2.INTER_AREA
+    )
     return jiashi
 
 
 # =========================
-# 鼠标操作（使用 win32api 实现）
+# 鼠标键盘输入
 # =========================
+# 所有鼠标键盘操作都通过 input_backend 执行：
+# - Win32InputBackend：Windows 上使用 SendInput，batched() 中的操作合并为一次 SendInput 调用
+# - PynputInputBackend：使用 pynput 控制器（非Windows平台）
+# - RecordingInputBackend：不操作真实设备，只按时钟记录事件（模拟器和测试使用）
+# 按键参数使用 pynput 的 keyboard.Key / keyboard.KeyCode，鼠标按键为 "left"/"right"/"middle"
+class InputBackend:
+    """鼠标键盘输入接口，统计每次调用的耗时"""
+
+    name = "base"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._batch_state = threading.local()  # 每个线程各自的批量缓存
+        self.event_count = 0
+        self.call_count = 0
+        self.call_time_total = 0.0
+
+    # ---------- 由子类实现 ----------
+    def _send(self, events):
+        """发送事件列表，事件为 ("button", 按键, 是否按下) / ("move", x, y) / ("key", 按键, 是否按下)"""
+        raise NotImplementedError
+
+    def position(self):
+        raise NotImplementedError
+
+    # ---------- 公共接口 ----------
+    def _dispatch(self, events):
+        pending = getattr(self._batch_state, "events", None)
+        if pending is not None:
+            pending.extend(events)
+            return
+        start = time.perf_counter()
+        self._send(events)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.call_count += 1
+            self.event_count += len(events)
+            self.call_time_total += elapsed
+
+    def mouse_down(self, button="left"):
+        self._dispatch([("button", button, True)])
+
+    def mouse_up(self, button="left"):
+        self._dispatch([("button", button, False)])
+
+    def click(self, button="left", count=1):
+        events = []
+        for _ in range(count):
+            events += [("button", button, True), ("button", button, False)]
+        self._dispatch(events)
+
+    def move(self, x, y):
+        self._dispatch([("move", int(x), int(y))])
+
+    def key_down(self, key):
+        self._dispatch([("key", key, True)])
+
+    def key_up(self, key):
+        self._dispatch([("key", key, False)])
+
+    def tap(self, key):
+        self._dispatch([("key", key, True), ("key", key, False)])
+
+    def batched(self):
+        """在 with 块中的操作先缓存，退出时一次性发送（中间不能有等待）"""
+        backend = self
+
+        class _Batch:
+            def __enter__(self):
+                backend._batch_state.events = []
+                return backend
+
+            def __exit__(self, exc_type, exc, tb):
+                events = backend._batch_state.events
+                backend._batch_state.events = None
+                if exc_type is None and events:
+                    backend._dispatch(events)
+                return False
+
+        return _Batch()
+
+    def get_stats(self):
+        """返回调用次数、事件数和平均每次调用耗时"""
+        with self._stats_lock:
+            calls = self.call_count
+            return {
+                "backend": self.name,
+                "calls": calls,
+                "events": self.event_count,
+                "avg_call_us": round(self.call_time_total / calls * 1e6, 1) if calls else 0.0,
+            }
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", ctypes.c_long),
+        ("dy", ctypes.c_long),
+        ("mouseData", ctypes.c_ulong),
+        ("dwFlags", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ("wVk", ctypes.c_ushort),
+        ("wScan", ctypes.c_ushort),
+        ("dwFlags", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class _HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [
+        ("uMsg", ctypes.c_ulong),
+        ("wParamL", ctypes.c_ushort),
+        ("wParamH", ctypes.c_ushort),
+    ]
+
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [("mi", _MOUSEINPUT), ("ki", _KEYBDINPUT), ("hi", _HARDWAREINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("union", _INPUTUNION)]
+
+
+class _POINT(ctypes.Structure):
+    _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
+
+
+class Win32InputBackend(InputBackend):
+    """Windows SendInput 输入"""
+
+    name = "win32"
+    INPUT_MOUSE = 0
+    INPUT_KEYBOARD = 1
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    KEYEVENTF_EXTENDEDKEY = 0x0001
+    KEYEVENTF_KEYUP = 0x0002
+    MAPVK_VK_TO_VSC = 0
+    # 扩展键（方向键、Insert/Delete/Home/End/PageUp/PageDown、右Ctrl/Alt、Win 等）需要 KEYEVENTF_EXTENDEDKEY
+    EXTENDED_VKS = frozenset(
+        (0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2C, 0x2D, 0x2E)
+        + (0x5B, 0x5C, 0x5D, 0x6F, 0x90, 0xA3, 0xA5)
+    )
+    BUTTON_FLAGS = {
+        "left": (0x0002, 0x0004),
+        "right": (0x0008, 0x0010),
+        "middle": (0x0020, 0x0040),
+    }
+
+    @staticmethod
+    def _vk(key):
+        if isinstance(key, keyboard.Key):
+            key = key.value
+        if getattr(key, "vk", None) is not None:
+            return key.vk
+        return user32.VkKeyScanW(ord(key.char)) & 0xFF
+
+    def _to_input(self, event):
+        item = _INPUT()
+        kind = event[0]
+        if kind == "button":
+            _, button, pressed = event
+            item.type = self.INPUT_MOUSE
+            item.union.mi.dwFlags = self.BUTTON_FLAGS[button][0 if pressed else 1]
+        elif kind == "move":
+            # 批量发送时用绝对坐标移动（0-65535 归一化到主屏幕）
+            _, x, y = event
+            width = max(1, user32.GetSystemMetrics(0) - 1)
+            height = max(1, user32.GetSystemMetrics(1) - 1)
+            item.type = self.INPUT_MOUSE
+            item.union.mi.dx = int(x * 65535 / width)
+            item.union.mi.dy = int(y * 65535 / height)
+            item.union.mi.dwFlags = self.MOUSEEVENTF_MOVE | self.MOUSEEVENTF_ABSOLUTE
+        else:
+            _, key, pressed = event
+            vk = self._vk(key)
+            item.type = self.INPUT_KEYBOARD
+            # 与 pynput 一样同时填写扫描码，读取扫描码的游戏才能收到按键
+            item.union.ki.wVk = vk
+            item.union.ki.wScan = user32.MapVirtualKeyW(vk, self.MAPVK_VK_TO_VSC)
+            flags = 0 if pressed else self.KEYEVENTF_KEYUP
+            if vk in self.EXTENDED_VKS:
+                flags |= self.KEYEVENTF_EXTENDEDKEY
+            item.union.ki.dwFlags = flags
+        return item
+
+    def _send(self, events):
+        if len(events) == 1 and events[0][0] == "move":
+            # 单独移动时与原来一样使用 SetCursorPos，坐标精确
+            user32.SetCursorPos(events[0][1], events[0][2])
+            return
+        inputs = (_INPUT * len(events))(*[self._to_input(event) for event in events])
+        user32.SendInput(len(events), inputs, ctypes.sizeof(_INPUT))
+
+    def position(self):
+        point = _POINT()
+        user32.GetCursorPos(ctypes.byref(point))
+        return point.x, point.y
+
+
+class PynputInputBackend(InputBackend):
+    """pynput 控制器输入"""
+
+    name = "pynput"
+
+    def __init__(self, mouse_ctl=None, keyboard_ctl=None):
+        super().__init__()
+        self._mouse = mouse_ctl
+        self._keyboard = keyboard_ctl
+
+    @property
+    def mouse(self):
+        # 控制器在第一次发送输入时才创建（此时才导入 pynput）
+        if self._mouse is None:
+            self._mouse = mouse.Controller()
+        return self._mouse
+
+    @property
+    def keyboard(self):
+        if self._keyboard is None:
+            self._keyboard = keyboard.Controller()
+        return self._keyboard
+
+    def _send(self, events):
+        for event in events:
+            kind = event[0]
+            if kind == "button":
+                _, button, pressed = event
+                if pressed:
+                    self.mouse.press(getattr(mouse.Button, button))
+                else:
+                    self.mouse.release(getattr(mouse.Button, button))
+            elif kind == "move":
+                self.mouse.position = (event[1], event[2])
+            else:
+                _, key, pressed = event
+                if pressed:
+                    self.keyboard.press(key)
+                else:
+                    self.keyboard.release(key)
+
+    def position(self):
+        return self.mouse.position
+
+
+class RecordingInputBackend(InputBackend):
+    """只记录事件的输入后端
+
+    每个事件按当前时钟（模拟器中为虚拟时钟）记录时间戳，
+    listener(事件) 可以把事件交给模拟器；最多保留 limit 条记录
+    """
+
+    name = "recording"
+
+    def __init__(self, listener=None, limit=10000):
+        super().__init__()
+        self.listener = listener
+        self.limit = limit
+        self.events = []  # (时间戳, 事件)
+        self._position = (0, 0)
+        self._lock = threading.Lock()
+
+    def _send(self, events):
+        now = clock.time()
+        with self._lock:
+            for event in events:
+                if event[0] == "move":
+                    self._position = (event[1], event[2])
+                self.events.append((now, event))
+            if len(self.events) > self.limit:
+                del self.events[: len(self.events) - self.limit]
+        if self.listener is not None:
+            for event in events:
+                self.listener(event)
+
+    def position(self):
+        return self._position
+
+
+def create_default_input_backend():
+    """Windows 上使用 SendInput，其他平台使用 pynput"""
+    if user32 is not None and hasattr(user32, "SendInput"):
+        return Win32InputBackend()
+    return PynputInputBackend()
+
+
+input_backend = create_default_input_backend()
+
+
+def print_input_backend_stats():
+    """打印输入后端的调用次数和平均耗时"""
+    stats = input_backend.get_stats()
+    if stats["calls"]:
+        print(
+            f"📊 [统计] 输入({stats['backend']}): {stats['calls']} 次调用，"
+            f"{stats['events']} 个事件，平均 {stats['avg_call_us']}µs/次"
+        )
+
 mouse_lock = threading.Lock()
 mouse_is_down = False
 
 
-def handle_jiashi_in_action(scr):
+def handle_jiashi_in_action(scr, detected=None):
     """
     在动作执行过程中处理加时，返回是否检测到并处理了加时
+
+    detected 为调用方已经得到的加时识别结果，None 时用游戏状态分类器识别 scr
     """
+    if detected is None:
+        detected = game_state_classifier.classify(scr, ["jiashi"])["state"] == "OVERTIME_PROMPT"
+    if not detected:
+        return False
+
     # 处理加时选择（使用锁保护读取jiashi_var）
     with param_lock:
         current_jiashi = jiashi_var
@@ -7011,52 +8937,52 @@ def handle_jiashi_in_action(scr):
         update_region_coords()
 
     if current_jiashi == 0:
-        if fangzhu_jiashi(scr):
-            btn_x, btn_y = btn_no_jiashi_coords
-            user32.SetCursorPos(btn_x, btn_y)
-            time.sleep(0.05)
-            user32.mouse_event(0x02, 0, 0, 0, 0)
-            time.sleep(0.1)
-            user32.mouse_event(0x04, 0, 0, 0, 0)
-            time.sleep(0.05)
-            if bait_math_val(scr):
-                with param_lock:
-                    previous_result = result_val_is
-            return True
+        btn_x, btn_y = btn_no_jiashi_coords
+        input_backend.move(btn_x, btn_y)
+        clock.sleep(0.05)
+        input_backend.mouse_down()
+        clock.sleep(0.1)
+        input_backend.mouse_up()
+        clock.sleep(0.05)
+        if bait_math_val(frame_bus.fetch(["bait"], newer_than=clock.time())):
+            with param_lock:
+                previous_result = result_val_is
+        return True
     elif current_jiashi == 1:
-        if fangzhu_jiashi(scr):
-            btn_x, btn_y = btn_yes_jiashi_coords
-            user32.SetCursorPos(btn_x, btn_y)
-            time.sleep(0.05)
-            user32.mouse_event(0x02, 0, 0, 0, 0)
-            time.sleep(0.1)
-            user32.mouse_event(0x04, 0, 0, 0, 0)
-            time.sleep(0.05)
-            if bait_math_val(scr):
-                with param_lock:
-                    previous_result = result_val_is
-            return True
+        btn_x, btn_y = btn_yes_jiashi_coords
+        input_backend.move(btn_x, btn_y)
+        clock.sleep(0.05)
+        input_backend.mouse_down()
+        clock.sleep(0.1)
+        input_backend.mouse_up()
+        clock.sleep(0.05)
+        if bait_math_val(frame_bus.fetch(["bait"], newer_than=clock.time())):
+            with param_lock:
+                previous_result = result_val_is
+        return True
     return False
 
 
 def pressandreleasemousebutton():
-    # 先检查是否需要处理加时
-    with mss.mss() as temp_scr:
-        if handle_jiashi_in_action(temp_scr):
-            return True
+    # 先检查是否需要处理加时（使用共享帧总线的最新画面）
+    temp_scr = frame_bus.fetch(["jiashi", "bait", "f1", "f2"], newer_than=clock.time())
+    vector = game_state_classifier.classify(temp_scr, ["jiashi", "f1", "f2"])
+    if handle_jiashi_in_action(temp_scr, detected=vector["state"] == "OVERTIME_PROMPT"):
+        return True
 
-        # [新增] 故障检测：检查是否断线或超时（回到待机状态）
-        if f1_mached(temp_scr) or f2_mached(temp_scr):
-            print("⚠️ [监测] 检测到异常，判定为断线或鱼跑了，本轮结束")
-            return False
+    # [新增] 故障检测：检查是否断线或超时（回到待机状态）
+    if vector["state"] == "READY_TO_CAST":
+        print("⚠️ [监测] 检测到异常，判定为断线或鱼跑了，本轮结束")
+        frame_recorder.dump("anomaly")
+        return False
 
-    user32.mouse_event(0x02, 0, 0, 0, 0)
+    input_backend.mouse_down()
     jittered_down = add_jitter(leftclickdown)
-    time.sleep(jittered_down)
+    clock.sleep(jittered_down)
     print_timing_info("收线", leftclickdown, jittered_down)
-    user32.mouse_event(0x04, 0, 0, 0, 0)
+    input_backend.mouse_up()
     jittered_up = add_jitter(leftclickup)
-    time.sleep(jittered_up)
+    clock.sleep(jittered_up)
     print_timing_info("放线", leftclickup, jittered_up)
     return True
 
@@ -7065,7 +8991,7 @@ def ensure_mouse_down():
     global mouse_is_down
     with mouse_lock:
         if not mouse_is_down:
-            user32.mouse_event(0x02, 0, 0, 0, 0)  # 左键按下
+            input_backend.mouse_down()  # 左键按下
             mouse_is_down = True
 
 
@@ -7073,7 +8999,7 @@ def ensure_mouse_up():
     global mouse_is_down
     with mouse_lock:
         if mouse_is_down:
-            user32.mouse_event(0x04, 0, 0, 0, 0)  # 左键释放
+            input_backend.mouse_up()  # 左键释放
             mouse_is_down = False
 
 
@@ -7170,7 +9096,7 @@ def get_max_screen_resolution():
 
 
 def bait_math_val(scr):
-    global region1, region2, result_val_is
+    global result_val_is
     # 记录日志：开始鱼饵识别
     if debug_mode:
         debug_info = {
@@ -7182,19 +9108,11 @@ def bait_math_val(scr):
         add_debug_info(debug_info)
 
     # 鱼饵数量显示在屏幕右下角，使用锚定方式计算坐标
-    x1, y1, x2, y2 = BAIT_REGION_BASE
-    base_w = x2 - x1
-    base_h = y2 - y1
-
     # 使用现有的scale_corner_anchored函数计算坐标，确保与其他UI元素使用相同的缩放逻辑
-    actual_x1, actual_y1, actual_w, actual_h = scale_corner_anchored(
-        x1, y1, base_w, base_h, anchor="bottom_right"
-    )
+    actual_x1, actual_y1, actual_w, actual_h = get_bait_region_coords()
     actual_x2 = actual_x1 + actual_w
     actual_y2 = actual_y1 + actual_h
 
-    region = (actual_x1, actual_y1, actual_x2, actual_y2)
-
     # 记录日志：识别区域
     if debug_mode:
         debug_info = {
@@ -7210,9 +9128,9 @@ def bait_math_val(scr):
         }
         add_debug_info(debug_info)
 
-    math_frame = scr.grab(region)
-    # 将 mss 截取的图像转换为 NumPy 数组 (height, width, 4)，即 RGBA 图像
-    if math_frame is None:
+    # 从共享帧取出鱼饵区域的灰度视图（整块截图只转换一次灰度，这里不再复制）
+    gray_img = capture_region(actual_x1, actual_y1, actual_w, actual_h, scr)
+    if gray_img is None:
         result_val_is = None
         # 记录日志：识别失败
         if debug_mode:
@@ -7225,70 +9143,59 @@ def bait_math_val(scr):
             }
             add_debug_info(debug_info)
         return None
-    else:
-        img = np.array(math_frame)  # screenshot 是 ScreenShot 类型，转换为 NumPy 数组
-        gray_img = cv2.cvtColor(img, cv2.COLOR_RGBA2GRAY)
-
-        # 根据统一缩放比例动态计算裁切尺寸
-        scale = SCALE_UNIFORM
-        crop_h = max(1, int(BAIT_CROP_HEIGHT_BASE * scale))
-        crop_w = max(1, int(BAIT_CROP_WIDTH1_BASE * scale))
-
-        # 确保不超出图像边界
-        img_h, img_w = gray_img.shape[:2]
-        crop_h = min(crop_h, img_h)
-        crop_w = min(crop_w, img_w // 2)  # 确保单个数字宽度不超过一半
-
-        # 初始化匹配结果
-        best_match1 = None
-        best_match2 = None
-        best_match3 = None
-
-        # 截取并处理区域1（第一个数字）
-        if crop_w <= img_w:
-            region1 = gray_img[0:crop_h, 0:crop_w]
-            best_match1 = match_digit_template(region1)
-
-        # 截取并处理区域2（第二个数字）
-        if crop_w * 2 <= img_w:
-            region2 = gray_img[0:crop_h, crop_w : crop_w * 2]
-            best_match2 = match_digit_template(region2)
-
-        # 单个数字居中区域 - 动态计算起始位置，适应各种分辨率
-        mid_start = max(0, (img_w - crop_w) // 2)
-        mid_end = min(mid_start + crop_w, img_w)
-        region3 = gray_img[0:crop_h, mid_start:mid_end]
-        best_match3 = match_digit_template(region3)
-        if best_match1 and best_match2:
-            # 从best_match中提取数字索引（i），并拼接成整数
-            best_match1_val = best_match1[0]  # 提取区域1的数字索引
-            best_match2_val = best_match2[0]  # 提取区域2的数字索引
-            # 拼接两个匹配的数字，转换为整数
-            result_val_is = int(f"{best_match1_val}{best_match2_val}")
-        elif best_match3:
-            result_val_is = int(f"{best_match3[0]}")
-        else:
-            result_val_is = None
 
-        # 记录日志：识别结果
-        if debug_mode:
-            debug_info = {
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
-                    :-3
-                ],
-                "action": "bait_recognition_result",
-                "message": "鱼饵识别完成",
-                "result": result_val_is,
-                "algorithm": bait_recognition_algorithm,
-                "parsed_info": {
-                    "鱼饵数量": result_val_is if result_val_is is not None else "未识别"
-                },
-            }
-            add_debug_info(debug_info)
+    # 鱼饵数量区域画面没变时直接使用上次的识别结果（同时恢复 result_val_is）
+    gate_key = (
+        (actual_x1, actual_y1, actual_w, actual_h),
+        id(templates),
+        bait_recognition_algorithm,
+    )
+    hit, cached, signature = roi_change_gate.lookup("bait_math_val", gray_img, gate_key)
+    if hit:
+        result_val_is = cached
         return result_val_is
 
+    # 按设置的识别算法分派到鱼饵识别器（OCR算法额外需要彩色图像）
+    bgra = None
+    if bait_recognition_algorithm == "ocr":
+        bgra = capture_region_bgra(actual_x1, actual_y1, actual_w, actual_h, scr)
+    # 上次的鱼饵数量作为先验：数字按“不变、少1”的顺序匹配，通常一两次匹配即可确定
+    recognition = bait_recognizer.recognize(
+        gray_img, bait_recognition_algorithm, bgra, previous=previous_result
+    )
+    result_val_is = recognition["value"]
+
+    # 记录日志：识别结果
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[
+                :-3
+            ],
+            "action": "bait_recognition_result",
+            "message": "鱼饵识别完成",
+            "result": result_val_is,
+            "algorithm": recognition["algorithm"],
+            "confidence": round(recognition["confidence"], 3),
+            "latency_ms": round(recognition["latency_ms"], 3),
+            "parsed_info": {
+                "鱼饵数量": result_val_is if result_val_is is not None else "未识别"
+            },
+        }
+        add_debug_info(debug_info)
+    roi_change_gate.store("bait_math_val", gate_key, signature, result_val_is)
+    return result_val_is
+
 
 def match_digit_template(image):
+    """识别单个数字区域，返回 (数字, 位置)，匹配度不超过阈值时返回 None"""
+    result = classify_digits([image])[0]
+    if result is None:
+        return None
+    return result[0], result[2]
+
+
+def _match_digit_template_loop(image):
+    """逐个模板调用 cv2.matchTemplate 的原始实现，保留用于性能对比和结果核对"""
     global templates
     # 确保模板已加载
     if templates is None or len(templates) == 0:
@@ -7310,919 +9217,4316 @@ def match_digit_template(image):
     return best_match
 
 
-def capture_region(x, y, w, h, scr):
-    region = (x, y, x + w, y + h)
-    frame = scr.grab(region)
-    if frame is None:
-        return None
-    img = np.array(frame)  # screenshot 是 ScreenShot 类型，转换为 NumPy 数组
-    gray_img = cv2.cvtColor(img, cv2.COLOR_RGBA2GRAY)
-    return gray_img
+# =========================
+# 模板匹配阈值配置（离线标定生成，见 --calibrate-thresholds）
+# =========================
+MATCH_THRESHOLD_DEFAULT = 0.8  # 没有标定结果时各模板的 TM_CCOEFF_NORMED 判定阈值
+MATCH_THRESHOLD_PROFILE_FILE = "./match_thresholds.json"
+MATCH_THRESHOLD_PROFILE_VERSION = 1
+# 标定时允许的误报率：选出满足该误报率的最低阈值（漏检意味着多一轮轮询，阈值宁低勿高）
+MATCH_THRESHOLD_MAX_FPR = 0.0
+MATCH_THRESHOLD_RANGE = (0.6, 0.95)  # 建议阈值的上下限
+MATCH_THRESHOLD_MIN_SAMPLES = 5  # 正、负样本都不少于该数量才给出建议阈值
 
 
-# 识别钓上鱼
-def fished(scr):
-    global region3_coords, star_template
-    # 确保模板已加载
-    if star_template is None:
-        load_star_template()
-    # 获取区域坐标并捕获灰度图
-    region_gray = capture_region(*region3_coords, scr)  # 直接传递解包后的参数和scr
-    if region_gray is None:
-        return None
-    # 执行模板匹配并检查最大匹配度是否大于 0.8
-    h, w = region_gray.shape[:2]
-    t_h, t_w = star_template.shape[:2]
-    if h >= t_h and w >= t_w:
-        return (
-            cv2.minMaxLoc(
-                cv2.matchTemplate(region_gray, star_template, cv2.TM_CCOEFF_NORMED)
-            )[1]
-            > 0.8
-        )
-    return False
+class MatchThresholdProfile:
+    """各模板按分辨率标定的判定阈值
 
+    文件格式：{"version": 1, "resolutions": {"2560x1440": {"star": {"threshold": 0.74, ...}}}}，
+    当前分辨率没有某个模板的标定结果时使用默认阈值0.8
+    """
 
-def f1_mached(scr):
-    global region4_coords, f1
-    # 确保模板已加载
-    if f1 is None:
-        load_f1()
-    region_gray = capture_region(*region4_coords, scr)
-    if region_gray is None:
-        return None
-    h, w = region_gray.shape[:2]
-    t_h, t_w = f1.shape[:2]
-    if h >= t_h and w >= t_w:
-        return (
-            cv2.minMaxLoc(cv2.matchTemplate(region_gray, f1, cv2.TM_CCOEFF_NORMED))[1]
-            > 0.8
-        )
-    return False
+    def __init__(self, path=MATCH_THRESHOLD_PROFILE_FILE):
+        self.path = path
+        self.resolutions = {}
+        self._loaded = False
+        self._current = None  # (分辨率键, 该分辨率的阈值字典)
+
+    def load(self):
+        """读取阈值文件，文件不存在或格式不对时全部使用默认阈值"""
+        self._loaded = True
+        self._current = None
+        self.resolutions = {}
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MATCH_THRESHOLD_PROFILE_VERSION:
+                print(f"⚠️  [警告] 阈值文件版本不匹配，使用默认阈值: {self.path}")
+                return False
+            self.resolutions = data.get("resolutions", {})
+        except Exception as e:
+            print(f"⚠️  [警告] 阈值文件读取失败，使用默认阈值: {e}")
+            return False
+        return True
 
+    def threshold(self, name, default=MATCH_THRESHOLD_DEFAULT):
+        """当前分辨率下模板 name 的判定阈值"""
+        if not self._loaded:
+            self.load()
+        key = resolution_key(TARGET_WIDTH, TARGET_HEIGHT)
+        current = self._current
+        if current is None or current[0] != key:
+            current = self._current = (key, self.resolutions.get(key, {}))
+        entry = current[1].get(name)
+        return default if entry is None else entry["threshold"]
+
+    def save(self, results):
+        """把标定结果 {分辨率键: {模板名称: 标定信息}} 合并写入阈值文件"""
+        if not self._loaded:
+            self.load()
+        for key, entries in results.items():
+            self.resolutions.setdefault(key, {}).update(entries)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MATCH_THRESHOLD_PROFILE_VERSION, "resolutions": self.resolutions},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self._current = None
 
-# 识别UNO条
-def uno_recognize_tiao(scr):
-    """识别UNO条模板
 
-    Args:
-        scr: 截图对象
+def resolution_key(width, height):
+    return f"{width}x{height}"
 
-    Returns:
-        bool: 是否识别成功
-    """
-    global tiao_template
-    # 确保模板已加载
-    if tiao_template is None:
-        print("⚠️ [UNO] 模板未加载，尝试重新加载...")
-        load_tiao_template()
 
-    if tiao_template is None:
-        print("❌ [UNO] 模板加载失败，无法识别")
-        return False
+match_threshold_profile = MatchThresholdProfile()
 
-    # 2K分辨率(2560×1440)下的原始坐标
-    base_x = 2242
-    base_y = 1314
-    base_width = 284
-    base_height = 100
 
-    # 使用与鱼饵识别相同的缩放逻辑，UI元素通常锚定在角落
-    scaled_x, scaled_y, scaled_width, scaled_height = scale_position(
-        base_x,
-        base_y,
-        base_width,
-        base_height,
-        anchor="bottom_right",
-        coordinate_type="region",
-    )
+def match_threshold(name, default=MATCH_THRESHOLD_DEFAULT):
+    """模板 name 在当前分辨率下的判定阈值（匹配度大于该值认为匹配成功）"""
+    return match_threshold_profile.threshold(name, default)
 
-    # 捕获缩放后的区域
-    region_gray = capture_region(scaled_x, scaled_y, scaled_width, scaled_height, scr)
-    if region_gray is None:
-        print(
-            f"❌ [UNO] 区域捕获失败 (缩放后: {scaled_x}, {scaled_y}, {scaled_width}, {scaled_height})"
-        )
-        return False
 
-    # 执行模板匹配
-    h, w = region_gray.shape[:2]
-    t_h, t_w = tiao_template.shape[:2]
-    if h >= t_h and w >= t_w:
-        match_result = cv2.minMaxLoc(
-            cv2.matchTemplate(region_gray, tiao_template, cv2.TM_CCOEFF_NORMED)
-        )[1]
-        is_match = match_result > 0.8
-        print(
-            f"🎮 [UNO] 识别结果: {'成功' if is_match else '失败'} (匹配度: {match_result:.2f})"
-        )
-        return is_match
-    return False
+DIGIT_EARLY_EXIT_CONFIDENCE = 0.95  # 按先验顺序匹配数字时，匹配度超过该值不再匹配其余数字
 
 
-# 加载UNO条模板
-def load_tiao_template():
-    """加载UNO条模板
+class DigitClassifier:
+    """鱼饵数字识别引擎
 
-    Returns:
-        numpy.ndarray: 加载的模板
+    10个数字模板减去均值、归一化后堆成一个矩阵，区域内每个滑动窗口同样去均值、
+    归一化，一次矩阵乘法即可得到所有窗口对所有模板的归一化相关系数
+    （与 cv2.TM_CCOEFF_NORMED 相同）。多个区域的窗口合并到同一次矩阵乘法中。
+    匹配度大于 threshold 才认为识别成功，与原来逐个模板匹配的0.8判定一致。
     """
-    global tiao_template
-    if tiao_template is None:
-        try:
-            tiao_path = os.path.join(template_folder_path, "tiao.png")
-            img = Image.open(tiao_path)
 
-            # 无论原图是什么格式，都转换为灰度图像
-            if img.mode != "L":
-                img = img.convert("L")
+    def __init__(self, templates, threshold=0.8):
+        shapes = {template.shape[:2] for template in templates}
+        if len(shapes) != 1:
+            raise ValueError(f"数字模板尺寸不一致: {sorted(shapes)}")
+        self.source = templates
+        self.template_shape = shapes.pop()
+        self.threshold = threshold
+        stack = np.stack([t.astype(np.float32).ravel() for t in templates])
+        stack -= stack.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(stack, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        # 形状 (模板像素数, 模板个数)，窗口矩阵右乘即得到相关系数
+        self.matrix = np.ascontiguousarray((stack / norms).T)
+
+    def _windows(self, image):
+        """区域的所有滑动窗口展平为 (窗口数, 模板像素数)，区域比模板小时返回 None"""
+        t_h, t_w = self.template_shape
+        if image is None or image.shape[0] < t_h or image.shape[1] < t_w:
+            return None
+        windows = np.lib.stride_tricks.sliding_window_view(image, (t_h, t_w))
+        return windows.reshape(-1, t_h * t_w)
 
-            template = np.array(img)
-            scale = SCALE_UNIFORM
-            tiao_template = scale_template(template, scale, scale)
+    @staticmethod
+    def _normalize(windows):
+        """窗口去均值、归一化；纯色窗口没有相关性，与 OpenCV 一样整行置0"""
+        windows = windows.astype(np.float32)
+        windows -= windows.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(windows, axis=1)
+        flat = norms < 1e-6
+        norms[flat] = 1.0
+        windows /= norms[:, None]
+        windows[flat] = 0.0
+        return windows
+
+    def scores(self, windows):
+        """窗口矩阵对全部模板的归一化相关系数，形状 (窗口数, 模板个数)"""
+        return self._normalize(windows) @ self.matrix
+
+    def classify_many(self, images):
+        """批量识别多个区域，每个区域返回 (数字, 匹配度, 位置) 或 None"""
+        windows = [self._windows(image) for image in images]
+        valid = [w for w in windows if w is not None]
+        if not valid:
+            return [None] * len(images)
+        all_scores = self.scores(np.concatenate(valid) if len(valid) > 1 else valid[0])
+
+        results = []
+        offset = 0
+        for image, image_windows in zip(images, windows):
+            if image_windows is None:
+                results.append(None)
+                continue
+            count = len(image_windows)
+            region_scores = all_scores[offset : offset + count]
+            offset += count
+            best_per_digit = region_scores.max(axis=0)
+            digit = int(np.argmax(best_per_digit))
+            confidence = float(best_per_digit[digit])
+            if confidence <= self.threshold:
+                results.append(None)
+                continue
+            out_w = image.shape[1] - self.template_shape[1] + 1
+            y, x = divmod(int(np.argmax(region_scores[:, digit])), out_w)
+            results.append((digit, confidence, (x, y)))
+        return results
 
-            # 确保模板是CV_8U格式（8位无符号整数）
-            if tiao_template.dtype != np.uint8:
-                tiao_template = tiao_template.astype(np.uint8)
-                print(f"🔧 [UNO] 模板格式转换: {tiao_template.dtype} → uint8")
+    def classify(self, image):
+        """识别单个区域，返回 (数字, 匹配度, 位置) 或 None"""
+        return self.classify_many([image])[0]
 
-            # 确保模板是单通道灰度图像
-            if len(tiao_template.shape) > 2:
-                tiao_template = cv2.cvtColor(tiao_template, cv2.COLOR_BGR2GRAY)
-                print(f"🔧 [UNO] 模板通道转换: {tiao_template.shape} → 单通道")
+    def classify_prior(self, image, candidates, cutoff=DIGIT_EARLY_EXIT_CONFIDENCE):
+        """按先验顺序逐个匹配候选数字，匹配度超过 cutoff 立即返回
 
-            print("✅ [UNO] 模板加载成功")
-        except Exception as e:
-            print(f"❌ [UNO] 模板加载失败: {e}")
-            tiao_template = None
-    return tiao_template
+        鱼饵数量通常不变或比上次少1，先匹配这两个数对应的数字，一般一两次匹配就能确定；
+        候选都没超过 cutoff 时再一次批量匹配剩余数字，按匹配度最高者判定（同 classify）。
 
+        Returns:
+            tuple: ((数字, 匹配度, 位置) 或 None, 实际匹配的候选数字个数)
+        """
+        windows = self._windows(image)
+        if windows is None:
+            return None, 0
+        windows = self._normalize(windows)
+        out_w = image.shape[1] - self.template_shape[1] + 1
+        best = (None, -1.0, 0)  # (数字, 匹配度, 窗口序号)
+        scored = []
+        for digit in candidates:
+            if digit in scored or not 0 <= digit < self.matrix.shape[1]:
+                continue
+            column = windows @ self.matrix[:, digit]
+            scored.append(digit)
+            index = int(np.argmax(column))
+            confidence = float(column[index])
+            if confidence > best[1]:
+                best = (digit, confidence, index)
+            if confidence > cutoff:
+                break
+        else:
+            rest = [d for d in range(self.matrix.shape[1]) if d not in scored]
+            if rest:
+                region_scores = windows @ self.matrix[:, rest]
+                best_per_digit = region_scores.max(axis=0)
+                column = int(np.argmax(best_per_digit))
+                if best_per_digit[column] > best[1]:
+                    best = (
+                        rest[column],
+                        float(best_per_digit[column]),
+                        int(np.argmax(region_scores[:, column])),
+                    )
+                scored.extend(rest)
+        digit, confidence, index = best
+        if digit is None or confidence <= self.threshold:
+            return None, len(scored)
+        y, x = divmod(index, out_w)
+        return (digit, confidence, (x, y)), len(scored)
 
-# 计算UNO点击位置
-def calculate_click_position():
-    """根据当前分辨率计算UNO点击位置
 
-    Returns:
-        tuple: (x, y) 点击位置
-    """
-    # 2K分辨率(2560×1440)下的原始位置
-    base_x = 2381
-    base_y = 1353
+_digit_classifier = None
 
-    # 获取当前分辨率
-    current_width, current_height = get_current_screen_resolution()
 
-    # 使用与鱼饵识别相同的缩放逻辑，UI元素通常锚定在角落
-    scaled_x, scaled_y = scale_position(
-        base_x, base_y, anchor="bottom_right", coordinate_type="point"
-    )
+def get_digit_classifier():
+    """返回与当前数字模板对应的识别引擎，模板重新加载后自动重建"""
+    global _digit_classifier
+    if templates is None or len(templates) == 0:
+        load_templates()
+    if templates is None or len(templates) == 0:
+        return None
+    if _digit_classifier is None or _digit_classifier.source is not templates:
+        _digit_classifier = DigitClassifier(templates)
+    _digit_classifier.threshold = match_threshold("digit")
+    return _digit_classifier
 
-    print(
-        f"🎮 [UNO] 分辨率 {current_width}×{current_height}，缩放比例 X={SCALE_X:.2f}, Y={SCALE_Y:.2f}，点击位置: ({scaled_x}, {scaled_y})"
-    )
-    return (scaled_x, scaled_y)
 
+def classify_digits(images):
+    """批量识别多个数字区域，每个区域返回 (数字, 匹配度, 位置) 或 None"""
+    classifier = get_digit_classifier()
+    if classifier is None:
+        return [None] * len(images)
+    return classifier.classify_many(images)
 
-# UNO主处理函数
-def uno_process(scr):
-    """处理UNO卡识别和计数
 
-    Args:
-        scr: 截图对象
+def capture_region(x, y, w, h, scr):
+    """从截图帧中取出区域的灰度视图
 
-    Returns:
-        bool: 是否处理成功
+    检测函数只通过帧（Frame，由FrameSource产生）读取画面，不直接截图，
+    因此同一套检测代码既可以用于实时截图，也可以用于回放录制的画面
     """
-    global uno_input1_var, uno_input2_var
+    if scr is None:
+        return None
+    return scr.gray(x, y, w, h)
 
-    # 检查变量是否已初始化
-    if uno_input1_var is None or uno_input2_var is None:
-        print("❌ [UNO] 计数变量未初始化")
-        return False
 
-    # 识别UNO条
-    if uno_recognize_tiao(scr):
-        # 获取当前牌数和抽取牌数
-        current_cards = uno_input1_var.get()
-        max_cards = uno_input2_var.get()
+def capture_region_bgra(x, y, w, h, scr):
+    """从截图帧中取出区域的原始BGRA视图"""
+    if scr is None:
+        return None
+    return scr.bgra(x, y, w, h)
 
-        print(f"🎮 [UNO] 当前牌数: {current_cards}, 抽取牌数: {max_cards}")
 
-        # 当前牌数+1
-        new_cards = current_cards + 1
-        uno_input1_var.set(new_cards)
-        print(f"🎮 [UNO] 牌数更新: {current_cards} → {new_cards}")
+# =========================
+# 区域画面变化检测（画面没变时直接使用上次的识别结果）
+# =========================
+FRAME_DIFF_GATING_ENABLED = True  # 是否启用画面变化检测
+FRAME_DIFF_TOLERANCE = 1.0  # 缩小后平均每像素灰度差不超过该值视为没有变化
+FRAME_DIFF_SAMPLE_WIDTH = 16  # 计算差异前把区域缩小到的宽度
 
-        # 检查是否达到抽取牌数且未显示过弹窗
-        if new_cards >= max_cards and not uno_popup_shown:
-            print(f"🎮 [UNO] 已达到抽取牌数: {new_cards}/{max_cards}")
-            # 显示弹窗并获取用户选择
-            continue_operation = uno_show_popup()
-            # 如果用户选择暂停，返回False
-            if not continue_operation:
-                print(f"🎮 [UNO] 已暂停操作")
-                return False
 
-        return True
-    return False
+class RoiChangeGate:
+    """按检测器缓存区域画面和识别结果
 
+    等待上鱼时F1/F2/星星/鱼饵区域往往连续几秒完全不变，这时没必要每帧都做模板匹配。
+    每个检测器保存上次实际识别时的缩小画面，新画面与之相比平均灰度差不超过容差、
+    且区域坐标和模板没有变化时，直接返回上次的结果并计入命中次数
+    """
 
-# UNO持续识别函数
-def uno_continuous_recognition():
-    """持续识别UNO卡并执行点击操作
+    def __init__(self, tolerance=FRAME_DIFF_TOLERANCE, sample_width=FRAME_DIFF_SAMPLE_WIDTH):
+        self.tolerance = tolerance
+        self.sample_width = sample_width
+        self._entries = {}  # 检测器名称 -> (键, 缩小画面, 识别结果)
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.hits = {}
+
+    def _signature(self, roi):
+        h, w = roi.shape[:2]
+        if w > self.sample_width:
+            small_h = max(1, round(h * self.sample_width / w))
+            return cv2.resize(roi, (self.sample_width, small_h), interpolation=cv2.INTER_AREA)
+        # 区域本身很小时直接复制（原图是帧缓冲区的视图，之后可能被复用）
+        return roi.copy()
+
+    def lookup(self, name, roi, key):
+        """返回 (是否命中, 缓存的结果, 本次画面签名)"""
+        if not FRAME_DIFF_GATING_ENABLED:
+            return False, None, None
+        signature = self._signature(roi)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            entry = self._entries.get(name)
+            if (
+                entry is not None
+                and entry[0] == key
+                and entry[1].shape == signature.shape
+                and cv2.norm(entry[1], signature, cv2.NORM_L1)
+                <= self.tolerance * signature.size
+            ):
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return True, entry[2], signature
+        return False, None, signature
 
-    该函数在单独线程中运行，直到uno_recognition_running为False
-    """
-    global uno_recognition_running
+    def store(self, name, key, signature, result):
+        if signature is None:
+            return
+        with self._lock:
+            self._entries[name] = (key, signature, result)
 
-    print("🎮 [UNO] 开始持续识别")
+    def reset(self):
+        """清空缓存的画面（统计保留）"""
+        with self._lock:
+            self._entries.clear()
 
-    import time
-    import mss
+    def get_stats(self):
+        """返回 {检测器名称: (调用次数, 命中次数, 命中率)}"""
+        with self._lock:
+            return {
+                name: (calls, self.hits.get(name, 0), self.hits.get(name, 0) / calls)
+                for name, calls in self.calls.items()
+                if calls
+            }
 
-    # 创建截图对象
-    scr = mss.mss()
 
-    try:
-        while uno_recognition_running:
-            # 识别UNO条
-            if uno_recognize_tiao(scr):
-                # 获取当前牌数和抽取牌数
-                current_cards = uno_input1_var.get()
-                max_cards = uno_input2_var.get()
+roi_change_gate = RoiChangeGate()
 
-                print(f"🎮 [UNO] 当前牌数: {current_cards}, 抽取牌数: {max_cards}")
 
-                # 当前牌数+1并执行点击
-                new_cards = current_cards + 1
-                uno_input1_var.set(new_cards)
-                print(f"🎮 [UNO] 牌数更新: {current_cards} → {new_cards}")
+def print_roi_change_gate_stats():
+    """打印各检测器的画面未变化命中率"""
+    stats = roi_change_gate.get_stats()
+    if not stats:
+        return
+    summary = "，".join(
+        f"{name} {rate * 100:.0f}% ({hits}/{calls})"
+        for name, (calls, hits, rate) in stats.items()
+    )
+    print(f"📊 [统计] 画面未变化复用结果: {summary}")
 
-                # 计算点击位置
-                click_x, click_y = calculate_click_position()
 
-                # 执行点击操作
-                mouse_controller.position = (click_x, click_y)
-                mouse_controller.click(mouse.Button.left, 1)
-                print(f"🎮 [UNO] 执行点击: ({click_x}, {click_y})")
+def gated_template_score(
+    name, region_gray, template, coords, base_template=None, threshold=None
+):
+    """区域画面没变时返回缓存的匹配度，否则做模板匹配，返回最大匹配度（区域比模板小时为0）
 
-                # 检查是否达到抽取牌数且未显示过弹窗
-                if new_cards >= max_cards and not uno_popup_shown:
-                    print(f"🎮 [UNO] 已达到抽取牌数: {new_cards}/{max_cards}")
-                    # 显示弹窗并获取用户选择
-                    continue_operation = uno_show_popup()
-                    # 如果用户选择暂停，停止持续识别
-                    if not continue_operation:
-                        print(f"🎮 [UNO] 已暂停持续识别")
-                        uno_recognition_running = False
+    提供 base_template（原始模板）时，高于2K的分辨率在基准分辨率下匹配，见 match_template_max；
+    threshold 为调用方的判断阈值，传给位置跟踪
+    """
+    key = (tuple(coords), id(template), MATCH_AT_BASE_RESOLUTION)
+    hit, cached, signature = roi_change_gate.lookup(name, region_gray, key)
+    if hit:
+        return cached
+    max_val = match_template_max(
+        region_gray, template, base_template, track=name, threshold=threshold
+    )
+    score = 0.0 if max_val is None else float(max_val)
+    roi_change_gate.store(name, key, signature, score)
+    return score
 
-            # 延迟一段时间，避免过于频繁的识别
-            time.sleep(0.5)
-    except Exception as e:
-        print(f"❌ [UNO] 持续识别出错: {e}")
-    finally:
-        # 关闭截图对象
-        scr.close()
-        print("🎮 [UNO] 持续识别停止")
 
+def gated_template_match(
+    name, region_gray, template, coords, threshold=MATCH_THRESHOLD_DEFAULT, base_template=None
+):
+    """区域画面没变时返回缓存结果，否则做模板匹配（最大匹配度大于阈值为True）"""
+    return (
+        gated_template_score(name, region_gray, template, coords, base_template, threshold)
+        > threshold
+    )
 
-# 启动UNO持续识别
-def uno_start_continuous_recognition():
-    """启动UNO持续识别
 
-    该函数负责创建和启动持续识别线程
-    """
-    global uno_recognition_running, uno_recognition_thread, uno_input1_var, uno_popup_shown
+# =========================
+# 共享截图帧总线
+# =========================
+# 所有工作线程（主循环、加时线程、放生识别、UNO）共用一个截图线程：
+# 每个周期只截一次图，发布带时间戳的帧，同一周期内所有检测器看到的是同一帧
+FRAME_BUS_INTERVAL = 0.05  # 截图周期（秒）
 
-    if not uno_recognition_running:
-        # 重置当前牌数为7
-        uno_input1_var.set(7)
-        print("🎮 [UNO] 当前牌数已重置为7")
+
+def get_bait_region_coords():
+    """鱼饵数量区域 (x, y, w, h)，锚定在屏幕右下角"""
+    x1, y1, x2, y2 = BAIT_REGION_BASE
+    return scale_corner_anchored(x1, y1, x2 - x1, y2 - y1, anchor="bottom_right")
+
+
+def get_tong_region_coords():
+    """放生界面鱼桶识别区域 (x, y, w, h)"""
+    return scale_position(1042, 675, 89, 79, anchor="center", coordinate_type="region")
+
+
+def get_uno_tiao_region_coords():
+    """UNO条识别区域 (x, y, w, h)，锚定在屏幕右下角"""
+    return scale_position(
+        2242, 1314, 284, 100, anchor="bottom_right", coordinate_type="region"
+    )
+
+
+def get_fish_info_region_coords():
+    """鱼信息区域 (x, y, w, h)"""
+    x1, y1, x2, y2 = FISH_INFO_REGION_BASE
+    left, top = int(x1 * SCALE_X), int(y1 * SCALE_Y)
+    return (left, top, int(x2 * SCALE_X) - left, int(y2 * SCALE_Y) - top)
+
+
+def get_jiashi_region_coords():
+    """加时识别区域 (x, y, w, h)，未初始化时先更新坐标"""
+    if jiashi_region_coords is None:
+        update_region_coords()
+    return jiashi_region_coords
+
+
+class GrabCostModel:
+    """截图耗时模型：单次截图耗时 ≈ 固定开销 + 单像素开销 × 面积
+
+    固定开销和单像素开销根据实际截图耗时在线拟合（带遗忘因子的最小二乘），
+    初始值为普通机器上BitBlt的经验值
+    """
+
+    def __init__(self, overhead=0.0015, per_pixel=2.5e-9, decay=0.98):
+        self.overhead = overhead  # 每次截图的固定开销（秒）
+        self.per_pixel = per_pixel  # 每个像素的开销（秒）
+        self.decay = decay
+        self._n = 0.0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    def cost(self, rect):
+        return self.overhead + self.per_pixel * rect[2] * rect[3]
+
+    def observe(self, area, seconds):
+        """记录一次截图的面积和耗时，样本足够分散时更新模型参数"""
+        d = self.decay
+        self._n = self._n * d + 1
+        self._sx = self._sx * d + area
+        self._sy = self._sy * d + seconds
+        self._sxx = self._sxx * d + area * area
+        self._sxy = self._sxy * d + area * seconds
+
+        # 面积差异太小时无法区分固定开销和像素开销，保留原参数
+        var = self._n * self._sxx - self._sx * self._sx
+        if self._n < 8 or var <= (self._n * 200) ** 2:
+            return
+        per_pixel = (self._n * self._sxy - self._sx * self._sy) / var
+        overhead = (self._sy - per_pixel * self._sx) / self._n
+        self.per_pixel = max(1e-11, per_pixel)
+        self.overhead = max(1e-5, overhead)
+
+
+def union_rect(r1, r2):
+    """两个 (x, y, w, h) 矩形的外接矩形"""
+    x = min(r1[0], r2[0])
+    y = min(r1[1], r2[1])
+    x2 = max(r1[0] + r1[2], r2[0] + r2[2])
+    y2 = max(r1[1] + r1[3], r2[1] + r2[3])
+    return (x, y, x2 - x, y2 - y)
+
+
+def plan_capture_rects(rects, cost_model):
+    """区域规划：把同时需要的区域合并成尽量少的截图矩形
+
+    反复合并“合并后比分开截更省时”的两个矩形，直到没有可省的合并为止。
+    相距很远的小区域合并后面积太大，按耗时模型不划算，会保持分开截图
+
+    Args:
+        rects: 需要截取的区域列表 [(x, y, w, h), ...]
+        cost_model: GrabCostModel 截图耗时模型
+
+    Returns:
+        list: 实际截图的矩形列表，每个输入区域都被其中某个矩形完全包含
+    """
+    tiles = list(dict.fromkeys(rects))
+    while len(tiles) > 1:
+        best = None
+        best_saving = 0.0
+        for i in range(len(tiles)):
+            for j in range(i + 1, len(tiles)):
+                merged = union_rect(tiles[i], tiles[j])
+                saving = (
+                    cost_model.cost(tiles[i])
+                    + cost_model.cost(tiles[j])
+                    - cost_model.cost(merged)
+                )
+                if saving > best_saving:
+                    best_saving = saving
+                    best = (i, j, merged)
+        if best is None:
+            break
+        i, j, merged = best
+        tiles = [tile for k, tile in enumerate(tiles) if k != i and k != j]
+        tiles.append(merged)
+    return tiles
+
+
+# 区域名称 -> 当前坐标，每次截图时重新计算，分辨率切换后自动生效
+FRAME_REGION_PROVIDERS = {
+    "star": lambda: region3_coords,
+    "f1": lambda: region4_coords,
+    "f2": lambda: region5_coords,
+    "bite": lambda: region6_coords,
+    "bait": get_bait_region_coords,
+    "jiashi": get_jiashi_region_coords,
+    "tong": get_tong_region_coords,
+    "uno_tiao": get_uno_tiao_region_coords,
+    "fish_info": get_fish_info_region_coords,
+}
+
+
+GRAY_BUFFER_POOL_MIN_PIXELS = 4096  # 小于该像素数的区域直接分配（小区域复用缓冲区的加锁开销比分配还大）
+
+
+class GrayBufferPool:
+    """按区域尺寸复用的灰度输出缓冲区
+
+    缓冲区由使用它的帧区域（FrameTile）持有，FrameTile 被回收时调用 release 归还；
+    只有归还的缓冲区才会再次分配出去，仍被帧持有的缓冲区不会被覆盖。每种尺寸最多保留 max_per_shape 个空闲缓冲区
+    """
+
+    def __init__(self, max_per_shape=8):
+        self.max_per_shape = max_per_shape
+        self._free = {}  # 尺寸 -> [空闲缓冲区, ...]
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.allocated = 0
+
+    def acquire(self, shape):
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                self.reused += 1
+                return free.pop()
+            self.allocated += 1
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, buffer):
+        """归还缓冲区，调用后调用方不能再使用它（以及它的切片视图）"""
+        with self._lock:
+            free = self._free.setdefault(buffer.shape, [])
+            if len(free) < self.max_per_shape:
+                free.append(buffer)
+
+
+# 截图线程和检测线程共用的灰度缓冲池
+gray_buffer_pool = GrayBufferPool()
+
+
+def bgra_to_gray(bgra, dst=None):
+    """BGRA转灰度，提供 dst 时结果写入 dst（不额外分配内存）"""
+    return cv2.cvtColor(bgra, cv2.COLOR_RGBA2GRAY, dst=dst)
+
+
+def wrap_screenshot(shot):
+    """把mss截图的原始BGRA数据包装为数组视图（np.frombuffer，不复制）"""
+    return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+
+class FrameTile:
+    """帧中的一块截图区域，灰度图在第一次使用时转换并缓存
+
+    回放录制的灰度裁切图时只有灰度数据，需要彩色时再由灰度转换
+    """
+
+    def __init__(self, rect, bgra=None, gray=None):
+        self.rect = rect  # (x, y, w, h)
+        self._bgra = bgra
+        self._gray = gray
+
+    @property
+    def bgra(self):
+        if self._bgra is None:
+            self._bgra = cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGRA)
+        return self._bgra
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            h, w = self._bgra.shape[:2]
+            if h * w < GRAY_BUFFER_POOL_MIN_PIXELS:
+                self._gray = bgra_to_gray(self._bgra)
+            else:
+                # 缓冲区归这块区域所有，区域（随帧）被回收时归还缓冲池；
+                # 灰度视图只在帧的生命周期内使用，需要保留的数据（录制器等）都会复制
+                buffer = gray_buffer_pool.acquire((h, w))
+                self._gray = bgra_to_gray(self._bgra, buffer)
+                weakref.finalize(self, gray_buffer_pool.release, buffer)
+        return self._gray
+
+    def contains(self, x, y, w, h):
+        tx, ty, tw, th = self.rect
+        return tx <= x and ty <= y and x + w <= tx + tw and y + h <= ty + th
+
+
+class Frame:
+    """一次截图得到的帧，带序号和时间戳
+
+    检测函数原来接收mss对象(scr)，现在也可以直接接收Frame，
+    capture_region会从帧里取出对应区域的视图而不是重新截图
+    """
+
+    def __init__(self, seq, timestamp, tiles, regions, labels=None):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.tiles = tiles
+        self.regions = regions  # 区域名称 -> (x, y, w, h)
+        self.labels = labels  # 回放时的人工标注（检测器名称 -> 期望结果）
+
+    def _find(self, x, y, w, h):
+        for tile in self.tiles:
+            if tile.contains(x, y, w, h):
+                return tile
+        return None
+
+    def gray(self, x, y, w, h):
+        """返回区域的灰度视图，帧中不包含该区域时返回None"""
+        tile = self._find(x, y, w, h)
+        if tile is None:
+            return None
+        tx, ty = tile.rect[:2]
+        return tile.gray[y - ty : y - ty + h, x - tx : x - tx + w]
+
+    def bgra(self, x, y, w, h):
+        """返回区域的BGRA视图，帧中不包含该区域时返回None"""
+        tile = self._find(x, y, w, h)
+        if tile is None:
+            return None
+        tx, ty = tile.rect[:2]
+        return tile.bgra[y - ty : y - ty + h, x - tx : x - tx + w]
+
+    def has_regions(self, names):
+        # 回放帧不记录截图区域，按录制内容直接使用
+        if self.regions is None:
+            return True
+        return all(name in self.regions for name in names)
+
+
+class FrameSource:
+    """画面来源接口
+
+    read(rects) 返回 (时间戳, [FrameTile, ...], 标注)，来源结束时返回None。
+    实时来源按 rects 截图；回放来源忽略 rects，直接返回录制的整屏画面或区域裁切图
+    """
+
+    realtime = True  # 回放来源为False，帧总线不再按截图周期限速
+    screen_size = None  # 回放来源的原始分辨率 (width, height)
+
+    def read(self, rects):
+        raise NotImplementedError
+
+    def reset(self):
+        """出错后重置来源（例如重新创建截图句柄）"""
+
+    def close(self):
+        """释放来源占用的资源"""
+
+
+class MssFrameSource(FrameSource):
+    """实时截图来源（mss），截图句柄在第一次读取的线程中创建"""
+
+    def __init__(self):
+        self._scr = None
+        self.cost_model = GrabCostModel()
+
+    def read(self, rects):
+        if self._scr is None:
+            self._scr = mss.mss()
+        timestamp = clock.time()
+        tiles = []
+        # 按耗时模型把区域合并成若干外接矩形，每个矩形只截一次
+        for rect in plan_capture_rects(rects, self.cost_model):
+            x, y, w, h = rect
+            start = time.perf_counter()
+            shot = self._scr.grab((x, y, x + w, y + h))
+            if shot is None:
+                continue
+            tiles.append(FrameTile(rect, wrap_screenshot(shot)))
+            self.cost_model.observe(w * h, time.perf_counter() - start)
+        return timestamp, tiles, None
+
+    def reset(self):
+        try:
+            if self._scr is not None:
+                self._scr.close()
+        except:
+            pass
+        self._scr = None
+
+    def close(self):
+        self.reset()
+
+
+def _image_to_tile(img):
+    """把cv2读取的整屏图像转换为帧区域（与实时截图一样使用BGRA格式）"""
+    h, w = img.shape[:2]
+    if img.ndim == 2:
+        return FrameTile((0, 0, w, h), gray=img)
+    if img.shape[2] == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    return FrameTile((0, 0, w, h), bgra=img)
+
+
+class ImageDirFrameSource(FrameSource):
+    """回放来源：PNG整屏截图目录，或录制器保存的NPZ文件
+
+    - *.png / *.jpg：一张图为一帧整屏画面
+    - *.npz（录制器格式）：timestamps、names、rects、screen 以及每个区域的
+      roi_<名称>/valid_<名称> 数组，一个文件包含多帧区域裁切图
+    - *.npz（单帧格式）：frame 数组为一帧整屏画面
+    目录下可选 labels.json：{"文件名" 或 "文件名#帧序号": {"f1": true, "bait": 12, ...}}，
+    用于回放测试统计识别准确率
+    """
+
+    realtime = False
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            files = [os.path.join(path, n) for n in names]
+            label_path = os.path.join(path, "labels.json")
+        else:
+            files = [path]
+            label_path = os.path.join(os.path.dirname(path), "labels.json")
+        self.labels = {}
+        if os.path.exists(label_path):
+            with open(label_path, "r", encoding="utf-8") as f:
+                self.labels = json.load(f)
+
+        # 展开为帧列表：(文件路径, NPZ内帧序号或None)
+        self._items = []
+        for file_path in files:
+            ext = os.path.splitext(file_path)[1].lower()
+            if ext in (".png", ".jpg", ".jpeg", ".bmp"):
+                self._items.append((file_path, None))
+            elif ext == ".npz":
+                with np.load(file_path) as data:
+                    if "timestamps" in data:
+                        count = len(data["timestamps"])
+                        self._items.extend((file_path, i) for i in range(count))
+                    elif "frame" in data:
+                        self._items.append((file_path, None))
+        self._index = 0
+        self._npz_path = None
+        self._npz = None
+        self.screen_size = self._probe_screen_size()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _load_npz(self, file_path):
+        if self._npz_path != file_path:
+            with np.load(file_path) as data:
+                self._npz = {key: data[key] for key in data.files}
+            self._npz_path = file_path
+        return self._npz
+
+    def _probe_screen_size(self):
+        if not self._items:
+            return None
+        file_path, frame_index = self._items[0]
+        if file_path.lower().endswith(".npz"):
+            data = self._load_npz(file_path)
+            if "screen" in data:
+                return tuple(int(v) for v in data["screen"])
+            if "frame" in data:
+                return (data["frame"].shape[1], data["frame"].shape[0])
+            return None
+        img = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            return None
+        return (img.shape[1], img.shape[0])
+
+    def read(self, rects):
+        if self._index >= len(self._items):
+            if not self.loop or not self._items:
+                return None
+            self._index = 0
+        position = self._index
+        file_path, frame_index = self._items[position]
+        self._index += 1
+
+        name = os.path.basename(file_path)
+        if frame_index is None:
+            labels = self.labels.get(name)
+        else:
+            labels = self.labels.get(f"{name}#{frame_index}")
+
+        if not file_path.lower().endswith(".npz"):
+            img = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+            if img is None:
+                return self.read(rects)
+            return position * FRAME_BUS_INTERVAL, [_image_to_tile(img)], labels
+
+        data = self._load_npz(file_path)
+        if frame_index is None:
+            return position * FRAME_BUS_INTERVAL, [_image_to_tile(data["frame"])], labels
+
+        tiles = []
+        for region_name, rect in zip(data["names"], data["rects"]):
+            valid = data.get(f"valid_{region_name}")
+            if valid is not None and not valid[frame_index]:
+                continue
+            roi = data[f"roi_{region_name}"][frame_index]
+            tiles.append(FrameTile(tuple(int(v) for v in rect), gray=roi))
+        return float(data["timestamps"][frame_index]), tiles, labels
+
+
+class VideoFrameSource(FrameSource):
+    """回放来源：录屏视频文件（cv2.VideoCapture 解码，一帧为一张整屏画面）"""
+
+    realtime = False
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise IOError(f"无法打开视频文件: {path}")
+        self.screen_size = (
+            int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+
+    def read(self, rects):
+        ok, img = self._cap.read()
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, img = self._cap.read()
+        if not ok:
+            return None
+        timestamp = self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        return timestamp, [_image_to_tile(img)], None
+
+    def close(self):
+        self._cap.release()
+
+
+def open_frame_source(path, loop=False):
+    """根据路径创建回放来源：视频文件使用VideoFrameSource，其余使用ImageDirFrameSource"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".mp4", ".avi", ".mkv", ".mov", ".wmv"):
+        return VideoFrameSource(path, loop)
+    return ImageDirFrameSource(path, loop)
+
+
+class FrameSubscription:
+    """帧总线订阅，记录订阅者关心的区域和已读取的最后一帧"""
+
+    def __init__(self, bus, name, regions):
+        self.bus = bus
+        self.name = name
+        self.regions = set(regions)
+        self.last_seq = 0
+
+    def set_regions(self, regions):
+        """更新订阅的区域，下一次截图生效"""
+        self.regions = set(regions)
+
+    def next_frame(self, timeout=1.0, newer_than=None):
+        """等待一帧本订阅者尚未读取过的帧
+
+        Args:
+            timeout: 最长等待时间（秒）
+            newer_than: 只接受截图时间不早于该时间戳的帧（动作执行后需要新画面时使用）
+
+        Returns:
+            Frame: 截图帧，超时返回None
+        """
+        return self.bus.wait_frame(self, timeout, newer_than)
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class FrameBus:
+    """共享截图帧总线
+
+    按需截图：只有订阅者在等待新帧时才截图，且两次截图间隔不小于interval，
+    同一周期内到来的其他订阅者直接复用同一帧。画面来自FrameSource，
+    默认是实时截图，也可以换成回放来源
+    """
+
+    def __init__(self, source=None, interval=FRAME_BUS_INTERVAL):
+        self.source = source if source is not None else MssFrameSource()
+        self.interval = interval
+        self.finished = False  # 回放来源已读完
+        self._cond = threading.Condition()
+        self._subscriptions = []
+        self._latest = None
+        self._seq = 0
+        self._wanted = False
+        self._thread = None
+        self._last_grab_time = 0.0
+        self.frame_listeners = []  # 每发布一帧调用一次 listener(frame)
+        self.grab_count = 0
+        self.grab_time_total = 0.0
+        self.frames_delivered = 0
+        self.tile_count = 0
+        self.pixels_grabbed = 0
+
+    def subscribe(self, name, regions):
+        sub = FrameSubscription(self, name, regions)
+        with self._cond:
+            self._subscriptions.append(sub)
+        self.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._cond:
+            if sub in self._subscriptions:
+                self._subscriptions.remove(sub)
+
+    def fetch(self, regions, timeout=1.0, newer_than=None):
+        """一次性读取包含指定区域的帧（用于偶尔需要截图的操作）"""
+        sub = self.subscribe("fetch", regions)
+        try:
+            return sub.next_frame(timeout, newer_than)
+        finally:
+            self.unsubscribe(sub)
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _accepts(self, frame, sub, newer_than):
+        if frame is None or frame.seq <= sub.last_seq:
+            return False
+        if newer_than is not None and frame.timestamp < newer_than:
+            return False
+        return frame.has_regions(sub.regions)
+
+    def wait_frame(self, sub, timeout=1.0, newer_than=None):
+        # 超时按真实时间计算（Condition.wait 等待的是真实时间），newer_than 按 clock 计算
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                frame = self._latest
+                if self._accepts(frame, sub, newer_than):
+                    sub.last_seq = frame.seq
+                    self.frames_delivered += 1
+                    return frame
+                if self.finished:
+                    return None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                # 通知截图线程有订阅者需要新帧
+                self._wanted = True
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+
+    def _collect_regions(self):
+        """汇总所有订阅者的区域，同一区域只截一次"""
+        names = set()
+        for sub in self._subscriptions:
+            names |= sub.regions
+        regions = {}
+        for name in names:
+            provider = FRAME_REGION_PROVIDERS.get(name)
+            rect = provider() if provider is not None else None
+            if rect is not None and rect[2] > 0 and rect[3] > 0:
+                regions[name] = tuple(int(v) for v in rect)
+        return regions
+
+    def set_source(self, source):
+        """切换画面来源（如切换到回放），下一次截图生效"""
+        with self._cond:
+            old_source = self.source
+            self.source = source
+            self.finished = False
+            self._latest = None
+        old_source.close()
+
+    def _grab(self, regions):
+        result = self.source.read(list(regions.values()))
+        if result is None:
+            return None
+        timestamp, tiles, labels = result
+        for tile in tiles:
+            self.tile_count += 1
+            self.pixels_grabbed += tile.rect[2] * tile.rect[3]
+        self._seq += 1
+        # 回放画面只有录制时的内容，不按订阅区域筛选
+        if not self.source.realtime:
+            regions = None
+        return Frame(self._seq, timestamp, tiles, regions, labels)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._wanted:
+                    self._cond.wait(0.5)
+                self._wanted = False
+                regions = self._collect_regions()
+                source = self.source
+
+            # 控制截图节奏：实时截图时两次截图间隔不小于一个周期
+            if source.realtime:
+                delay = self._last_grab_time + self.interval - clock.time()
+                if delay > 0:
+                    clock.sleep(delay)
+
+            try:
+                start = time.perf_counter()
+                frame = self._grab(regions)
+                self.grab_time_total += time.perf_counter() - start
+                self.grab_count += 1
+            except Exception as e:
+                print(f"❌ [错误] 截图线程异常: {e}")
+                # 截图句柄可能已失效，下次重新创建
+                source.reset()
+                clock.sleep(0.1)
+                continue
+
+            with self._cond:
+                if frame is None:
+                    self.finished = True
+                else:
+                    self._latest = frame
+                    self._last_grab_time = clock.time() if source.realtime else 0.0
+                self._cond.notify_all()
+
+            # 帧监听器（如画面录制器）在通知订阅者之后执行，不拖慢检测
+            if frame is not None:
+                for listener in self.frame_listeners:
+                    try:
+                        listener(frame)
+                    except Exception as e:
+                        print(f"⚠️  [警告] 帧监听器出错: {e}")
+
+    def get_stats(self):
+        """截图统计信息"""
+        avg_ms = self.grab_time_total / self.grab_count * 1000 if self.grab_count else 0
+        grabs = max(1, self.grab_count)
+        stats = {
+            "grab_count": self.grab_count,
+            "frames_delivered": self.frames_delivered,
+            "avg_grab_ms": round(avg_ms, 3),
+            "avg_tiles_per_grab": round(self.tile_count / grabs, 2),
+            "avg_pixels_per_grab": int(self.pixels_grabbed / grabs),
+            "subscribers": [sub.name for sub in self._subscriptions],
+        }
+        cost_model = getattr(self.source, "cost_model", None)
+        if cost_model is not None:
+            stats["grab_overhead_ms"] = round(cost_model.overhead * 1000, 3)
+            stats["grab_ns_per_pixel"] = round(cost_model.per_pixel * 1e9, 3)
+        return stats
+
+
+class SynchronousFrameBus(FrameBus):
+    """同步帧总线：不启动截图线程，订阅者需要新帧时直接在调用线程里截图
+
+    配合 SimulatedClock 在单线程里驱动状态机（离线回放），截图间隔同样按 interval 推进虚拟时间
+    """
+
+    def start(self):
+        pass
+
+    def wait_frame(self, sub, timeout=1.0, newer_than=None):
+        frame = self._latest
+        if not self._accepts(frame, sub, newer_than):
+            if self.finished:
+                return None
+            if self.source.realtime:
+                delay = self._last_grab_time + self.interval - clock.time()
+                if delay > 0:
+                    clock.sleep(delay)
+            start = time.perf_counter()
+            frame = self._grab(self._collect_regions())
+            self.grab_time_total += time.perf_counter() - start
+            self.grab_count += 1
+            if frame is None:
+                self.finished = True
+                return None
+            self._latest = frame
+            self._last_grab_time = clock.time() if self.source.realtime else 0.0
+            if not self._accepts(frame, sub, newer_than):
+                return None
+        sub.last_seq = frame.seq
+        self.frames_delivered += 1
+        return frame
+
+
+# 全局共享帧总线
+frame_bus = FrameBus()
+
+
+# =========================
+# 会话画面录制（异常时保存最近画面）
+# =========================
+frame_recorder_enabled = False  # 是否启用画面录制（默认关闭）
+frame_recorder_seconds = 10  # 保留最近多少秒的画面
+frame_recorder_budget_mb = 64  # 录制缓冲区内存上限（MB）
+frame_recorder_hotkey_name = "F9"  # 手动保存录制的热键
+FRAME_RECORDER_DIR = os.path.join(".", "录制")
+FRAME_RECORDER_MIN_DUMP_INTERVAL = 5.0  # 两次自动保存的最小间隔（秒）
+
+
+class FrameRecorder:
+    """会话画面录制器
+
+    在预先分配的环形缓冲区中保存最近N秒每个识别区域的灰度裁切图，
+    每帧只做内存拷贝，不分配新内存；缓冲区总大小不超过内存上限。
+    出现异常（断线/鱼跑了）、鱼桶满、OCR失败或按下热键时，
+    在后台线程把缓冲区压缩保存为 .npz，可直接用 ImageDirFrameSource 回放
+    """
+
+    def __init__(self, seconds, budget_mb, fps=1 / FRAME_BUS_INTERVAL):
+        self.capacity = max(1, int(seconds * fps))
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self._rings = {}  # 区域名称 -> (区域坐标, (N,h,w)灰度缓冲, (N,)有效标记)
+        self._head = 0  # 下一帧写入位置
+        self._count = 0
+        self._last_dump_time = 0.0
+        self._skipped_regions = set()
+
+    def reset(self, seconds, budget_mb):
+        """修改录制时长或内存上限，清空已录制的画面"""
+        with self._lock:
+            self.capacity = max(1, int(seconds * (1 / FRAME_BUS_INTERVAL)))
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+            self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+            self._rings = {}
+            self._head = 0
+            self._count = 0
+            self._skipped_regions = set()
+
+    def memory_bytes(self):
+        return sum(ring.nbytes for _, ring, _ in self._rings.values())
+
+    def _ring_for(self, name, rect):
+        """取区域的环形缓冲区，第一次出现或区域尺寸变化时分配"""
+        entry = self._rings.get(name)
+        if entry is not None and entry[0] == rect:
+            return entry
+        if entry is not None:
+            del self._rings[name]
+        need = self.capacity * rect[2] * rect[3]
+        if self.memory_bytes() + need > self.budget_bytes:
+            if name not in self._skipped_regions:
+                self._skipped_regions.add(name)
+                print(f"⚠️  [录制] 区域 {name} 超出录制内存上限，不录制该区域")
+            return None
+        entry = (
+            rect,
+            np.zeros((self.capacity, rect[3], rect[2]), dtype=np.uint8),
+            np.zeros(self.capacity, dtype=bool),
+        )
+        self._rings[name] = entry
+        return entry
+
+    def record(self, frame):
+        """记录一帧（帧总线的监听器，只录制实时截图）"""
+        if not frame_recorder_enabled or frame.regions is None:
+            return
+        with self._lock:
+            index = self._head
+            self._timestamps[index] = frame.timestamp
+            for _, _, valid in self._rings.values():
+                valid[index] = False
+            for name, rect in frame.regions.items():
+                gray = frame.gray(*rect)
+                if gray is None:
+                    continue
+                entry = self._ring_for(name, rect)
+                if entry is None:
+                    continue
+                np.copyto(entry[1][index], gray)
+                entry[2][index] = True
+            self._head = (index + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def dump(self, reason, force=False):
+        """把缓冲区保存为 .npz（后台线程写文件），返回保存路径，未保存返回None"""
+        if not frame_recorder_enabled:
+            return None
+        now = clock.time()
+        with self._lock:
+            if self._count == 0:
+                return None
+            if not force and now - self._last_dump_time < FRAME_RECORDER_MIN_DUMP_INTERVAL:
+                return None
+            self._last_dump_time = now
+            # 按时间顺序复制出快照，之后的写文件不再占用锁
+            order = (np.arange(self._count) + self._head - self._count) % self.capacity
+            arrays = {"timestamps": self._timestamps[order]}
+            names = []
+            rects = []
+            for name, (rect, ring, valid) in self._rings.items():
+                names.append(name)
+                rects.append(rect)
+                arrays[f"roi_{name}"] = ring[order]
+                arrays[f"valid_{name}"] = valid[order]
+        arrays["names"] = np.array(names)
+        arrays["rects"] = np.array(rects, dtype=np.int32).reshape(-1, 4)
+        arrays["screen"] = np.array([TARGET_WIDTH, TARGET_HEIGHT], dtype=np.int32)
+        arrays["reason"] = np.array(reason)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(FRAME_RECORDER_DIR, f"{timestamp}_{reason}.npz")
+
+        def _write():
+            try:
+                os.makedirs(FRAME_RECORDER_DIR, exist_ok=True)
+                np.savez_compressed(path, **arrays)
+                print(f"📼 [录制] 已保存最近 {len(order)} 帧画面 ({reason}): {path}")
+            except Exception as e:
+                print(f"❌ [错误] 保存录制画面失败: {e}")
+
+        threading.Thread(target=_write, daemon=True).start()
+        return path
+
+
+frame_recorder = FrameRecorder(frame_recorder_seconds, frame_recorder_budget_mb)
+frame_bus.frame_listeners.append(frame_recorder.record)
+
+
+# 各指示器的匹配度（最大匹配度，帧中没有该区域时返回None），识别函数按 match_threshold 判定
+def star_score(scr):
+    """上鱼星星的匹配度"""
+    # 确保模板已加载
+    if star_template is None:
+        load_star_template()
+    # 获取区域坐标并捕获灰度图
+    region_gray = capture_region(*region3_coords, scr)  # 直接传递解包后的参数和scr
+    if region_gray is None:
+        return None
+    # 画面没变时使用上次结果
+    return gated_template_score(
+        "fished",
+        region_gray,
+        star_template,
+        region3_coords,
+        base_template=load_base_template("star_grayscale.png"),
+        threshold=match_threshold("star"),
+    )
+
+
+def f1_score(scr):
+    """F1抛竿提示的匹配度"""
+    # 确保模板已加载
+    if f1 is None:
+        load_f1()
+    region_gray = capture_region(*region4_coords, scr)
+    if region_gray is None:
+        return None
+    return gated_template_score(
+        "f1_mached",
+        region_gray,
+        f1,
+        region4_coords,
+        base_template=load_base_template("F1_grayscale.png"),
+        threshold=match_threshold("f1"),
+    )
+
+
+def f2_score(scr):
+    """F2抛竿提示的匹配度"""
+    # 确保模板已加载
+    if f2 is None:
+        load_f2()
+    region_gray = capture_region(*region5_coords, scr)
+    if region_gray is None:
+        return None
+    return gated_template_score(
+        "f2_mached",
+        region_gray,
+        f2,
+        region5_coords,
+        base_template=load_base_template("F2_grayscale.png"),
+        threshold=match_threshold("f2"),
+    )
+
+
+def bite_score(scr):
+    """上鱼右键提示的匹配度"""
+    # 确保模板已加载
+    if shangyule is None:
+        load_shangyule()
+    region_gray = capture_region(*region6_coords, scr)
+    if region_gray is None:
+        return None
+    return gated_template_score(
+        "shangyu_mached",
+        region_gray,
+        shangyule,
+        region6_coords,
+        base_template=load_base_template("shangyu_grayscale.png"),
+        threshold=match_threshold("bite"),
+    )
+
+
+def jiashi_score(scr):
+    """加时界面的匹配度"""
+    global jiashi
+    # 确保模板已加载
+    if jiashi is None:
+        jiashi = load_jiashi()
+    if jiashi is None:
+        return None
+    region_gray = capture_region(*get_jiashi_region_coords(), scr)
+    if region_gray is None:
+        return None
+    # 区域比模板小时 match_template_max 返回None
+    max_val = match_template_max(
+        region_gray,
+        jiashi,
+        load_base_template("chang_grayscale.png"),
+        track="fangzhu_jiashi",
+        threshold=match_threshold("jiashi"),
+    )
+    return 0.0 if max_val is None else float(max_val)
+
+
+def uno_tiao_score(scr):
+    """UNO条的匹配度"""
+    # 确保模板已加载
+    if tiao_template is None:
+        load_tiao_template()
+    if tiao_template is None:
+        return None
+    region_gray = capture_region(*get_uno_tiao_region_coords(), scr)
+    if region_gray is None:
+        return None
+    max_val = match_template_max(
+        region_gray,
+        tiao_template,
+        load_base_template("tiao.png"),
+        track="uno_recognize_tiao",
+        threshold=match_threshold("uno_tiao"),
+    )
+    return 0.0 if max_val is None else float(max_val)
+
+
+# 识别钓上鱼
+def fished(scr):
+    # 检查最大匹配度是否大于阈值
+    score = star_score(scr)
+    return None if score is None else score > match_threshold("star")
+
+
+def f1_mached(scr):
+    score = f1_score(scr)
+    return None if score is None else score > match_threshold("f1")
+
+
+# 识别UNO条
+def uno_recognize_tiao(scr):
+    """识别UNO条模板
+
+    Args:
+        scr: 截图对象
+
+    Returns:
+        bool: 是否识别成功
+    """
+    # 确保模板已加载
+    if tiao_template is None:
+        print("⚠️ [UNO] 模板未加载，尝试重新加载...")
+        load_tiao_template()
+
+    if tiao_template is None:
+        print("❌ [UNO] 模板加载失败，无法识别")
+        return False
+
+    # 2K分辨率(2560×1440)下的原始坐标 (2242, 1314, 284, 100)
+    # 使用与鱼饵识别相同的缩放逻辑，UI元素通常锚定在角落
+    match_result = uno_tiao_score(scr)
+    if match_result is None:
+        scaled_x, scaled_y, scaled_width, scaled_height = get_uno_tiao_region_coords()
+        print(
+            f"❌ [UNO] 区域捕获失败 (缩放后: {scaled_x}, {scaled_y}, {scaled_width}, {scaled_height})"
+        )
+        return False
+
+    is_match = match_result > match_threshold("uno_tiao")
+    print(f"🎮 [UNO] 识别结果: {'成功' if is_match else '失败'} (匹配度: {match_result:.2f})")
+    return is_match
+
+
+# 加载UNO条模板
+def load_tiao_template():
+    """加载UNO条模板
+
+    Returns:
+        numpy.ndarray: 加载的模板
+    """
+    global tiao_template
+    if tiao_template is None:
+        try:
+            # 模板仓库统一转换为单通道灰度图像
+            tiao_template = template_store.get("tiao.png")
+            print("✅ [UNO] 模板加载成功")
+        except Exception as e:
+            print(f"❌ [UNO] 模板加载失败: {e}")
+            tiao_template = None
+    return tiao_template
+
+
+# 计算UNO点击位置
+def calculate_click_position():
+    """根据当前分辨率计算UNO点击位置
+
+    Returns:
+        tuple: (x, y) 点击位置
+    """
+    # 2K分辨率(2560×1440)下的原始位置
+    base_x = 2381
+    base_y = 1353
+
+    # 获取当前分辨率
+    current_width, current_height = get_current_screen_resolution()
+
+    # 使用与鱼饵识别相同的缩放逻辑，UI元素通常锚定在角落
+    scaled_x, scaled_y = scale_position(
+        base_x, base_y, anchor="bottom_right", coordinate_type="point"
+    )
+
+    print(
+        f"🎮 [UNO] 分辨率 {current_width}×{current_height}，缩放比例 X={SCALE_X:.2f}, Y={SCALE_Y:.2f}，点击位置: ({scaled_x}, {scaled_y})"
+    )
+    return (scaled_x, scaled_y)
+
+
+# UNO主处理函数
+def uno_process(scr):
+    """处理UNO卡识别和计数
+
+    Args:
+        scr: 截图对象
+
+    Returns:
+        bool: 是否处理成功
+    """
+    global uno_input1_var, uno_input2_var
+
+    # 检查变量是否已初始化
+    if uno_input1_var is None or uno_input2_var is None:
+        print("❌ [UNO] 计数变量未初始化")
+        return False
+
+    # 识别UNO条
+    if uno_recognize_tiao(scr):
+        # 获取当前牌数和抽取牌数
+        current_cards = uno_input1_var.get()
+        max_cards = uno_input2_var.get()
+
+        print(f"🎮 [UNO] 当前牌数: {current_cards}, 抽取牌数: {max_cards}")
+
+        # 当前牌数+1
+        new_cards = current_cards + 1
+        uno_input1_var.set(new_cards)
+        print(f"🎮 [UNO] 牌数更新: {current_cards} → {new_cards}")
+
+        # 检查是否达到抽取牌数且未显示过弹窗
+        if new_cards >= max_cards and not uno_popup_shown:
+            print(f"🎮 [UNO] 已达到抽取牌数: {new_cards}/{max_cards}")
+            # 显示弹窗并获取用户选择
+            continue_operation = uno_show_popup()
+            # 如果用户选择暂停，返回False
+            if not continue_operation:
+                print(f"🎮 [UNO] 已暂停操作")
+                return False
+
+        return True
+    return False
+
+
+# UNO持续识别函数
+def uno_continuous_recognition():
+    """持续识别UNO卡并执行点击操作
+
+    该函数在单独线程中运行，直到uno_recognition_running为False
+    """
+    global uno_recognition_running
+
+    print("🎮 [UNO] 开始持续识别")
+
+    # 订阅共享帧总线，只关心UNO条区域
+    uno_sub = frame_bus.subscribe("uno", ["uno_tiao"])
+
+    try:
+        while uno_recognition_running:
+            scr = uno_sub.next_frame()
+            # 识别UNO条
+            if uno_recognize_tiao(scr):
+                # 获取当前牌数和抽取牌数
+                current_cards = uno_input1_var.get()
+                max_cards = uno_input2_var.get()
+
+                print(f"🎮 [UNO] 当前牌数: {current_cards}, 抽取牌数: {max_cards}")
+
+                # 当前牌数+1并执行点击
+                new_cards = current_cards + 1
+                uno_input1_var.set(new_cards)
+                print(f"🎮 [UNO] 牌数更新: {current_cards} → {new_cards}")
+
+                # 计算点击位置
+                click_x, click_y = calculate_click_position()
+
+                # 执行点击操作（移动和点击合并为一次发送）
+                with input_backend.batched():
+                    input_backend.move(click_x, click_y)
+                    input_backend.click("left")
+                print(f"🎮 [UNO] 执行点击: ({click_x}, {click_y})")
+
+                # 检查是否达到抽取牌数且未显示过弹窗
+                if new_cards >= max_cards and not uno_popup_shown:
+                    print(f"🎮 [UNO] 已达到抽取牌数: {new_cards}/{max_cards}")
+                    # 显示弹窗并获取用户选择
+                    continue_operation = uno_show_popup()
+                    # 如果用户选择暂停，停止持续识别
+                    if not continue_operation:
+                        print(f"🎮 [UNO] 已暂停持续识别")
+                        uno_recognition_running = False
+
+            # 延迟一段时间，避免过于频繁的识别
+            clock.sleep(0.5)
+    except Exception as e:
+        print(f"❌ [UNO] 持续识别出错: {e}")
+    finally:
+        # 取消订阅
+        uno_sub.close()
+        print("🎮 [UNO] 持续识别停止")
+
+
+# 启动UNO持续识别
+def uno_start_continuous_recognition():
+    """启动UNO持续识别
+
+    该函数负责创建和启动持续识别线程
+    """
+    global uno_recognition_running, uno_recognition_thread, uno_input1_var, uno_popup_shown
+
+    if not uno_recognition_running:
+        # 重置当前牌数为7
+        uno_input1_var.set(7)
+        print("🎮 [UNO] 当前牌数已重置为7")
 
         # 重置弹窗显示标志位
         uno_popup_shown = False
 
-        # 设置识别状态为True
-        uno_recognition_running = True
+        # 设置识别状态为True
+        uno_recognition_running = True
+
+        # 创建并启动线程
+        import threading
+
+        uno_recognition_thread = threading.Thread(
+            target=uno_continuous_recognition, daemon=True
+        )
+        uno_recognition_thread.start()
+
+        print("🎮 [UNO] 持续识别已启动")
+        return True
+    else:
+        print("🎮 [UNO] 持续识别已在运行")
+        return False
+
+
+# 停止UNO持续识别
+def uno_stop_continuous_recognition():
+    """停止UNO持续识别
+
+    该函数负责停止持续识别线程
+    """
+    global uno_recognition_running, uno_recognition_thread
+
+    if uno_recognition_running:
+        # 设置识别状态为False
+        uno_recognition_running = False
+
+        # 等待线程结束
+        if uno_recognition_thread is not None:
+            uno_recognition_thread.join(timeout=1.0)  # 等待1秒
+            uno_recognition_thread = None
+
+        print("🎮 [UNO] 持续识别已停止")
+        return True
+    else:
+        print("🎮 [UNO] 持续识别未在运行")
+        return False
+
+
+# UNO弹窗函数
+def uno_show_popup():
+    """显示UNO暂停/继续弹窗
+
+    弹窗5秒后自动选择继续
+    """
+    # 不直接使用global root，改为检查root是否已定义
+    global root, uno_popup_shown
+    if root is None:
+        print("⚠️ [UNO] 无法显示弹窗，root未定义")
+        return
+
+    # 弹窗显示后设置标志位为True
+    uno_popup_shown = True
+
+    # 创建弹窗
+    popup = tk.Toplevel(root)
+    popup.title("🎮 UNO 提示")
+    popup.geometry("300x150")
+    popup.resizable(False, False)
+    popup.grab_set()  # 模态窗口
+    popup.attributes("-topmost", True)  # 弹窗置顶显示
+
+    # 设置样式
+    popup.configure(background="#2d3748")
+
+    # 添加标题
+    title_label = ttkb.Label(
+        popup,
+        text="🎮 UNO 操作提示",
+        font=("Segoe UI", 12, "bold"),
+        bootstyle="primary",
+    )
+    title_label.pack(pady=15)
+
+    # 添加提示文本
+    text_label = ttkb.Label(
+        popup, text="是否继续操作？", font=("Segoe UI", 10), bootstyle="light"
+    )
+    text_label.pack(pady=5)
+
+    # 继续标志
+    continue_flag = [False]
+
+    # 暂停按钮回调
+    def on_pause():
+        continue_flag[0] = False
+        print("🎮 [UNO] 用户选择暂停")
+        popup.destroy()
+
+    # 继续按钮回调
+    def on_continue():
+        continue_flag[0] = True
+        print("🎮 [UNO] 用户选择继续")
+        popup.destroy()
+
+    # 按钮框架
+    btn_frame = ttkb.Frame(popup)
+    btn_frame.pack(pady=20)
+
+    # 暂停按钮
+    pause_btn = ttkb.Button(
+        btn_frame, text="暂停", bootstyle="danger", width=10, command=on_pause
+    )
+    pause_btn.pack(side=LEFT, padx=10)
+
+    # 继续按钮
+    continue_btn = ttkb.Button(
+        btn_frame, text="继续", bootstyle="success", width=10, command=on_continue
+    )
+    continue_btn.pack(side=RIGHT, padx=10)
+
+    # 设置5秒自动继续
+    popup.after(5000, on_continue)
+
+    # 等待弹窗关闭
+    popup.wait_window()
+
+    return continue_flag[0]
+
+
+def f2_mached(scr):
+    score = f2_score(scr)
+    return None if score is None else score > match_threshold("f2")
+
+
+def shangyu_mached(scr):
+    score = bite_score(scr)
+    return None if score is None else score > match_threshold("bite")
+
+
+def fangzhu_jiashi(scr):
+    # 记录日志：开始加时识别
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "action": "jiashi_recognition_start",
+            "message": "开始识别加时界面",
+        }
+        add_debug_info(debug_info)
+
+    # 使用缓存的坐标（未初始化时会先更新）
+    actual_x, actual_y, actual_w, actual_h = get_jiashi_region_coords()
+
+    # 记录日志：识别区域
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "action": "jiashi_recognition_region",
+            "message": "加时识别区域",
+            "region": {
+                "x1": actual_x,
+                "y1": actual_y,
+                "x2": actual_x + actual_w,
+                "y2": actual_y + actual_h,
+            },
+        }
+        add_debug_info(debug_info)
+
+    # 模板加载失败或无法获取区域图像时为None
+    score = jiashi_score(scr)
+    if score is None:
+        # 记录日志：识别失败
+        if debug_mode:
+            debug_info = {
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "action": "jiashi_recognition_failed",
+                "message": "无法获取加时区域图像",
+            }
+            add_debug_info(debug_info)
+        return False
+
+    result = score > match_threshold("jiashi")
+
+    # 记录日志：识别结果
+    if debug_mode:
+        debug_info = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "action": "jiashi_recognition_result",
+            "message": "加时识别完成",
+            "result": "是" if result else "否",
+            "parsed_info": {"加时界面": "已识别" if result else "未识别"},
+        }
+        add_debug_info(debug_info)
+
+    return result
+
+
+# =========================
+# 游戏状态分类器
+# =========================
+# 指示器名称（与帧总线区域名称相同）-> 匹配度函数、默认判定阈值（阈值文件中有标定结果时以标定结果为准）、
+# 代表的游戏状态和优先级。
+# 同一帧中多个指示器成立时取优先级最高的状态（加时 > 上鱼星星 > 上鱼提示 > 抛竿提示 > UNO条）。
+# critical 的指示器（加时、上鱼星星、F1/F2）决定收线时的加时处理和断线/跑鱼判断，调用方把没识别的
+# 指示器当作不成立，所以即使超出耗时预算也不跳过
+GAME_STATE_INDICATORS = {
+    "jiashi": {
+        "score": jiashi_score,
+        "threshold": MATCH_THRESHOLD_DEFAULT,
+        "state": "OVERTIME_PROMPT",
+        "priority": 50,
+        "critical": True,
+    },
+    "star": {
+        "score": star_score,
+        "threshold": MATCH_THRESHOLD_DEFAULT,
+        "state": "FISH_LANDED",
+        "priority": 40,
+        "critical": True,
+    },
+    "bite": {
+        "score": bite_score,
+        "threshold": MATCH_THRESHOLD_DEFAULT,
+        "state": "BITE",
+        "priority": 30,
+    },
+    "f1": {
+        "score": f1_score,
+        "threshold": MATCH_THRESHOLD_DEFAULT,
+        "state": "READY_TO_CAST",
+        "priority": 20,
+        "critical": True,
+    },
+    "f2": {
+        "score": f2_score,
+        "threshold": MATCH_THRESHOLD_DEFAULT,
+        "state": "READY_TO_CAST",
+        "priority": 20,
+        "critical": True,
+    },
+    "uno_tiao": {
+        "score": uno_tiao_score,
+        "threshold": MATCH_THRESHOLD_DEFAULT,
+        "state": "UNO",
+        "priority": 10,
+    },
+}
+# 每个指示器单次识别的耗时预算（毫秒），平均耗时超过预算时降频运行（critical 的指示器不受预算限制）
+GAME_STATE_INDICATOR_BUDGET_MS = {
+    "jiashi": 2.0,
+    "star": 2.0,
+    "bite": 2.0,
+    "f1": 2.0,
+    "f2": 2.0,
+    "uno_tiao": 5.0,
+}
+
+
+class GameStateClassifier:
+    """游戏状态分类器：一帧画面 -> 每个指示器的匹配度（状态向量）和判定出的游戏状态
+
+    指示器按测得的平均耗时从低到高依次识别；已成立的指示器优先级不低于所有尚未识别的指示器时，
+    状态已经确定，提前结束。平均耗时超过预算的指示器隔帧运行，连续跳过 max_skip 次后必定运行一次；
+    critical 的指示器不受预算限制，每次都运行
+    """
+
+    def __init__(self, indicators, budgets=None, max_skip=2, smoothing=0.2):
+        self.indicators = indicators
+        self.budgets = dict(budgets or {})
+        self.max_skip = max_skip
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._cost = {name: 0.0 for name in indicators}  # 平均耗时（秒，指数滑动平均）
+        self._skips = {name: 0 for name in indicators}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.classifications = 0
+            self.stats = {
+                name: {"runs": 0, "time": 0.0, "confirmed": 0, "early_exit": 0, "over_budget": 0}
+                for name in self.indicators
+            }
+
+    def classify(self, frame, names=None):
+        """识别一帧画面
+
+        Args:
+            frame: 截图帧
+            names: 需要识别的指示器，None 表示全部
+
+        Returns:
+            dict: state（优先级最高的成立状态，没有时为None）、confidence（指示器 -> 匹配度，
+            未识别或帧中没有该区域时为None）、confirmed（成立的指示器）、evaluated（实际识别的指示器）、
+            early_exit（状态确定后跳过的指示器）、over_budget（超出预算被跳过的指示器）、latency_ms
+        """
+        start = time.perf_counter()
+        names = list(self.indicators) if names is None else [n for n in names if n in self.indicators]
+        with self._lock:
+            order = sorted(names, key=lambda n: (self._cost[n], -self.indicators[n]["priority"]))
+        confidence = {name: None for name in names}
+        confirmed, evaluated, early_exit, over_budget = [], [], [], []
+
+        for i, name in enumerate(order):
+            spec = self.indicators[name]
+            if confirmed:
+                best = max(self.indicators[n]["priority"] for n in confirmed)
+                if all(self.indicators[n]["priority"] <= best for n in order[i:]):
+                    early_exit = order[i:]
+                    break
+            budget = None if spec.get("critical") else self.budgets.get(name)
+            with self._lock:
+                if budget is not None and self._cost[name] * 1000 > budget:
+                    if self._skips[name] < self.max_skip:
+                        self._skips[name] += 1
+                        self.stats[name]["over_budget"] += 1
+                        over_budget.append(name)
+                        continue
+                self._skips[name] = 0
+
+            t0 = time.perf_counter()
+            score = spec["score"](frame)
+            elapsed = time.perf_counter() - t0
+            confidence[name] = score
+            evaluated.append(name)
+            is_confirmed = score is not None and score > match_threshold(name, spec["threshold"])
+            if is_confirmed:
+                confirmed.append(name)
+            with self._lock:
+                cost = self._cost[name]
+                self._cost[name] = elapsed if cost == 0.0 else cost + (elapsed - cost) * self.smoothing
+                stats = self.stats[name]
+                stats["runs"] += 1
+                stats["time"] += elapsed
+                stats["confirmed"] += is_confirmed
+
+        with self._lock:
+            self.classifications += 1
+            for name in early_exit:
+                self.stats[name]["early_exit"] += 1
+        state = None
+        if confirmed:
+            state = self.indicators[max(confirmed, key=lambda n: self.indicators[n]["priority"])]["state"]
+        if debug_mode:
+            add_debug_info(
+                {
+                    "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                    "action": "game_state_classified",
+                    "message": "游戏状态识别完成",
+                    "result": state,
+                    "parsed_info": {
+                        name: round(score, 3) for name, score in confidence.items() if score is not None
+                    },
+                }
+            )
+        return {
+            "state": state,
+            "confidence": confidence,
+            "confirmed": confirmed,
+            "evaluated": evaluated,
+            "early_exit": early_exit,
+            "over_budget": over_budget,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "classifications": self.classifications,
+                "indicators": {
+                    name: {
+                        "runs": stats["runs"],
+                        "avg_ms": stats["time"] / stats["runs"] * 1000 if stats["runs"] else 0.0,
+                        "confirmed": stats["confirmed"],
+                        "early_exit": stats["early_exit"],
+                        "over_budget": stats["over_budget"],
+                    }
+                    for name, stats in self.stats.items()
+                },
+            }
+
+
+game_state_classifier = GameStateClassifier(GAME_STATE_INDICATORS, GAME_STATE_INDICATOR_BUDGET_MS)
+
+
+def print_game_state_classifier_stats():
+    """打印各指示器的识别次数、平均耗时、提前结束和超出预算跳过的次数"""
+    stats = game_state_classifier.get_stats()
+    if not stats["classifications"]:
+        return
+    summary = "，".join(
+        f"{name} {s['runs']}次/{s['avg_ms']:.2f}ms"
+        + (f"/提前跳过{s['early_exit']}" if s["early_exit"] else "")
+        + (f"/超预算{s['over_budget']}" if s["over_budget"] else "")
+        for name, s in stats["indicators"].items()
+        if s["runs"] or s["early_exit"] or s["over_budget"]
+    )
+    print(f"📊 [统计] 状态识别 {stats['classifications']} 次: {summary}")
+
+
+# =========================
+# 程序主循环与热键监听
+# =========================
+def toggle_run():
+    global a, previous_result, scr
+    if run_event.is_set():
+        run_event.clear()  # 暂停
+        a = 0
+        previous_result = None
+        ensure_mouse_up()  # 确保鼠标没有按下
+        end_current_session()  # 结束钓鱼会话
+
+        # 播放暂停音效
+        sound_manager.play_pause()
+
+        print("⏸️  [状态] 脚本已暂停")
+        print_roi_change_gate_stats()
+        print_fishing_fsm_stats()
+        print_input_backend_stats()
+        print_bait_recognizer_stats()
+        print_template_store_stats()
+        print_game_state_classifier_stats()
+        print_roi_tracker_stats()
+        print_ocr_worker_stats()
+        print_ocr_cache_stats()
+        ocr_result_cache.flush()
+        print_banner_quality_stats()
+        print_fish_name_resolver_stats()
+
+    else:
+        # 重置鱼桶满检测状态
+        reset_fish_bucket_full_detection()
+
+        start_new_session()  # 开始新的钓鱼会话
+        if previous_result is None:
+            try:
+                bait_result = bait_math_val(frame_bus.fetch(["bait"]))
+                if bait_result is not None:
+                    previous_result = result_val_is
+                    run_event.set()  # 恢复运行
+
+                    # 播放启动音效
+                    sound_manager.play_start()
+
+                    print("▶️  [状态] 脚本开始运行")
+
+                else:
+                    clock.sleep(0.1)
+                    print("⚠️  [警告] 未识别到鱼饵，请确保游戏界面正确")
+            except Exception as e:
+                print(f"❌ [错误] 初始化失败: {e}")
+            finally:
+                scr = None
+        else:
+            run_event.set()
+            # 播放恢复音效
+            sound_manager.play_resume()
+            print("▶️  [状态] 脚本继续运行")
+
+
+def on_press(key):
+    global current_modifiers
+    time.sleep(0.02)
+
+    # 检查是否是修饰键
+    if key in MODIFIER_KEYS:
+        current_modifiers.add(MODIFIER_KEYS[key])
+        return
+
+    # 检查是否匹配热键
+    check_hotkey_match(key)
+
+
+def on_release(key):
+    global current_modifiers
+    # 释放修饰键时移除
+    if key in MODIFIER_KEYS:
+        current_modifiers.discard(MODIFIER_KEYS[key])
+
+
+def on_mouse_press(x, y, button, pressed):
+    """鼠标按下事件处理"""
+    if not pressed:
+        return
+
+    # 检查是否匹配热键
+    check_hotkey_match(button)
+
+
+def check_hotkey_match(key):
+    """检查按键是否匹配热键"""
+    # 比较主按键
+    main_key_match = False
+    uno_key_match = False
+
+    # 直接比较按键对象
+    if key == hotkey_main_key:
+        main_key_match = True
+    if key == uno_hotkey_main_key:
+        uno_key_match = True
+
+    # 虚拟键码比较
+    elif hasattr(key, "vk"):
+        # 检查主热键
+        if hasattr(hotkey_main_key, "vk") and hotkey_main_key.vk is not None:
+            if key.vk is not None:
+                main_key_match = key.vk == hotkey_main_key.vk
+        # 检查UNO热键
+        if hasattr(uno_hotkey_main_key, "vk") and uno_hotkey_main_key.vk is not None:
+            if key.vk is not None:
+                uno_key_match = key.vk == uno_hotkey_main_key.vk
+
+    # 字符键比较（忽略大小写）
+    elif hasattr(key, "char") and key.char:
+        # 检查主热键
+        if hasattr(hotkey_main_key, "char") and hotkey_main_key.char:
+            main_key_match = key.char.lower() == hotkey_main_key.char.lower()
+        # 检查UNO热键
+        if hasattr(uno_hotkey_main_key, "char") and uno_hotkey_main_key.char:
+            uno_key_match = key.char.lower() == uno_hotkey_main_key.char.lower()
+
+    # 鼠标按键比较
+    elif isinstance(key, mouse.Button):
+        # 检查主热键
+        if isinstance(hotkey_main_key, mouse.Button):
+            main_key_match = key == hotkey_main_key
+        # 检查UNO热键
+        if isinstance(uno_hotkey_main_key, mouse.Button):
+            uno_key_match = key == uno_hotkey_main_key
+
+    # 画面录制热键（仅启用录制时生效）
+    if frame_recorder_enabled and key == frame_recorder_hotkey_main_key:
+        frame_recorder.dump("hotkey", force=True)
+        return
+
+    # 处理主热键匹配
+    if main_key_match:
+        # 检查修饰键是否匹配
+        if current_modifiers == hotkey_modifiers:
+            toggle_run()  # 暂停或恢复程序
+            return
+
+    # 处理UNO热键匹配
+    if uno_key_match:
+        # 检查修饰键是否匹配
+        if current_modifiers == uno_hotkey_modifiers:
+            print(f"🎮 [UNO] 热键 {uno_hotkey_name} 被触发")
+            # 切换持续识别状态
+            global uno_recognition_running
+            if uno_recognition_running:
+                # 如果正在识别，停止识别
+                uno_stop_continuous_recognition()
+                print("🎮 [UNO] 已停止持续识别")
+            else:
+                # 如果未在识别，启动识别
+                uno_start_continuous_recognition()
+                print("🎮 [UNO] 已启动持续识别")
+            return
+
+
+def start_hotkey_listener():
+    global listener, mouse_listener
+    # 启动键盘监听器，设置suppress=False允许事件传递，确保全局监听
+    if listener is None or not listener.running:
+        listener = keyboard.Listener(
+            on_press=on_press,
+            on_release=on_release,
+            suppress=False,  # 不抑制事件，允许其他应用程序接收按键
+        )
+        listener.daemon = True
+        listener.start()
+
+    # 启动鼠标监听器
+    if (
+        "mouse_listener" not in globals()
+        or mouse_listener is None
+        or not mouse_listener.running
+    ):
+        mouse_listener = mouse.Listener(
+            on_click=on_mouse_press,
+            suppress=False,  # 不抑制事件，允许其他应用程序接收鼠标事件
+        )
+        mouse_listener.daemon = True
+        mouse_listener.start()
+
+
+# =========================
+# 主函数
+# =========================
+# 主函数：定时识别并比较数字
+def handle_jiashi_thread():
+    global run_event, previous_result, result_val_is
+    # 订阅共享帧总线，与主循环共用同一次截图
+    jiashi_sub = frame_bus.subscribe("jiashi", ["jiashi"])
+    while True:
+        if run_event.is_set():
+            try:
+                scr = jiashi_sub.next_frame(timeout=0.5)
+                overtime = (
+                    scr is not None
+                    and game_state_classifier.classify(scr, ["jiashi"])["state"] == "OVERTIME_PROMPT"
+                )
+                if overtime:
+                    # 处理加时选择（使用锁保护读取jiashi_var）
+                    with param_lock:
+                        current_jiashi = jiashi_var
+
+                    if current_jiashi == 0:
+                        # 确保按钮坐标已初始化
+                        if btn_no_jiashi_coords is None:
+                            update_region_coords()
+                        btn_x, btn_y = btn_no_jiashi_coords
+                        input_backend.move(btn_x, btn_y)
+                        clock.sleep(0.05)
+                        input_backend.mouse_down()
+                        clock.sleep(0.1)
+                        input_backend.mouse_up()
+                        clock.sleep(0.05)
+                        if bait_math_val(
+                            frame_bus.fetch(["bait"], newer_than=clock.time())
+                        ):
+                            with param_lock:
+                                previous_result = result_val_is
+                    elif current_jiashi == 1:
+                        # 确保按钮坐标已初始化
+                        if btn_yes_jiashi_coords is None:
+                            update_region_coords()
+                        btn_x, btn_y = btn_yes_jiashi_coords
+                        input_backend.move(btn_x, btn_y)
+                        clock.sleep(0.05)
+                        input_backend.mouse_down()
+                        clock.sleep(0.1)
+                        input_backend.mouse_up()
+                        clock.sleep(0.05)
+                        if bait_math_val(
+                            frame_bus.fetch(["bait"], newer_than=clock.time())
+                        ):
+                            with param_lock:
+                                previous_result = result_val_is
+            except Exception as e:
+                print(f"❌ [错误] 加时线程异常: {e}")
+        clock.sleep(0.05)
+
+
+# =========================
+# 钓鱼流程状态机
+# =========================
+# 每个状态需要运行的检测器及检测间隔（秒），主循环只截取和识别当前状态需要的区域。
+# 检测器名称与帧总线的区域名称相同
+FISHING_STATE_DETECTORS = {
+    # 待机：不确定处于哪个阶段，全部检测
+    "IDLE": {"jiashi": 0.05, "f1": 0.05, "f2": 0.05, "bite": 0.05, "bait": 0.05},
+    # 抛竿：执行按住鼠标的动作，不需要检测
+    "CASTING": {},
+    # 等待上鱼：主要看鱼饵数量和上鱼提示，F1/F2（鱼跑了回到抛竿界面）和加时低频检测
+    "WAITING_BITE": {"bait": 0.05, "bite": 0.05, "f1": 0.2, "f2": 0.2, "jiashi": 0.2},
+    # 收线：收线循环内每次拉杆后检测星星
+    "REELING": {},
+    # 上岸：识别并记录鱼的信息
+    "LANDED": {},
+    # 加时提示：处理加时后回到之前的状态
+    "OVERTIME_PROMPT": {"jiashi": 0.0},
+    # 放生：由 release_fish 进入和退出
+    "RELEASING": {},
+    # 鱼桶满：等待检测状态被重置
+    "BUCKET_FULL": {},
+}
+
+# 检测器名称 -> 检测函数
+FISHING_STATE_DETECTOR_FUNCS = {
+    "jiashi": fangzhu_jiashi,
+    "f1": f1_mached,
+    "f2": f2_mached,
+    "bite": shangyu_mached,
+    "bait": bait_math_val,
+}
+
+
+class FishingStateMachine:
+    """钓鱼流程状态机
+
+    记录当前状态和每次状态切换（带时间戳），统计各状态停留时间和每轮钓鱼耗时
+    （从一次抛竿到下一次抛竿）。状态切换可能来自主循环以外的线程（放生、鱼桶满），用锁保护
+    """
+
+    def __init__(self, state="IDLE"):
+        self._lock = threading.Lock()
+        self.state = state
+        self.entered_at = clock.time()
+        self.return_state = state  # 加时提示处理完后返回的状态
+        self.history = []  # (时间戳, 原状态, 新状态, 原因)，最多保留 HISTORY_LIMIT 条
+        self.state_time = {name: 0.0 for name in FISHING_STATE_DETECTORS}
+        self.cycle_times = []  # 每轮钓鱼耗时（秒）
+        self._cycle_start = None
+        self._last_run = {}  # 检测器名称 -> 上次运行时间
+
+    HISTORY_LIMIT = 500
+
+    def transition(self, new_state, reason=""):
+        """切换状态，返回原状态"""
+        with self._lock:
+            old_state = self.state
+            if new_state == old_state:
+                return old_state
+            now = clock.time()
+            self.state_time[old_state] += now - self.entered_at
+            if new_state == "OVERTIME_PROMPT":
+                self.return_state = old_state
+            if new_state == "CASTING":
+                if self._cycle_start is not None:
+                    self.cycle_times.append(now - self._cycle_start)
+                self._cycle_start = now
+            self.state = new_state
+            self.entered_at = now
+            self._last_run.clear()  # 进入新状态后所有检测器立即运行一次
+            self.history.append((now, old_state, new_state, reason))
+            if len(self.history) > self.HISTORY_LIMIT:
+                self.history.pop(0)
+        stamp = datetime.datetime.fromtimestamp(now).strftime("%H:%M:%S.%f")[:-3]
+        detail = f"（{reason}）" if reason else ""
+        print(f"🔀 [状态] {stamp} {old_state} → {new_state}{detail}")
+        return old_state
+
+    def due_detectors(self, now=None):
+        """返回当前状态下已到检测时间的检测器名称"""
+        if now is None:
+            now = clock.time()
+        with self._lock:
+            spec = FISHING_STATE_DETECTORS[self.state]
+            return [
+                name
+                for name, interval in spec.items()
+                if now - self._last_run.get(name, 0.0) >= interval
+            ]
+
+    def mark_run(self, names, now=None):
+        if now is None:
+            now = clock.time()
+        with self._lock:
+            for name in names:
+                self._last_run[name] = now
+
+    def reset(self):
+        """回到待机状态并清除本轮计时（暂停时调用）"""
+        self.transition("IDLE", "重置")
+        with self._lock:
+            self._cycle_start = None
+
+    def get_stats(self):
+        """返回钓鱼轮数、平均/最短/最长每轮耗时以及各状态累计停留时间"""
+        with self._lock:
+            state_time = dict(self.state_time)
+            state_time[self.state] += clock.time() - self.entered_at
+            cycles = list(self.cycle_times)
+        return {
+            "cycles": len(cycles),
+            "avg_cycle": sum(cycles) / len(cycles) if cycles else 0.0,
+            "min_cycle": min(cycles) if cycles else 0.0,
+            "max_cycle": max(cycles) if cycles else 0.0,
+            "state_time": state_time,
+        }
+
+
+fishing_fsm = FishingStateMachine()
+
+
+def print_fishing_fsm_stats(stats=None):
+    """打印每轮钓鱼耗时和各状态停留时间"""
+    if stats is None:
+        stats = fishing_fsm.get_stats()
+    if not stats["cycles"]:
+        return
+    print(
+        f"📊 [统计] 共 {stats['cycles']} 轮，平均每轮 {stats['avg_cycle']:.1f}s"
+        f"（最短 {stats['min_cycle']:.1f}s，最长 {stats['max_cycle']:.1f}s）"
+    )
+    total = sum(stats["state_time"].values()) or 1.0
+    summary = "，".join(
+        f"{name} {seconds:.0f}s ({seconds / total * 100:.0f}%)"
+        for name, seconds in stats["state_time"].items()
+        if seconds >= 0.5
+    )
+    print(f"📊 [统计] 各状态停留时间: {summary}")
+
+
+def fishing_state_ready(fsm, sub, scr, results):
+    """待机/等待上鱼：处理加时、抛竿提示、上鱼提示，并比较鱼饵数量判断是否上鱼"""
+    global current_result, previous_result
+
+    if results.get("jiashi"):
+        fsm.transition("OVERTIME_PROMPT", "检测到加时")
+        return
+
+    # 检测F1/F2抛竿
+    if results.get("f1") or results.get("f2"):
+        fsm.transition("CASTING", "F1/F2")
+        return
+
+    if results.get("bite"):
+        input_backend.mouse_down()
+        clock.sleep(0.1)
+        input_backend.mouse_up()
+        return
+
+    if "bait" not in results:
+        return
+
+    # 获取当前结果
+    if results["bait"] is not None:
+        current_result = result_val_is
+    else:
+        current_result = previous_result  # 将当前数字设为上次的数字
+        return
+
+    # 比较并执行操作
+    comparison_result = compare_results()
+    if comparison_result == -1:  # 当前结果小于上次结果，鱼饵被吃掉
+        previous_result = current_result  # 更新上次识别的结果
+        fsm.transition("REELING", f"鱼饵 {current_result}")
+    elif comparison_result == 1:
+        previous_result = current_result
+
+
+def fishing_state_casting(fsm, sub, scr, results):
+    """抛竿：按住鼠标左键抛竿，完成后等待上鱼"""
+    # 检查是否正在放生，如果是则等待
+    with operation_lock:
+        if is_releasing:
+            print("⏳ [提示] 正在放生，等待放生完成后再抛杆")
+            clock.sleep(0.5)
+            return
+        # 设置抛杆状态
+        is_casting = True
+
+    try:
+        # 在这里记录抛竿时间
+        current_time = clock.time()
+        with casting_interval_lock:
+            casting_timestamps.append(current_time)
+            # 保持队列长度，防止内存泄露
+            if len(casting_timestamps) > 20:
+                casting_timestamps.pop(0)
+        input_backend.mouse_down()
+        jittered_pao = add_jitter(paogantime)
+        clock.sleep(jittered_pao)
+        print_timing_info("抛竿", paogantime, jittered_pao)
+        input_backend.mouse_up()
+        clock.sleep(0.15)
+    finally:
+        # 无论是否异常，都要重置抛杆状态
+        with operation_lock:
+            is_casting = False
+    fsm.transition("WAITING_BITE", "抛竿完成")
+
+
+def fishing_state_reeling(fsm, sub, scr, results):
+    """收线：反复拉杆直到出现星星（上鱼成功）、检测到异常或达到最大拉杆次数"""
+    global a
+    sub.set_regions(["star"])
+    reason = "暂停"
+    while run_event.is_set():
+        frame = sub.next_frame(newer_than=clock.time())
+        if game_state_classifier.classify(frame, ["star"])["state"] == "FISH_LANDED":
+            reason = "上鱼成功"
+            break
+        # 使用锁保护读取times
+        with param_lock:
+            current_times = times
+        if a <= current_times:
+            a += 1
+            # 调用优化后的点击循环函数，如果返回False表示遇到异常需中断
+            if not pressandreleasemousebutton():
+                reason = "异常"
+                break
+        else:
+            print("🎣 [提示] 达到最大拉杆次数，本轮结束")
+            reason = "达到最大拉杆次数"
+            break
+    ensure_mouse_up()
+    a = 0
+    fsm.transition("LANDED", reason)
+
+
+def fishing_state_landed(fsm, sub, scr, results):
+    """上岸：识别并记录鱼的信息（需要时在这里放生），然后回到待机"""
+    if OCR_AVAILABLE and record_fish_enabled:
+        try:
+            record_caught_fish()
+        except Exception as e:
+            print(f"⚠️  [警告] 记录鱼信息失败: {e}")
+    fsm.transition("IDLE", "本轮结束")
+
+
+def fishing_state_overtime(fsm, sub, scr, results):
+    """加时提示：按设置点击加时按钮，然后回到之前的状态"""
+    if results.get("jiashi"):
+        handle_jiashi_in_action(scr, detected=True)
+    fsm.transition(fsm.return_state, "加时处理完成")
+
+
+def fishing_state_bucket_full(fsm, sub, scr, results):
+    """鱼桶满：等待鱼桶满处理结束（检测状态被重置）后回到待机"""
+    if not fish_bucket_full_detected:
+        fsm.transition("IDLE", "鱼桶满状态已重置")
+    else:
+        clock.sleep(0.5)
+
+
+def fishing_state_wait(fsm, sub, scr, results):
+    """放生等由其他流程驱动的状态，主循环只等待"""
+    clock.sleep(0.05)
+
+
+# 状态 -> 处理函数 handler(fsm, 订阅, 帧, 检测结果)
+FISHING_STATE_HANDLERS = {
+    "IDLE": fishing_state_ready,
+    "CASTING": fishing_state_casting,
+    "WAITING_BITE": fishing_state_ready,
+    "REELING": fishing_state_reeling,
+    "LANDED": fishing_state_landed,
+    "OVERTIME_PROMPT": fishing_state_overtime,
+    "RELEASING": fishing_state_wait,
+    "BUCKET_FULL": fishing_state_bucket_full,
+}
+
+
+def run_fishing_state_tick(fsm, sub):
+    """执行状态机的一步：只截取并运行当前状态已到时间的检测器，再交给状态处理函数"""
+    global scr
+    state = fsm.state
+    results = {}
+    scr = None
+    if FISHING_STATE_DETECTORS[state]:
+        due = fsm.due_detectors()
+        if not due:
+            clock.sleep(0.01)
+            return
+        sub.set_regions(due)
+        scr = sub.next_frame()
+        # 检查截图帧是否有效
+        if scr is None:
+            print("⚠️  [警告] 获取截图帧超时")
+            clock.sleep(0.1)
+            return
+        # 模板指示器交给游戏状态分类器一次识别（状态确定后提前结束），其余检测器（鱼饵数量）单独运行
+        indicators = [name for name in due if name in GAME_STATE_INDICATORS]
+        skipped = []
+        if indicators:
+            vector = game_state_classifier.classify(scr, indicators)
+            for name in vector["evaluated"]:
+                results[name] = name in vector["confirmed"]
+            skipped = vector["over_budget"]
+        for name in due:
+            if name not in GAME_STATE_INDICATORS:
+                results[name] = FISHING_STATE_DETECTOR_FUNCS[name](scr)
+        # 超出预算被跳过的指示器下一帧继续检测
+        fsm.mark_run([name for name in due if name not in skipped])
+    FISHING_STATE_HANDLERS[state](fsm, sub, scr, results)
+
+
+def main():
+    global scr
+
+    # 启动加时处理线程
+    jiashi_thread = threading.Thread(target=handle_jiashi_thread, daemon=True)
+    jiashi_thread.start()
+
+    # 启动鱼桶满独立检测线程
+    bucket_full_thread = threading.Thread(
+        target=bucket_full_detection_thread, daemon=True
+    )
+    bucket_full_thread.start()
+
+    # 主循环订阅共享帧总线，订阅的区域随状态机当前状态变化
+    main_sub = frame_bus.subscribe("main", [])
+
+    while True:
+        if run_event.is_set():
+            try:
+                run_fishing_state_tick(fishing_fsm, main_sub)
+            except Exception as e:
+                print(f"❌ [错误] 主循环异常: {e}")
+                # 记录更详细的错误信息
+                import traceback
+
+                traceback.print_exc()
+                clock.sleep(0.1)
+        else:
+            # 暂停时回到待机（鱼桶满状态保留到检测状态被重置）
+            if fishing_fsm.state not in ("IDLE", "BUCKET_FULL"):
+                fishing_fsm.reset()
+            main_sub.set_regions([])
+            clock.sleep(0.1)
+
+
+# =========================
+# 游戏模拟器（无界面闭环测试）
+# =========================
+# 模拟器用 resources 中的模板按目标分辨率绘制钓鱼界面（鱼饵数字、F1/F2、上鱼提示、星星、
+# 加时对话框、鱼信息横幅），通过 RecordingInputBackend 接收脚本的鼠标键盘事件并推进游戏状态，
+# 配合加速时钟可以在 Linux 上以高于实时的速度运行完整的 main()
+
+
+class FishingGameSimulator:
+    """钓鱼玩法的简化模型
+
+    游戏状态：
+      ready    显示F1/F2，按住左键超过 min_cast_hold 后松开即抛竿（没有鱼饵或鱼桶满时抛竿失败）
+      casting  正在按住左键抛竿
+      waiting  等待上钩，bite_delay 秒后鱼上钩：鱼饵数量减一，显示上鱼提示
+      hooked   收线中，按住左键累计 reel_hold 秒后上鱼；escape_after 秒没有收线鱼会跑掉
+      overtime 收线中弹出加时对话框，点击加时/不加时按钮后继续收线
+      landed   显示星星和鱼信息横幅，landed_duration 秒后（或点击后）回到 ready
+
+    统计上鱼数、跑鱼数、脚本对各画面事件的反应延迟（虚拟时间）以及误操作次数
+    （在不该点击的状态点击，例如等待上钩时按下左键）
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        bait=999,
+        bite_delay=(3.0, 10.0),
+        reel_hold=(6.0, 20.0),
+        escape_after=6.0,
+        overtime_chance=0.1,
+        landed_duration=6.0,
+        min_cast_hold=0.2,
+    ):
+        self.random = random.Random(seed)
+        self.bait = bait
+        self.bite_delay = bite_delay
+        self.reel_hold = reel_hold
+        self.escape_after = escape_after
+        self.overtime_chance = overtime_chance
+        self.landed_duration = landed_duration
+        self.min_cast_hold = min_cast_hold
+        self._lock = threading.Lock()
+
+        self.state = "ready"
+        self.mouse_pos = (0, 0)
+        self._left_down_at = None
+        self._bite_at = None
+        self._hooked_at = None
+        self._last_reel = None
+        self._required_hold = 0.0
+        self._progress = 0.0
+        self._overtime_at = None
+        self._landed_at = None
+        self._quality_level = 0
+
+        # 画面事件出现的时间，脚本做出对应操作时计算反应延迟
+        self._stimulus = {"cast": clock.time()}
+        self.latencies = {"cast": [], "reel": [], "overtime": []}
+        self.counters = {
+            "casts": 0,
+            "failed_casts": 0,
+            "bites": 0,
+            "fish": 0,
+            "escaped": 0,
+            "overtime": 0,
+            "false_triggers": 0,
+            "key_presses": 0,
+        }
+        self.false_trigger_states = {}
+        self.bucket_full = False  # 鱼桶满：抛竿失败，立即回到抛竿界面
+
+        self._load_sprites()
+        self._background = self._make_background(seed)
+
+    # ---------- 绘制 ----------
+    def _load_sprites(self):
+        """使用脚本按当前分辨率缩放后的模板作为界面元素"""
+        load_templates()
+        load_f1()
+        load_f2()
+        load_shangyule()
+        load_star_template()
+        self.sprites = {
+            "digits": list(templates),
+            "f1": f1,
+            "f2": f2,
+            "bite": shangyule,
+            "star": star_template,
+            "jiashi": load_jiashi(),
+        }
+
+    def _make_background(self, seed):
+        """低频起伏的灰度背景（固定种子），让误判率有意义"""
+        rng = np.random.default_rng(seed)
+        small = rng.integers(50, 170, (TARGET_HEIGHT // 32 + 1, TARGET_WIDTH // 32 + 1))
+        background = cv2.resize(
+            small.astype(np.uint8), (TARGET_WIDTH, TARGET_HEIGHT), interpolation=cv2.INTER_LINEAR
+        )
+        noise = rng.integers(-6, 7, background.shape)
+        return np.clip(background.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def _centered(rect, sprite):
+        x, y, w, h = rect
+        t_h, t_w = sprite.shape[:2]
+        return x + (w - t_w) // 2, y + (h - t_h) // 2, sprite
+
+    def _bait_elements(self):
+        x, y, w, h = get_bait_region_coords()
+        crop_w = max(1, min(int(BAIT_CROP_WIDTH1_BASE * SCALE_UNIFORM), w // 2))
+        digits = str(max(0, self.bait))[-2:]
+        if len(digits) == 1:
+            positions = [max(0, (w - crop_w) // 2)]
+        else:
+            positions = [0, crop_w]
+        elements = []
+        for offset, digit in zip(positions, digits):
+            sprite = self.sprites["digits"][int(digit)]
+            elements.append((x + offset, y, sprite[:h, :crop_w]))
+        return elements
+
+    def _elements(self, now):
+        """当前画面上的元素 [(x, y, 灰度图), ...]"""
+        elements = self._bait_elements()
+        if self.state == "ready":
+            elements.append(self._centered(region4_coords, self.sprites["f1"]))
+            elements.append(self._centered(region5_coords, self.sprites["f2"]))
+        elif self.state == "hooked" and now - self._hooked_at < 1.0:
+            elements.append(self._centered(region6_coords, self.sprites["bite"]))
+        elif self.state == "overtime" and self.sprites["jiashi"] is not None:
+            elements.append(self._centered(get_jiashi_region_coords(), self.sprites["jiashi"]))
+        elif self.state == "landed":
+            # 横幅与星星区域有重叠，先画横幅
+            x, y, w, h = get_fish_info_region_coords()
+            banner = np.full((h, w), 200 - 25 * self._quality_level, dtype=np.uint8)
+            elements.append((x, y, banner))
+            elements.append(self._centered(region3_coords, self.sprites["star"]))
+        return elements
+
+    def render(self, rect, now):
+        """绘制一个截图区域的灰度图"""
+        x, y, w, h = rect
+        tile = self._background[y : y + h, x : x + w].copy()
+        with self._lock:
+            self._update(now)
+            elements = self._elements(now)
+        for ex, ey, sprite in elements:
+            s_h, s_w = sprite.shape[:2]
+            x0, y0 = max(x, ex), max(y, ey)
+            x1, y1 = min(x + w, ex + s_w), min(y + h, ey + s_h)
+            if x0 < x1 and y0 < y1:
+                tile[y0 - y : y1 - y, x0 - x : x1 - x] = sprite[y0 - ey : y1 - ey, x0 - ex : x1 - ex]
+        return tile
+
+    # ---------- 游戏状态 ----------
+    def _set_state(self, state, now):
+        self.state = state
+        if state == "ready":
+            self._stimulus["cast"] = now
+
+    def _update(self, now):
+        """按时间推进游戏状态（调用方持有锁）"""
+        if self.state == "waiting" and now >= self._bite_at:
+            self.bait -= 1
+            self.counters["bites"] += 1
+            self._hooked_at = self._last_reel = now
+            self._required_hold = self.random.uniform(*self.reel_hold)
+            self._progress = 0.0
+            self._overtime_at = None
+            if self.random.random() < self.overtime_chance:
+                self._overtime_at = self._required_hold * self.random.uniform(0.3, 0.7)
+            self._stimulus["reel"] = now
+            self._set_state("hooked", now)
+        if self.state == "hooked":
+            progress = self._progress
+            if self._left_down_at is not None:
+                progress += now - self._left_down_at
+            if self._overtime_at is not None and progress >= self._overtime_at:
+                self._overtime_at = None
+                self.counters["overtime"] += 1
+                self._stimulus["overtime"] = now
+                self._set_state("overtime", now)
+            elif progress >= self._required_hold:
+                self.counters["fish"] += 1
+                self._landed_at = now
+                self._quality_level = self.random.choice([0, 0, 0, 1, 1, 2, 3, 4])
+                self._set_state("landed", now)
+            elif self._left_down_at is None and now - self._last_reel > self.escape_after:
+                self.counters["escaped"] += 1
+                self._set_state("ready", now)
+        if self.state == "landed" and now - self._landed_at >= self.landed_duration:
+            self._set_state("ready", now)
+
+    def _respond(self, name, now):
+        started = self._stimulus.pop(name, None)
+        if started is not None:
+            self.latencies[name].append(now - started)
+
+    def _false_trigger(self):
+        self.counters["false_triggers"] += 1
+        self.false_trigger_states[self.state] = self.false_trigger_states.get(self.state, 0) + 1
+
+    def left_down(self):
+        now = clock.time()
+        with self._lock:
+            self._update(now)
+            if self._left_down_at is not None:
+                return
+            self._left_down_at = now
+            if self.state == "ready":
+                self._respond("cast", now)
+                self._set_state("casting", now)
+            elif self.state == "hooked":
+                self._respond("reel", now)
+            elif self.state == "overtime":
+                for button in (btn_no_jiashi_coords, btn_yes_jiashi_coords):
+                    if button is not None and abs(self.mouse_pos[0] - button[0]) <= 40 and abs(self.mouse_pos[1] - button[1]) <= 40:
+                        self._respond("overtime", now)
+                        self._last_reel = now
+                        self._set_state("hooked", now)
+                        break
+                else:
+                    self._false_trigger()
+            elif self.state == "landed":
+                self._set_state("ready", now)  # 点击关闭鱼信息
+            else:
+                self._false_trigger()
+
+    def left_up(self):
+        now = clock.time()
+        with self._lock:
+            if self._left_down_at is None:
+                return
+            held = now - self._left_down_at
+            self._left_down_at = None
+            if self.state == "casting":
+                self.counters["casts"] += 1
+                if held >= self.min_cast_hold and self.bait > 0 and not self.bucket_full:
+                    self._bite_at = now + self.random.uniform(*self.bite_delay)
+                    self._set_state("waiting", now)
+                else:
+                    self.counters["failed_casts"] += 1
+                    self._set_state("ready", now)
+            elif self.state == "hooked":
+                self._progress += held
+                self._last_reel = now
+            self._update(now)
+
+    def move(self, x, y):
+        with self._lock:
+            self.mouse_pos = (int(x), int(y))
+
+    def key(self, key, pressed):
+        if pressed:
+            with self._lock:
+                self.counters["key_presses"] += 1
+
+    def on_input(self, event):
+        """RecordingInputBackend 的监听函数：只处理左键、移动和按键"""
+        kind = event[0]
+        if kind == "button":
+            if event[1] == "left":
+                if event[2]:
+                    self.left_down()
+                else:
+                    self.left_up()
+        elif kind == "move":
+            self.move(event[1], event[2])
+        else:
+            self.key(event[1], event[2])
+
+    def report(self, virtual_seconds):
+        """汇总统计：每小时上鱼数、反应延迟、误操作次数"""
+        with self._lock:
+            hours = virtual_seconds / 3600 if virtual_seconds > 0 else 0
+            latencies = {}
+            for name, values in self.latencies.items():
+                if values:
+                    ordered = sorted(values)
+                    latencies[name] = {
+                        "count": len(values),
+                        "avg_ms": sum(values) / len(values) * 1000,
+                        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                    }
+            return {
+                "virtual_seconds": virtual_seconds,
+                "fish_per_hour": self.counters["fish"] / hours if hours else 0.0,
+                "counters": dict(self.counters),
+                "latencies": latencies,
+                "false_trigger_states": dict(self.false_trigger_states),
+            }
+
+
+class SimulatedFrameSource(FrameSource):
+    """模拟器画面来源：按订阅区域绘制模拟的游戏画面"""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.screen_size = (TARGET_WIDTH, TARGET_HEIGHT)
+
+    def read(self, rects):
+        now = clock.time()
+        tiles = [FrameTile(rect, gray=self.simulator.render(rect, now)) for rect in rects]
+        return now, tiles, None
+
+
+def run_game_simulation(width, height, minutes=60.0, speed=10.0, seed=0, **game_options):
+    """在模拟器中运行完整的 main()，返回模拟器统计
+
+    Args:
+        width, height: 模拟的屏幕分辨率
+        minutes: 模拟的游戏时长（虚拟分钟）
+        speed: 加速倍数（虚拟时间/实际时间）
+        seed: 随机种子，相同参数得到可重复的结果
+        game_options: 传给 FishingGameSimulator 的玩法参数
+    """
+    global clock, input_backend, jitter_random
+    global debug_mode, previous_result
+
+    apply_target_resolution(width, height)
+    debug_mode = False
+    saved = (clock, input_backend, frame_bus.source, jitter_random)
+
+    clock = AcceleratedClock(speed)
+    jitter_random = random.Random(seed)
+    simulator = FishingGameSimulator(seed=seed, **game_options)
+    # 脚本的鼠标键盘操作只记录下来并交给模拟器
+    input_backend = RecordingInputBackend(listener=simulator.on_input)
+    frame_bus.set_source(SimulatedFrameSource(simulator))
+
+    start_real = time.time()
+    start_virtual = clock.time()
+    try:
+        if bait_math_val(frame_bus.fetch(["bait"])) is None:
+            print("❌ [模拟] 无法识别模拟画面中的鱼饵数量")
+            return None
+        previous_result = result_val_is
+        fishing_fsm.reset()
+        game_state_classifier.reset_stats()
+        roi_tracker.reset()
+        run_event.set()
+        threading.Thread(target=main, daemon=True).start()
+
+        end_virtual = start_virtual + minutes * 60
+        next_report = start_virtual + 600
+        while clock.time() < end_virtual and run_event.is_set():
+            time.sleep(0.1)
+            if clock.time() >= next_report:
+                next_report += 600
+                elapsed_min = (clock.time() - start_virtual) / 60
+                print(
+                    f"🎮 [模拟] {elapsed_min:.0f} 分钟: 上鱼 {simulator.counters['fish']} 条，"
+                    f"误操作 {simulator.counters['false_triggers']} 次"
+                )
+        stopped_early = not run_event.is_set()
+        virtual_seconds = clock.time() - start_virtual
+        fsm_stats = fishing_fsm.get_stats()  # 恢复实时时钟之前统计
+        run_event.clear()
+        # 等待主循环回到待机，避免恢复输入替身时还有动作在执行
+        deadline = time.time() + 5
+        while fishing_fsm.state not in ("IDLE", "BUCKET_FULL") and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        recorded_input = input_backend.get_stats()
+        clock, input_backend, source, jitter_random = saved
+        frame_bus.set_source(source)
+
+    report = simulator.report(virtual_seconds)
+    report["input"] = recorded_input
+    report["real_seconds"] = time.time() - start_real
+    report["stopped_early"] = stopped_early
+    report["fsm"] = fsm_stats
+    return report
+
+
+# =========================
+# 命令行工具（回放测试等，不启动GUI）
+# =========================
+# 回放测试使用的检测器：名称 -> 检测函数
+REPLAY_DETECTORS = {
+    "f1": f1_mached,
+    "f2": f2_mached,
+    "bite": shangyu_mached,
+    "star": fished,
+    "jiashi": fangzhu_jiashi,
+    "bait": bait_math_val,
+}
+
+
+def run_replay_benchmark(source, max_frames=None):
+    """回放录制的画面，经过帧总线把每一帧交给所有检测器，统计吞吐量和准确率
+
+    Args:
+        source: 回放来源（ImageDirFrameSource / VideoFrameSource）
+        max_frames: 最多回放的帧数，None表示全部
 
-        # 创建并启动线程
-        import threading
+    Returns:
+        dict: 帧数、耗时、回放倍速以及每个检测器的统计
+    """
+    global debug_mode
+    if source.screen_size:
+        apply_target_resolution(*source.screen_size)
+    # 回放时关闭逐帧调试日志，避免影响耗时统计
+    debug_mode = False
+
+    detector_stats = {
+        name: {"calls": 0, "time": 0.0, "positive": 0, "labelled": 0, "correct": 0}
+        for name in REPLAY_DETECTORS
+    }
+    bus = FrameBus(source, interval=0)
+    sub = bus.subscribe("replay", [])
+    frames = 0
+    first_ts = last_ts = None
+    start = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            frame = sub.next_frame(timeout=10)
+            if frame is None:
+                break
+            frames += 1
+            if first_ts is None:
+                first_ts = frame.timestamp
+            last_ts = frame.timestamp
+            labels = frame.labels or {}
+            for name, detector in REPLAY_DETECTORS.items():
+                t0 = time.perf_counter()
+                value = detector(frame)
+                stats = detector_stats[name]
+                stats["time"] += time.perf_counter() - t0
+                stats["calls"] += 1
+                if name == "bait":
+                    stats["positive"] += value is not None
+                else:
+                    value = bool(value)
+                    stats["positive"] += value
+                if name in labels:
+                    stats["labelled"] += 1
+                    stats["correct"] += value == labels[name]
+    finally:
+        sub.close()
+    elapsed = time.perf_counter() - start
 
-        uno_recognition_thread = threading.Thread(
-            target=uno_continuous_recognition, daemon=True
+    recorded = (last_ts - first_ts) if frames > 1 else 0.0
+    speed = recorded / elapsed if elapsed > 0 else 0.0
+    print(
+        f"📼 [回放] {frames} 帧，耗时 {elapsed:.2f}s，{frames / elapsed if elapsed > 0 else 0:.1f} 帧/秒，"
+        f"相当于实时的 {speed:.1f} 倍"
+    )
+    for name, stats in detector_stats.items():
+        avg_ms = stats["time"] / stats["calls"] * 1000 if stats["calls"] else 0
+        accuracy = (
+            f"{stats['correct'] / stats['labelled'] * 100:.1f}% ({stats['labelled']}帧标注)"
+            if stats["labelled"]
+            else "无标注"
         )
-        uno_recognition_thread.start()
+        print(
+            f"   {name}: 平均 {avg_ms:.3f}ms，命中 {stats['positive']} 次，准确率 {accuracy}"
+        )
+    print_roi_change_gate_stats()
+    print_roi_tracker_stats()
+    return {
+        "frames": frames,
+        "elapsed": elapsed,
+        "speed": speed,
+        "detectors": detector_stats,
+    }
 
-        print("🎮 [UNO] 持续识别已启动")
-        return True
+
+def tool_replay(args):
+    """--replay <目录/NPZ/视频> [最大帧数]"""
+    if not args:
+        print("用法: PartyFish.py --replay <目录/NPZ/视频> [最大帧数]")
+        return 2
+    source = open_frame_source(args[0])
+    max_frames = int(args[1]) if len(args) > 1 else None
+    try:
+        run_replay_benchmark(source, max_frames)
+    finally:
+        source.close()
+    return 0
+
+
+# 阈值标定的模板：名称（与 match_threshold 的名称和 labels.json 中的键一致）-> 匹配度函数
+CALIBRATION_SCORERS = {
+    "star": star_score,
+    "f1": f1_score,
+    "f2": f2_score,
+    "bite": bite_score,
+    "jiashi": jiashi_score,
+    "uno_tiao": uno_tiao_score,
+    "tong": tong_score,
+}
+
+
+def bait_digit_calibration_scores(gray_img, value):
+    """鱼饵数量区域的数字匹配度样本
+
+    标注的数字所在区域取该数字的匹配度作为正样本；应为空白的区域（一位数时的区域1、2，
+    两位数时的区域3）取所有数字中最高的匹配度作为负样本
+
+    Returns:
+        tuple: ([正样本匹配度], [负样本匹配度])
+    """
+    classifier = get_digit_classifier()
+    if classifier is None:
+        return [], []
+    regions = bait_digit_regions(gray_img)
+    if value >= 10:
+        expected = [value // 10 % 10, value % 10, None]
     else:
-        print("🎮 [UNO] 持续识别已在运行")
-        return False
+        expected = [None, None, value]
+    positives, negatives = [], []
+    for region, digit in zip(regions, expected):
+        windows = classifier._windows(region)
+        if windows is None:
+            continue
+        best = classifier.scores(windows).max(axis=0)
+        if digit is None:
+            negatives.append(float(best.max()))
+        else:
+            positives.append(float(best[digit]))
+    return positives, negatives
 
 
-# 停止UNO持续识别
-def uno_stop_continuous_recognition():
-    """停止UNO持续识别
+def collect_calibration_scores(path, max_frames=None):
+    """回放一份带标注的录制画面，收集每个模板的正、负样本匹配度
 
-    该函数负责停止持续识别线程
+    标注中 star/f1/f2/bite/jiashi/uno_tiao/tong 为布尔值，bait 为鱼饵数量（标定 digit 阈值）。
+    标定时关闭画面变化检测和匹配位置跟踪，每帧都做完整的模板匹配
+
+    Returns:
+        tuple: (分辨率 (width, height) 或 None, {模板名称: {"positive": [...], "negative": [...]}})
     """
-    global uno_recognition_running, uno_recognition_thread
+    global FRAME_DIFF_GATING_ENABLED, ROI_TRACKING_ENABLED
+    source = open_frame_source(path)
+    samples = {}
+    saved = (FRAME_DIFF_GATING_ENABLED, ROI_TRACKING_ENABLED)
+    FRAME_DIFF_GATING_ENABLED = ROI_TRACKING_ENABLED = False
+    try:
+        if source.screen_size:
+            apply_target_resolution(*source.screen_size)
+        frames = 0
+        while max_frames is None or frames < max_frames:
+            item = source.read([])
+            if item is None:
+                break
+            frames += 1
+            timestamp, tiles, labels = item
+            if not labels:
+                continue
+            frame = Frame(0, timestamp, tiles, None, labels)
+            for name, scorer in CALIBRATION_SCORERS.items():
+                if name not in labels:
+                    continue
+                score = scorer(frame)
+                if score is not None:
+                    entry = samples.setdefault(name, {"positive": [], "negative": []})
+                    entry["positive" if labels[name] else "negative"].append(score)
+            if labels.get("bait") is not None:
+                gray = capture_region(*get_bait_region_coords(), frame)
+                if gray is not None:
+                    positives, negatives = bait_digit_calibration_scores(gray, int(labels["bait"]))
+                    entry = samples.setdefault("digit", {"positive": [], "negative": []})
+                    entry["positive"].extend(positives)
+                    entry["negative"].extend(negatives)
+    finally:
+        FRAME_DIFF_GATING_ENABLED, ROI_TRACKING_ENABLED = saved
+        source.close()
+    return source.screen_size, samples
+
+
+def roc_curve(positives, negatives, thresholds):
+    """每个阈值（匹配度大于阈值判为成立）下的 (阈值, 检出率, 误报率)"""
+    pos = np.sort(np.asarray(positives, dtype=np.float64))
+    neg = np.sort(np.asarray(negatives, dtype=np.float64))
+    curve = []
+    for threshold in thresholds:
+        tpr = (len(pos) - np.searchsorted(pos, threshold, side="right")) / len(pos) if len(pos) else 0.0
+        fpr = (len(neg) - np.searchsorted(neg, threshold, side="right")) / len(neg) if len(neg) else 0.0
+        curve.append((float(threshold), float(tpr), float(fpr)))
+    return curve
+
+
+def roc_auc(positives, negatives):
+    """ROC曲线下面积：随机取一正一负样本，正样本匹配度更高的概率"""
+    if not positives or not negatives:
+        return None
+    pos = np.asarray(positives, dtype=np.float64)
+    neg = np.sort(np.asarray(negatives, dtype=np.float64))
+    below = np.searchsorted(neg, pos, side="left")
+    ties = np.searchsorted(neg, pos, side="right") - below
+    return float((below + ties * 0.5).sum() / (len(pos) * len(neg)))
 
-    if uno_recognition_running:
-        # 设置识别状态为False
-        uno_recognition_running = False
 
-        # 等待线程结束
-        if uno_recognition_thread is not None:
-            uno_recognition_thread.join(timeout=1.0)  # 等待1秒
-            uno_recognition_thread = None
+def suggest_match_threshold(positives, negatives, max_fpr=MATCH_THRESHOLD_MAX_FPR):
+    """在满足误报率不超过 max_fpr 的负样本上界与其上方最低的正样本之间取中点
 
-        print("🎮 [UNO] 持续识别已停止")
-        return True
-    else:
-        print("🎮 [UNO] 持续识别未在运行")
-        return False
+    正、负样本之间的间隔两侧留出相同余量；样本不足时返回 None
+    """
+    if len(positives) < MATCH_THRESHOLD_MIN_SAMPLES or len(negatives) < MATCH_THRESHOLD_MIN_SAMPLES:
+        return None
+    neg = np.sort(np.asarray(negatives, dtype=np.float64))[::-1]
+    allowed = int(max_fpr * len(neg))
+    # 判定为“大于阈值”，阈值取第 allowed+1 高的负样本匹配度即可保证误报不超过 allowed 个
+    bound = float(neg[allowed]) if allowed < len(neg) else float(neg[-1])
+    above = [p for p in positives if p > bound]
+    threshold = (bound + min(above)) / 2 if above else bound
+    low, high = MATCH_THRESHOLD_RANGE
+    return float(min(max(threshold, low), high))
 
 
-# UNO弹窗函数
-def uno_show_popup():
-    """显示UNO暂停/继续弹窗
+def calibrate_match_thresholds(samples):
+    """根据正、负样本匹配度给出每个模板的建议阈值、AUC和ROC曲线
 
-    弹窗5秒后自动选择继续
+    Returns:
+        dict: {模板名称: {"threshold", "auc", "positives", "negatives", "tpr", "fpr", "roc"}}，
+        样本不足的模板不给出建议阈值
     """
-    # 不直接使用global root，改为检查root是否已定义
-    global root, uno_popup_shown
-    if root is None:
-        print("⚠️ [UNO] 无法显示弹窗，root未定义")
-        return
+    grid = np.round(np.arange(0.5, 0.96, 0.05), 2)
+    results = {}
+    for name, entry in samples.items():
+        positives, negatives = entry["positive"], entry["negative"]
+        threshold = suggest_match_threshold(positives, negatives)
+        auc = roc_auc(positives, negatives)
+        result = {
+            "threshold": None if threshold is None else round(threshold, 4),
+            "auc": None if auc is None else round(auc, 4),
+            "positives": len(positives),
+            "negatives": len(negatives),
+            "roc": [[round(v, 4) for v in point] for point in roc_curve(positives, negatives, grid)],
+        }
+        if threshold is not None:
+            _, tpr, fpr = roc_curve(positives, negatives, [result["threshold"]])[0]
+            result["tpr"], result["fpr"] = round(tpr, 4), round(fpr, 4)
+        results[name] = result
+    return results
 
-    # 弹窗显示后设置标志位为True
-    uno_popup_shown = True
 
-    # 创建弹窗
-    popup = tk.Toplevel(root)
-    popup.title("🎮 UNO 提示")
-    popup.geometry("300x150")
-    popup.resizable(False, False)
-    popup.grab_set()  # 模态窗口
-    popup.attributes("-topmost", True)  # 弹窗置顶显示
+def print_calibration_report(samples, results):
+    """打印每个模板的匹配度分布、默认阈值与建议阈值下的检出率和误报率"""
 
-    # 设置样式
-    popup.configure(background="#2d3748")
+    def _summary(values, label):
+        if not values:
+            return f"{label} 无"
+        low, mid, high = np.percentile(values, [5, 50, 95])
+        return (
+            f"{label} {len(values)} 个 (最低 {min(values):.3f}，"
+            f"5%/50%/95% {low:.3f}/{mid:.3f}/{high:.3f}，最高 {max(values):.3f})"
+        )
 
-    # 添加标题
-    title_label = ttkb.Label(
-        popup,
-        text="🎮 UNO 操作提示",
-        font=("Segoe UI", 12, "bold"),
-        bootstyle="primary",
-    )
-    title_label.pack(pady=15)
+    for name, result in results.items():
+        entry = samples[name]
+        print(f"   {name}: {_summary(entry['positive'], '正样本')}；{_summary(entry['negative'], '负样本')}")
+        _, tpr, fpr = roc_curve(entry["positive"], entry["negative"], [MATCH_THRESHOLD_DEFAULT])[0]
+        auc = "—" if result["auc"] is None else f"{result['auc']:.4f}"
+        line = (
+            f"      AUC {auc}，默认阈值 {MATCH_THRESHOLD_DEFAULT}: "
+            f"检出率 {tpr * 100:.1f}% 误报率 {fpr * 100:.1f}%"
+        )
+        if result["threshold"] is None:
+            line += f"，样本不足（正、负样本各需 {MATCH_THRESHOLD_MIN_SAMPLES} 个），不给出建议阈值"
+        else:
+            line += (
+                f"，建议阈值 {result['threshold']:.3f}: 检出率 {result['tpr'] * 100:.1f}% "
+                f"误报率 {result['fpr'] * 100:.1f}%"
+            )
+        print(line)
+
+
+def tool_calibrate_thresholds(args):
+    """--calibrate-thresholds <带标注的目录/NPZ/视频>... [--out 阈值文件]"""
+    paths = [arg for arg in args if not arg.startswith("--")]
+    out = MATCH_THRESHOLD_PROFILE_FILE
+    if "--out" in args:
+        index = args.index("--out")
+        if index + 1 >= len(args):
+            print("用法: PartyFish.py --calibrate-thresholds <目录/NPZ/视频>... [--out 阈值文件]")
+            return 2
+        out = args[index + 1]
+        paths.remove(out)
+    if not paths:
+        print("用法: PartyFish.py --calibrate-thresholds <目录/NPZ/视频>... [--out 阈值文件]")
+        return 2
+
+    # 同一分辨率的多份录制合并标定
+    by_resolution = {}
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    try:
+        for path in paths:
+            _, samples = collect_calibration_scores(path)
+            key = resolution_key(TARGET_WIDTH, TARGET_HEIGHT)
+            merged = by_resolution.setdefault(key, {})
+            for name, entry in samples.items():
+                target = merged.setdefault(name, {"positive": [], "negative": []})
+                target["positive"].extend(entry["positive"])
+                target["negative"].extend(entry["negative"])
+    finally:
+        apply_target_resolution(*saved_resolution)
 
-    # 添加提示文本
-    text_label = ttkb.Label(
-        popup, text="是否继续操作？", font=("Segoe UI", 10), bootstyle="light"
+    profile = {}
+    for key, samples in by_resolution.items():
+        if not samples:
+            print(f"⚠️  [警告] {key}: 录制画面中没有可用的标注")
+            continue
+        print(f"📊 [标定] 分辨率 {key}")
+        results = calibrate_match_thresholds(samples)
+        print_calibration_report(samples, results)
+        entries = {name: result for name, result in results.items() if result["threshold"] is not None}
+        if entries:
+            profile[key] = entries
+    if not profile:
+        print("❌ [错误] 没有得到任何建议阈值，未写入阈值文件")
+        return 1
+    MatchThresholdProfile(out).save(profile)
+    if os.path.abspath(out) == os.path.abspath(match_threshold_profile.path):
+        match_threshold_profile.load()
+    print(f"✅ [标定] 建议阈值已写入 {out}")
+    return 0
+
+
+def run_gray_conversion_benchmark(iterations=500):
+    """对比截图转灰度的两种方式：旧的 np.array 复制 + cvtColor 与
+    np.frombuffer 包装 + 复用缓冲区，统计每次调用的耗时和内存分配"""
+    import tracemalloc
+
+    class _FakeShot:
+        # 与 mss.ScreenShot 一样提供 raw/width/height 和数组接口
+        def __init__(self, w, h):
+            self.width, self.height = w, h
+            self.raw = bytearray(np.random.randint(0, 256, w * h * 4, dtype=np.uint8))
+
+        @property
+        def __array_interface__(self):
+            return {
+                "version": 3,
+                "shape": (self.height, self.width, 4),
+                "typestr": "|u1",
+                "data": self.raw,
+            }
+
+    def _old(shot):
+        return cv2.cvtColor(np.array(shot), cv2.COLOR_RGBA2GRAY)
+
+    reused, allocated = gray_buffer_pool.reused, gray_buffer_pool.allocated
+
+    def _new(shot):
+        # 与实时截图相同的路径：区域随帧创建、转换灰度，帧用完后回收（大区域的缓冲区归还缓冲池）
+        tile = FrameTile((0, 0, shot.width, shot.height), bgra=wrap_screenshot(shot))
+        tile.gray
+        return tile
+
+    results = {}
+    for name in ("f1", "bait", "star", "jiashi", "fish_info"):
+        x, y, w, h = FRAME_REGION_PROVIDERS[name]()
+        shot = _FakeShot(w, h)
+        assert np.array_equal(_old(shot), _new(shot).gray)
+        results[name] = {}
+        for label, func in (("np.array+cvtColor", _old), ("frombuffer+FrameTile", _new)):
+            func(shot)  # 预热（缓冲池第一次分配）
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func(shot)
+            elapsed = (time.perf_counter() - start) / iterations
+
+            tracemalloc.start()
+            for _ in range(iterations):
+                func(shot)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name][label] = (elapsed, peak)
+            print(
+                f"   {name} ({w}×{h}) {label}: {elapsed * 1e6:.1f}µs/次，峰值分配 {peak / 1024:.1f}KB"
+            )
+    print(
+        f"   缓冲池（不小于 {GRAY_BUFFER_POOL_MIN_PIXELS} 像素的区域）: 复用 {gray_buffer_pool.reused - reused} 次，"
+        f"新建 {gray_buffer_pool.allocated - allocated} 个缓冲区"
     )
-    text_label.pack(pady=5)
+    return results
 
-    # 继续标志
-    continue_flag = [False]
 
-    # 暂停按钮回调
-    def on_pause():
-        continue_flag[0] = False
-        print("🎮 [UNO] 用户选择暂停")
-        popup.destroy()
+def tool_benchmark_gray(args):
+    """--benchmark-gray [每项次数]"""
+    iterations = int(args[0]) if args else 500
+    print(f"📊 [测试] 截图转灰度性能对比（{TARGET_WIDTH}×{TARGET_HEIGHT}，每项 {iterations} 次）")
+    run_gray_conversion_benchmark(iterations)
+    return 0
 
-    # 继续按钮回调
-    def on_continue():
-        continue_flag[0] = True
-        print("🎮 [UNO] 用户选择继续")
-        popup.destroy()
 
-    # 按钮框架
-    btn_frame = ttkb.Frame(popup)
-    btn_frame.pack(pady=20)
+def run_digit_classifier_benchmark(iterations=300, resolutions=("1080P", "2K", "4K"), seed=0):
+    """对比鱼饵数字识别的三种方式：逐个模板 cv2.matchTemplate（每次读数30次匹配）、
+    DigitClassifier 批量识别（每次读数1次矩阵乘法）和按上次数量的先验顺序匹配，
+    统计每次读数耗时、结果一致率和先验顺序匹配平均匹配的候选数字个数
 
-    # 暂停按钮
-    pause_btn = ttkb.Button(
-        btn_frame, text="暂停", bootstyle="danger", width=10, command=on_pause
-    )
-    pause_btn.pack(side=LEFT, padx=10)
+    用缩放后的数字模板拼出鱼饵数量区域（1~2位数字，加随机噪声和亮度变化），
+    按 bait_math_val 的方式截取三个区域分别识别
+    """
+    global templates
+    rng = np.random.default_rng(seed)
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    results = {}
+    try:
+        for label in resolutions:
+            width, height = parse_resolution(label)
+            apply_target_resolution(width, height)
+            templates = None
+            load_templates()
+            t_h, t_w = templates[0].shape[:2]
+            _, _, w, h = get_bait_region_coords()
+            h, w = max(h, t_h), max(w, t_w * 2)
+
+            samples = []
+            values = []
+            for _ in range(iterations):
+                value = int(rng.integers(0, 100))
+                values.append(value)
+                img = rng.integers(20, 60, (h, w)).astype(np.float32)
+                if value >= 10:
+                    img[:t_h, :t_w] = templates[value // 10]
+                    img[:t_h, t_w : t_w * 2] = templates[value % 10]
+                else:
+                    start = max(0, (w - t_w) // 2)
+                    img[:t_h, start : start + t_w] = templates[value]
+                img = img * rng.uniform(0.8, 1.1) + rng.normal(0, 6, img.shape)
+                samples.append(np.clip(img, 0, 255).astype(np.uint8))
 
-    # 继续按钮
-    continue_btn = ttkb.Button(
-        btn_frame, text="继续", bootstyle="success", width=10, command=on_continue
-    )
-    continue_btn.pack(side=RIGHT, padx=10)
+            def _regions(img):
+                mid = max(0, (w - t_w) // 2)
+                return [img[:t_h, :t_w], img[:t_h, t_w : t_w * 2], img[:t_h, mid : mid + t_w]]
 
-    # 设置5秒自动继续
-    popup.after(5000, on_continue)
+            def _old(img):
+                return [_match_digit_template_loop(region) for region in _regions(img)]
 
-    # 等待弹窗关闭
-    popup.wait_window()
+            def _new(img):
+                return [None if m is None else (m[0], m[2]) for m in classify_digits(_regions(img))]
 
-    return continue_flag[0]
+            # 收线时鱼饵数量一般不变或比上次少1，上次的数量按这两种情况各取一半
+            recognizer = BaitRecognizer()
+            previous = [value + int(rng.integers(0, 2)) for value in values]
 
+            def _prior(img, prev):
+                return recognizer._recognize_template(img, None, prev)[0]
 
-def f2_mached(scr):
-    global region5_coords, f2
-    # 确保模板已加载
-    if f2 is None:
-        load_f2()
-    region_gray = capture_region(*region5_coords, scr)
-    if region_gray is None:
-        return None
-    h, w = region_gray.shape[:2]
-    t_h, t_w = f2.shape[:2]
-    if h >= t_h and w >= t_w:
-        return (
-            cv2.minMaxLoc(cv2.matchTemplate(region_gray, f2, cv2.TM_CCOEFF_NORMED))[1]
-            > 0.8
-        )
-    return False
+            agree = sum(_old(img) == _new(img) for img in samples)
+            prior_agree = sum(
+                combine_bait_digits(*classify_digits(_regions(img)))[0] == _prior(img, prev)
+                for img, prev in zip(samples, previous)
+            )
+            results[label] = {"agreement": agree / iterations, "prior_agreement": prior_agree / iterations}
+            for name, func in (("逐个模板匹配", _old), ("批量矩阵运算", _new)):
+                start = time.perf_counter()
+                for img in samples:
+                    func(img)
+                elapsed = (time.perf_counter() - start) / iterations
+                results[label][name] = elapsed
+                print(f"   {label} (模板 {t_w}×{t_h}) {name}: {elapsed * 1e6:.1f}µs/次读数")
+            recognizer.reset_stats()
+            start = time.perf_counter()
+            for img, prev in zip(samples, previous):
+                _prior(img, prev)
+            elapsed = (time.perf_counter() - start) / iterations
+            candidates = recognizer.get_prior_stats()["avg_candidates"]
+            results[label]["先验顺序匹配"] = elapsed
+            results[label]["avg_candidates"] = candidates
+            print(
+                f"   {label} (模板 {t_w}×{t_h}) 先验顺序匹配: {elapsed * 1e6:.1f}µs/次读数，"
+                f"平均匹配 {candidates:.2f} 个候选数字"
+            )
+            print(f"   {label} 识别结果一致: {agree}/{iterations}，先验顺序匹配一致: {prior_agree}/{iterations}")
+    finally:
+        apply_target_resolution(*saved_resolution)
+        templates = None
+    return results
+
+
+def tool_benchmark_digits(args):
+    """--benchmark-digits [每项次数]"""
+    iterations = int(args[0]) if args else 300
+    print(f"📊 [测试] 鱼饵数字识别性能对比（每种分辨率 {iterations} 次读数）")
+    run_digit_classifier_benchmark(iterations)
+    return 0
+
+
+def _base_match_detectors():
+    """基准分辨率匹配对比使用的检测器：名称 -> (区域坐标, 缩放后的模板, 原始模板文件名)"""
+    global star_template, f1, f2, jiashi, tiao_template
+    star_template = f1 = f2 = jiashi = tiao_template = None
+    return {
+        "fished": (region3_coords, load_star_template(), "star_grayscale.png"),
+        "f1_mached": (region4_coords, load_f1(), "F1_grayscale.png"),
+        "f2_mached": (region5_coords, load_f2(), "F2_grayscale.png"),
+        "shangyu_mached": (region6_coords, load_shangyule(), "shangyu_grayscale.png"),
+        "fangzhu_jiashi": (get_jiashi_region_coords(), load_jiashi(), "chang_grayscale.png"),
+        "uno_recognize_tiao": (get_uno_tiao_region_coords(), load_tiao_template(), "tiao.png"),
+    }
 
 
-def shangyu_mached(scr):
-    global region6_coords, shangyule
-    # 确保模板已加载
-    if shangyule is None:
-        load_shangyule()
-    region_gray = capture_region(*region6_coords, scr)
-    if region_gray is None:
-        return None
-    h, w = region_gray.shape[:2]
-    t_h, t_w = shangyule.shape[:2]
-    if h >= t_h and w >= t_w:
-        return (
-            cv2.minMaxLoc(
-                cv2.matchTemplate(region_gray, shangyule, cv2.TM_CCOEFF_NORMED)
-            )[1]
-            > 0.8
-        )
-    return False
+def synthesize_indicator_regions(coords, base_template, rng, count=8):
+    """生成指示器区域画面：原始模板放在基准尺寸的噪声背景中央，再放大到当前分辨率的区域尺寸"""
+    _, _, w, h = coords
+    t_h, t_w = base_template.shape[:2]
+    base_w = max(t_w, round(w / SCALE_UNIFORM))
+    base_h = max(t_h, round(h / SCALE_UNIFORM))
+    regions = []
+    for _ in range(count):
+        canvas = rng.normal(128, 30, (base_h, base_w))
+        x = (base_w - t_w) // 2
+        y = (base_h - t_h) // 2
+        canvas[y : y + t_h, x : x + t_w] = base_template + rng.normal(0, 4, (t_h, t_w))
+        canvas = np.clip(canvas, 0, 255).astype(np.uint8)
+        regions.append(cv2.resize(canvas, (w, h), interpolation=cv2.INTER_LINEAR))
+    return regions
+
+
+def run_roi_tracking_benchmark(iterations=300, resolutions=("1080P", "2K", "4K"), seed=0):
+    """对比整区域搜索与匹配位置跟踪（先搜上次位置附近的小窗口）每次识别的耗时和命中率"""
+    global roi_tracker
+    rng = np.random.default_rng(seed)
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    saved_tracker = roi_tracker
+    results = {}
+    try:
+        for label in resolutions:
+            apply_target_resolution(*parse_resolution(label))
+            results[label] = {}
+            detectors = _base_match_detectors()
+            for name in ("fished", "fangzhu_jiashi", "uno_recognize_tiao"):
+                coords, template, filename = detectors[name]
+                base_template = load_base_template(filename)
+                regions = synthesize_indicator_regions(coords, base_template, rng)
+                # 一半画面没有指示器（纯噪声），统计未命中时多出的开销
+                _, _, w, h = coords
+                absent = [rng.integers(0, 256, (h, w), dtype=np.uint8) for _ in range(len(regions))]
+                roi_tracker = RoiTracker()
+                at_base = name in MATCH_AT_BASE_RESOLUTION_INDICATORS
+                row = {}
+                for mode, track in (("整区域", None), ("位置跟踪", name)):
+                    match_template_max(regions[0], template, base_template, at_base, track=track)
+                    for kind, samples in (("", regions), ("无指示器", absent)):
+                        start = time.perf_counter()
+                        for i in range(iterations):
+                            match_template_max(
+                                samples[i % len(samples)], template, base_template, at_base, track=track
+                            )
+                        row[mode + kind] = (time.perf_counter() - start) / iterations * 1e6
+                row["hit_rate"] = roi_tracker.get_stats().get(name, {}).get("hit_rate", 0.0)
+                results[label][name] = row
+                print(
+                    f"   {label} {name} ({w}×{h}): 整区域 {row['整区域']:.1f}µs，"
+                    f"位置跟踪 {row['位置跟踪']:.1f}µs（命中率 {row['hit_rate'] * 100:.0f}%），"
+                    f"快 {row['整区域'] / row['位置跟踪']:.1f} 倍；无指示器时 "
+                    f"{row['整区域无指示器']:.1f}µs → {row['位置跟踪无指示器']:.1f}µs"
+                )
+    finally:
+        roi_tracker = saved_tracker
+        apply_target_resolution(*saved_resolution)
+        _base_match_detectors()
+    return results
 
 
-def fangzhu_jiashi(scr):
-    global jiashi
-    # 记录日志：开始加时识别
-    if debug_mode:
-        debug_info = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            "action": "jiashi_recognition_start",
-            "message": "开始识别加时界面",
-        }
-        add_debug_info(debug_info)
+def tool_benchmark_tracking(args):
+    """--benchmark-tracking [每项次数]"""
+    iterations = int(args[0]) if args else 300
+    print(f"📊 [测试] 匹配位置跟踪耗时对比（每项 {iterations} 次）")
+    run_roi_tracking_benchmark(iterations)
+    return 0
 
-    # 确保模板已加载
-    if jiashi is None:
-        jiashi = load_jiashi()
-    
-    # 检查模板是否成功加载
-    if jiashi is None:
-        return False
 
-    # 确保加时区域坐标已初始化
-    if jiashi_region_coords is None:
-        update_region_coords()
+def run_ncc_engine_benchmark(iterations=2000, resolutions=("1080P", "2K", "4K"), seed=0):
+    """对比 cv2.matchTemplate 与小区域匹配引擎在实际指示器区域尺寸上每次匹配的耗时和结果差异
 
-    # 使用缓存的坐标
-    actual_x, actual_y, actual_w, actual_h = jiashi_region_coords
+    单模板：F1、F2、上鱼提示、上鱼星星各自的区域与模板；
+    多模板：F1、F2 两个同尺寸模板对同一区域，cv2 需要调用两次，匹配引擎一次矩阵乘法
+    """
+    rng = np.random.default_rng(seed)
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    results = {}
 
-    # 记录日志：识别区域
-    if debug_mode:
-        debug_info = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            "action": "jiashi_recognition_region",
-            "message": "加时识别区域",
-            "region": {
-                "x1": actual_x,
-                "y1": actual_y,
-                "x2": actual_x + actual_w,
-                "y2": actual_y + actual_h,
-            },
-        }
-        add_debug_info(debug_info)
+    def _timed(func, regions):
+        func(regions[0])
+        start = time.perf_counter()
+        for i in range(iterations):
+            func(regions[i % len(regions)])
+        return (time.perf_counter() - start) / iterations * 1e6
 
-    region_gray = capture_region(actual_x, actual_y, actual_w, actual_h, scr)
-    if region_gray is None:
-        # 记录日志：识别失败
-        if debug_mode:
-            debug_info = {
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-                "action": "jiashi_recognition_failed",
-                "message": "无法获取加时区域图像",
-            }
-            add_debug_info(debug_info)
-        return False
+    try:
+        for label in resolutions:
+            apply_target_resolution(*parse_resolution(label))
+            results[label] = {}
+            detectors = _base_match_detectors()
+            cases = []
+            for name in ("f1_mached", "f2_mached", "shangyu_mached", "fished"):
+                coords, template, filename = detectors[name]
+                regions = synthesize_indicator_regions(coords, load_base_template(filename), rng)
+                cases.append((name, regions, (template,)))
+            f1_template, f2_template = detectors["f1_mached"][1], detectors["f2_mached"][1]
+            if f1_template.shape == f2_template.shape:
+                cases.append(("F1+F2", cases[0][1], (f1_template, f2_template)))
+
+            for name, regions, group in cases:
+                h, w = regions[0].shape[:2]
+                matcher = get_ncc_matcher(*group)
+
+                def _opencv(region):
+                    return [
+                        cv2.minMaxLoc(cv2.matchTemplate(region, t, cv2.TM_CCOEFF_NORMED))[1]
+                        for t in group
+                    ]
+
+                def _engine(region):
+                    return [score for score, _ in matcher.match(region)]
+
+                diff = max(
+                    abs(a - b)
+                    for region in regions
+                    for a, b in zip(_opencv(region), _engine(region))
+                )
+                row = {"opencv": _timed(_opencv, regions), "engine": _timed(_engine, regions), "max_diff": diff}
+                if len(group) == 1:
+                    # ncc_match_max 按实测加速比选择的实现
+                    speedup = ncc_engine_speedup(regions[0], group[0])
+                    row["uses_engine"] = speedup is not None and speedup >= NCC_ENGINE_MIN_SPEEDUP
+                results[label][name] = row
+                t_h, t_w = group[0].shape[:2]
+                choice = ""
+                if "uses_engine" in row:
+                    choice = f"，识别时使用{'匹配引擎' if row['uses_engine'] else ' cv2'}"
+                print(
+                    f"   {label} {name} (区域 {w}×{h}，模板 {t_w}×{t_h}×{len(group)}): "
+                    f"cv2.matchTemplate {row['opencv']:.1f}µs，匹配引擎 {row['engine']:.1f}µs，"
+                    f"快 {row['opencv'] / row['engine']:.1f} 倍，匹配度最大差异 {diff:.1e}{choice}"
+                )
+    finally:
+        apply_target_resolution(*saved_resolution)
+        _base_match_detectors()
+    return results
 
-    # 安全检查：确保图像尺寸大于等于模板尺寸
-    h, w = region_gray.shape[:2]
-    t_h, t_w = jiashi.shape[:2]
-    if h >= t_h and w >= t_w:
-        # 降低匹配阈值，提高识别率
-        match_result = cv2.matchTemplate(region_gray, jiashi, cv2.TM_CCOEFF_NORMED)
-        max_val = cv2.minMaxLoc(match_result)[1]
-        result = max_val > 0.8  # 降低阈值到0.8
-    else:
-        result = False
 
-    # 记录日志：识别结果
-    if debug_mode:
-        debug_info = {
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-            "action": "jiashi_recognition_result",
-            "message": "加时识别完成",
-            "result": "是" if result else "否",
-            "parsed_info": {"加时界面": "已识别" if result else "未识别"},
-        }
-        add_debug_info(debug_info)
+def tool_benchmark_ncc(args):
+    """--benchmark-ncc [每项次数]"""
+    iterations = int(args[0]) if args else 2000
+    print(f"📊 [测试] 小区域匹配引擎与 cv2.matchTemplate 耗时对比（每项 {iterations} 次）")
+    run_ncc_engine_benchmark(iterations)
+    return 0
 
-    return result
 
+def run_base_resolution_match_benchmark(iterations=300, resolutions=("1080P", "2K", "4K"), seed=0):
+    """对比两种匹配方式在各分辨率下每个检测器的耗时：
+    放大模板（区域原尺寸 + 缩放后的模板）与缩小区域（INTER_AREA 缩小到2K基准 + 原始模板）
 
-# =========================
-# 程序主循环与热键监听
-# =========================
-def toggle_run():
-    global a, previous_result, scr
-    if run_event.is_set():
-        run_event.clear()  # 暂停
-        a = 0
-        previous_result = None
-        ensure_mouse_up()  # 确保鼠标没有按下
-        end_current_session()  # 结束钓鱼会话
+    区域画面由原始模板放在基准尺寸的噪声背景上、再放大到当前分辨率得到，
+    同时输出两种方式的平均匹配度，确认缩小区域后识别结果不变
+    """
+    rng = np.random.default_rng(seed)
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    results = {}
+    try:
+        for label in resolutions:
+            apply_target_resolution(*parse_resolution(label))
+            results[label] = {}
+            for name, (coords, template, filename) in _base_match_detectors().items():
+                base_template = load_base_template(filename)
+                _, _, w, h = coords
+                regions = synthesize_indicator_regions(coords, base_template, rng)
+
+                row = {}
+                for mode, at_base in (("放大模板", False), ("缩小区域", True)):
+                    scores = [match_template_max(r, template, base_template, at_base) for r in regions]
+                    start = time.perf_counter()
+                    for i in range(iterations):
+                        match_template_max(regions[i % len(regions)], template, base_template, at_base)
+                    elapsed = (time.perf_counter() - start) / iterations
+                    valid = [v for v in scores if v is not None]
+                    row[mode] = {
+                        "us": elapsed * 1e6,
+                        "score": sum(valid) / len(valid) if valid else None,
+                    }
+                results[label][name] = row
+                summary = "，".join(
+                    f"{mode} {r['us']:.1f}µs（匹配度 {r['score']:.2f}）"
+                    if r["score"] is not None
+                    else f"{mode} {r['us']:.1f}µs（区域小于模板）"
+                    for mode, r in row.items()
+                )
+                used = "缩小区域" if name in MATCH_AT_BASE_RESOLUTION_INDICATORS else "放大模板"
+                print(f"   {label} {name} ({w}×{h}): {summary}，使用{used}")
+    finally:
+        apply_target_resolution(*saved_resolution)
+        _base_match_detectors()
+    return results
+
+
+def tool_benchmark_match(args):
+    """--benchmark-match [每项次数]"""
+    iterations = int(args[0]) if args else 300
+    print(f"📊 [测试] 放大模板与缩小区域匹配耗时对比（每项 {iterations} 次）")
+    run_base_resolution_match_benchmark(iterations)
+    return 0
+
+
+def measure_template_cold_start(width, height, repeats=5):
+    """比较冷启动时加载一个分辨率全部模板的耗时：从PNG解码缩放 与 内存映射模板包"""
+    keys = template_pack_keys(width, height)
+    results = {}
+    for label, use_pack in (("PNG解码+缩放", False), ("模板包", True)):
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            store = TemplateStore(template_folder_path, use_pack=use_pack)
+            for filename, scale, interp in keys:
+                store.get(filename, scale, interp)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[label] = {"seconds": best, "stats": store.get_stats()}
+    return results
+
+
+def tool_build_template_pack(args):
+    """--build-template-pack [输出路径]"""
+    path = args[0] if args else os.path.join(template_folder_path, TEMPLATE_PACK_FILE)
+    count = build_template_pack(path)
+    resolutions = "、".join(TEMPLATE_PACK_RESOLUTIONS)
+    print(f"✅ [模板] 已生成模板包 {path}（{count} 个模板，{resolutions}，{os.path.getsize(path) / 1024:.1f}KB）")
+    if os.path.abspath(path) != os.path.abspath(os.path.join(template_folder_path, TEMPLATE_PACK_FILE)):
+        return 0
+    for label, (width, height) in TEMPLATE_PACK_RESOLUTIONS.items():
+        results = measure_template_cold_start(width, height)
+        summary = "，".join(
+            f"{name} {r['seconds'] * 1000:.2f}ms（解码PNG {r['stats']['decodes']} 次）"
+            for name, r in results.items()
+        )
+        print(f"   {label} 冷启动加载模板: {summary}")
+    return 0
+
+
+def synthesize_bait_crops(count, rng):
+    """用当前分辨率下缩放后的数字模板拼出鱼饵数量区域，返回 [(灰度图, BGRA图, 鱼饵数量), ...]
+
+    背景取模板边缘的亮度，1位数居中、2位数从左侧开始，加随机亮度变化和噪声
+    """
+    load_templates()
+    t_h, t_w = templates[0].shape[:2]
+    _, _, w, h = get_bait_region_coords()
+    h, w = max(h, t_h), max(w, t_w * 2)
+    background = float(np.median(np.concatenate([templates[0][0], templates[0][-1]])))
+    samples = []
+    for _ in range(count):
+        value = int(rng.integers(0, 100))
+        img = np.full((h, w), background, dtype=np.float32)
+        if value >= 10:
+            img[:t_h, :t_w] = templates[value // 10]
+            img[:t_h, t_w : t_w * 2] = templates[value % 10]
+        else:
+            start = max(0, (w - t_w) // 2)
+            img[:t_h, start : start + t_w] = templates[value]
+        img = img * rng.uniform(0.85, 1.1) + rng.normal(0, 5, img.shape)
+        gray = np.clip(img, 0, 255).astype(np.uint8)
+        samples.append((gray, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGRA), value))
+    return samples
 
-        # 播放暂停音效
-        sound_manager.play_pause()
 
-        print("⏸️  [状态] 脚本已暂停")
+def load_recorded_bait_crops(path):
+    """从录制的画面（目录/NPZ/视频）中取出带 bait 标注的鱼饵数量区域
 
-    else:
-        # 重置鱼桶满检测状态
-        reset_fish_bucket_full_detection()
+    Returns:
+        tuple: (分辨率 (width, height) 或 None, [(灰度图, BGRA图, 鱼饵数量), ...])
+    """
+    source = open_frame_source(path)
+    samples = []
+    try:
+        if source.screen_size:
+            apply_target_resolution(*source.screen_size)
+        coords = get_bait_region_coords()
+        while True:
+            item = source.read([])
+            if item is None:
+                break
+            timestamp, tiles, labels = item
+            if not labels or "bait" not in labels:
+                continue
+            frame = Frame(0, timestamp, tiles, None, labels)
+            gray = capture_region(*coords, frame)
+            if gray is not None:
+                samples.append((gray, capture_region_bgra(*coords, frame), labels["bait"]))
+    finally:
+        source.close()
+    return source.screen_size, samples
+
+
+def score_bait_backends(samples, algorithms=None):
+    """用每个鱼饵识别算法识别全部样本，统计准确率、识别率、平均耗时和平均置信度"""
+    recognizer = BaitRecognizer()
+    if algorithms is None:
+        # 未安装RapidOCR时跳过OCR算法
+        algorithms = [name for name in recognizer.backends if name != "ocr" or OCR_AVAILABLE]
+    results = {}
+    for name in algorithms:
+        correct = recognized = 0
+        confidence = 0.0
+        start = time.perf_counter()
+        for gray, bgra, label in samples:
+            recognition = recognizer.recognize(gray, name, bgra)
+            if recognition["value"] is not None:
+                recognized += 1
+                confidence += recognition["confidence"]
+            correct += recognition["value"] == label
+        elapsed = time.perf_counter() - start
+        count = max(1, len(samples))
+        results[name] = {
+            "accuracy": correct / count,
+            "recognized": recognized / count,
+            "avg_ms": elapsed / count * 1000,
+            "avg_confidence": confidence / recognized if recognized else 0.0,
+        }
+    return results
 
-        start_new_session()  # 开始新的钓鱼会话
-        if previous_result is None:
-            temp_scr = None
-            try:
-                temp_scr = mss.mss()
-                bait_result = bait_math_val(temp_scr)
-                if bait_result is not None:
-                    previous_result = result_val_is
-                    run_event.set()  # 恢复运行
 
-                    # 播放启动音效
-                    sound_manager.play_start()
+def pick_bait_backend(results, min_accuracy=0.99):
+    """在准确率达标的算法中选最快的，都不达标时选准确率最高的"""
+    accurate = [name for name, r in results.items() if r["accuracy"] >= min_accuracy]
+    if accurate:
+        return min(accurate, key=lambda name: results[name]["avg_ms"])
+    return max(results, key=lambda name: results[name]["accuracy"])
 
-                    print("▶️  [状态] 脚本开始运行")
 
-                else:
-                    time.sleep(0.1)
-                    print("⚠️  [警告] 未识别到鱼饵，请确保游戏界面正确")
-            except Exception as e:
-                print(f"❌ [错误] 初始化失败: {e}")
-            finally:
-                if temp_scr is not None:
-                    try:
-                        temp_scr.close()
-                    except:
-                        pass
-                scr = None
+def run_bait_recognizer_benchmark(count=200, resolutions=("1080P", "2K", "4K"), path=None, seed=0):
+    """对比所有鱼饵识别算法：有录制画面时使用录制中带 bait 标注的帧，
+    否则在各分辨率下用数字模板合成鱼饵数量区域"""
+    global templates
+    rng = np.random.default_rng(seed)
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    results = {}
+    try:
+        if path:
+            templates = None
+            screen_size, samples = load_recorded_bait_crops(path)
+            label = f"{screen_size[0]}×{screen_size[1]}" if screen_size else "录制"
+            datasets = [(label, lambda: samples)]
         else:
-            run_event.set()
-            # 播放恢复音效
-            sound_manager.play_resume()
-            print("▶️  [状态] 脚本继续运行")
+            datasets = []
+            for label in resolutions:
+                def _make(label=label):
+                    apply_target_resolution(*parse_resolution(label))
+                    return synthesize_bait_crops(count, rng)
+
+                datasets.append((label, _make))
+
+        for label, make in datasets:
+            templates = None
+            samples = make()
+            if not samples:
+                print(f"   {label}: 没有带 bait 标注的样本")
+                continue
+            scores = score_bait_backends(samples)
+            results[label] = scores
+            for name, r in scores.items():
+                print(
+                    f"   {label} {bait_recognition_algorithms.get(name, name)}: 准确率 {r['accuracy'] * 100:.1f}%，"
+                    f"识别率 {r['recognized'] * 100:.1f}%，平均 {r['avg_ms']:.3f}ms，"
+                    f"平均置信度 {r['avg_confidence']:.2f}（{len(samples)} 个样本）"
+                )
+            best = pick_bait_backend(scores)
+            print(f"   {label} 推荐算法: {bait_recognition_algorithms.get(best, best)} ({best})")
+    finally:
+        apply_target_resolution(*saved_resolution)
+        templates = None
+    return results
 
 
-def on_press(key):
-    global current_modifiers
-    time.sleep(0.02)
+def tool_benchmark_bait(args):
+    """--benchmark-bait [录制目录/NPZ/视频] [合成样本数]"""
+    path = None
+    if args and not args[0].isdigit():
+        path, args = args[0], args[1:]
+    count = int(args[0]) if args else 200
+    source = path or f"合成样本，每种分辨率 {count} 个"
+    print(f"📊 [测试] 鱼饵识别算法对比（{source}）")
+    run_bait_recognizer_benchmark(count, path=path)
+    return 0
 
-    # 检查是否是修饰键
-    if key in MODIFIER_KEYS:
-        current_modifiers.add(MODIFIER_KEYS[key])
-        return
 
-    # 检查是否匹配热键
-    check_hotkey_match(key)
+def load_recorded_fish_banners(path):
+    """从录制的画面（目录/NPZ/视频）中取出带 fish_info 标注的鱼信息横幅
 
+    标注格式：{"fish_info": {"name": "鱼名", "quality": "品质", "weight": "1.20kg"}}
 
-def on_release(key):
-    global current_modifiers
-    # 释放修饰键时移除
-    if key in MODIFIER_KEYS:
-        current_modifiers.discard(MODIFIER_KEYS[key])
+    Returns:
+        tuple: (分辨率 (width, height) 或 None, [(RGB图像, 标注), ...])
+    """
+    source = open_frame_source(path)
+    samples = []
+    try:
+        if source.screen_size:
+            apply_target_resolution(*source.screen_size)
+        while True:
+            item = source.read([])
+            if item is None:
+                break
+            timestamp, tiles, labels = item
+            if not labels or not isinstance(labels.get("fish_info"), dict):
+                continue
+            img = capture_fish_info_region(Frame(0, timestamp, tiles, None, labels))
+            if img is not None:
+                samples.append((img, labels["fish_info"]))
+    finally:
+        source.close()
+    return source.screen_size, samples
 
 
-def on_mouse_press(x, y, button, pressed):
-    """鼠标按下事件处理"""
-    if not pressed:
-        return
+def run_fish_info_ocr_benchmark(samples, modes=("full", "layout")):
+    """对比完整流程OCR与固定版面OCR在录制横幅上的平均耗时和各字段识别准确率（不使用OCR结果缓存）"""
+    global FISH_INFO_OCR_MODE, OCR_CACHE_ENABLED
+    saved = (FISH_INFO_OCR_MODE, OCR_CACHE_ENABLED)
+    OCR_CACHE_ENABLED = False
+    results = {}
+    try:
+        for mode in modes:
+            FISH_INFO_OCR_MODE = mode
+            recognize_fish_info_ocr(samples[0][0])  # 预热（模型首次推理较慢）
+            correct = {"name": 0, "quality": 0, "weight": 0}
+            labelled = dict.fromkeys(correct, 0)
+            start = time.perf_counter()
+            for img, label in samples:
+                name, quality, weight, _ = recognize_fish_info_ocr(img)
+                for field, value in (("name", name), ("quality", quality), ("weight", weight)):
+                    if label.get(field) is not None:
+                        labelled[field] += 1
+                        correct[field] += value == label[field]
+            elapsed = (time.perf_counter() - start) / len(samples)
+            accuracy = {
+                field: correct[field] / labelled[field] if labelled[field] else None
+                for field in correct
+            }
+            results[mode] = {"avg_ms": elapsed * 1000, "accuracy": accuracy}
+            summary = "，".join(
+                f"{field} {value * 100:.1f}%" for field, value in accuracy.items() if value is not None
+            )
+            print(f"   {mode}: 平均 {elapsed * 1000:.1f}ms/条，准确率 {summary or '无标注'}")
+    finally:
+        FISH_INFO_OCR_MODE, OCR_CACHE_ENABLED = saved
+    return results
 
-    # 检查是否匹配热键
-    check_hotkey_match(button)
 
+def tool_benchmark_ocr(args):
+    """--benchmark-ocr <录制目录/NPZ/视频>"""
+    if not args:
+        print("用法: PartyFish.py --benchmark-ocr <录制目录/NPZ/视频>")
+        return 2
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    try:
+        screen_size, samples = load_recorded_fish_banners(args[0])
+        if not samples:
+            print("❌ [错误] 录制画面中没有带 fish_info 标注的鱼信息横幅")
+            return 1
+        boxes = measure_fish_info_line_boxes([img for img, _ in samples])
+        if boxes is None:
+            print("⚠️  [警告] 没能从录制的横幅中分出各文字行，沿用当前行框")
+        else:
+            print(f"📊 [测试] 测量出的文字行框（2K基准）: FISH_INFO_LINE_BOXES_BASE = {boxes}")
+        if not OCR_AVAILABLE or ocr_engine is None:
+            print("❌ [错误] RapidOCR 未安装，无法测试OCR")
+            return 1
+        print(f"📊 [测试] 鱼信息OCR完整流程与固定版面对比（{len(samples)} 条横幅，{screen_size}）")
+        run_fish_info_ocr_benchmark(samples)
+    finally:
+        apply_target_resolution(*saved_resolution)
+    return 0
 
-def check_hotkey_match(key):
-    """检查按键是否匹配热键"""
-    # 比较主按键
-    main_key_match = False
-    uno_key_match = False
 
-    # 直接比较按键对象
-    if key == hotkey_main_key:
-        main_key_match = True
-    if key == uno_hotkey_main_key:
-        uno_key_match = True
+def run_banner_quality_benchmark(samples, classifier=None):
+    """在录制的横幅上测试横幅颜色判断品质：平均耗时、准确率，以及高置信度判断的覆盖率和准确率"""
+    classifier = classifier or BannerQualityClassifier()
+    labelled = [(img, label["quality"]) for img, label in samples if label.get("quality")]
+    if not labelled:
+        print("⚠️  [警告] 横幅没有品质标注")
+        return None
+    correct = confident = confident_correct = 0
+    start = time.perf_counter()
+    for img, quality in labelled:
+        predicted, confidence = classifier.classify(img)
+        correct += predicted == quality
+        if confidence >= QUALITY_COLOR_MIN_CONFIDENCE:
+            confident += 1
+            confident_correct += predicted == quality
+    elapsed = (time.perf_counter() - start) / len(labelled)
+    result = {
+        "avg_us": elapsed * 1e6,
+        "accuracy": correct / len(labelled),
+        "coverage": confident / len(labelled),
+        "confident_accuracy": confident_correct / confident if confident else None,
+    }
+    confident_summary = (
+        f"{result['confident_accuracy'] * 100:.1f}%" if confident else "-"
+    )
+    print(
+        f"   平均 {result['avg_us']:.0f}µs/条，准确率 {result['accuracy'] * 100:.1f}%，"
+        f"高置信度 {result['coverage'] * 100:.1f}%（其中准确率 {confident_summary}）"
+    )
+    return result
 
-    # 虚拟键码比较
-    elif hasattr(key, "vk"):
-        # 检查主热键
-        if hasattr(hotkey_main_key, "vk") and hotkey_main_key.vk is not None:
-            if key.vk is not None:
-                main_key_match = key.vk == hotkey_main_key.vk
-        # 检查UNO热键
-        if hasattr(uno_hotkey_main_key, "vk") and uno_hotkey_main_key.vk is not None:
-            if key.vk is not None:
-                uno_key_match = key.vk == uno_hotkey_main_key.vk
 
-    # 字符键比较（忽略大小写）
-    elif hasattr(key, "char") and key.char:
-        # 检查主热键
-        if hasattr(hotkey_main_key, "char") and hotkey_main_key.char:
-            main_key_match = key.char.lower() == hotkey_main_key.char.lower()
-        # 检查UNO热键
-        if hasattr(uno_hotkey_main_key, "char") and uno_hotkey_main_key.char:
-            uno_key_match = key.char.lower() == uno_hotkey_main_key.char.lower()
+def tool_benchmark_quality_color(args):
+    """--benchmark-quality-color <录制目录/NPZ/视频>"""
+    if not args:
+        print("用法: PartyFish.py --benchmark-quality-color <录制目录/NPZ/视频>")
+        return 2
+    saved_resolution = (TARGET_WIDTH, TARGET_HEIGHT)
+    try:
+        screen_size, samples = load_recorded_fish_banners(args[0])
+        if not samples:
+            print("❌ [错误] 录制画面中没有带 fish_info 标注的鱼信息横幅")
+            return 1
+        print(f"📊 [测试] 横幅颜色判断品质（{len(samples)} 条横幅，{screen_size}）")
+        print("   默认色相:")
+        run_banner_quality_benchmark(samples)
+        fitted = BannerQualityClassifier()
+        fitted.fit([(img, label.get("quality")) for img, label in samples])
+        print("   按录制横幅拟合的色相（同一批样本，偏乐观）:")
+        run_banner_quality_benchmark(samples, fitted)
+        hues = ", ".join(f'"{name}": {hue:.1f}' for name, hue in fitted.hues.items())
+        print(f"   建议 QUALITY_COLOR_HUES = {{{hues}}}")
+    finally:
+        apply_target_resolution(*saved_resolution)
+    return 0
 
-    # 鼠标按键比较
-    elif isinstance(key, mouse.Button):
-        # 检查主热键
-        if isinstance(hotkey_main_key, mouse.Button):
-            main_key_match = key == hotkey_main_key
-        # 检查UNO热键
-        if isinstance(uno_hotkey_main_key, mouse.Button):
-            uno_key_match = key == uno_hotkey_main_key
 
-    # 处理主热键匹配
-    if main_key_match:
-        # 检查修饰键是否匹配
-        if current_modifiers == hotkey_modifiers:
-            toggle_run()  # 暂停或恢复程序
-            return
+def synthesize_fish_name_corpus(resolver, count=500, seed=0):
+    """用词典中的鱼名合成带OCR噪声的横幅文本：繁体字、"钓"误识别为"约"、错字、漏字、多余空格
 
-    # 处理UNO热键匹配
-    if uno_key_match:
-        # 检查修饰键是否匹配
-        if current_modifiers == uno_hotkey_modifiers:
-            print(f"🎮 [UNO] 热键 {uno_hotkey_name} 被触发")
-            # 切换持续识别状态
-            global uno_recognition_running
-            if uno_recognition_running:
-                # 如果正在识别，停止识别
-                uno_stop_continuous_recognition()
-                print("🎮 [UNO] 已停止持续识别")
+    约五分之一是不在词典中、与词典鱼名只差一个字的短鱼名（如"刀鱼"之于"鬼刀鱼"），正确结果为None
+    """
+    rng = random.Random(seed)
+    to_traditional = str.maketrans(
+        _TRADITIONAL_SIMPLIFIED_PAIRS[1::2], _TRADITIONAL_SIMPLIFIED_PAIRS[0::2]
+    )
+    names = [entry["name"] for entry in resolver.species]
+    short_names = [name for name in names if len(name) <= 3] or names
+    corpus = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            # 不在词典中的鱼：短鱼名改一个字或去掉一个字
+            noisy = list(rng.choice(short_names))
+            if rng.random() < 0.5 and len(noisy) > 2:
+                del noisy[rng.randrange(len(noisy))]
             else:
-                # 如果未在识别，启动识别
-                uno_start_continuous_recognition()
-                print("🎮 [UNO] 已启动持续识别")
-            return
+                noisy[rng.randrange(len(noisy))] = chr(rng.randrange(0x4E00, 0x9FA5))
+            name = None if "".join(noisy) not in resolver.exact else "".join(noisy)
+        else:
+            name = rng.choice(names)
+            noisy = list(name)
+            # 错字和漏字都在该鱼名允许的编辑距离以内
+            if fish_name_max_distance(name) >= 1 and rng.random() < 0.3:
+                noisy[rng.randrange(len(noisy))] = chr(rng.randrange(0x4E00, 0x9FA5))
+            elif fish_name_max_distance(name) >= 1 and rng.random() < 0.15:
+                del noisy[rng.randrange(len(noisy))]
+        if rng.random() < 0.2:
+            noisy.insert(rng.randrange(1, len(noisy)), " ")
+        prefix = rng.choice(["你钓到了", "你约到了", "首次捕获", "钓到了"])
+        text = f"{prefix}{''.join(noisy)} {rng.choice(['标准', '非凡', '稀有', '史诗', '传奇'])} {rng.uniform(0.1, 30):.2f}kg"
+        if rng.random() < 0.3:
+            text = text.translate(to_traditional)
+        corpus.append({"text": text, "name": name})
+    return corpus
+
+
+def _resolve_fish_name_linear(resolver, text):
+    """不使用索引，逐个比较词典中的全部鱼名（--benchmark-fish-names 的对照）"""
+    query = "".join(normalize_fish_name_text(text))
+    best_name, best_score = None, 0.0
+    for key, name in resolver.keys:
+        distance = edit_distance(key, query)
+        if distance <= fish_name_max_distance(key) and 1.0 - distance / len(key) > best_score:
+            best_name, best_score = name, 1.0 - distance / len(key)
+    return best_name, best_score
+
+
+def run_fish_name_benchmark(corpus, resolver=None):
+    """测试鱼名词典在OCR文本上的识别准确率、错配率和耗时，并与不使用索引逐个比较全部鱼名对比
+
+    语料中 name 为None的文本不是词典中的鱼，返回任何鱼名都计为错配
+    """
+    resolver = resolver or get_fish_name_resolver()
+    results = {}
+    for mode in ("index", "linear"):
+        correct = wrong = 0
+        start = time.perf_counter()
+        for sample in corpus:
+            if mode == "index":
+                name, _ = resolver.resolve(sample["text"])
+            else:
+                name, _ = _resolve_fish_name_linear(resolver, sample["text"])
+            correct += name == sample["name"]
+            wrong += name is not None and name != sample["name"]
+        elapsed = (time.perf_counter() - start) / len(corpus)
+        results[mode] = {
+            "avg_us": elapsed * 1e6,
+            "accuracy": correct / len(corpus),
+            "wrong": wrong / len(corpus),
+        }
+        label = "n-gram 索引" if mode == "index" else "逐个比较"
+        print(
+            f"   {label}: 平均 {elapsed * 1e6:.0f}µs/条，准确率 {correct / len(corpus) * 100:.1f}%，"
+            f"错配 {wrong / len(corpus) * 100:.1f}%"
+        )
+    return results
 
 
-def start_hotkey_listener():
-    global listener, mouse_listener
-    # 启动键盘监听器，设置suppress=False允许事件传递，确保全局监听
-    if listener is None or not listener.running:
-        listener = keyboard.Listener(
-            on_press=on_press,
-            on_release=on_release,
-            suppress=False,  # 不抑制事件，允许其他应用程序接收按键
-        )
-        listener.daemon = True
-        listener.start()
+def tool_benchmark_fish_names(args):
+    """--benchmark-fish-names [OCR文本语料.json] [--count N]
 
-    # 启动鼠标监听器
-    if (
-        "mouse_listener" not in globals()
-        or mouse_listener is None
-        or not mouse_listener.running
-    ):
-        mouse_listener = mouse.Listener(
-            on_click=on_mouse_press,
-            suppress=False,  # 不抑制事件，允许其他应用程序接收鼠标事件
-        )
-        mouse_listener.daemon = True
-        mouse_listener.start()
+    语料格式：[{"text": "OCR识别出的横幅文本", "name": "正确鱼名，不在词典中的鱼为null"}, ...]，不指定时用词典合成带噪声的文本
+    """
+    count = 500
+    if "--count" in args:
+        i = args.index("--count")
+        count = int(args[i + 1])
+        args = args[:i] + args[i + 2 :]
+    resolver = get_fish_name_resolver()
+    if args:
+        with open(args[0], "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+        source = f"{args[0]}，{len(corpus)} 条"
+    else:
+        corpus = synthesize_fish_name_corpus(resolver, count)
+        source = f"合成 {len(corpus)} 条"
+    print(f"📊 [测试] 鱼名词典识别（{source}，词典 {len(resolver.species)} 种鱼）")
+    run_fish_name_benchmark(corpus, resolver)
+    return 0
 
 
-# =========================
-# 主函数
-# =========================
-# 主函数：定时识别并比较数字
-def handle_jiashi_thread():
-    global run_event, previous_result, result_val_is
-    while True:
-        if run_event.is_set():
-            try:
-                # 为每个线程创建独立的mss对象
-                scr = mss.mss()
+def tool_build_species_dict(args):
+    """--build-species-dict [钓鱼记录文件]：把钓鱼记录中出现过多次的鱼名加入鱼名词典"""
+    path = args[0] if args else FISH_RECORD_FILE
+    counts = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = FishRecord.from_line(line)
+                if record is not None and record.name != "未知":
+                    counts[record.name] = counts.get(record.name, 0) + 1
+    except FileNotFoundError:
+        print(f"❌ [错误] 钓鱼记录文件不存在: {path}")
+        return 1
+    resolver = get_fish_name_resolver()
+    names = sorted(name for name, n in counts.items() if n >= FISH_SPECIES_MIN_RECORDS)
+    added = resolver.add_species(names)
+    resolver.save()
+    print(f"✅ [词典] 从 {path} 加入 {added} 种鱼，词典共 {len(resolver.species)} 种")
+    return 0
 
-                # 确保scr对象和_handles属性正确初始化
-                if (
-                    hasattr(scr, "_handles")
-                    and hasattr(scr._handles, "srcdc")
-                    and scr._handles.srcdc is not None
-                ):
-                    # 处理加时选择（使用锁保护读取jiashi_var）
-                    with param_lock:
-                        current_jiashi = jiashi_var
 
-                    if current_jiashi == 0:
-                        if fangzhu_jiashi(scr):
-                            # 确保按钮坐标已初始化
-                            if btn_no_jiashi_coords is None:
-                                update_region_coords()
-                            btn_x, btn_y = btn_no_jiashi_coords
-                            user32.SetCursorPos(btn_x, btn_y)
-                            time.sleep(0.05)
-                            user32.mouse_event(0x02, 0, 0, 0, 0)
-                            time.sleep(0.1)
-                            user32.mouse_event(0x04, 0, 0, 0, 0)
-                            time.sleep(0.05)
-                            if bait_math_val(scr):
-                                with param_lock:
-                                    previous_result = result_val_is
-                    elif current_jiashi == 1:
-                        if fangzhu_jiashi(scr):
-                            # 确保按钮坐标已初始化
-                            if btn_yes_jiashi_coords is None:
-                                update_region_coords()
-                            btn_x, btn_y = btn_yes_jiashi_coords
-                            user32.SetCursorPos(btn_x, btn_y)
-                            time.sleep(0.05)
-                            user32.mouse_event(0x02, 0, 0, 0, 0)
-                            time.sleep(0.1)
-                            user32.mouse_event(0x04, 0, 0, 0, 0)
-                            time.sleep(0.05)
-                            if bait_math_val(scr):
-                                with param_lock:
-                                    previous_result = result_val_is
-
-                # 确保资源被正确释放
-                scr.close()
-            except Exception as e:
-                print(f"❌ [错误] 加时线程异常: {e}")
-                # 确保即使发生异常也能释放资源
-                try:
-                    if "scr" in locals() and scr is not None:
-                        scr.close()
-                except:
-                    pass
-        time.sleep(0.05)
+def run_session_replay(hours=8.0, seed=0, bucket_full_at=None, width=1920, height=1080):
+    """用模拟时钟离线回放一整段钓鱼会话
 
+    在当前线程里按状态机逐步运行真实的钓鱼流程（抛竿、等待上鱼、收线、加时处理），
+    画面来自游戏模拟器，鼠标操作交给模拟器；时间全部由 SimulatedClock 推进，
+    鱼桶满检测注册为每0.5秒（虚拟时间）一次的定时回调，和检测线程使用同一个检查函数。
+    bucket_full_at（小时）之后模拟器里的抛竿都会失败，用来测量鱼桶满的判定延迟；
+    在此之前的判定计为误报。回放期间的运行日志不输出
 
-def main():
-    global templates, template_folder_path, current_result, previous_result, times, a, region1, region2, result_val_is, scr, jiashi_var
+    Returns:
+        dict: 轮数、每小时轮数、每轮耗时、上鱼数、误操作次数、鱼桶满误报次数、判定延迟以及各操作的抖动统计；
+        无法识别模拟画面时返回None
+    """
+    global clock, frame_bus, input_backend, fishing_fsm, jitter_random
+    global debug_mode, previous_result, a, last_operation_time, last_operation_type
+
+    apply_target_resolution(width, height)
+    debug_mode = False
+    saved = (clock, frame_bus, input_backend, fishing_fsm, jitter_random)
+
+    clock = SimulatedClock()
+    jitter_random = random.Random(seed)
+    simulator = FishingGameSimulator(seed=seed)
+    input_backend = RecordingInputBackend(listener=simulator.on_input)
+    frame_bus = SynchronousFrameBus(SimulatedFrameSource(simulator))
+    fishing_fsm = FishingStateMachine()
+
+    detector = BucketFullIntervalDetector(verbose=False)
+    jitter = {"抛竿": [], "收线": [], "放线": []}
+    state = {"detected_at": None, "false_alarms": 0}
+    end = hours * 3600
+    full_from = bucket_full_at * 3600 if bucket_full_at is not None else None
+
+    def record_timing(operation_type, base_time, actual_time):
+        if operation_type in jitter and base_time > 0:
+            jitter[operation_type].append(actual_time / base_time - 1)
+
+    def bucket_full_check():
+        if state["detected_at"] is not None or not check_bucket_full_interval(detector):
+            return
+        if full_from is not None and clock.time() >= full_from:
+            state["detected_at"] = clock.time()
+        else:
+            state["false_alarms"] += 1
+            detector.reset()
 
-    # 启动加时处理线程
-    jiashi_thread = threading.Thread(target=handle_jiashi_thread, daemon=True)
-    jiashi_thread.start()
+    def fill_bucket():
+        simulator.bucket_full = True
 
-    # 启动鱼桶满独立检测线程
-    bucket_full_thread = threading.Thread(
-        target=bucket_full_detection_thread, daemon=True
+    clock.call_at(0.5, bucket_full_check, interval=0.5)
+    if full_from is not None:
+        clock.call_at(full_from, fill_bucket)
+    timing_listeners.append(record_timing)
+    with casting_interval_lock:
+        casting_timestamps.clear()
+    last_operation_time = last_operation_type = None
+    a = 0
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if bait_math_val(frame_bus.fetch(["bait"])) is None:
+                return None
+            previous_result = result_val_is
+            game_state_classifier.reset_stats()
+            roi_tracker.reset()
+            run_event.set()
+            main_sub = frame_bus.subscribe("main", [])
+            while clock.time() < end and state["detected_at"] is None:
+                run_fishing_state_tick(fishing_fsm, main_sub)
+        elapsed = clock.time()
+        fsm_stats = fishing_fsm.get_stats()
+    finally:
+        run_event.clear()
+        timing_listeners.remove(record_timing)
+        with casting_interval_lock:
+            casting_timestamps.clear()
+        clock, frame_bus, input_backend, fishing_fsm, jitter_random = saved
+
+    jitter_stats = {}
+    for name, values in jitter.items():
+        if values:
+            mean = sum(values) / len(values)
+            std = (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+            jitter_stats[name] = {
+                "count": len(values),
+                "mean_pct": mean * 100,
+                "std_pct": std * 100,
+                "min_pct": min(values) * 100,
+                "max_pct": max(values) * 100,
+            }
+    detected_at = state["detected_at"]
+    return {
+        "virtual_seconds": elapsed,
+        "cycles": fsm_stats["cycles"],
+        "cycles_per_hour": fsm_stats["cycles"] / (elapsed / 3600) if elapsed else 0.0,
+        "avg_cycle": fsm_stats["avg_cycle"],
+        "fish": simulator.counters["fish"],
+        "false_triggers": simulator.counters["false_triggers"],
+        "false_alarms": state["false_alarms"],
+        "bucket_full_delay": detected_at - full_from if detected_at is not None else None,
+        "jitter": jitter_stats,
+    }
+
+
+def tool_replay_session(args):
+    """--replay-session [小时] [随机种子] [鱼桶满时刻(小时)]"""
+    try:
+        hours = float(args[0]) if args else 8.0
+        seed = int(args[1]) if len(args) > 1 else 0
+        bucket_full_at = float(args[2]) if len(args) > 2 else None
+    except ValueError:
+        print("用法: PartyFish.py --replay-session [小时] [随机种子] [鱼桶满时刻(小时)]")
+        return 2
+    load_parameters()
+    start = time.perf_counter()
+    report = run_session_replay(hours, seed, bucket_full_at)
+    elapsed = time.perf_counter() - start
+    if report is None:
+        print("❌ [回放] 无法识别模拟画面中的鱼饵数量")
+        return 1
+    print(
+        f"⏱️  [回放] 虚拟 {report['virtual_seconds'] / 3600:.2f} 小时，实际耗时 {elapsed:.2f}s："
+        f"{report['cycles']} 轮（{report['cycles_per_hour']:.1f} 轮/小时），平均每轮 {report['avg_cycle']:.1f}s"
     )
-    bucket_full_thread.start()
+    print(f"   上鱼 {report['fish']} 条，误操作 {report['false_triggers']} 次")
+    print(f"   鱼桶满误报 {report['false_alarms']} 次")
+    if bucket_full_at is not None:
+        delay = report["bucket_full_delay"]
+        print(
+            f"   鱼桶满判定延迟: {delay:.1f}s" if delay is not None else "   鱼桶满未被判定"
+        )
+    for name, stats in report["jitter"].items():
+        print(
+            f"   抖动 {name}: {stats['count']} 次，平均 {stats['mean_pct']:+.2f}%，"
+            f"标准差 {stats['std_pct']:.2f}%，范围 {stats['min_pct']:+.1f}% ~ {stats['max_pct']:+.1f}%"
+        )
+    return 0
 
-    while True:
-        if run_event.is_set():
-            scr = None
-            try:
-                # 创建新的截图对象，确保每次都是新鲜的
-                scr = mss.mss()
 
-                # 检查截图对象是否有效
-                if scr is None:
-                    print("⚠️  [警告] 截图对象创建失败")
-                    time.sleep(0.1)
-                    continue
+RESOLUTION_PRESETS = {"1080P": (1920, 1080), "2K": (2560, 1440), "4K": (3840, 2160)}
 
-                # 先检查是否需要处理加时
-                if handle_jiashi_in_action(scr):
-                    # 确保释放截图对象
-                    try:
-                        scr.close()
-                    except:
-                        pass
-                    scr = None
-                    continue
 
-                # 检测F1/F2抛竿
-                if f1_mached(scr) or f2_mached(scr):
-                    # 检查是否正在放生，如果是则等待
-                    with operation_lock:
-                        if is_releasing:
-                            print("⏳ [提示] 正在放生，等待放生完成后再抛杆")
-                            time.sleep(0.5)
-                            continue
-                        # 设置抛杆状态
-                        is_casting = True
-                    
-                    try:
-                        # 在这里记录抛竿时间
-                        current_time = time.time()
-                        with casting_interval_lock:
-                            casting_timestamps.append(current_time)
-                            # 保持队列长度，防止内存泄露
-                            if len(casting_timestamps) > 20:
-                                casting_timestamps.pop(0)
-                        user32.mouse_event(0x02, 0, 0, 0, 0)
-                        jittered_pao = add_jitter(paogantime)
-                        time.sleep(jittered_pao)
-                        print_timing_info("抛竿", paogantime, jittered_pao)
-                        user32.mouse_event(0x04, 0, 0, 0, 0)
-                        time.sleep(0.15)
-                    finally:
-                        # 无论是否异常，都要重置抛杆状态
-                        with operation_lock:
-                            is_casting = False
-                elif shangyu_mached(scr):
-                    user32.mouse_event(0x02, 0, 0, 0, 0)
-                    time.sleep(0.1)
-                    user32.mouse_event(0x04, 0, 0, 0, 0)
+def parse_resolution(text):
+    """解析分辨率参数：1080P/2K/4K 或 宽x高"""
+    if text.upper() in RESOLUTION_PRESETS:
+        return RESOLUTION_PRESETS[text.upper()]
+    width, height = text.lower().replace("×", "x").split("x")
+    return int(width), int(height)
 
-                time.sleep(0.05)
 
-                # 获取当前结果
-                bait_result = bait_math_val(scr)
-                if bait_result is not None:
-                    current_result = result_val_is
-                else:
-                    current_result = previous_result  # 将当前数字设为上次的数字
-                    time.sleep(0.1)
-                    # 确保释放截图对象
-                    try:
-                        scr.close()
-                    except:
-                        pass
-                    scr = None
-                    continue
+def tool_simulate(args):
+    """--simulate [分辨率] [虚拟分钟] [倍速] [随机种子]"""
+    try:
+        width, height = parse_resolution(args[0]) if args else (2560, 1440)
+        minutes = float(args[1]) if len(args) > 1 else 60.0
+        speed = float(args[2]) if len(args) > 2 else 10.0
+        seed = int(args[3]) if len(args) > 3 else 0
+    except ValueError:
+        print("用法: PartyFish.py --simulate [1080P/2K/4K/宽x高] [虚拟分钟] [倍速] [随机种子]")
+        return 2
+    print(f"🎮 [模拟] {width}×{height}，模拟 {minutes:g} 分钟，{speed:g} 倍速，种子 {seed}")
+    report = run_game_simulation(width, height, minutes, speed, seed)
+    if report is None:
+        return 1
+    counters = report["counters"]
+    print(
+        f"🎮 [模拟] 虚拟 {report['virtual_seconds'] / 60:.1f} 分钟（实际 {report['real_seconds']:.1f}s）"
+        + ("，脚本提前停止" if report["stopped_early"] else "")
+    )
+    print(
+        f"   上鱼 {counters['fish']} 条（{report['fish_per_hour']:.1f} 条/小时），"
+        f"跑鱼 {counters['escaped']} 条，抛竿 {counters['casts']} 次（失败 {counters['failed_casts']}），"
+        f"加时 {counters['overtime']} 次"
+    )
+    for name, latency in report["latencies"].items():
+        print(
+            f"   反应延迟 {name}: 平均 {latency['avg_ms']:.0f}ms，P95 {latency['p95_ms']:.0f}ms（{latency['count']} 次）"
+        )
+    states = "，".join(f"{state} {count}" for state, count in report["false_trigger_states"].items())
+    print(f"   误操作 {counters['false_triggers']} 次" + (f"（{states}）" if states else ""))
+    print(f"   输入事件 {report['input']['events']} 个（{report['input']['calls']} 次调用）")
+    print_fishing_fsm_stats(report["fsm"])
+    print_game_state_classifier_stats()
+    print_roi_tracker_stats()
+    return 0
+
+
+# 命令行参数 -> 工具函数
+COMMAND_LINE_TOOLS = {
+    "--replay": tool_replay,
+    "--benchmark-gray": tool_benchmark_gray,
+    "--benchmark-digits": tool_benchmark_digits,
+    "--benchmark-bait": tool_benchmark_bait,
+    "--benchmark-match": tool_benchmark_match,
+    "--build-template-pack": tool_build_template_pack,
+    "--benchmark-tracking": tool_benchmark_tracking,
+    "--benchmark-ncc": tool_benchmark_ncc,
+    "--benchmark-ocr": tool_benchmark_ocr,
+    "--benchmark-quality-color": tool_benchmark_quality_color,
+    "--benchmark-fish-names": tool_benchmark_fish_names,
+    "--build-species-dict": tool_build_species_dict,
+    "--simulate": tool_simulate,
+    "--replay-session": tool_replay_session,
+    "--calibrate-thresholds": tool_calibrate_thresholds,
+}
 
-                # 比较并执行操作
-                comparison_result = compare_results()
-                time.sleep(0.01)
-
-                if comparison_result == -1:  # 当前结果小于上次结果
-                    previous_result = current_result  # 更新上次识别的结果
-                    while not fished(scr) and run_event.is_set():
-                        # 使用锁保护读取times
-                        with param_lock:
-                            current_times = times
-                        if a <= current_times:
-                            a += 1
-                            # 调用优化后的点击循环函数，如果返回False表示遇到异常需中断
-                            if not pressandreleasemousebutton():
-                                a = 0
-                                break
-                        else:
-                            a = 0
-                            print("🎣 [提示] 达到最大拉杆次数，本轮结束")
-                            break
-                    ensure_mouse_up()
-                    a = 0
-
-                    # 钓到鱼后，识别并记录鱼的信息
-                    if OCR_AVAILABLE and record_fish_enabled:
-                        try:
-                            record_caught_fish()
-                        except Exception as e:
-                            print(f"⚠️  [警告] 记录鱼信息失败: {e}")
-                elif comparison_result == 1:
-                    previous_result = current_result
-                    # continue会在finally中关闭scr
-            except Exception as e:
-                print(f"❌ [错误] 主循环异常: {e}")
-                # 记录更详细的错误信息
-                import traceback
 
-                traceback.print_exc()
-            finally:
-                # 确保mss资源被正确释放
-                if scr is not None:
-                    try:
-                        scr.close()
-                    except:
-                        pass
-                    scr = None
-        time.sleep(0.1)
+def run_command_line_tool(argv):
+    """执行命令行工具，返回进程退出码"""
+    tool = COMMAND_LINE_TOOLS.get(argv[0])
+    if tool is None:
+        print(f"❌ [错误] 未知命令: {argv[0]}，可用命令: {', '.join(COMMAND_LINE_TOOLS)}")
+        return 2
+    return tool(argv[1:])
 
 
 # =========================
 # 程序入口
 # =========================
 if __name__ == "__main__":
+    # 命令行工具模式（回放测试等）不启动GUI
+    if len(sys.argv) > 1 and sys.argv[1].startswith("--"):
+        sys.exit(run_command_line_tool(sys.argv[1:]))
+
     # 先加载参数以获取热键设置
     load_parameters()
 
@@ -8294,3 +13598,6 @@ if __name__ == "__main__":
         print("└" + "─" * 48 + "┘")
         # 确保所有资源都能正确释放
         pass
+    finally:
+        # 退出前写入尚未保存的OCR结果缓存
+        ocr_result_cache.flush()
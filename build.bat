@@ -1,6 +1,9 @@
 @echo off
 echo 正在打包 PartyFish...
 
+echo 正在生成模板包...
+python PartyFish.py --build-template-pack
+
 pyinstaller --noconfirm ^
     --name "PartyFish" ^
     --windowed ^
@@ -46,6 +46,15 @@ try {
     Write-Host "Warning: Failed to copy model files: $_" -ForegroundColor Yellow
 }
 
+# Build the precompiled template pack (resources\templates_pack.npz)
+Write-Host "Building template pack..." -ForegroundColor Yellow
+try {
+    & $pythonPath PartyFish.py --build-template-pack
+    Write-Host "Template pack built successfully" -ForegroundColor Green
+} catch {
+    Write-Host "Warning: Failed to build template pack, PNG templates will be used: $_" -ForegroundColor Yellow
+}
+
 # Run PyInstaller to build the application
 Write-Host "Running PyInstaller..." -ForegroundColor Yellow
 try {
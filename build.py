@@ -13,6 +13,12 @@ def main():
             import shutil
             shutil.rmtree(item)
 
+    # 生成预编译模板包（resources/templates_pack.npz），随 resources 目录一起打包
+    print("正在生成模板包...")
+    pack_result = subprocess.run([sys.executable, "PartyFish.py", "--build-template-pack"])
+    if pack_result.returncode != 0:
+        print("模板包生成失败，程序将在运行时使用PNG模板")
+
     # 构建命令
     cmd = [
         sys.executable,  # 当前Python解释器
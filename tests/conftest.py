@@ -0,0 +1,33 @@
+"""测试公共设置：在仓库根目录下导入 PartyFish（资源路径是相对当前目录的 ./resources）"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import PartyFish  # noqa: E402
+
+
+@pytest.fixture
+def pf():
+    return PartyFish
+
+
+@pytest.fixture
+def resolution():
+    """切换目标分辨率，测试结束后恢复"""
+    saved = (PartyFish.TARGET_WIDTH, PartyFish.TARGET_HEIGHT)
+    yield PartyFish.apply_target_resolution
+    PartyFish.apply_target_resolution(*saved)
+
+
+@pytest.fixture
+def sim_clock(monkeypatch):
+    """把模块使用的时钟换成模拟时钟"""
+    clock = PartyFish.SimulatedClock(start=1000.0)
+    monkeypatch.setattr(PartyFish, "clock", clock)
+    return clock
@@ -0,0 +1,60 @@
+"""plan_capture_rects 区域规划"""
+
+import pytest
+
+
+def _contains(tile, rect):
+    return (
+        tile[0] <= rect[0]
+        and tile[1] <= rect[1]
+        and rect[0] + rect[2] <= tile[0] + tile[2]
+        and rect[1] + rect[3] <= tile[1] + tile[3]
+    )
+
+
+def test_nearby_regions_are_merged(pf):
+    rects = [(1100, 1329, 10, 19), (1212, 1329, 10, 19), (1146, 1316, 17, 21)]
+    tiles = pf.plan_capture_rects(rects, pf.GrabCostModel())
+    assert tiles == [(1100, 1316, 122, 32)]
+
+
+def test_distant_regions_stay_separate(pf):
+    rects = [(0, 0, 10, 10), (2500, 1400, 10, 10)]
+    tiles = pf.plan_capture_rects(rects, pf.GrabCostModel())
+    assert sorted(tiles) == sorted(rects)
+
+
+def test_duplicates_are_captured_once(pf):
+    rect = (10, 20, 30, 40)
+    assert pf.plan_capture_rects([rect, rect], pf.GrabCostModel()) == [rect]
+
+
+def test_merging_follows_cost_model(pf):
+    rects = [(0, 0, 100, 100), (1000, 0, 100, 100)]
+    # 固定开销大时合并省时，像素开销大时分开截图
+    assert len(pf.plan_capture_rects(rects, pf.GrabCostModel(overhead=0.01, per_pixel=1e-9))) == 1
+    assert len(pf.plan_capture_rects(rects, pf.GrabCostModel(overhead=1e-5, per_pixel=1e-7))) == 2
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_every_region_is_covered(pf, seed):
+    import random
+
+    rng = random.Random(seed)
+    rects = [
+        (rng.randrange(0, 2500), rng.randrange(0, 1400), rng.randrange(5, 200), rng.randrange(5, 200))
+        for _ in range(9)
+    ]
+    model = pf.GrabCostModel()
+    tiles = pf.plan_capture_rects(rects, model)
+    assert all(any(_contains(tile, rect) for tile in tiles) for rect in rects)
+    # 规划结果的总耗时不超过逐个截图
+    assert sum(map(model.cost, tiles)) <= sum(map(model.cost, set(rects))) + 1e-12
+
+
+def test_cost_model_fits_observed_grabs(pf):
+    model = pf.GrabCostModel()
+    for area in [1_000, 50_000, 200_000, 800_000, 2_000_000] * 4:
+        model.observe(area, 0.002 + 4e-9 * area)
+    assert model.overhead == pytest.approx(0.002, rel=1e-3)
+    assert model.per_pixel == pytest.approx(4e-9, rel=1e-3)
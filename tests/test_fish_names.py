@@ -0,0 +1,93 @@
+"""FishNameResolver / resolve_fish_name 鱼名识别"""
+
+import pytest
+
+
+@pytest.fixture
+def resolver(pf):
+    return pf.FishNameResolver(
+        [
+            {"name": "大口黑鲈"},
+            {"name": "鲤鱼"},
+            {"name": "美髯公", "aliases": ["美须公"]},
+            {"name": "地包天鱼", "phantom_rare": True},
+        ]
+    )
+
+
+@pytest.fixture
+def shipped(pf, monkeypatch):
+    """resources 中随程序发布的鱼名词典"""
+    resolver = pf.FishNameResolver.load()
+    monkeypatch.setattr(pf, "_fish_name_resolver", resolver)
+    return resolver
+
+
+def test_normalize_strips_prefix_quality_and_weight(pf):
+    assert pf.normalize_fish_name_text("你钓到了 大口 黑鲈 史诗 4.1kg") == ["大口", "黑鲈"]
+    assert pf.normalize_fish_name_text("首次捕獲！鯉魚 標準 0.8千克") == ["鲤鱼"]
+
+
+def test_exact_and_alias(resolver):
+    assert resolver.resolve("你钓到了 鲤鱼 标准 0.8kg") == ("鲤鱼", 1.0)
+    assert resolver.resolve("你钓到了 美须公 传奇 2.5kg") == ("美髯公", 1.0)
+    # 繁体先转成简体
+    assert resolver.resolve("你釣到了 美鬚公 傳奇 2.5kg") == ("美髯公", 1.0)
+
+
+def test_words_split_by_ocr_are_joined(resolver):
+    assert resolver.resolve("你钓到了 大口 黑鲈 史诗 4.1kg") == ("大口黑鲈", 1.0)
+
+
+def test_fuzzy_match_within_edit_budget(resolver):
+    name, score = resolver.resolve("你钓到了 大口白鲈 史诗 4.1kg")
+    assert name == "大口黑鲈"
+    assert score == pytest.approx(0.75)
+    # 3个字以内的鱼名不允许错字
+    assert resolver.resolve("你钓到了 鲤虾 标准 0.8kg") == (None, 0.0)
+
+
+def test_phantom_rare_lookup(resolver):
+    assert resolver.is_phantom_rare("地包天鱼")
+    assert not resolver.is_phantom_rare("地包夭鱼")
+    assert not resolver.is_phantom_rare("鲤鱼")
+    assert not resolver.is_phantom_rare("")
+
+
+def test_add_species_rebuilds_index(resolver):
+    assert resolver.add_species(["草鱼", "鲤鱼"]) == 1
+    assert resolver.resolve("你钓到了 草鱼 标准 1.0kg") == ("草鱼", 1.0)
+
+
+def test_save_and_load_round_trip(pf, resolver, tmp_path):
+    path = str(tmp_path / "species.json")
+    resolver.save(path)
+    loaded = pf.FishNameResolver.load(path)
+    assert loaded.species == resolver.species
+    assert loaded.phantom_rare == {"地包天鱼"}
+
+
+def test_missing_dictionary_falls_back_to_phantom_rare(pf, tmp_path):
+    loaded = pf.FishNameResolver.load(str(tmp_path / "missing.json"))
+    assert loaded.phantom_rare == set(pf.PHANTOM_RARE_FISHES)
+
+
+def test_resolve_fish_name_with_shipped_dictionary(pf, shipped):
+    assert pf.resolve_fish_name("你钓到了 大口 黑鲈 史诗 4.1kg") == ("大口黑鲈", 1.0)
+    assert pf.resolve_fish_name("你钓到了 大口白鲈 史诗 4.1kg")[0] == "大口黑鲈"
+    assert pf.resolve_fish_name("首次捕获 鲤鱼 标准 0.8kg")[0] == "鲤鱼"
+
+
+def test_resolve_fish_name_never_guesses_phantom_rare(pf, shipped):
+    # 一个错字的文本与幻神稀有鱼相近时不替换，保留原文
+    name, score = pf.resolve_fish_name("你钓到了 地包夭鱼 传奇 1.2kg")
+    assert name == "地包夭鱼"
+    assert score == pytest.approx(0.75)
+    assert not shipped.is_phantom_rare(name)
+    assert pf.resolve_fish_name("你钓到了 地包天鱼 传奇 1.2kg")[0] == "地包天鱼"
+
+
+def test_resolve_fish_name_fallback_keeps_multi_word_names(pf, shipped):
+    assert pf.resolve_fish_name("你钓到了 金色 龙王 史诗 4.1kg")[0] == "金色 龙王"
+    # 单个字视为误识别，没有可用文字时返回None
+    assert pf.resolve_fish_name("你钓到了 鲤 标准 0.8kg")[0] is None
@@ -0,0 +1,92 @@
+"""FishingStateMachine 状态切换、检测器调度和耗时统计（模拟时钟）"""
+
+import pytest
+
+
+@pytest.fixture
+def fsm(pf, sim_clock):
+    return pf.FishingStateMachine()
+
+
+def test_transition_records_history(fsm, sim_clock):
+    assert fsm.transition("CASTING", "F1/F2") == "IDLE"
+    sim_clock.sleep(2.0)
+    assert fsm.transition("WAITING_BITE") == "CASTING"
+    assert fsm.state == "WAITING_BITE"
+    assert [(old, new, reason) for _, old, new, reason in fsm.history] == [
+        ("IDLE", "CASTING", "F1/F2"),
+        ("CASTING", "WAITING_BITE", ""),
+    ]
+    assert fsm.history[1][0] == sim_clock.time()
+
+
+def test_same_state_is_not_a_transition(fsm):
+    fsm.transition("CASTING")
+    fsm.transition("CASTING")
+    assert len(fsm.history) == 1
+
+
+def test_overtime_prompt_remembers_return_state(fsm):
+    fsm.transition("WAITING_BITE")
+    fsm.transition("OVERTIME_PROMPT", "检测到加时")
+    assert fsm.return_state == "WAITING_BITE"
+    fsm.transition(fsm.return_state)
+    assert fsm.state == "WAITING_BITE"
+
+
+def test_cycle_time_is_measured_between_casts(fsm, sim_clock):
+    for seconds in (12.0, 8.0):
+        fsm.transition("CASTING")
+        sim_clock.sleep(1.0)
+        fsm.transition("WAITING_BITE")
+        sim_clock.sleep(seconds - 1.0)
+        fsm.transition("LANDED")
+    fsm.transition("CASTING")
+    stats = fsm.get_stats()
+    assert stats["cycles"] == 2
+    assert stats["avg_cycle"] == pytest.approx(10.0)
+    assert (stats["min_cycle"], stats["max_cycle"]) == (pytest.approx(8.0), pytest.approx(12.0))
+    assert stats["state_time"]["CASTING"] == pytest.approx(2.0)
+    assert stats["state_time"]["WAITING_BITE"] == pytest.approx(18.0)
+
+
+def test_reset_returns_to_idle_and_drops_open_cycle(fsm, sim_clock):
+    fsm.transition("CASTING")
+    sim_clock.sleep(5.0)
+    fsm.reset()
+    fsm.transition("CASTING")
+    assert fsm.state == "CASTING"
+    assert fsm.get_stats()["cycles"] == 0
+
+
+def test_due_detectors_follow_state_intervals(pf, fsm, sim_clock):
+    fsm.transition("WAITING_BITE")
+    now = sim_clock.time()
+    spec = pf.FISHING_STATE_DETECTORS["WAITING_BITE"]
+    assert set(fsm.due_detectors(now)) == set(spec)
+    fsm.mark_run(list(spec), now)
+    assert fsm.due_detectors(now + 0.01) == []
+    assert set(fsm.due_detectors(now + 0.1)) == {"bait", "bite"}
+    assert set(fsm.due_detectors(now + 0.25)) == set(spec)
+
+
+def test_entering_a_state_runs_its_detectors_immediately(fsm, sim_clock):
+    fsm.transition("WAITING_BITE")
+    now = sim_clock.time()
+    fsm.mark_run(["bait", "bite", "f1", "f2", "jiashi"], now)
+    fsm.transition("OVERTIME_PROMPT")
+    assert fsm.due_detectors(now) == ["jiashi"]
+    fsm.transition("CASTING")
+    assert fsm.due_detectors(now) == []
+
+
+def test_session_replay_drives_the_state_machine(pf, resolution):
+    """用游戏模拟器和模拟时钟跑半小时真实的钓鱼流程"""
+    saved = (pf.clock, pf.frame_bus, pf.input_backend, pf.fishing_fsm)
+    report = pf.run_session_replay(0.5, seed=0)
+    assert (pf.clock, pf.frame_bus, pf.input_backend, pf.fishing_fsm) == saved
+    assert report["virtual_seconds"] == pytest.approx(1800, abs=1)
+    assert report["cycles"] > 20
+    assert report["fish"] >= report["cycles"] - 1
+    assert report["false_triggers"] == 0
+    assert report["false_alarms"] == 0
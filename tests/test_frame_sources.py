@@ -0,0 +1,49 @@
+"""ImageDirFrameSource 回放截图目录"""
+
+import json
+
+import cv2
+import numpy as np
+
+
+def test_png_directory_with_labels(pf, tmp_path):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (108, 192, 3), dtype=np.uint8) for _ in range(2)]
+    for i, frame in enumerate(frames):
+        cv2.imwrite(str(tmp_path / f"{i}.png"), frame)
+    (tmp_path / "labels.json").write_text(json.dumps({"1.png": {"f1": True}}), encoding="utf-8")
+
+    source = pf.ImageDirFrameSource(str(tmp_path))
+    assert len(source) == 2 and source.screen_size == (192, 108)
+    assert not source.realtime
+
+    timestamp, tiles, labels = source.read([])
+    assert timestamp == 0 and labels is None
+    assert tiles[0].rect == (0, 0, 192, 108)
+    np.testing.assert_array_equal(tiles[0].bgra[:, :, :3], frames[0])
+    timestamp, tiles, labels = source.read([])
+    assert timestamp == pf.FRAME_BUS_INTERVAL and labels == {"f1": True}
+    assert source.read([]) is None
+
+
+def test_loop_and_recorder_npz(pf, tmp_path):
+    roi = np.arange(3 * 19 * 10, dtype=np.uint8).reshape(3, 19, 10)
+    np.savez(
+        tmp_path / "session.npz",
+        timestamps=np.array([1.0, 1.5, 2.0]),
+        names=np.array(["f1"]),
+        rects=np.array([[1100, 1329, 10, 19]]),
+        screen=np.array([2560, 1440]),
+        roi_f1=roi,
+        valid_f1=np.array([True, False, True]),
+    )
+    source = pf.ImageDirFrameSource(str(tmp_path), loop=True)
+    assert len(source) == 3 and source.screen_size == (2560, 1440)
+
+    timestamp, tiles, _ = source.read([])
+    assert timestamp == 1.0 and tiles[0].rect == (1100, 1329, 10, 19)
+    np.testing.assert_array_equal(tiles[0].gray, roi[0])
+    # 录制时没有截到的区域不返回
+    assert source.read([])[1] == []
+    source.read([])
+    assert source.read([])[0] == 1.0
@@ -0,0 +1,85 @@
+"""NccMatcher / ncc_match_max 与 cv2.matchTemplate(TM_CCOEFF_NORMED) 的一致性"""
+
+import cv2
+import numpy as np
+import pytest
+
+
+def _opencv_scores(region, template):
+    return cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+
+
+@pytest.mark.parametrize("region_shape,template_shape", [((19, 10), (19, 10)), ((25, 25), (23, 25)), ((30, 24), (26, 21))])
+def test_scores_match_opencv(pf, region_shape, template_shape):
+    rng = np.random.default_rng(0)
+    region = rng.integers(0, 256, region_shape, dtype=np.uint8)
+    template = rng.integers(0, 256, template_shape, dtype=np.uint8)
+    expected = _opencv_scores(region, template).ravel()
+    scores = pf.NccMatcher([template]).scores(region)[:, 0]
+    np.testing.assert_allclose(scores, expected, atol=1e-4)
+
+
+def test_match_finds_template_position(pf):
+    rng = np.random.default_rng(1)
+    region = rng.integers(0, 256, (24, 20), dtype=np.uint8)
+    template = region[3:21, 2:17].copy()
+    [(score, loc)] = pf.NccMatcher([template]).match(region)
+    _, expected_score, _, expected_loc = cv2.minMaxLoc(_opencv_scores(region, template))
+    assert loc == expected_loc == (2, 3)
+    assert score == pytest.approx(expected_score, abs=1e-4)
+
+
+def test_several_templates_in_one_pass(pf):
+    rng = np.random.default_rng(2)
+    region = rng.integers(0, 256, (19, 10), dtype=np.uint8)
+    templates = [region.copy(), rng.integers(0, 256, (19, 10), dtype=np.uint8)]
+    results = pf.NccMatcher(templates).match(region)
+    for (score, _), template in zip(results, templates):
+        assert score == pytest.approx(float(_opencv_scores(region, template).max()), abs=1e-4)
+    assert results[0][0] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_flat_region_scores_zero(pf):
+    template = np.random.default_rng(3).integers(0, 256, (19, 10), dtype=np.uint8)
+    region = np.full((21, 12), 128, dtype=np.uint8)
+    assert not pf.NccMatcher([template]).scores(region).any()
+
+
+def test_templates_must_share_shape(pf):
+    with pytest.raises(ValueError):
+        pf.NccMatcher([np.zeros((5, 5), np.uint8), np.zeros((5, 6), np.uint8)])
+
+
+def test_ncc_match_max_agrees_with_opencv(pf):
+    rng = np.random.default_rng(4)
+    for region_shape, template_shape in [((19, 10), (19, 10)), ((25, 25), (23, 25)), ((60, 300), (20, 40))]:
+        region = rng.integers(0, 256, region_shape, dtype=np.uint8)
+        template = region[: template_shape[0], -template_shape[1] :].copy()
+        score, loc = pf.ncc_match_max(region, template)
+        _, expected_score, _, expected_loc = cv2.minMaxLoc(_opencv_scores(region, template))
+        assert score == pytest.approx(expected_score, abs=1e-4)
+        assert loc == expected_loc
+    assert pf.ncc_match_max(np.zeros((5, 5), np.uint8), np.zeros((6, 6), np.uint8)) == (None, None)
+
+
+def test_ncc_match_max_uses_engine_only_when_measured_faster(pf, monkeypatch):
+    rng = np.random.default_rng(5)
+    region = rng.integers(0, 256, (25, 25), dtype=np.uint8)
+    template = rng.integers(0, 256, (23, 25), dtype=np.uint8)
+    key = ((25, 25), (23, 25))
+    calls = []
+    engine = pf._engine_match_max
+    monkeypatch.setattr(pf, "_engine_match_max", lambda *args: calls.append(args) or engine(*args))
+
+    monkeypatch.setitem(pf._ncc_engine_speedups, key, 0.8)
+    pf.ncc_match_max(region, template)
+    assert not calls
+
+    monkeypatch.setitem(pf._ncc_engine_speedups, key, 2.0)
+    pf.ncc_match_max(region, template)
+    assert len(calls) == 1
+
+
+def test_large_regions_are_not_measured(pf):
+    region = np.zeros((60, 300), np.uint8)
+    assert pf.ncc_engine_speedup(region, np.zeros((20, 40), np.uint8)) is None
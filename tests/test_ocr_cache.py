@@ -0,0 +1,105 @@
+"""OcrResultCache 按横幅感知签名缓存OCR结果"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+
+def banner(pf, name, quality, weight, capture):
+    """合成鱼信息横幅：三行文字画在渐变背景上，每次“截图”的背景亮度和噪声不同"""
+    w, h = int(725 * pf.SCALE_X), int(150 * pf.SCALE_Y)
+    rng = np.random.default_rng(capture)
+    background = np.linspace(40, 70, w)[None, :] + rng.normal(0, 3, (h, w)) + rng.uniform(-8, 8)
+    img = np.clip(background, 0, 255).astype(np.uint8)
+    s = pf.SCALE_Y
+    cv2.putText(img, name, (int(20 * s), int(42 * s)), cv2.FONT_HERSHEY_SIMPLEX, 1.3 * s, 230, max(1, int(3 * s)))
+    cv2.putText(img, quality, (int(20 * s), int(88 * s)), cv2.FONT_HERSHEY_SIMPLEX, 0.9 * s, 200, max(1, int(2 * s)))
+    cv2.putText(img, weight, (int(20 * s), int(135 * s)), cv2.FONT_HERSHEY_SIMPLEX, 1.2 * s, 230, max(1, int(3 * s)))
+    img = np.clip(img.astype(np.int16) + rng.normal(0, 3, img.shape), 0, 255).astype(np.uint8)
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+
+
+@pytest.fixture
+def signature(pf, resolution):
+    resolution(2560, 1440)
+    return lambda *fish, capture: pf.fish_info_signature(banner(pf, *fish, capture=capture))
+
+
+@pytest.fixture
+def cache(pf, tmp_path, sim_clock):
+    return pf.OcrResultCache(path=str(tmp_path / "ocr_cache.json"), max_entries=4)
+
+
+BASS = ("Bass", "Rare", "4.12kg")
+RESULT = ("大口黑鲈", "稀有", 4.12, False)
+
+
+def test_same_banner_in_another_capture_hits(cache, signature):
+    assert cache.lookup("full", signature(*BASS, capture=1)) is None
+    cache.store("full", signature(*BASS, capture=1), RESULT, 120.0)
+    assert cache.lookup("full", signature(*BASS, capture=2)) == RESULT
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["saved_ms"]) == (1, 1, 120.0)
+
+
+def test_one_digit_weight_change_misses(cache, signature):
+    cache.store("full", signature(*BASS, capture=1), RESULT, 120.0)
+    assert cache.lookup("full", signature("Bass", "Rare", "4.13kg", capture=2)) is None
+    assert cache.lookup("full", signature("Carp", "Rare", "4.12kg", capture=3)) is None
+
+
+def test_results_are_per_recognition_mode(cache, signature):
+    cache.store("full", signature(*BASS, capture=1), RESULT, 120.0)
+    assert cache.lookup("layout", signature(*BASS, capture=2)) is None
+
+
+def test_least_recently_used_banner_is_evicted(cache, signature):
+    weights = [f"{w}.00kg" for w in range(1, 6)]
+    for i, weight in enumerate(weights[:4]):
+        cache.store("full", signature("Bass", "Rare", weight, capture=i), (weight,), 100.0)
+    assert cache.lookup("full", signature("Bass", "Rare", weights[0], capture=10)) == (weights[0],)
+    cache.store("full", signature("Bass", "Rare", weights[4], capture=4), (weights[4],), 100.0)
+    assert cache.get_stats()["entries"] == 4
+    # 最久未使用的是 2.00kg（1.00kg 刚被查到过）
+    assert cache.lookup("full", signature("Bass", "Rare", weights[1], capture=11)) is None
+    assert cache.lookup("full", signature("Bass", "Rare", weights[0], capture=12)) == (weights[0],)
+
+
+def test_store_again_replaces_result(cache, signature):
+    cache.store("full", signature(*BASS, capture=1), RESULT, 120.0)
+    cache.store("full", signature(*BASS, capture=2), RESULT[:2] + (4.12, True), 80.0)
+    assert cache.get_stats()["entries"] == 1
+    assert cache.lookup("full", signature(*BASS, capture=3))[3] is True
+
+
+def test_saves_are_batched_and_flushed(pf, cache, signature, sim_clock):
+    cache.store("full", signature(*BASS, capture=1), RESULT, 120.0)
+    cache.store("full", signature("Bass", "Rare", "7.50kg", capture=2), RESULT, 120.0)
+    assert not os.path.exists(cache.path)
+    sim_clock.sleep(pf.OCR_CACHE_SAVE_INTERVAL)
+    cache.store("full", signature("Bass", "Rare", "9.75kg", capture=3), RESULT, 120.0)
+    assert os.path.exists(cache.path)
+
+    os.remove(cache.path)
+    cache.flush()  # 没有新结果时不写文件
+    assert not os.path.exists(cache.path)
+    cache.store("full", signature("Carp", "Epic", "1.25kg", capture=4), RESULT, 120.0)
+    cache.flush()
+    reloaded = pf.OcrResultCache(path=cache.path, max_entries=4)
+    assert reloaded.lookup("full", signature(*BASS, capture=5)) == RESULT
+    assert reloaded.get_stats()["entries"] == 4
+
+
+def test_corrupt_file_starts_empty(pf, tmp_path, signature):
+    path = tmp_path / "ocr_cache.json"
+    path.write_text("{not json", encoding="utf-8")
+    cache = pf.OcrResultCache(path=str(path))
+    assert cache.lookup("full", signature(*BASS, capture=1)) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_signature_needs_text_lines(pf, resolution):
+    resolution(2560, 1440)
+    assert pf.fish_info_signature(np.zeros((1, 1), np.uint8)) is None
@@ -0,0 +1,65 @@
+"""RoiChangeGate 画面不变时复用上次的识别结果"""
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def gate(pf):
+    return pf.RoiChangeGate(tolerance=1.0, sample_width=16)
+
+
+@pytest.fixture
+def roi():
+    return np.random.default_rng(0).integers(0, 256, (40, 64), dtype=np.uint8)
+
+
+def test_first_lookup_misses(gate, roi):
+    hit, result, signature = gate.lookup("f1", roi, key=(1, 2))
+    assert not hit and result is None
+    assert signature.shape == (10, 16)
+
+
+def test_unchanged_roi_returns_stored_result(gate, roi):
+    _, _, signature = gate.lookup("f1", roi, key=(1, 2))
+    gate.store("f1", (1, 2), signature, 0.93)
+    noisy = np.clip(roi.astype(np.int16) + np.random.default_rng(1).integers(-1, 2, roi.shape), 0, 255)
+    assert gate.lookup("f1", noisy.astype(np.uint8), key=(1, 2))[:2] == (True, 0.93)
+    assert gate.get_stats()["f1"] == (2, 1, 0.5)
+
+
+def test_changed_roi_misses(gate, roi):
+    _, _, signature = gate.lookup("f1", roi, key=(1, 2))
+    gate.store("f1", (1, 2), signature, 0.93)
+    changed = roi.copy()
+    changed[:, :32] = 255 - changed[:, :32]
+    assert not gate.lookup("f1", changed, key=(1, 2))[0]
+
+
+def test_key_change_and_other_detectors_miss(gate, roi):
+    _, _, signature = gate.lookup("f1", roi, key=(1, 2))
+    gate.store("f1", (1, 2), signature, 0.93)
+    # 区域坐标或模板变了（例如切换分辨率）
+    assert not gate.lookup("f1", roi, key=(1, 3))[0]
+    assert not gate.lookup("f2", roi, key=(1, 2))[0]
+
+
+def test_small_roi_is_copied(gate):
+    small = np.zeros((19, 10), np.uint8)
+    _, _, signature = gate.lookup("f1", small, key=None)
+    gate.store("f1", None, signature, False)
+    # 原区域是帧缓冲区的视图，之后被覆盖不能影响缓存的画面
+    small[:] = 255
+    assert not gate.lookup("f1", small, key=None)[0]
+
+
+def test_reset_and_disabled(pf, gate, roi, monkeypatch):
+    _, _, signature = gate.lookup("f1", roi, key=None)
+    gate.store("f1", None, signature, 1)
+    gate.reset()
+    assert not gate.lookup("f1", roi, key=None)[0]
+
+    _, _, signature = gate.lookup("f1", roi, key=None)
+    gate.store("f1", None, signature, 1)
+    monkeypatch.setattr(pf, "FRAME_DIFF_GATING_ENABLED", False)
+    assert gate.lookup("f1", roi, key=None) == (False, None, None)
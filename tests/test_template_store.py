@@ -0,0 +1,58 @@
+"""TemplateStore 模板解码一次、缩放版本LRU缓存"""
+
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def store(pf, tmp_path):
+    rng = np.random.default_rng(0)
+    for name in ("a.png", "b.png"):
+        cv2.imwrite(str(tmp_path / name), rng.integers(0, 256, (20, 30, 3), dtype=np.uint8))
+    return pf.TemplateStore(str(tmp_path), max_scaled=2, use_pack=False)
+
+
+def test_original_is_grayscale_and_decoded_once(store):
+    first = store.original("a.png")
+    assert first.shape == (20, 30) and first.dtype == np.uint8
+    assert store.original("a.png") is first
+    assert store.get_stats()["decodes"] == 1
+
+
+def test_scaled_versions_are_cached(store):
+    half = store.get("a.png", 0.5)
+    assert half.shape == (10, 15)
+    assert store.get("a.png", 0.5) is half
+    stats = store.get_stats()
+    assert (stats["hits"], stats["misses"], stats["decodes"]) == (1, 1, 1)
+    # 插值方式不同是不同的缓存项
+    store.get("a.png", 0.5, cv2.INTER_AREA)
+    assert store.get_stats()["misses"] == 2
+
+
+def test_least_recently_used_scale_is_evicted(store):
+    a_half = store.get("a.png", 0.5)
+    store.get("a.png", 2.0)
+    store.get("a.png", 0.5)  # 0.5 变为最近使用
+    store.get("b.png", 0.5)  # 超过 max_scaled=2，淘汰 a.png@2.0
+    stats = store.get_stats()
+    assert (stats["evictions"], stats["cached"]) == (1, 2)
+    assert store.get("a.png", 0.5) is a_half
+    misses = store.get_stats()["misses"]
+    store.get("a.png", 2.0)
+    assert store.get_stats()["misses"] == misses + 1
+    # 重新生成缩放版本不需要再解码PNG
+    assert store.get_stats()["decodes"] == 2
+
+
+def test_default_scale_follows_resolution(pf, store, resolution):
+    resolution(3840, 2160)
+    assert store.get("a.png").shape == (int(20 * pf.SCALE_UNIFORM), int(30 * pf.SCALE_UNIFORM))
+
+
+def test_clear_drops_cached_templates(store):
+    store.get("a.png", 0.5)
+    store.clear()
+    store.get("a.png", 0.5)
+    assert store.get_stats()["decodes"] == 2